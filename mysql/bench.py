@@ -0,0 +1,412 @@
+"""
+Benchmark of the EMS hot queries on MySQL.
+
+## Key Features:
+- Loads the schema and a synthetic workload (`seed.py`) at every requested \
+    scale, then runs the "queries of interest" from `queries.sql`.
+- Per query:
+    - `cold`: first execution on a brand new connection (empty session \
+        state; the InnoDB buffer pool is not flushed).
+    - `warm`: `--repeat` further executions on one connection, reported \
+        as p50/p95/p99 latency and rows/s.
+    - `plan`: access type and key per table from `EXPLAIN`, so a lost \
+        index shows up as an `ALL` (full scan) in the diff.
+- Question papers (`catalog`): the per-request view query \
+    (`test_questions_option_search` by title) against `catalog.load_paper` \
+    and against the paper served from a `ResultCache`, with the memory of \
+    the view rows and of the paper of one test.
+- Answer submissions: `--write-rows` results inserted one statement per \
+    round trip (one parameterized `execute` per row) and as multi-row inserts \
+    (`db.submit_results`), reported as rows/s; both fire the scoring trigger. \
+    Then scored in memory against the answer key of the papers \
+    (`scoring.write_scored`, the trigger switched off).
+- `--events` pads `events` with routine (not suspicious) events up to a \
+    total volume, e.g. 50M, so that `proctor_alerts` (the proctor alert \
+    screen) is measured at production size without loading millions of \
+    students: it reads the suspicious range of `idx_events_suspicious`.
+- Prints one JSON document (or writes it with `--output`), meant to be \
+    stored and compared between schema changes.
+
+## Usage:
+```sh
+python bench.py --scales 1 10 --repeat 50 --output bench-mysql.json
+python bench.py --events 50000000
+```
+"""
+
+import argparse
+import json
+import logging
+import sys
+from itertools import islice
+from time import perf_counter
+
+import mysql.connector as mysql
+
+from catalog import PAPER, load_paper
+from catalog import sizeof as paper_sizeof
+from db import RESULT_INSERT
+from resultcache import CATALOG_TABLES, ResultCache
+from resultcache import sizeof as rows_sizeof
+from runner import DEFAULT_WRITE_BATCH_SIZE, write_batched
+from schema import load_schema
+from scoring import answer_key, write_scored
+from seed import (
+    BATCH_SIZE,
+    COLUMNS,
+    DERIVED_TABLES,
+    TABLES,
+    Workload,
+    insert_rows,
+    load,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCALES = (1,)
+DEFAULT_REPEAT = 30
+DEFAULT_WRITE_ROWS = 2000
+DEFAULT_EVENTS = 0  # no padding
+
+# Queries of interest (see the end of `queries.sql`), parameters come from
+# the loaded workload
+QUERIES = {
+    "tests_history_by_name": (
+        "SELECT * FROM `tests_history` WHERE `student_id` = ("
+        "SELECT `id` FROM `students` WHERE `first_name` = %(first_name)s "
+        "AND `last_name` = %(last_name)s)"
+    ),
+    "tests_history_by_email": (
+        "SELECT * FROM `tests_history` WHERE `student_id` = ("
+        "SELECT `id` FROM `students` WHERE `email` = %(email)s)"
+    ),
+    "test_questions_option_search_by_title": (
+        "SELECT * FROM `test_questions_option_search` WHERE `title` = %(title)s"
+    ),
+    "test_questions_option_search_by_is_correct": (
+        "SELECT * FROM `test_questions_option_search` WHERE `is_correct` = 1"
+    ),
+    "test_sessions_suspicious_behaviour_search_by_status": (
+        "SELECT * FROM `test_sessions_suspicious_behaviour_search` "
+        "WHERE `test_session_status` = 'ended'"
+    ),
+    "proctor_alerts": (
+        "SELECT * FROM `test_sessions_suspicious_behaviour_search` "
+        "WHERE `proctor_id` = %(proctor_id)s "
+        "AND `test_session_status` = 'in-progress'"
+    ),
+}
+
+
+def percentile(samples: list, fraction: float) -> float:
+    """Nearest-rank percentile of already sorted samples."""
+    index = max(0, min(len(samples) - 1, round(fraction * len(samples)) - 1))
+    return samples[index]
+
+
+def query_params(workload: Workload) -> dict:
+    """Look up a student, a test and a proctor that exist in the workload."""
+    _, first_name, last_name, _, email = next(workload.students())
+    test_id, title, *_ = next(workload.tests())
+    return {
+        "first_name": first_name,
+        "last_name": last_name,
+        "email": email,
+        "test_id": test_id,
+        "title": title,
+        "proctor_id": next(workload.proctors())[0],
+    }
+
+
+def plan_shape(cnx: mysql.MySQLConnection, query: str, params: dict) -> list:
+    """Access type (and key) per table of the query plan, in join order."""
+    cursor = cnx.cursor(dictionary=True)
+    cursor.execute(f"EXPLAIN {query}", params)
+    shape = []
+    for step in cursor.fetchall():
+        label = f"{step['type'] or step['Extra']} on {step['table']}"
+        if step["key"]:
+            label += f" using {step['key']}"
+        shape.append(label)
+    cursor.close()
+    return shape
+
+
+def time_query(cnx: mysql.MySQLConnection, query: str, params: dict) -> tuple:
+    """Run a query once, return `(seconds, rows)` including the fetch."""
+    cursor = cnx.cursor()
+    started = perf_counter()
+    cursor.execute(query, params)
+    rows = len(cursor.fetchall())
+    elapsed = perf_counter() - started
+    cursor.close()
+    return elapsed, rows
+
+
+def pad_events(cnx: mysql.MySQLConnection, workload: Workload, total: int) -> int:
+    """Add routine events until `events` holds `total` rows, return its size."""
+    cursor = cnx.cursor()
+    cursor.execute("SELECT COUNT(*) FROM `events`")
+    (count,) = cursor.fetchone()
+    if total > count:
+        started = perf_counter()
+        added = insert_rows(
+            cursor,
+            "events",
+            COLUMNS["events"],
+            workload.background_events(total - count),
+            BATCH_SIZE,
+        )
+        cnx.commit()
+        logger.info("events padded: %d rows in %.2f s", added, perf_counter() - started)
+        count = total
+    cursor.close()
+    return count
+
+
+def bench_query(config: dict, query: str, params: dict, repeat: int) -> dict:
+    cold = mysql.connect(**config)
+    cold_seconds, rows = time_query(cold, query, params)
+    cold.close()
+
+    cnx = mysql.connect(**config)
+    samples = sorted(time_query(cnx, query, params)[0] for _ in range(repeat))
+    plan = plan_shape(cnx, query, params)
+    cnx.close()
+    mean = sum(samples) / len(samples)
+    return {
+        "rows": rows,
+        "cold_ms": cold_seconds * 1000,
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+        "rows_per_s": rows / mean if mean else None,
+        "plan": plan,
+    }
+
+
+def bench_catalog(config: dict, params: dict, repeat: int) -> dict:
+    """Time and size the view rows and the paper of one test."""
+    view = QUERIES["test_questions_option_search_by_title"]
+    cache = ResultCache()
+    cnx = mysql.connect(**config)
+    try:
+        cursor = cnx.cursor()
+
+        def read_view():
+            cursor.execute(view, params)
+            return cursor.fetchall()
+
+        def read_paper():
+            return load_paper(cnx, params["test_id"])
+
+        def serve_paper():
+            return cache.fetch(PAPER, params, CATALOG_TABLES, read_paper, paper_sizeof)
+
+        timings = {}
+        for name, read in (
+            ("view", read_view),
+            ("load", read_paper),
+            ("cached", serve_paper),
+        ):
+            samples = []
+            for _ in range(repeat):
+                started = perf_counter()
+                read()
+                samples.append(perf_counter() - started)
+            timings[f"{name}_p50_ms"] = percentile(sorted(samples), 0.50) * 1000
+        rows = read_view()
+        paper = read_paper()
+        cursor.close()
+    finally:
+        cnx.close()
+    return {
+        "rows": len(rows),
+        "questions": len(paper.questions),
+        "view_bytes": rows_sizeof(rows),
+        "paper_bytes": paper_sizeof(paper),
+        **timings,
+    }
+
+
+def bench_writes(config: dict, answers: list, batch_size: int, tests=()) -> dict:
+    """Insert the same answers statement by statement, batched, then scored
+    against the answer key of `tests` (loaded beforehand, like cached papers).
+    """
+    cnx = mysql.connect(**config)
+    started = perf_counter()
+    cursor = cnx.cursor()
+    for answer in answers:
+        cursor.execute(RESULT_INSERT, answer)
+    cursor.close()
+    cnx.commit()
+    statement_seconds = perf_counter() - started
+
+    started = perf_counter()
+    write_batched(cnx, RESULT_INSERT, answers, batch_size)
+    cnx.commit()
+    batched_seconds = perf_counter() - started
+
+    key = answer_key(*(load_paper(cnx, test_id) for test_id in tests))
+    started = perf_counter()
+    write_scored(cnx, key, answers, batch_size)
+    cnx.commit()
+    scored_seconds = perf_counter() - started
+    cnx.close()
+    return {
+        "rows": len(answers),
+        "batch_size": batch_size,
+        "statement_rows_per_s": len(answers) / statement_seconds,
+        "batched_rows_per_s": len(answers) / batched_seconds,
+        "speedup": statement_seconds / batched_seconds,
+        "scored_rows_per_s": len(answers) / scored_seconds,
+        "scored_speedup": batched_seconds / scored_seconds,
+    }
+
+
+def bench_scale(
+    config: dict,
+    scale: float,
+    seed: int,
+    repeat: int,
+    write_rows: int = DEFAULT_WRITE_ROWS,
+    write_batch_size: int = DEFAULT_WRITE_BATCH_SIZE,
+    events: int = DEFAULT_EVENTS,
+) -> dict:
+    """Reload the database at one scale and benchmark every query."""
+    workload = Workload(scale, seed)
+    cnx = mysql.connect(**config)
+    load_schema(cnx)
+    started = perf_counter()
+    tables = load(cnx, workload)
+    load_seconds = perf_counter() - started
+    events = pad_events(cnx, workload, events)
+    cursor = cnx.cursor()
+    names = ", ".join(f"`{table}`" for table in (*TABLES, *DERIVED_TABLES))
+    cursor.execute(f"ANALYZE TABLE {names}")
+    cursor.fetchall()
+    cursor.close()
+    cnx.close()
+
+    params = query_params(workload)
+    queries = {}
+    for name, query in QUERIES.items():
+        queries[name] = bench_query(config, query, params, repeat)
+        logger.info(
+            "scale %-6s %-52s p50 %8.3f ms  p99 %8.3f ms",
+            scale,
+            name,
+            queries[name]["p50_ms"],
+            queries[name]["p99_ms"],
+        )
+
+    papers = bench_catalog(config, params, repeat)
+    logger.info(
+        "scale %-6s %-52s %8d -> %8d bytes per test",
+        scale,
+        "paper",
+        papers["view_bytes"],
+        papers["paper_bytes"],
+    )
+
+    # Last: the submitted answers stay in the database
+    answers = list(islice(workload.results(), write_rows))
+    tests = [test_id for test_id, *_ in workload.tests()]
+    writes = bench_writes(config, answers, write_batch_size, tests)
+    logger.info(
+        "scale %-6s %-52s %8.0f -> %8.0f -> %8.0f rows/s",
+        scale,
+        "submit_results",
+        writes["statement_rows_per_s"],
+        writes["batched_rows_per_s"],
+        writes["scored_rows_per_s"],
+    )
+    return {
+        "scale": scale,
+        "rows": {table: count for table, (count, _) in tables.items()},
+        "events": events,
+        "load_s": load_seconds,
+        "queries": queries,
+        "catalog": papers,
+        "writes": writes,
+    }
+
+
+def run(
+    config: dict,
+    scales=DEFAULT_SCALES,
+    seed=0,
+    repeat=DEFAULT_REPEAT,
+    write_rows=DEFAULT_WRITE_ROWS,
+    write_batch_size=DEFAULT_WRITE_BATCH_SIZE,
+    events=DEFAULT_EVENTS,
+) -> dict:
+    """Benchmark every scale, return the JSON-ready report."""
+    # `EXPLAIN` and `ANALYZE TABLE` report notes, which are not failures here
+    config = {**config, "raise_on_warnings": False}
+    cnx = mysql.connect(**config)
+    version = cnx.get_server_info()
+    cnx.close()
+    return {
+        "backend": "mysql",
+        "server_version": version,
+        "seed": seed,
+        "repeat": repeat,
+        "runs": [
+            bench_scale(
+                config, scale, seed, repeat, write_rows, write_batch_size, events
+            )
+            for scale in scales
+        ],
+    }
+
+
+if __name__ == "__main__":
+    from db import config
+
+    parser = argparse.ArgumentParser(description="Benchmark the EMS hot queries")
+    parser.add_argument(
+        "--scales", type=float, nargs="+", default=DEFAULT_SCALES, help="data sizes"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument(
+        "--repeat", type=int, default=DEFAULT_REPEAT, help="warm runs per query"
+    )
+    parser.add_argument(
+        "--write-rows",
+        type=int,
+        default=DEFAULT_WRITE_ROWS,
+        help="answers submitted by the write benchmark",
+    )
+    parser.add_argument(
+        "--write-batch-size",
+        type=int,
+        default=DEFAULT_WRITE_BATCH_SIZE,
+        help="answers per multi-row insert",
+    )
+    parser.add_argument(
+        "--events",
+        type=int,
+        default=DEFAULT_EVENTS,
+        help="pad events with routine rows up to this total",
+    )
+    parser.add_argument("--output", help="write the JSON report to a file")
+    args = parser.parse_args()
+
+    # `db` already routes the helper modules' logs to the console
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.StreamHandler())
+    report = run(
+        config,
+        args.scales,
+        args.seed,
+        args.repeat,
+        args.write_rows,
+        args.write_batch_size,
+        args.events,
+    )
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
@@ -0,0 +1,172 @@
+"""
+Compact in-memory question papers: a test's questions and options.
+
+## Key Features:
+- `load_paper(cnx, test_id)` reads a test, its questions and their options \
+    in three indexed queries, instead of `test_questions_option_search`, \
+    which repeats the test columns on every option row.
+- `Paper` / `Question` / `Option` are `__slots__` records; the options are \
+    grouped by question (tuples) and the strings repeated across questions \
+    (type, topic, course, option texts) are interned.
+- `Paper.rows()` gives the rows of `test_questions_option_search` for the \
+    test, so a paper can stand in for the view.
+- `sizeof(paper)`: estimated memory of a paper, to compare with the view rows.
+- `db.paper(test_id)` serves every session of a test the same paper from \
+    the result cache (see `resultcache.py`), reloaded when the catalog \
+    tables change.
+
+## Notes:
+- A paper is shared: callers must not modify it.
+- Durations are kept as read (`datetime.timedelta`).
+
+## Usage:
+```py
+with pool.connection() as cnx:
+    paper = load_paper(cnx, test_id)
+for question in paper.questions:
+    print(question.question, [option.option for option in question.options])
+```
+"""
+
+import sys
+from itertools import groupby
+
+import mysql.connector as mysql
+
+# Result cache key of the papers (`db.paper`)
+PAPER = "paper"
+
+TEST = (
+    "SELECT `title`, `description`, `duration`, `instructions`, `course` "
+    "FROM `tests` WHERE `id` = %(test_id)s"
+)
+QUESTIONS = (
+    "SELECT `id`, `question`, `type`, `topic`, `duration` FROM `questions` "
+    "WHERE `test_id` = %(test_id)s ORDER BY `id`"
+)
+OPTIONS = (
+    "SELECT `QO`.`question_id`, `QO`.`id`, `QO`.`option`, `QO`.`is_correct` "
+    "FROM `questions_options` `QO` "
+    "JOIN `questions` `Q` ON `Q`.`id` = `QO`.`question_id` "
+    "WHERE `Q`.`test_id` = %(test_id)s ORDER BY `QO`.`question_id`, `QO`.`id`"
+)
+
+
+class Option:
+    __slots__ = ("id", "is_correct", "option")
+
+    def __init__(self, id: int, option: str, is_correct: int):
+        self.id = id
+        self.option = sys.intern(option)
+        self.is_correct = is_correct
+
+
+class Question:
+    __slots__ = ("duration", "id", "options", "question", "topic", "type")
+
+    def __init__(self, id, question, type, topic, duration, options=()):
+        self.id = id
+        self.question = question
+        self.type = sys.intern(type)
+        self.topic = sys.intern(topic)
+        self.duration = duration
+        self.options = options
+
+
+class Paper:
+    """A test with its questions, each with its options, in id order."""
+
+    __slots__ = (
+        "course",
+        "description",
+        "duration",
+        "id",
+        "instructions",
+        "questions",
+        "title",
+    )
+
+    def __init__(
+        self, id, title, description, duration, instructions, course, questions
+    ):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.duration = duration
+        self.instructions = instructions
+        self.course = sys.intern(course)
+        self.questions = questions
+
+    def rows(self) -> list:
+        """Rows of `test_questions_option_search` for this test."""
+        return [
+            (
+                self.title,
+                self.description,
+                self.duration,
+                self.course,
+                question.question,
+                question.type,
+                question.topic,
+                question.duration,
+                option.option,
+                option.is_correct,
+            )
+            for question in self.questions
+            for option in question.options
+        ]
+
+
+def load_paper(cnx: mysql.MySQLConnection, test_id: int) -> Paper:
+    """Read the paper of a test.
+
+    Args:
+        cnx (mysql.MySQLConnection): open connection
+        test_id (int): test id
+
+    Raises:
+        KeyError: no such test
+
+    Returns:
+        Paper: the test, its questions and options
+    """
+    params = {"test_id": test_id}
+    cursor = cnx.cursor()
+    try:
+        cursor.execute(TEST, params)
+        test = cursor.fetchone()
+        if test is None:
+            raise KeyError(test_id)
+        cursor.execute(OPTIONS, params)
+        options = {
+            question_id: tuple(Option(*option[1:]) for option in group)
+            for question_id, group in groupby(
+                cursor.fetchall(), key=lambda option: option[0]
+            )
+        }
+        cursor.execute(QUESTIONS, params)
+        questions = tuple(
+            Question(*question, options.get(question[0], ()))
+            for question in cursor.fetchall()
+        )
+    finally:
+        cursor.close()
+    return Paper(test_id, *test, questions)
+
+
+def sizeof(paper: Paper) -> int:
+    """Estimated memory held by a paper, in bytes (shared objects once)."""
+    seen = set()
+    size = 0
+    stack = [paper]
+    while stack:
+        value = stack.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        size += sys.getsizeof(value)
+        if isinstance(value, tuple):
+            stack.extend(value)
+        elif hasattr(value, "__slots__"):
+            stack.extend(getattr(value, name) for name in value.__slots__)
+    return size
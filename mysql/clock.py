@@ -0,0 +1,95 @@
+"""
+Injectable clock for the time-dependent triggers of the MySQL database.
+
+## Key Features:
+- The triggers and column defaults read "now" from `NOW()` / \
+    `CURRENT_TIMESTAMP`, which follow the session's `TIMESTAMP` variable: \
+    no schema change is needed to simulate time.
+- `WallClock`: real time (`SET TIMESTAMP = DEFAULT`), `sleep` waits for real.
+- `SimulatedClock`: a fixed time that `sleep` moves forward instantly, so \
+    `duration_taken` & co. are exact and nothing waits.
+- `using(cnx, clock)`: sets the clock of a (pooled) connection for a \
+    `with` block, then goes back to the wall clock.
+- `CLOCKS` maps the names accepted by `CLOCK` (see `db.py`) to classes.
+
+## Notes:
+- `TIMESTAMP` is a session variable outside transactions: a rollback \
+    doesn't touch it and other sessions keep the wall clock. `using` goes \
+    back to the wall clock on exit, and `db.py`'s pool does it again when \
+    the connection is returned (`POOL_SESSION_CLEANUP`).
+- `SYSDATE()` ignores it; the schema doesn't use it.
+
+## Usage:
+```py
+clock = SimulatedClock()
+with using(cnx, clock):
+    execute(cnx, part1)
+clock.sleep(3)  # instant
+with using(cnx, clock):
+    execute(cnx, part2)  # duration_taken = 00:00:03
+```
+"""
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from time import sleep
+
+import mysql.connector as mysql
+
+SET_CLOCK = "SET TIMESTAMP = %s"
+RESET_CLOCK = "SET TIMESTAMP = DEFAULT"
+
+
+class WallClock:
+    """Real time: `NOW()` is the server's time, waiting takes real time."""
+
+    def setting(self) -> tuple:
+        """Statement and parameters that make the triggers use this clock."""
+        return RESET_CLOCK, ()
+
+    def sleep(self, seconds: float) -> None:
+        sleep(seconds)
+
+
+class SimulatedClock(WallClock):
+    """A clock that only moves when told to.
+
+    Args:
+        start (datetime, optional): initial time (naive means local). \
+            Defaults to now, truncated to the second.
+    """
+
+    def __init__(self, start: datetime | None = None):
+        self.now = start or datetime.now().replace(microsecond=0)
+
+    def setting(self) -> tuple:
+        return SET_CLOCK, (int(self.now.timestamp()),)
+
+    def sleep(self, seconds: float) -> None:
+        """Move the clock forward, instantly."""
+        self.now += timedelta(seconds=seconds)
+
+
+CLOCKS = {"wall": WallClock, "simulated": SimulatedClock}
+
+
+def _set(cnx: mysql.MySQLConnection, setting: tuple) -> None:
+    cursor = cnx.cursor()
+    try:
+        cursor.execute(*setting)
+    finally:
+        cursor.close()
+
+
+@contextmanager
+def using(cnx: mysql.MySQLConnection, clock: WallClock | None = None):
+    """Make the triggers use `clock` for the duration of a `with` block
+    (no clock: leave the connection alone)."""
+    if clock is None:
+        yield cnx
+        return
+    _set(cnx, clock.setting())
+    try:
+        yield cnx
+    finally:
+        _set(cnx, WallClock().setting())
@@ -0,0 +1,245 @@
+"""
+Monthly partitions of `events`: creation, retention and archival.
+
+## Key Features:
+- `events` is range-partitioned by month of `timestamp` (`pYYYYMM`, see \
+    `schema.sql`): a query with a time range, e.g. on the \
+    `test_sessions_suspicious_behaviour_search` view, only reads the \
+    partitions of that range (`partitions` column of `EXPLAIN`).
+- `p_past` and `p_future` hold the rows before / after the monthly \
+    partitions. `ensure_partitions` splits them (`REORGANIZE PARTITION`) \
+    into the months of their rows and of the coming months, so the \
+    monthly partitions always are one contiguous range.
+- `archive_partitions` writes every partition older than the retention to \
+    `<directory>/pYYYYMM.csv.gz` (`export.export_query`), then empties it \
+    and merges it into `p_past`.
+- `maintain` runs both; schedule it (e.g. a daily cron job) so that \
+    partitions exist before their month starts.
+
+## Notes:
+- "Now" is `NOW()`, so months follow the trigger clock (see `clock.py`).
+- Partition changes are DDL: MySQL commits around them, there is no \
+    transaction to roll back. An archive file is complete before its \
+    partition is emptied: if that fails, the next run writes it again.
+- Partitioned InnoDB tables can't have foreign keys: triggers check the \
+    proctoring session of new events instead, see `schema.sql`.
+
+## Usage:
+```sh
+python partitions.py --retention-months 12 --archive-dir archive
+python partitions.py --list
+```
+"""
+
+import argparse
+import logging
+import os
+import re
+from datetime import date, datetime
+
+import mysql.connector as mysql
+
+from export import export_query
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AHEAD = 3  # months
+DEFAULT_RETENTION_MONTHS = 12
+DEFAULT_ARCHIVE_DIR = "archive"
+
+PAST, FUTURE = "p_past", "p_future"
+PARTITION = re.compile(r"^p(\d{4})(\d{2})$")
+
+LIST_PARTITIONS = (
+    "SELECT `PARTITION_NAME` FROM `information_schema`.`PARTITIONS` "
+    "WHERE `TABLE_SCHEMA` = DATABASE() AND `TABLE_NAME` = 'events' "
+    "ORDER BY `PARTITION_ORDINAL_POSITION`"
+)
+
+# Months of the rows outside the monthly partitions
+WAITING_MONTHS = (
+    "SELECT DISTINCT YEAR(`timestamp`), MONTH(`timestamp`) "
+    f"FROM `events` PARTITION (`{PAST}`, `{FUTURE}`)"
+)
+
+
+def add_months(day: date, months: int) -> date:
+    """First day of the month `months` after (or before) the month of `day`."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _fetch(cnx: mysql.MySQLConnection, query: str) -> list:
+    cursor = cnx.cursor(buffered=True)
+    try:
+        cursor.execute(query)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _alter(cnx: mysql.MySQLConnection, clause: str) -> None:
+    cursor = cnx.cursor()
+    try:
+        cursor.execute(f"ALTER TABLE `events` {clause}")
+    finally:
+        cursor.close()
+
+
+def _reorganize(cnx: mysql.MySQLConnection, names: list, definitions: list) -> None:
+    """Replace adjacent partitions by new ones covering the same range."""
+    names = ", ".join(f"`{name}`" for name in names)
+    _alter(cnx, f"REORGANIZE PARTITION {names} INTO ({', '.join(definitions)})")
+
+
+def _now(cnx: mysql.MySQLConnection) -> datetime:
+    return _fetch(cnx, "SELECT NOW()")[0][0]
+
+
+def _range(name: str, until) -> str:
+    bound = "MAXVALUE" if until is None else f"'{until:%Y-%m-%d}'"
+    return f"PARTITION `{name}` VALUES LESS THAN ({bound})"
+
+
+def _months(first: date, last: date) -> list:
+    """Partition definitions of the months from `first` to `last`."""
+    count = (last.year - first.year) * 12 + last.month - first.month + 1
+    return [
+        _range(f"p{add_months(first, n):%Y%m}", add_months(first, n + 1))
+        for n in range(count)
+    ]
+
+
+def partitions(cnx: mysql.MySQLConnection) -> list:
+    """`(name, first day of its month)` of the monthly partitions, oldest first."""
+    found = []
+    for (name,) in _fetch(cnx, LIST_PARTITIONS):
+        if match := PARTITION.match(name):
+            found.append((name, date(int(match[1]), int(match[2]), 1)))
+    return found
+
+
+def ensure_partitions(
+    cnx: mysql.MySQLConnection,
+    since: datetime | None = None,
+    ahead: int = DEFAULT_AHEAD,
+) -> list:
+    """Create the missing partitions, up to `ahead` months after now.
+
+    Args:
+        cnx (mysql.MySQLConnection): open connection
+        since (datetime, optional): also cover the months from `since`, \
+            e.g. before loading old events. Defaults to now.
+        ahead (int, optional): months after the current one. Defaults to 3.
+
+    Returns:
+        list: names of the created partitions
+    """
+    now = _now(cnx)
+    wanted = [add_months((since or now).date(), 0), add_months(now.date(), ahead)]
+    wanted += [date(year, month, 1) for year, month in _fetch(cnx, WAITING_MONTHS)]
+    first, last = min(wanted), max(wanted)
+    existing = partitions(cnx)
+
+    if not existing:
+        months = _months(first, last)
+        _reorganize(
+            cnx, [PAST, FUTURE], [_range(PAST, first), *months, _range(FUTURE, None)]
+        )
+    else:
+        oldest, newest = existing[0][1], existing[-1][1]
+        if first < oldest:
+            months = _months(first, add_months(oldest, -1))
+            _reorganize(cnx, [PAST], [_range(PAST, first), *months])
+        if last > newest:
+            months = _months(add_months(newest, 1), last)
+            _reorganize(cnx, [FUTURE], [*months, _range(FUTURE, None)])
+
+    names = {name for name, _ in existing}
+    created = [name for name, _ in partitions(cnx) if name not in names]
+    if created:
+        logger.info("Created events partitions: %s", ", ".join(created))
+    return created
+
+
+def archive_partitions(
+    cnx: mysql.MySQLConnection,
+    keep_months: int = DEFAULT_RETENTION_MONTHS,
+    directory: str = DEFAULT_ARCHIVE_DIR,
+) -> list:
+    """Archive and drop the partitions older than the retention.
+
+    The current month and the `keep_months` before it are kept.
+
+    Args:
+        cnx (mysql.MySQLConnection): open connection
+        keep_months (int, optional): months kept before the current one. \
+            Defaults to 12.
+        directory (str, optional): archive directory, created if missing. \
+            Defaults to "archive".
+
+    Returns:
+        list: `(name, path, rows)` of the archived partitions
+    """
+    cutoff = add_months(_now(cnx).date(), -keep_months)
+    archived = []
+    for name, period in partitions(cnx):
+        if period >= cutoff:
+            break
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}.csv.gz")
+        query = f"SELECT * FROM `events` PARTITION (`{name}`) ORDER BY `id`"
+        rows = export_query(cnx, query, path)
+        # Dropping it would move its range to the next month, `p_past` takes it
+        _alter(cnx, f"TRUNCATE PARTITION `{name}`")
+        _reorganize(cnx, [PAST, name], [_range(PAST, add_months(period, 1))])
+        logger.info("Archived %s: %d rows -> %s", name, rows, path)
+        archived.append((name, path, rows))
+    return archived
+
+
+def maintain(
+    cnx: mysql.MySQLConnection,
+    keep_months: int = DEFAULT_RETENTION_MONTHS,
+    directory: str = DEFAULT_ARCHIVE_DIR,
+    ahead: int = DEFAULT_AHEAD,
+) -> dict:
+    """Create the coming partitions, then archive the expired ones.
+
+    Returns:
+        dict: `created` partition names, `archived` `(name, path, rows)`
+    """
+    return {
+        "created": ensure_partitions(cnx, ahead=ahead),
+        "archived": archive_partitions(cnx, keep_months, directory),
+    }
+
+
+if __name__ == "__main__":
+    from tabulate import tabulate as tb
+
+    from db import (
+        EVENTS_ARCHIVE_DIR,
+        EVENTS_PARTITIONS_AHEAD,
+        EVENTS_RETENTION_MONTHS,
+        pool,
+    )
+
+    parser = argparse.ArgumentParser(description="Maintain the events partitions")
+    parser.add_argument("--retention-months", type=int, default=EVENTS_RETENTION_MONTHS)
+    parser.add_argument("--archive-dir", default=EVENTS_ARCHIVE_DIR)
+    parser.add_argument("--ahead", type=int, default=EVENTS_PARTITIONS_AHEAD)
+    parser.add_argument("--list", action="store_true", help="only list the partitions")
+    args = parser.parse_args()
+
+    with pool.connection() as cnx:
+        if not args.list:
+            maintain(cnx, args.retention_months, args.archive_dir, args.ahead)
+        months = dict(partitions(cnx))
+        rows = []
+        for (name,) in _fetch(cnx, LIST_PARTITIONS):
+            count = f"SELECT COUNT(*) FROM `events` PARTITION (`{name}`)"
+            month = f"{months[name]:%Y-%m}" if name in months else ""
+            rows.append((name, month, _fetch(cnx, count)[0][0]))
+        print(tb(rows, ["partition", "month", "rows"], tablefmt="grid"))
+    pool.close()
@@ -0,0 +1,342 @@
+"""
+Pooled connections for the MySQL database.
+
+## Key Features:
+- Pool of `mysql.connector.connect()` connections:
+    - `min_size` connections are opened up front, the pool grows on demand \
+        up to `max_size`.
+    - Connections are health-checked (`ping(reconnect=True)`) when they are \
+        handed out, not when they are returned.
+    - Connections idle for more than `max_idle` seconds are closed \
+        (down to `min_size`) instead of being reused.
+    - Callers wait up to `timeout` seconds for a free connection.
+- Acquire-latency metrics (count, p50/p95/max) next to the pool counters.
+- `connection()` context manager: commits on success, rolls back on error and \
+    always returns the connection to the pool.
+- `LazyPool` handle: the pool (and the first connection) is only opened on \
+    first use, so importing a module that defines one never touches the network.
+
+## Notes:
+- The connector's `MySQLConnectionPool` hands out wrappers: property setters \
+    (e.g. `raise_on_warnings` in `schema.load_schema`) wouldn't reach the \
+    connection and `queries.cache_for` would see a new object every borrow. \
+    The pool keeps the connections itself and only uses their public API.
+- Idle connections are reused most recently returned first, so under light \
+    load the others stay idle and expire from the oldest end (down to \
+    `min_size`). A caller waits on a condition that returns and closes \
+    signal, without polling.
+- With `reset_session`, returned connections are reset \
+    (`COM_RESET_CONNECTION`), which also deallocates their prepared statements.
+    Without it, the `cleanup` statement (e.g. clearing session variables) runs \
+    on every returned connection, which is dropped if it fails.
+"""
+
+import logging
+from collections import deque
+from collections.abc import Callable
+from contextlib import contextmanager
+from threading import Condition, Lock
+from time import monotonic, perf_counter
+from typing import Self
+
+import mysql.connector as mysql
+from mysql.connector.errors import PoolError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_SIZE = 1
+DEFAULT_MAX_SIZE = 4
+DEFAULT_MAX_IDLE = 300.0  # seconds
+DEFAULT_TIMEOUT = 30.0  # seconds
+
+
+class AcquireLatency:
+    """Rolling window of the time spent waiting for a connection."""
+
+    def __init__(self, window: int = 1024):
+        self._samples = deque(maxlen=window)
+        self._lock = Lock()
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.max = max(self.max, seconds)
+
+    def summary(self) -> dict:
+        """Latency figures in milliseconds (percentiles over the window)."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {"acquire_count": 0}
+        return {
+            "acquire_count": self.count,
+            "acquire_p50_ms": samples[len(samples) // 2] * 1000,
+            "acquire_p95_ms": samples[int(len(samples) * 0.95)] * 1000,
+            "acquire_max_ms": self.max * 1000,
+        }
+
+
+class Pool:
+    """MySQL connection pool with acquire-latency metrics.
+
+    Args:
+        config (dict): `mysql.connector.connect` keyword arguments
+        min_size (int, optional): connections kept open. Defaults to 1.
+        max_size (int, optional): upper bound of open connections. Defaults to 4.
+        max_idle (float, optional): seconds before an idle connection is closed.
+        timeout (float, optional): seconds to wait for a free connection.
+        check (bool, optional): health-check connections on checkout.
+        reset_session (bool, optional): reset the session state of returned \
+            connections. Defaults to True.
+        cleanup (str, optional): statement run on returned connections when \
+            they aren't reset, e.g. `SET @var = NULL`. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        min_size: int = DEFAULT_MIN_SIZE,
+        max_size: int = DEFAULT_MAX_SIZE,
+        max_idle: float = DEFAULT_MAX_IDLE,
+        timeout: float = DEFAULT_TIMEOUT,
+        check: bool = True,
+        reset_session: bool = True,
+        cleanup: str | None = None,
+    ):
+        self.config = config
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.check = check
+        self.reset_session = reset_session
+        self.cleanup = cleanup
+        self.latency = AcquireLatency()
+        self._available = Condition()
+        self._idle = deque()  # (connection, monotonic time of return), oldest first
+        self._size = 0  # open connections, idle or borrowed
+        self._opened = False
+        self._counters = {"connections_num": 0, "connections_lost": 0}
+
+    def open(self) -> None:
+        """Open `min_size` connections."""
+        with self._available:
+            self._opened = True
+        for _ in range(self.min_size):
+            with self._available:
+                self._size += 1
+            cnx = self._connect()
+            with self._available:
+                self._idle.append((cnx, monotonic()))
+                self._available.notify()
+        logger.info(
+            "Connection pool ready (min %d, max %d)", self.min_size, self.max_size
+        )
+
+    def _connect(self) -> mysql.MySQLConnection:
+        """Open a connection for a slot already counted in `_size`."""
+        try:
+            cnx = mysql.connect(**self.config)
+        except BaseException:
+            self._drop(None)
+            raise
+        with self._available:
+            self._counters["connections_num"] += 1
+        return cnx
+
+    @staticmethod
+    def _disconnect(cnx) -> None:
+        try:
+            cnx.disconnect()
+        except mysql.Error:
+            pass
+
+    def _drop(self, cnx) -> None:
+        """Close a connection (if any) and free its slot."""
+        if cnx is not None:
+            self._disconnect(cnx)
+        with self._available:
+            self._size -= 1
+            self._available.notify()
+
+    def _expire(self) -> list:
+        """Take the connections idle for over `max_idle` off the oldest end of
+        `_idle`, down to `min_size`. Called with the lock held."""
+        expired = []
+        now = monotonic()
+        while (
+            self._idle
+            and self._size > self.min_size
+            and now - self._idle[0][1] > self.max_idle
+        ):
+            cnx, _ = self._idle.popleft()
+            self._size -= 1  # before another caller checks the size
+            expired.append(cnx)
+        if expired:
+            self._available.notify(len(expired))
+        return expired
+
+    def _checkout(self, deadline: float, timeout: float) -> tuple:
+        """`(idle connection or None for a new slot, expired connections)`."""
+        with self._available:
+            while not self._idle and self._size >= self.max_size:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    raise PoolError(
+                        f"Couldn't get a connection after {timeout:.2f} sec"
+                    )
+                self._available.wait(remaining)
+            expired = self._expire()
+            if self._idle:
+                cnx, _ = self._idle.pop()  # the most recently returned
+                return cnx, expired
+            self._size += 1
+            return None, expired
+
+    def _acquire(self, timeout: float) -> mysql.MySQLConnection:
+        deadline = monotonic() + timeout
+        while True:
+            cnx, expired = self._checkout(deadline, timeout)
+            if expired:
+                logger.info(
+                    "Closing %d connection(s) idle for over %ss",
+                    len(expired),
+                    self.max_idle,
+                )
+                for stale in expired:
+                    self._disconnect(stale)
+            if cnx is None:
+                return self._connect()
+            if not self.check:
+                return cnx
+            try:
+                cnx.ping(reconnect=True, attempts=1, delay=0)
+                return cnx
+            except mysql.Error as err:
+                logger.info("Dropping broken connection: %s", err)
+                with self._available:
+                    self._counters["connections_lost"] += 1
+                self._drop(cnx)
+
+    def _clean(self, cnx) -> bool:
+        """Reset or run `cleanup` on a returned connection, False if it failed."""
+        try:
+            if self.reset_session:
+                cnx.reset_session()
+            elif self.cleanup is not None:
+                cursor = cnx.cursor()
+                try:
+                    cursor.execute(self.cleanup)
+                finally:
+                    cursor.close()
+        except mysql.Error as err:
+            logger.info("Dropping connection whose session wasn't cleaned: %s", err)
+            return False
+        return True
+
+    def _release(self, cnx, usable: bool) -> None:
+        """Give a borrowed connection back, or drop it."""
+        if usable and self._clean(cnx):
+            with self._available:
+                if self._opened:
+                    self._idle.append((cnx, monotonic()))
+                    self._available.notify()
+                    return
+        self._drop(cnx)
+
+    @contextmanager
+    def connection(self, timeout: float | None = None):
+        """Borrow a connection for the duration of a `with` block.
+
+        Args:
+            timeout (float, optional): seconds to wait for a free connection
+
+        Yields:
+            mysql.connector.MySQLConnection: pooled connection
+        """
+        started = perf_counter()
+        cnx = self._acquire(self.timeout if timeout is None else timeout)
+        self.latency.record(perf_counter() - started)
+        usable = True
+        try:
+            yield cnx
+            cnx.commit()
+        except BaseException:
+            try:
+                cnx.rollback()
+            except mysql.Error:
+                # Lost, the next checkout would only reconnect it
+                usable = False
+            raise
+        finally:
+            self._release(cnx, usable)
+
+    def stats(self) -> dict:
+        """Pool counters (`psycopg_pool` names) plus acquire latency."""
+        with self._available:
+            sizes = {
+                "pool_min": self.min_size,
+                "pool_max": self.max_size,
+                "pool_size": self._size,
+                "pool_available": len(self._idle),
+            }
+            counters = dict(self._counters)
+        return {**counters, **sizes, **self.latency.summary()}
+
+    def close(self) -> None:
+        """Close the idle connections, borrowed ones are closed when returned."""
+        with self._available:
+            self._opened = False
+            idle, self._idle = self._idle, deque()
+        for cnx, _ in idle:
+            self._drop(cnx)
+        logger.info("Connection pool closed: %s", self.stats())
+
+    def __enter__(self) -> Self:
+        self.open()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class LazyPool:
+    """Handle to a pool that is only opened when a connection is first needed.
+
+    Args:
+        factory (Callable[[], Pool]): opens the pool (with connection retries)
+    """
+
+    def __init__(self, factory: Callable[[], Pool]):
+        self._factory = factory
+        self._pool = None
+        self._lock = Lock()
+
+    @property
+    def opened(self) -> bool:
+        return self._pool is not None
+
+    def open(self) -> Pool:
+        """Open the pool now (once), e.g. to fail fast at program start."""
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = self._factory()
+        return self._pool
+
+    def connection(self, timeout: float | None = None):
+        """Same as `Pool.connection`, opening the pool first if needed."""
+        return self.open().connection(timeout)
+
+    def stats(self) -> dict:
+        return self._pool.stats() if self._pool is not None else {}
+
+    def close(self) -> None:
+        """Close the pool if it was opened; a later use opens a new one."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
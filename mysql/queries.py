@@ -0,0 +1,165 @@
+"""
+Parameterized hot lookups over server-side prepared statements.
+
+## Key Features:
+- `LOOKUPS`: the lookups the application runs over and over (history by \
+    email, options by title or correctness, suspicious behaviour by status), \
+    written with bound parameters instead of literal values.
+- `CACHED_LOOKUPS`: the catalog lookups, whose rows only change with the \
+    tables listed, served from the result cache by `db.lookup` (see \
+    `resultcache.py`).
+- `StatementCache` keeps one prepared cursor (`cursor(prepared=True)`) per \
+    query: MySQL parses the statement once (`COM_STMT_PREPARE`), later calls \
+    only send the parameters (`COM_STMT_EXECUTE`, binary protocol).
+- The cache is a per-connection LRU of `maxsize` statements; evicting a \
+    query closes its cursor, which deallocates the statement on the server.
+- Hit/miss/eviction counters (`stats()`).
+- `cache_for(cnx)` returns the cache of a (pooled) connection, so repeated \
+    borrows of the same connection keep their prepared statements.
+
+## Notes:
+- `%(name)s` placeholders are rewritten to `?` once, when the query is \
+    prepared: a prepared cursor re-prepares whenever it is given a query \
+    string that is not the very same object as the last one.
+- A session reset or a reconnect deallocates every statement; the next \
+    call notices (`ER_UNKNOWN_STMT_HANDLER`), empties the cache and prepares \
+    again. `db.py` pools connections without `reset_session` for that reason.
+- Fetch every row before the next call, the connection has a single \
+    result stream.
+
+## Usage:
+```py
+with pool.connection() as cnx:
+    rows = cache_for(cnx).lookup("tests_history_by_email", {"email": email})
+```
+"""
+
+import re
+import weakref
+from collections import OrderedDict
+
+import mysql.connector as mysql
+from mysql.connector import errorcode
+
+from resultcache import CATALOG_TABLES
+
+DEFAULT_CACHE_SIZE = 100
+
+LOOKUPS = {
+    "tests_history_by_email": (
+        "SELECT * FROM `tests_history` WHERE `student_id` = ("
+        "SELECT `id` FROM `students` WHERE `email` = %(email)s)"
+    ),
+    "test_questions_option_search_by_title": (
+        "SELECT * FROM `test_questions_option_search` WHERE `title` = %(title)s"
+    ),
+    "test_questions_option_search_by_is_correct": (
+        "SELECT * FROM `test_questions_option_search` "
+        "WHERE `is_correct` = %(is_correct)s"
+    ),
+    "test_sessions_suspicious_behaviour_search_by_status": (
+        "SELECT * FROM `test_sessions_suspicious_behaviour_search` "
+        "WHERE `test_session_status` = %(status)s"
+    ),
+}
+
+CACHED_LOOKUPS = {
+    "test_questions_option_search_by_title": CATALOG_TABLES,
+    "test_questions_option_search_by_is_correct": CATALOG_TABLES,
+}
+
+PARAM = re.compile(r"%\((\w+)\)s")
+
+
+class _Statement:
+    """A prepared cursor and how to order its parameters."""
+
+    def __init__(self, cursor, query: str):
+        self.cursor = cursor
+        self.names = PARAM.findall(query)
+        self.operation = PARAM.sub("?", query)
+
+    def bind(self, params) -> tuple:
+        if isinstance(params, dict):
+            return tuple(params[name] for name in self.names)
+        return tuple(params or ())
+
+
+class StatementCache:
+    """LRU of the statements prepared on one connection.
+
+    Args:
+        cnx (mysql.MySQLConnection): connection the statements are prepared on
+        maxsize (int, optional): prepared statements kept. Defaults to 100.
+    """
+
+    def __init__(self, cnx: mysql.MySQLConnection, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.cnx = cnx
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._statements = OrderedDict()
+
+    def _statement(self, query: str) -> _Statement:
+        statement = self._statements.get(query)
+        if statement is not None:
+            self.hits += 1
+            self._statements.move_to_end(query)
+            return statement
+        self.misses += 1
+        statement = self._statements[query] = _Statement(
+            self.cnx.cursor(prepared=True), query
+        )
+        if len(self._statements) > self.maxsize:
+            _, evicted = self._statements.popitem(last=False)
+            evicted.cursor.close()
+            self.evictions += 1
+        return statement
+
+    def execute(self, query: str, params=None):
+        """Run a query as a prepared statement, return its cursor."""
+        statement = self._statement(query)
+        try:
+            statement.cursor.execute(statement.operation, statement.bind(params))
+        except mysql.DatabaseError as err:
+            if err.errno != errorcode.ER_UNKNOWN_STMT_HANDLER:
+                raise
+            # The server forgot the statements (session reset or reconnect)
+            self.close()
+            statement = self._statement(query)
+            statement.cursor.execute(statement.operation, statement.bind(params))
+        return statement.cursor
+
+    def fetchall(self, query: str, params=None) -> list:
+        return self.execute(query, params).fetchall()
+
+    def lookup(self, name: str, params: dict) -> list:
+        """Rows of one of the `LOOKUPS`."""
+        return self.fetchall(LOOKUPS[name], params)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._statements),
+            "maxsize": self.maxsize,
+        }
+
+    def close(self) -> None:
+        """Deallocate every prepared statement."""
+        while self._statements:
+            _, statement = self._statements.popitem()
+            statement.cursor.close()
+
+
+_caches = weakref.WeakKeyDictionary()
+
+
+def cache_for(cnx: mysql.MySQLConnection, maxsize: int = DEFAULT_CACHE_SIZE):
+    """The `StatementCache` of a connection, created on first use."""
+    cache = _caches.get(cnx)
+    if cache is None:
+        cache = _caches[cnx] = StatementCache(cnx, maxsize)
+    return cache
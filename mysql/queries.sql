@@ -1,5 +1,7 @@
 -- INSERT/DELETE data from tables (reset-tables)
+DELETE FROM tests_history_summary;
 DELETE FROM reports;
+DELETE FROM tests_sessions_scores;
 DELETE FROM results;
 DELETE FROM events;
 DELETE FROM proctoring_sessions;
@@ -95,8 +97,10 @@ SELECT * FROM reports;
 
 -- $$$testbreak
 
--- Simulate a delay of 5 seconds
-SELECT SLEEP(3);
+-- Simulate the test taking 3 seconds: move the session clock forward
+-- instead of waiting (`db.py` and the tests skip this section and use
+-- `clock.py`)
+SET TIMESTAMP = UNIX_TIMESTAMP() + 3;
 
 --- $$$sleeptestbreak
 
@@ -159,6 +163,14 @@ SELECT *
 FROM test_sessions_suspicious_behaviour_search
 WHERE test_session_status = 'ended';
 
+-- Running score of a test session (live dashboards)
+SELECT *
+FROM tests_sessions_live_scores
+WHERE test_session_id = 1;
+
 -- Check for errors and warnings
 SHOW ERRORS;
 SHOW WARNINGS;
+
+-- Back to the wall clock
+SET TIMESTAMP = DEFAULT;
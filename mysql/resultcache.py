@@ -0,0 +1,312 @@
+"""
+Read-through cache of query results, invalidated by table changes.
+
+## Key Features:
+- `ResultCache` keeps the rows of read-only queries, keyed by the query \
+    (whitespace normalized) and its parameters; every entry records the \
+    tables it reads.
+- Entries expire after `ttl` seconds, and the least recently used ones are \
+    evicted to keep the estimated size of the cached rows under `max_bytes`.
+- `invalidate(tables)` drops the entries reading any of those tables. A load \
+    that overlaps an invalidation of its tables is returned, not cached.
+- `VersionWatcher`: triggers on the catalog tables count their changes in \
+    `ems_table_versions` (see `schema.sql`); the watcher reads the counters \
+    (at most every `interval` seconds) and invalidates the tables whose \
+    counter moved.
+- Hit rate, expirations, evictions and invalidations (`stats()`).
+
+## Notes:
+- MySQL has no `LISTEN/NOTIFY`: with `interval=0` the counters are read \
+    before every cached lookup (one primary key read of three rows instead \
+    of the query), a larger interval trades that read for stale rows during \
+    up to `interval` seconds after a change.
+- The counters are kept across schema reloads and bumped by them (and by \
+    `seed.reset_tables`, as `TRUNCATE` fires no trigger).
+- Concurrent writers of one catalog table queue on its counter row; the \
+    catalog changes rarely.
+- Sizes are estimates (`sys.getsizeof` of the rows and their values).
+
+## Usage:
+```py
+cache = ResultCache(ttl=300, max_bytes=64 * 1024 * 1024)
+watcher = VersionWatcher(cache)
+with pool.connection() as cnx:
+    watcher.check(cnx)
+    rows = cache.fetch(query, params, CATALOG_TABLES, lambda: load(cnx))
+print(cache.stats())
+```
+"""
+
+import logging
+import sys
+from collections import OrderedDict
+from collections.abc import Callable
+from threading import Lock
+from time import monotonic
+
+import mysql.connector as mysql
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 300.0  # seconds
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_INTERVAL = 0.0  # seconds, read the versions before every lookup
+
+# Tables of the test catalog, the only ones the triggers count
+CATALOG_TABLES = ("tests", "questions", "questions_options")
+
+VERSIONS = "SELECT `table_name`, `version` FROM `ems_table_versions`"
+
+
+def normalize(query: str) -> str:
+    """The query with every run of whitespace collapsed to one space."""
+    return " ".join(query.split())
+
+
+def cache_key(query: str, params=None) -> tuple:
+    if isinstance(params, dict):
+        params = tuple(sorted(params.items()))
+    elif params is not None:
+        params = tuple(params)
+    return normalize(query), params
+
+
+def sizeof(rows: list) -> int:
+    """Estimated memory held by a result set, in bytes."""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+    return size
+
+
+class _Entry:
+    __slots__ = ("expires", "rows", "size", "tables")
+
+    def __init__(self, rows: list, tables: tuple, size: int, expires: float):
+        self.rows = rows
+        self.tables = tables
+        self.size = size
+        self.expires = expires
+
+
+class ResultCache:
+    """LRU of query results with a time to live and a memory bound.
+
+    Args:
+        ttl (float, optional): seconds an entry is served. Defaults to 300.
+        max_bytes (int, optional): estimated size of all the cached rows. \
+            Defaults to 64 MiB.
+        clock (Callable[[], float], optional): monotonic seconds. \
+            Defaults to `time.monotonic`.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        clock: Callable[[], float] = monotonic,
+    ):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.bytes = 0
+        self._entries = OrderedDict()
+        # Bumped by every invalidation of a table (`_epoch`: of all of them),
+        # see `fetch`
+        self._epoch = 0
+        self._generations = {}
+        self._lock = Lock()
+
+    def get(self, key: tuple):
+        """Cached rows of `key`, or `None` (counted as a miss)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= self.clock():
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.rows
+
+    def put(
+        self, key: tuple, rows, tables: tuple, generations=None, size: int | None = None
+    ) -> bool:
+        """Cache rows read from `tables`.
+
+        Args:
+            key (tuple): `cache_key(query, params)`
+            rows (list): result rows, not to be modified afterwards
+            tables (tuple): tables the query reads
+            generations (tuple, optional): `generations(tables)` taken \
+                before the rows were read: the rows are not cached if one \
+                of the tables was invalidated since.
+            size (int, optional): size of `rows` in bytes. \
+                Defaults to `sizeof(rows)`.
+
+        Returns:
+            bool: whether the rows were cached
+        """
+        size = (sizeof(rows) if size is None else size) + sys.getsizeof(key[0])
+        with self._lock:
+            if generations is not None and generations != self._generation(tables):
+                return False
+            if size > self.max_bytes:
+                return False
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(rows, tables, size, self.clock() + self.ttl)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def generations(self, tables: tuple) -> tuple:
+        with self._lock:
+            return self._generation(tables)
+
+    def fetch(
+        self,
+        query: str,
+        params,
+        tables: tuple,
+        load: Callable[[], list],
+        measure: Callable = sizeof,
+    ):
+        """Rows of a query, from the cache or from `load()` (then cached).
+
+        Args:
+            query (str): read-only query
+            params (Sequence | Mapping): query parameters
+            tables (tuple): tables the query reads
+            load (Callable[[], list]): runs the query, returns its rows
+            measure (Callable, optional): size in bytes of what `load` \
+                returns. Defaults to `sizeof`.
+
+        Returns:
+            list: result rows, shared with the cache: don't modify them
+        """
+        key = cache_key(query, params)
+        rows = self.get(key)
+        if rows is None:
+            generations = self.generations(tables)
+            rows = load()
+            self.put(key, rows, tables, generations, measure(rows))
+        return rows
+
+    def invalidate(self, tables=None) -> int:
+        """Drop the entries reading any of `tables` (all of them if `None`).
+
+        Returns:
+            int: number of dropped entries
+        """
+        with self._lock:
+            if tables is None:
+                self._epoch += 1
+                stale = list(self._entries)
+            else:
+                for table in tables:
+                    self._generations[table] = self._generations.get(table, 0) + 1
+                stale = [
+                    key
+                    for key, entry in self._entries.items()
+                    if not set(entry.tables).isdisjoint(tables)
+                ]
+            for key in stale:
+                self._drop(key)
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self) -> None:
+        self.invalidate()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _generation(self, tables: tuple) -> tuple:
+        return (self._epoch, *(self._generations.get(table, 0) for table in tables))
+
+    def _drop(self, key: tuple) -> None:
+        self.bytes -= self._entries.pop(key).size
+
+
+class VersionWatcher:
+    """Invalidate a `ResultCache` when the counters of `ems_table_versions` move.
+
+    Args:
+        cache (ResultCache): cache to invalidate
+        interval (float, optional): seconds between two reads of the \
+            counters, 0 to read them before every lookup. Defaults to 0.
+        clock (Callable[[], float], optional): monotonic seconds. \
+            Defaults to `time.monotonic`.
+    """
+
+    def __init__(
+        self,
+        cache: ResultCache,
+        interval: float = DEFAULT_INTERVAL,
+        clock: Callable[[], float] = monotonic,
+    ):
+        self.cache = cache
+        self.interval = interval
+        self.clock = clock
+        self.checks = 0
+        self._versions = None
+        self._next_check = 0.0
+        self._lock = Lock()
+
+    def due(self) -> bool:
+        return self._versions is None or self.clock() >= self._next_check
+
+    def check(self, cnx: mysql.MySQLConnection) -> list:
+        """Read the counters, invalidate the tables that changed since.
+
+        Args:
+            cnx (mysql.MySQLConnection): open connection
+
+        Returns:
+            list: invalidated tables
+        """
+        cursor = cnx.cursor()
+        try:
+            cursor.execute(VERSIONS)
+            versions = dict(cursor.fetchall())
+        finally:
+            cursor.close()
+        with self._lock:
+            self.checks += 1
+            self._next_check = self.clock() + self.interval
+            if self._versions is None:
+                # Nothing is known about what was cached before
+                changed = list(versions)
+                self.cache.clear()
+            else:
+                changed = [
+                    table
+                    for table, version in versions.items()
+                    if self._versions.get(table) != version
+                ]
+                if changed:
+                    self.cache.invalidate(changed)
+            self._versions = versions
+        return changed
@@ -0,0 +1,174 @@
+"""
+Script execution engine for running many SQL statements over one connection.
+
+## Key Features:
+- Reuses a single (buffered) cursor for every statement of a script.
+- Transaction modes:
+    - `statement`: commit after every statement (previous behaviour).
+    - `script`: one commit at the end of the script.
+    - `batch`: commit every `batch_size` statements.
+- Optionally times every statement (`timer`, see `timing.py`).
+- `write_batched` sends one parameterized `INSERT` for many rows as \
+    multi-row `INSERT ... VALUES (...), (...)` statements: one network round \
+    trip per `batch_size` rows instead of one per row.
+
+## Notes:
+- InnoDB rolls back only the failing statement, so no savepoints are needed \
+    to keep the rest of a batch; deadlocks roll back the whole transaction \
+    and are reported as such.
+- DDL statements commit implicitly in MySQL regardless of the mode.
+"""
+
+import logging
+from time import perf_counter
+
+import mysql.connector as mysql
+from mysql.connector import errorcode
+
+logger = logging.getLogger(__name__)
+
+STATEMENT = "statement"
+SCRIPT = "script"
+BATCH = "batch"
+TRANSACTION_MODES = (STATEMENT, SCRIPT, BATCH)
+
+# Errors after which InnoDB has rolled back the whole transaction
+TRANSACTION_ROLLBACK_ERRORS = (errorcode.ER_LOCK_DEADLOCK,)
+
+DEFAULT_WRITE_BATCH_SIZE = 500
+
+
+def write_batched(
+    cnx: mysql.MySQLConnection,
+    query: str,
+    params_seq,
+    batch_size: int = DEFAULT_WRITE_BATCH_SIZE,
+) -> int:
+    """Run one parameterized `INSERT` for many rows, `batch_size` per round trip.
+
+    `executemany` rewrites `INSERT ... VALUES (%s, ...)` into a single multi-row
+    `INSERT`; triggers still fire for every row. Nothing is committed: the
+    caller owns the transaction.
+
+    Args:
+        cnx (mysql.MySQLConnection): open connection
+        query (str): `INSERT ... VALUES` with `%s` placeholders
+        params_seq (Iterable[Sequence]): one parameter tuple per row
+        batch_size (int, optional): rows per statement. Defaults to 500.
+
+    Returns:
+        int: number of rows written
+    """
+    rows = 0
+    batch = []
+    cursor = cnx.cursor()
+    try:
+        for params in params_seq:
+            batch.append(params)
+            if len(batch) == batch_size:
+                cursor.executemany(query, batch)
+                rows += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(query, batch)
+            rows += len(batch)
+    finally:
+        cursor.close()
+    return rows
+
+
+class ScriptRunner:
+    """Execute statements over a shared cursor with batched commits.
+
+    Args:
+        cnx (mysql.MySQLConnection): connection used for every statement
+        mode (str, optional): one of `TRANSACTION_MODES`. Defaults to "script".
+        batch_size (int, optional): statements per commit in `batch` mode.
+        timer (timing.StatementTimer, optional): records the wall time of \
+            every successful statement.
+    """
+
+    def __init__(
+        self,
+        cnx: mysql.MySQLConnection,
+        mode: str = SCRIPT,
+        batch_size: int = 1000,
+        timer=None,
+    ):
+        if mode not in TRANSACTION_MODES:
+            raise ValueError(f"Unknown transaction mode: {mode}")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.cnx = cnx
+        self.mode = mode
+        self.batch_size = batch_size
+        self.timer = timer
+        self.stats = {"executed": 0, "failed": 0, "commits": 0, "rolled_back": 0}
+        self._pending = 0
+
+    def _recover(self, err: mysql.Error) -> None:
+        """Account for statements lost when the server aborted the transaction."""
+        if err.errno in TRANSACTION_ROLLBACK_ERRORS and self._pending:
+            logger.error(
+                "Transaction rolled back, lost %d uncommitted statement(s)",
+                self._pending,
+            )
+            self.stats["rolled_back"] += self._pending
+            self._pending = 0
+        elif self.mode == STATEMENT:
+            self.cnx.rollback()
+
+    def commit(self) -> None:
+        """Commit pending statements, if any."""
+        if self._pending:
+            self.cnx.commit()
+            self.stats["commits"] += 1
+            self._pending = 0
+
+    def run(self, statements, on_result=None) -> dict:
+        """Execute statements in order and commit according to `mode`.
+
+        Args:
+            statements (Iterable[str]): SQL statements without terminators
+            on_result (callable, optional): called as `on_result(cursor, query)` \
+                after each successful statement, while its result is current.
+
+        Returns:
+            dict: counters of executed, failed, commits and rolled back statements
+        """
+        cursor = self.cnx.cursor(buffered=True)
+        try:
+            for query in statements:
+                query = query.strip()
+                if not query:
+                    continue
+                try:
+                    started = perf_counter()
+                    cursor.execute(query)
+                    elapsed = perf_counter() - started
+                except mysql.Error as e:
+                    logger.error(f"Error executing query: {query}\n{e}")
+                    self.stats["failed"] += 1
+                    self._recover(e)
+                    continue
+
+                self.stats["executed"] += 1
+                self._pending += 1
+                if self.timer is not None:
+                    self.timer.record(cursor, query, elapsed)
+                if on_result:
+                    on_result(cursor, query)
+
+                if self.mode == STATEMENT or (
+                    self.mode == BATCH and self._pending >= self.batch_size
+                ):
+                    self.commit()
+            self.commit()
+        except BaseException:
+            # Leave the connection usable for the caller
+            if self.cnx.is_connected():
+                self.cnx.rollback()
+            raise
+        finally:
+            cursor.close()
+        return self.stats
@@ -0,0 +1,83 @@
+"""
+In-process schema loading over an open mysql-connector connection.
+
+## Key Features:
+- Applies `schema.sql` statement by statement (split with `sqlsplit`, which \
+    follows the `DELIMITER` directives), so triggers load without mysql shell.
+- Stops at the first failing statement and rolls back what is still \
+    uncommitted.
+- Logs the time taken by every DDL block.
+
+## Notes:
+- MySQL commits implicitly around every DDL statement, so unlike Postgres \
+    the script cannot be applied atomically; it is safe to re-run since \
+    `schema.sql` drops its objects first.
+- Warnings (e.g. `DROP ... IF EXISTS` on a missing object) are logged \
+    instead of raised while the script runs.
+"""
+
+import logging
+from time import perf_counter
+
+import mysql.connector as mysql
+
+from sqlsplit import read_statements
+
+logger = logging.getLogger(__name__)
+
+
+def describe(statement: str, width: int = 60) -> str:
+    """First line of code in a statement, used as its label in logs."""
+    for line in statement.splitlines():
+        line = line.strip()
+        if line and not line.startswith(("--", "#")):
+            return line if len(line) <= width else f"{line[: width - 3]}..."
+    return ""
+
+
+def load_schema(cnx: mysql.MySQLConnection, path: str = "schema.sql") -> list:
+    """Apply a schema script in one transaction (as far as MySQL allows).
+
+    Args:
+        cnx (mysql.MySQLConnection): open connection
+        path (str, optional): schema script. Defaults to "schema.sql".
+
+    Returns:
+        list: `(statement label, seconds)` for every executed statement
+    """
+    timings = []
+    warnings = 0
+    started = perf_counter()
+    raise_on_warnings, get_warnings = cnx.raise_on_warnings, cnx.get_warnings
+    cnx.raise_on_warnings = False
+    cnx.get_warnings = True
+    # Start from a clean transaction for the non-DDL parts of the script
+    cnx.commit()
+    cursor = cnx.cursor(buffered=True)
+    try:
+        for statement in read_statements(path):
+            label = describe(statement)
+            statement_started = perf_counter()
+            cursor.execute(statement)
+            elapsed = perf_counter() - statement_started
+            timings.append((label, elapsed))
+            logger.info("%8.2f ms  %s", elapsed * 1000, label)
+            for level, code, message in cursor.fetchwarnings() or ():
+                warnings += 1
+                logger.info("%s %s: %s", level, code, message)
+        cnx.commit()
+    except BaseException:
+        cnx.rollback()
+        logger.error("Schema import failed, rolled back %s", path)
+        raise
+    finally:
+        cursor.close()
+        cnx.raise_on_warnings = raise_on_warnings
+        cnx.get_warnings = get_warnings
+    logger.info(
+        "Schema import succeeded: %d statements (%d warnings) in %.2f ms",
+        len(timings),
+        warnings,
+        (perf_counter() - started) * 1000,
+    )
+    return timings
@@ -3,10 +3,15 @@
 DROP VIEW IF EXISTS `tests_history`;
 DROP VIEW IF EXISTS `test_questions_option_search`;
 DROP VIEW IF EXISTS `test_sessions_suspicious_behaviour_search`;
+DROP VIEW IF EXISTS `tests_sessions_live_scores`;
 
 -- Drop index if exists
 -- DROP INDEX idx_reports ON reports;
--- DROP INDEX idx_events ON events;
+-- DROP INDEX idx_events_suspicious ON events;
+-- DROP INDEX idx_proctoring_sessions ON proctoring_sessions;
+-- DROP INDEX idx_proctoring_sessions_proctor_id ON proctoring_sessions;
+-- DROP INDEX idx_results ON results;
+-- DROP INDEX idx_tests_history_summary ON tests_history_summary;
 -- DROP INDEX idx_tests_sessions ON tests_sessions;
 -- DROP INDEX idx_tests_sessions_status ON tests_sessions;
 -- DROP INDEX idx_questions_options_is_correct ON questions_options;
@@ -16,7 +21,9 @@ DROP VIEW IF EXISTS `test_sessions_suspicious_behaviour_search`;
 -- DROP INDEX idx_students ON students;
 
 -- Drop tables if exists
+DROP TABLE IF EXISTS `tests_history_summary`;
 DROP TABLE IF EXISTS `reports`;
+DROP TABLE IF EXISTS `tests_sessions_scores`;
 DROP TABLE IF EXISTS `results`;
 DROP TABLE IF EXISTS `events`;
 DROP TABLE IF EXISTS `proctoring_sessions`;
@@ -118,6 +125,10 @@ CREATE TABLE IF NOT EXISTS
 
 -- Represents events occurring during proctoring sessions
 -- trigger added for some new auto updates and entries
+-- partitioned by month of `timestamp` (`pYYYYMM`, see `partitions.py`), rows
+-- of months without a partition wait in `p_past` / `p_future`; partitioned
+-- InnoDB tables can't have foreign keys, triggers reject the
+-- `proctoring_session_id`s of no proctoring session instead
 CREATE TABLE IF NOT EXISTS
     `events` (
         `id` INT AUTO_INCREMENT,
@@ -130,8 +141,11 @@ CREATE TABLE IF NOT EXISTS
         ) NOT NULL,
         `timestamp` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
         `description` VARCHAR(32) DEFAULT 'OK',
-        PRIMARY KEY (`id`),
-        FOREIGN KEY (`proctoring_session_id`) REFERENCES `proctoring_sessions` (`id`)
+        PRIMARY KEY (`id`, `timestamp`)
+    )
+    PARTITION BY RANGE COLUMNS (`timestamp`) (
+        PARTITION `p_past` VALUES LESS THAN ('2000-01-01'),
+        PARTITION `p_future` VALUES LESS THAN (MAXVALUE)
     );
 
 -- Represents the results of test sessions
@@ -163,6 +177,45 @@ CREATE TABLE IF NOT EXISTS
         FOREIGN KEY (`test_session_id`) REFERENCES `tests_sessions` (`id`)
     );
 
+-- Represents the materialized `tests_history` view
+-- trigger added: one row per report, kept with the report
+CREATE TABLE IF NOT EXISTS
+    `tests_history_summary` (
+        `report_id` INT,
+        `student_id` INT,
+        `test_id` INT,
+        `test_title` VARCHAR(300),
+        `total_score` INT,
+        `scored` INT,
+        `overall_feedback` VARCHAR(32),
+        `duration_taken` TIME,
+        PRIMARY KEY (`report_id`),
+        FOREIGN KEY (`report_id`) REFERENCES `reports` (`id`)
+    );
+
+-- Represents the running score of test sessions
+-- trigger added: one row per session, updated on every answer
+CREATE TABLE IF NOT EXISTS
+    `tests_sessions_scores` (
+        `test_session_id` INT,
+        `answered` INT NOT NULL DEFAULT 0,
+        `correct` INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (`test_session_id`),
+        FOREIGN KEY (`test_session_id`) REFERENCES `tests_sessions` (`id`)
+    );
+
+-- Change counters of the test catalog tables, bumped by triggers and read by
+-- the result caches (see `resultcache.py`); kept across schema reloads
+CREATE TABLE IF NOT EXISTS
+    `ems_table_versions` (
+        `table_name` VARCHAR(64),
+        `version` BIGINT UNSIGNED NOT NULL DEFAULT 0,
+        PRIMARY KEY (`table_name`)
+    );
+
+INSERT IGNORE INTO `ems_table_versions` (`table_name`)
+VALUES ('tests'), ('questions'), ('questions_options');
+
 -- CREATE TRIGGERS: to UPDATE and INSERT values
 DELIMITER $$
 -- Create a trigger to set the end time based on the tests duration
@@ -186,19 +239,91 @@ BEGIN
         (NEW.id, 'started-test');
 END$$
 
+-- Create triggers to reject events of no proctoring session (in place of
+-- the foreign key that partitioned `events` can't have)
+CREATE TRIGGER `check_proctoring_session_of_event` BEFORE INSERT ON
+`events` FOR EACH ROW
+BEGIN
+    IF NEW.proctoring_session_id IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM `proctoring_sessions` WHERE `id` = NEW.proctoring_session_id
+    ) THEN
+        SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'events.proctoring_session_id: no such proctoring session';
+    END IF;
+END$$
+
+CREATE TRIGGER `check_proctoring_session_of_event_update` BEFORE UPDATE ON
+`events` FOR EACH ROW
+BEGIN
+    IF NEW.proctoring_session_id IS NOT NULL
+        AND NOT (NEW.proctoring_session_id <=> OLD.proctoring_session_id)
+        AND NOT EXISTS (
+            SELECT 1 FROM `proctoring_sessions` WHERE `id` = NEW.proctoring_session_id
+        ) THEN
+        SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'events.proctoring_session_id: no such proctoring session';
+    END IF;
+END$$
+
 -- Create a trigger to set score for answer of questions
+-- Answers scored by the application (`scoring.py`) come with their score:
+-- it sets `@ems_scoring` to 'bulk' while it inserts them
 CREATE TRIGGER `set_score_of_result` BEFORE INSERT ON
 `results` FOR EACH ROW
 BEGIN
-    SET NEW.score = (
-        SELECT is_correct FROM questions_options WHERE id = NEW.answer
-    );
-    SET NEW.feedback = CASE
-        WHEN (
+    IF @ems_scoring IS NULL OR @ems_scoring <> 'bulk' THEN
+        SET NEW.score = (
             SELECT is_correct FROM questions_options WHERE id = NEW.answer
-        ) = 0 THEN 'need-improvement'
-        ELSE 'great'
-    END;
+        );
+        SET NEW.feedback = CASE
+            WHEN (
+                SELECT is_correct FROM questions_options WHERE id = NEW.answer
+            ) = 0 THEN 'need-improvement'
+            ELSE 'great'
+        END;
+
+        -- Count the answer in the running score of its session
+        IF NEW.test_session_id IS NOT NULL THEN
+            INSERT INTO `tests_sessions_scores` (`test_session_id`, `answered`, `correct`)
+            VALUES (NEW.test_session_id, 1, NEW.score)
+            ON DUPLICATE KEY UPDATE
+                `answered` = `answered` + 1,
+                `correct` = `correct` + NEW.score;
+        END IF;
+    END IF;
+END$$
+
+-- Create triggers to keep the running scores with corrected and deleted answers
+CREATE TRIGGER `update_score_of_result` AFTER UPDATE ON
+`results` FOR EACH ROW
+BEGIN
+    IF NOT (OLD.test_session_id <=> NEW.test_session_id) OR OLD.score <> NEW.score THEN
+        -- Take the old answer out of the running score of its session
+        UPDATE `tests_sessions_scores`
+        SET
+            `answered` = `answered` - 1,
+            `correct` = `correct` - OLD.score
+        WHERE `test_session_id` = OLD.test_session_id;
+
+        -- Count the corrected one in
+        IF NEW.test_session_id IS NOT NULL THEN
+            INSERT INTO `tests_sessions_scores` (`test_session_id`, `answered`, `correct`)
+            VALUES (NEW.test_session_id, 1, NEW.score)
+            ON DUPLICATE KEY UPDATE
+                `answered` = `answered` + 1,
+                `correct` = `correct` + NEW.score;
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER `delete_score_of_result` AFTER DELETE ON
+`results` FOR EACH ROW
+BEGIN
+    UPDATE `tests_sessions_scores`
+    SET
+        `answered` = `answered` - 1,
+        `correct` = `correct` - OLD.score
+    WHERE `test_session_id` = OLD.test_session_id;
 END$$
 
 -- Create a trigger to update tests sessions, events, proctoring session and reports on tests session status update
@@ -229,39 +354,195 @@ BEGIN
             `test_session_id` = NEW.id
             AND `status` = 'active';
 
-        -- Add reports for test session
+        -- Add reports for test session from its running score (no results scan)
         INSERT INTO `reports` (
             `test_session_id`,
             `total_score`,
             `final_score`,
             `overall_feedback`
         )
-        VALUES (
+        SELECT
             NEW.id,
-            (SELECT COUNT(*) FROM `results` WHERE `test_session_id` = NEW.id),
-            (SELECT IFNULL(SUM(`score`),0) FROM `results` WHERE `test_session_id` = NEW.id),
-            (SELECT MAX(`feedback`) FROM `results` WHERE `test_session_id` = NEW.id)
+            IFNULL(`S`.`answered`, 0),
+            IFNULL(`S`.`correct`, 0),
+            CASE
+                WHEN `S`.`correct` < `S`.`answered` THEN 'need-improvement'
+                WHEN `S`.`answered` > 0 THEN 'great'
+            END
+        FROM (SELECT NEW.id AS `id`) AS `TS`
+        LEFT JOIN `tests_sessions_scores` AS `S` ON `S`.`test_session_id` = `TS`.`id`;
+    END IF;
+END$$
+
+-- Create a trigger to copy the reports of a session to the materialized tests
+-- history when it closes (its report is added by the trigger above), or when
+-- its student, test or duration taken changes
+CREATE TRIGGER `update_tests_history_session` AFTER UPDATE ON
+`tests_sessions` FOR EACH ROW
+BEGIN
+    IF (NEW.status IN ('ended', 'completed') AND OLD.status NOT IN ('ended', 'completed'))
+        OR NOT (OLD.student_id <=> NEW.student_id)
+        OR NOT (OLD.test_id <=> NEW.test_id)
+        OR NOT (OLD.duration_taken <=> NEW.duration_taken) THEN
+        DELETE FROM `tests_history_summary`
+        WHERE `report_id` IN (
+            SELECT `id` FROM `reports` WHERE `test_session_id` = NEW.id
         );
+
+        INSERT INTO `tests_history_summary` (
+            `report_id`,
+            `student_id`,
+            `test_id`,
+            `test_title`,
+            `total_score`,
+            `scored`,
+            `overall_feedback`,
+            `duration_taken`
+        )
+        SELECT
+            `R`.`id`,
+            NEW.student_id,
+            NEW.test_id,
+            `T`.`title`,
+            `R`.`total_score`,
+            `R`.`final_score`,
+            `R`.`overall_feedback`,
+            NEW.duration_taken
+        FROM `reports` AS `R`
+        JOIN `tests` AS `T` ON `T`.`id` = NEW.test_id
+        WHERE `R`.`test_session_id` = NEW.id;
     END IF;
 END$$
+
+-- Create triggers to keep corrected and deleted reports in the materialized
+-- tests history (deleted first: the history row references the report)
+CREATE TRIGGER `update_tests_history_report` AFTER UPDATE ON
+`reports` FOR EACH ROW
+BEGIN
+    DELETE FROM `tests_history_summary` WHERE `report_id` = OLD.id;
+
+    INSERT INTO `tests_history_summary` (
+        `report_id`,
+        `student_id`,
+        `test_id`,
+        `test_title`,
+        `total_score`,
+        `scored`,
+        `overall_feedback`,
+        `duration_taken`
+    )
+    SELECT
+        NEW.id,
+        `TS`.`student_id`,
+        `TS`.`test_id`,
+        `T`.`title`,
+        NEW.total_score,
+        NEW.final_score,
+        NEW.overall_feedback,
+        `TS`.`duration_taken`
+    FROM `tests_sessions` AS `TS`
+    JOIN `tests` AS `T` ON `T`.`id` = `TS`.`test_id`
+    WHERE `TS`.`id` = NEW.test_session_id;
+END$$
+
+CREATE TRIGGER `delete_tests_history_report` BEFORE DELETE ON
+`reports` FOR EACH ROW
+BEGIN
+    DELETE FROM `tests_history_summary` WHERE `report_id` = OLD.id;
+END$$
+
+-- Create a trigger to keep test titles of the materialized tests history
+CREATE TRIGGER `update_tests_history_title` AFTER UPDATE ON
+`tests` FOR EACH ROW
+BEGIN
+    IF CAST(NEW.title AS BINARY) <> CAST(OLD.title AS BINARY) THEN
+        UPDATE `tests_history_summary`
+        SET `test_title` = NEW.title
+        WHERE `test_id` = NEW.id;
+    END IF;
+END$$
+
+-- Create triggers to count the changes of the test catalog tables, read by
+-- the result caches (see `resultcache.py`)
+CREATE TRIGGER `tests_version_insert` AFTER INSERT ON
+`tests` FOR EACH ROW
+BEGIN
+    UPDATE `ems_table_versions` SET `version` = `version` + 1
+    WHERE `table_name` = 'tests';
+END$$
+
+CREATE TRIGGER `tests_version_update` AFTER UPDATE ON
+`tests` FOR EACH ROW
+BEGIN
+    UPDATE `ems_table_versions` SET `version` = `version` + 1
+    WHERE `table_name` = 'tests';
+END$$
+
+CREATE TRIGGER `tests_version_delete` AFTER DELETE ON
+`tests` FOR EACH ROW
+BEGIN
+    UPDATE `ems_table_versions` SET `version` = `version` + 1
+    WHERE `table_name` = 'tests';
+END$$
+
+CREATE TRIGGER `questions_version_insert` AFTER INSERT ON
+`questions` FOR EACH ROW
+BEGIN
+    UPDATE `ems_table_versions` SET `version` = `version` + 1
+    WHERE `table_name` = 'questions';
+END$$
+
+CREATE TRIGGER `questions_version_update` AFTER UPDATE ON
+`questions` FOR EACH ROW
+BEGIN
+    UPDATE `ems_table_versions` SET `version` = `version` + 1
+    WHERE `table_name` = 'questions';
+END$$
+
+CREATE TRIGGER `questions_version_delete` AFTER DELETE ON
+`questions` FOR EACH ROW
+BEGIN
+    UPDATE `ems_table_versions` SET `version` = `version` + 1
+    WHERE `table_name` = 'questions';
+END$$
+
+CREATE TRIGGER `questions_options_version_insert` AFTER INSERT ON
+`questions_options` FOR EACH ROW
+BEGIN
+    UPDATE `ems_table_versions` SET `version` = `version` + 1
+    WHERE `table_name` = 'questions_options';
+END$$
+
+CREATE TRIGGER `questions_options_version_update` AFTER UPDATE ON
+`questions_options` FOR EACH ROW
+BEGIN
+    UPDATE `ems_table_versions` SET `version` = `version` + 1
+    WHERE `table_name` = 'questions_options';
+END$$
+
+CREATE TRIGGER `questions_options_version_delete` AFTER DELETE ON
+`questions_options` FOR EACH ROW
+BEGIN
+    UPDATE `ems_table_versions` SET `version` = `version` + 1
+    WHERE `table_name` = 'questions_options';
+END$$
 DELIMITER ;
 
 -- end of trigger
 -- CREATE VIEWS: to simplify quering
 -- VIEW all students test performance history in test they took
+-- (reads the trigger-maintained `tests_history_summary`, no joins)
 CREATE VIEW
     `tests_history` AS
 SELECT
-    `TS`.`student_id`,
-    `T`.`title` AS `test_title`,
-    `R`.`total_score`,
-    `R`.`final_score` AS `scored`,
-    `R`.`overall_feedback`,
-    `TS`.`duration_taken`
+    `student_id`,
+    `test_title`,
+    `total_score`,
+    `scored`,
+    `overall_feedback`,
+    `duration_taken`
 FROM
-    `reports` AS `R`
-    JOIN `tests_sessions` AS `TS` ON `R`.`test_session_id` = `TS`.`id`
-    JOIN `tests` AS `T` ON `TS`.`test_id` = `T`.`id`;
+    `tests_history_summary`;
 
 -- VIEW all tests and their questions as well as options
 CREATE VIEW
@@ -302,6 +583,19 @@ FROM
 WHERE
     `E`.`type` = 'suspicious-behavior';
 
+-- VIEW running score of test sessions, one primary key probe per session
+CREATE VIEW
+    `tests_sessions_live_scores` AS
+SELECT
+    `TS`.`id` AS `test_session_id`,
+    `TS`.`student_id`,
+    `TS`.`status` `test_session_status`,
+    IFNULL(`S`.`answered`, 0) `answered`,
+    IFNULL(`S`.`correct`, 0) `correct`
+FROM
+    `tests_sessions` `TS`
+    LEFT JOIN `tests_sessions_scores` `S` ON `S`.`test_session_id` = `TS`.`id`;
+
 -- CREATE INDEXES: to speed common searches
 CREATE INDEX `idx_tests_sessions` ON `tests_sessions` (`student_id`, `test_id`, `id`);
 
@@ -319,8 +613,27 @@ CREATE INDEX `idx_tests` ON `tests` (`title`);
 
 CREATE INDEX `idx_questions` ON `questions` (`test_id`, `id`);
 
-CREATE INDEX `idx_events` ON `events` (`type`);
+-- Trigger and view access paths: `results` is aggregated per test session,
+-- `proctoring_sessions` is updated per test session and the suspicious
+-- behaviour view joins `events` per proctoring session. These replace the
+-- single column indexes InnoDB adds for the foreign keys
+CREATE INDEX `idx_results` ON `results` (`test_session_id`, `score`, `feedback`);
+
+CREATE INDEX `idx_proctoring_sessions` ON `proctoring_sessions` (`test_session_id`, `status`);
+
+-- The proctor alert screen: sessions of a proctor, then their suspicious
+-- events. MySQL has no partial indexes: with `type` first, the suspicious
+-- events are one dense range of the index, by session, and the index
+-- covers the view (`timestamp` comes with the primary key)
+CREATE INDEX `idx_proctoring_sessions_proctor_id` ON `proctoring_sessions` (`proctor_id`, `test_session_id`);
+
+CREATE INDEX `idx_events_suspicious` ON `events` (`type`, `proctoring_session_id`, `description`);
+
+CREATE INDEX `idx_tests_history_summary` ON `tests_history_summary` (`student_id`);
+
 
+-- The tables were recreated: every cached result is stale
+UPDATE `ems_table_versions` SET `version` = `version` + 1;
 
 -- check errors
 SHOW WARNINGS;
@@ -0,0 +1,151 @@
+"""
+Bulk answer scoring against an answer key, without the per-row trigger.
+
+## Key Features:
+- `answer_key(*papers)`: for every question of the tests, whether each of \
+    its options is correct, from their papers (see `catalog.py`).
+- `score_answers(key, answers)`: `(test_session_id, question_id, answer, \
+    score, feedback)` rows, scored like `set_score_of_result` does, in memory.
+- `session_totals(scored)`: answers and correct answers per session, one \
+    `tests_sessions_scores` upsert per session instead of one per answer.
+- `write_scored(cnx, key, answers)` inserts the scored rows (multi-row \
+    inserts) with the trigger switched off (`@ems_scoring` = 'bulk', see \
+    `schema.sql`), then adds the totals: no `questions_options` lookup per \
+    answer.
+
+## Notes:
+- Only an option of the answered question is accepted (`ValueError`), the \
+    trigger would score an option of another question by its own correctness.
+- `@ems_scoring` is a session variable: it is reset when the call returns \
+    or fails, a rollback alone wouldn't; `db.py`'s pool clears it again when \
+    the connection is returned (`POOL_SESSION_CLEANUP`).
+- The totals upsert uses a row alias from MySQL 8.0.19 on and `VALUES()` \
+    before it (`session_scores_upsert`), where it isn't deprecated yet.
+- Nothing is committed, the caller owns the transaction.
+
+## Usage:
+```py
+key = answer_key(db.paper(test_id))
+with pool.connection() as cnx:
+    write_scored(cnx, key, [(session_id, question_id, option_id), ...])
+```
+"""
+
+import mysql.connector as mysql
+
+from runner import DEFAULT_WRITE_BATCH_SIZE, write_batched
+
+# `set_score_of_result`: 0 is "need-improvement", anything else "great"
+FEEDBACK = {0: "need-improvement", 1: "great"}
+
+BULK_SCORING = "SET @ems_scoring = 'bulk'"
+TRIGGER_SCORING = "SET @ems_scoring = NULL"
+
+SCORED_RESULT_INSERT = (
+    "INSERT INTO `results` "
+    "(`test_session_id`, `question_id`, `answer`, `score`, `feedback`) "
+    "VALUES (%s, %s, %s, %s, %s)"
+)
+# The row alias needs MySQL 8.0.19; `VALUES()` works before it but is
+# deprecated from 8.0.20 on (a warning, an error with `raise_on_warnings`)
+ROW_ALIAS_VERSION = (8, 0, 19)
+SESSION_SCORES_UPSERT = (
+    "INSERT INTO `tests_sessions_scores` "
+    "(`test_session_id`, `answered`, `correct`) VALUES (%s, %s, %s) AS `new` "
+    "ON DUPLICATE KEY UPDATE "
+    "`answered` = `tests_sessions_scores`.`answered` + `new`.`answered`, "
+    "`correct` = `tests_sessions_scores`.`correct` + `new`.`correct`"
+)
+LEGACY_SESSION_SCORES_UPSERT = (
+    "INSERT INTO `tests_sessions_scores` "
+    "(`test_session_id`, `answered`, `correct`) VALUES (%s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE "
+    "`answered` = `answered` + VALUES(`answered`), "
+    "`correct` = `correct` + VALUES(`correct`)"
+)
+
+
+def answer_key(*papers) -> dict:
+    """`{question_id: {option_id: is_correct}}` of the questions of `papers`."""
+    return {
+        question.id: {option.id: option.is_correct for option in question.options}
+        for paper in papers
+        for question in paper.questions
+    }
+
+
+def score_answers(key: dict, answers) -> list:
+    """Score answers `(test_session_id, question_id, answer)`.
+
+    Args:
+        key (dict): `answer_key` of the answered tests
+        answers (Iterable[Sequence]): one answer per row
+
+    Raises:
+        ValueError: an answer is not an option of its question
+
+    Returns:
+        list: `(test_session_id, question_id, answer, score, feedback)` rows
+    """
+    scored = []
+    for test_session_id, question_id, answer in answers:
+        try:
+            score = key[question_id][answer]
+        except KeyError:
+            raise ValueError(
+                f"answer {answer} is not an option of question {question_id}"
+            ) from None
+        scored.append((test_session_id, question_id, answer, score, FEEDBACK[score]))
+    return scored
+
+
+def session_totals(scored: list) -> list:
+    """`(test_session_id, answered, correct)` of the sessions of scored rows."""
+    totals = {}
+    for test_session_id, _, _, score, _ in scored:
+        # Like the trigger, answers without a session count nowhere
+        if test_session_id is not None:
+            answered, correct = totals.get(test_session_id, (0, 0))
+            totals[test_session_id] = (answered + 1, correct + score)
+    return [(session, *counts) for session, counts in totals.items()]
+
+
+def session_scores_upsert(cnx: mysql.MySQLConnection) -> str:
+    """The running scores upsert the server accepts without a warning."""
+    if tuple(cnx.get_server_version()[:3]) >= ROW_ALIAS_VERSION:
+        return SESSION_SCORES_UPSERT
+    return LEGACY_SESSION_SCORES_UPSERT
+
+
+def write_scored(
+    cnx: mysql.MySQLConnection,
+    key: dict,
+    answers,
+    batch_size: int = DEFAULT_WRITE_BATCH_SIZE,
+) -> int:
+    """Score answers in memory and insert them, bypassing the scoring trigger.
+
+    Args:
+        cnx (mysql.MySQLConnection): open connection
+        key (dict): `answer_key` of the answered tests
+        answers (Iterable[Sequence]): `(test_session_id, question_id, answer)`
+        batch_size (int, optional): rows per statement. Defaults to 500.
+
+    Raises:
+        ValueError: an answer is not an option of its question (nothing \
+            is written)
+
+    Returns:
+        int: number of answers written
+    """
+    scored = score_answers(key, answers)
+    cursor = cnx.cursor()
+    try:
+        cursor.execute(BULK_SCORING)
+        rows = write_batched(cnx, SCORED_RESULT_INSERT, scored, batch_size)
+        totals = session_totals(scored)
+        write_batched(cnx, session_scores_upsert(cnx), totals, batch_size)
+    finally:
+        cursor.execute(TRIGGER_SCORING)
+        cursor.close()
+    return rows
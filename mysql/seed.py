@@ -0,0 +1,446 @@
+"""
+Synthetic EMS workload generator and bulk loader for MySQL.
+
+## Key Features:
+- Generates students, tests, questions, questions_options, tests_sessions, \
+    proctors, proctoring_sessions, results and suspicious-behaviour events \
+    for any volume, deterministically from a seed.
+- Distributions are configurable (see `DEFAULT_SCALE`): questions per test, \
+    options per question, sessions per student, test popularity (Zipf), \
+    answer accuracy, session status mix and suspicious-event rate.
+- Rows are produced lazily per table, only a few compact arrays are kept \
+    in memory, so millions of rows load in constant memory.
+- Loads with multi-row `INSERT`s (`executemany`, which mysql.connector \
+    rewrites into one statement per batch) or `LOAD DATA LOCAL INFILE` \
+    (`--infile`, needs `local_infile` enabled on the server), in one transaction.
+- `TRUNCATE` (with `reset`) and the new `events` partitions of the \
+    workload's months (see `partitions.py`) commit implicitly like any \
+    MySQL DDL; all rows are then loaded and committed together.
+- Triggers stay enabled: `end`, `score`/`feedback` and the `started-test` \
+    events are filled in by the schema, and finished sessions are closed \
+    with one set-based `UPDATE`, so `reports` and the final events come \
+    from the same code path as in production.
+
+## Usage:
+```sh
+python seed.py --scale 100 --seed 42 [--infile]
+```
+"""
+
+import argparse
+import logging
+import math
+import os
+import random
+import tempfile
+from array import array
+from datetime import datetime, timedelta
+from itertools import accumulate
+from time import perf_counter
+
+import mysql.connector as mysql
+
+from partitions import ensure_partitions
+
+logger = logging.getLogger(__name__)
+
+# Volumes for `scale=1`, multiplied by the scale factor
+DEFAULT_SCALE = {
+    "students": 1000,
+    "tests": 20,
+    "proctors": 20,
+    "questions_per_test": (5, 20),  # uniform range, inclusive
+    "options_per_question": (2, 4),  # one of them is correct
+    "sessions_per_student": 3.0,  # mean (Poisson)
+    "test_popularity": 1.1,  # Zipf exponent, 0 for uniform
+    "answered_ratio": 0.9,  # share of a test's questions answered
+    "correct_ratio": 0.6,  # chance that an answer is correct
+    "status_weights": {"in-progress": 0.1, "ended": 0.2, "completed": 0.7},
+    "suspicious_ratio": 0.05,  # suspicious events per proctoring session
+    "days": 90,  # sessions start within the last `days` days
+}
+
+COLUMNS = {
+    "students": ("id", "first_name", "last_name", "password", "email"),
+    "tests": ("id", "title", "description", "duration", "instructions", "course"),
+    "questions": ("id", "test_id", "question", "type", "topic", "duration"),
+    "questions_options": ("id", "question_id", "option", "is_correct"),
+    "tests_sessions": ("id", "test_id", "student_id", "start"),
+    "proctors": ("id", "first_name", "last_name", "password", "email"),
+    "proctoring_sessions": ("id", "proctor_id", "test_session_id", "start"),
+    "results": ("test_session_id", "question_id", "answer"),
+    "events": ("proctoring_session_id", "type", "timestamp", "description"),
+}
+
+# Load order (foreign keys first)
+TABLES = tuple(COLUMNS)
+
+# Filled by the schema triggers, never loaded directly
+DERIVED_TABLES = ("tests_history_summary", "reports", "tests_sessions_scores")
+
+BATCH_SIZE = 5000  # rows per multi-row INSERT
+
+FIRST_NAMES = ("John", "Jane", "Alex", "Maria", "Wei", "Aisha", "Ivan", "Sara")
+LAST_NAMES = ("Doe", "Smith", "Khan", "Garcia", "Chen", "Okafor", "Novak", "Rossi")
+COURSES = ("sql", "python", "math", "physics", "history", "random")
+TOPICS = ("dtype", "joins", "indexes", "triggers", "views", "transactions")
+SUSPICIOUS = (
+    "not present in front of screen",
+    "multiple faces detected",
+    "switched browser tab",
+    "voice detected",
+)
+STATUSES = ("in-progress", "ended", "completed")
+TEST_DURATION = "00:30:00"
+QUESTION_DURATION = "00:03:00"
+
+
+class Workload:
+    """Deterministic synthetic dataset for the EMS schema.
+
+    Args:
+        scale (float, optional): multiplies students and proctors. Defaults to 1.
+        seed (int, optional): random seed. Defaults to 0.
+        **overrides: replace any `DEFAULT_SCALE` entry
+    """
+
+    def __init__(self, scale: float = 1, seed: int = 0, **overrides):
+        self.config = {**DEFAULT_SCALE, **overrides}
+        self.seed = seed
+        self.students_count = max(1, round(self.config["students"] * scale))
+        self.proctors_count = max(1, round(self.config["proctors"] * scale))
+        self.tests_count = self.config["tests"]
+        self.now = datetime.now().replace(microsecond=0)
+        self._plan()
+
+    def _rng(self, table: str) -> random.Random:
+        # One independent stream per table, so tables can be generated alone
+        return random.Random(f"{self.seed}:{table}")
+
+    def _plan(self) -> None:
+        """Draw the shape of the dataset (sizes and foreign keys)."""
+        rng = self._rng("plan")
+        low, high = self.config["questions_per_test"]
+        self.questions_per_test = [
+            rng.randint(low, high) for _ in range(self.tests_count)
+        ]
+        self.first_question = [0, *accumulate(self.questions_per_test)]
+
+        low, high = self.config["options_per_question"]
+        questions = self.first_question[-1]
+        self.options_per_question = array(
+            "B", (rng.randint(low, high) for _ in range(questions))
+        )
+        self.first_option = array("l", [0])
+        for count in self.options_per_question:
+            self.first_option.append(self.first_option[-1] + count)
+        self.correct_option = array(
+            "B", (rng.randrange(count) for count in self.options_per_question)
+        )
+
+        # Popular tests are taken far more often than the rest
+        exponent = self.config["test_popularity"]
+        popularity = [1 / (rank + 1) ** exponent for rank in range(self.tests_count)]
+        mean = self.config["sessions_per_student"]
+        statuses = list(self.config["status_weights"])
+        weights = list(self.config["status_weights"].values())
+        self.session_student = array("l")
+        self.session_test = array("l")
+        self.session_status = array("B")
+        for student in range(self.students_count):
+            for _ in range(_poisson(rng, mean)):
+                self.session_student.append(student + 1)
+                self.session_test.append(
+                    rng.choices(range(self.tests_count), popularity)[0]
+                )
+                status = rng.choices(statuses, weights)[0]
+                self.session_status.append(STATUSES.index(status))
+
+    @property
+    def sessions_count(self) -> int:
+        return len(self.session_test)
+
+    def students(self):
+        rng = self._rng("students")
+        for i in range(1, self.students_count + 1):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            yield (i, first, f"{last}{i}", f"pass{i}", f"student{i}@example.com")
+
+    def tests(self):
+        for i in range(1, self.tests_count + 1):
+            yield (
+                i,
+                f"test-{i}",
+                f"synthetic test {i}",
+                TEST_DURATION,
+                "choose correct option for questions",
+                COURSES[i % len(COURSES)],
+            )
+
+    def questions(self):
+        for test in range(self.tests_count):
+            first = self.first_question[test]
+            for i in range(first + 1, first + self.questions_per_test[test] + 1):
+                kind = "true/false" if i % 3 == 0 else "multiple-choice"
+                yield (
+                    i,
+                    test + 1,
+                    f"question {i}?",
+                    kind,
+                    TOPICS[i % len(TOPICS)],
+                    QUESTION_DURATION,
+                )
+
+    def questions_options(self):
+        for question, count in enumerate(self.options_per_question):
+            first = self.first_option[question]
+            correct = self.correct_option[question]
+            for n in range(count):
+                yield (
+                    first + n + 1,
+                    question + 1,
+                    f"option {n + 1}",
+                    int(n == correct),
+                )
+
+    def _session_start(self, rng: random.Random) -> datetime:
+        return self.now - timedelta(seconds=rng.randrange(self.config["days"] * 86400))
+
+    def tests_sessions(self):
+        rng = self._rng("tests_sessions")
+        for i in range(self.sessions_count):
+            yield (
+                i + 1,
+                self.session_test[i] + 1,
+                self.session_student[i],
+                self._session_start(rng),
+            )
+
+    def proctors(self):
+        rng = self._rng("proctors")
+        for i in range(1, self.proctors_count + 1):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            yield (i, first, f"{last}{i}", f"pass{i}", f"proctor{i}@example.com")
+
+    def proctoring_sessions(self):
+        # One proctoring session per test session, starting at the same time
+        rng = self._rng("proctoring_sessions")
+        starts = self.tests_sessions()
+        for i in range(self.sessions_count):
+            start = next(starts)[3]
+            yield (i + 1, rng.randint(1, self.proctors_count), i + 1, start)
+
+    def results(self):
+        rng = self._rng("results")
+        answered = self.config["answered_ratio"]
+        correct_ratio = self.config["correct_ratio"]
+        for i in range(self.sessions_count):
+            test = self.session_test[i]
+            first = self.first_question[test]
+            for question in range(first, first + self.questions_per_test[test]):
+                if rng.random() >= answered:
+                    continue
+                count = self.options_per_question[question]
+                correct = self.correct_option[question]
+                if rng.random() < correct_ratio or count == 1:
+                    option = correct
+                else:
+                    option = (correct + rng.randrange(1, count)) % count
+                yield (i + 1, question + 1, self.first_option[question] + option + 1)
+
+    def events(self):
+        """Suspicious-behaviour events (the others come from triggers)."""
+        rng = self._rng("events")
+        ratio = self.config["suspicious_ratio"]
+        starts = self.tests_sessions()
+        for i in range(self.sessions_count):
+            start = next(starts)[3]
+            # Poisson number of events, most sessions have none
+            for _ in range(_poisson(rng, ratio)):
+                yield (
+                    i + 1,
+                    "suspicious-behavior",
+                    start + timedelta(seconds=rng.randrange(30 * 60)),
+                    rng.choice(SUSPICIOUS),
+                )
+
+    def background_events(self, count: int):
+        """`count` routine events over the sessions and days (benchmark volume)."""
+        rng = self._rng("background_events")
+        for _ in range(count):
+            yield (
+                rng.randrange(self.sessions_count) + 1,
+                "started-test",
+                self._session_start(rng),
+                "OK",
+            )
+
+    def finished_sessions(self):
+        """`(id, status)` of sessions that get ended or completed."""
+        for i, status in enumerate(self.session_status):
+            if STATUSES[status] != "in-progress":
+                yield (i + 1, STATUSES[status])
+
+    def rows(self, table: str):
+        return getattr(self, table)()
+
+
+def _poisson(rng: random.Random, mean: float) -> int:
+    """Knuth's Poisson sampler (fine for the small means used here)."""
+    limit, count, product = math.exp(-mean), 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+
+def reset_tables(cursor) -> None:
+    """Empty every EMS table and reset the auto increment counters."""
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    try:
+        for table in (*DERIVED_TABLES, *TABLES):
+            cursor.execute(f"TRUNCATE TABLE `{table}`")
+    finally:
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+    # `TRUNCATE` fires no trigger, the result caches must still notice
+    cursor.execute("UPDATE `ems_table_versions` SET `version` = `version` + 1")
+
+
+def insert_rows(cursor, table: str, columns: tuple, rows, batch_size: int) -> int:
+    """Insert rows with multi-row `INSERT`s, return the row count."""
+    names = ", ".join(f"`{column}`" for column in columns)
+    marks = ", ".join(["%s"] * len(columns))
+    statement = f"INSERT INTO `{table}` ({names}) VALUES ({marks})"
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            cursor.executemany(statement, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        cursor.executemany(statement, batch)
+        count += len(batch)
+    return count
+
+
+def _infile_value(value) -> str:
+    """Format a value for `LOAD DATA`'s default (tab separated) format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        value = value.strftime("%Y-%m-%d %H:%M:%S")
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def load_infile(cursor, table: str, columns: tuple, rows) -> int:
+    """Load rows through a temporary file and `LOAD DATA LOCAL INFILE`."""
+    names = ", ".join(f"`{column}`" for column in columns)
+    count = 0
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".tsv", encoding="utf-8", delete=False
+    ) as data:
+        for row in rows:
+            data.write("\t".join(map(_infile_value, row)))
+            data.write("\n")
+            count += 1
+    try:
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE `{table}` "
+            "CHARACTER SET utf8mb4 "
+            f"({names})",
+            (data.name,),
+        )
+    finally:
+        os.remove(data.name)
+    return count
+
+
+def load(
+    cnx: mysql.MySQLConnection,
+    workload: Workload,
+    reset: bool = True,
+    infile: bool = False,
+    batch_size: int = BATCH_SIZE,
+) -> dict:
+    """Load a workload in one transaction.
+
+    Args:
+        cnx (mysql.MySQLConnection): open connection \
+            (`allow_local_infile=True` for `infile`)
+        workload (Workload): dataset to load
+        reset (bool, optional): empty the tables first. Defaults to True.
+        infile (bool, optional): use `LOAD DATA LOCAL INFILE`. Defaults to False.
+        batch_size (int, optional): rows per multi-row `INSERT`.
+
+    Returns:
+        dict: `{table: (rows, seconds)}`, `finish` for the status update
+    """
+    stats = {}
+    cursor = cnx.cursor()
+    try:
+        if reset:
+            reset_tables(cursor)
+        # Old events go straight to their monthly partition
+        first_start = workload.now - timedelta(days=workload.config["days"])
+        ensure_partitions(cnx, since=first_start)
+        for table in TABLES:
+            started = perf_counter()
+            rows = workload.rows(table)
+            if infile:
+                count = load_infile(cursor, table, COLUMNS[table], rows)
+            else:
+                count = insert_rows(cursor, table, COLUMNS[table], rows, batch_size)
+            stats[table] = (count, perf_counter() - started)
+            logger.info("%-20s %10d rows in %8.2f s", table, *stats[table])
+
+        # Close sessions the way the application does, fires the triggers
+        started = perf_counter()
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS `finished`")
+        cursor.execute(
+            "CREATE TEMPORARY TABLE `finished` "
+            "(`id` INT PRIMARY KEY, `status` VARCHAR(16))"
+        )
+        count = insert_rows(
+            cursor,
+            "finished",
+            ("id", "status"),
+            workload.finished_sessions(),
+            batch_size,
+        )
+        cursor.execute(
+            "UPDATE `tests_sessions` AS `TS` "
+            "JOIN `finished` AS `F` ON `TS`.`id` = `F`.`id` "
+            "SET `TS`.`status` = `F`.`status`"
+        )
+        cursor.execute("DROP TEMPORARY TABLE `finished`")
+        stats["finish"] = (count, perf_counter() - started)
+        logger.info("%-20s %10d rows in %8.2f s", "finish", *stats["finish"])
+        cnx.commit()
+    except BaseException:
+        cnx.rollback()
+        raise
+    finally:
+        cursor.close()
+    return stats
+
+
+if __name__ == "__main__":
+    from db import pool
+
+    parser = argparse.ArgumentParser(description="Load a synthetic EMS workload")
+    parser.add_argument("--scale", type=float, default=1, help="volume multiplier")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument(
+        "--infile", action="store_true", help="use LOAD DATA LOCAL INFILE"
+    )
+    args = parser.parse_args()
+
+    # `db` already routes the helper modules' logs to the console
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.StreamHandler())
+    workload = Workload(args.scale, args.seed)
+    with pool.connection() as cnx:
+        load(cnx, workload, infile=args.infile)
+    pool.close()
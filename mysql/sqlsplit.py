@@ -0,0 +1,139 @@
+"""
+Streaming SQL statement splitter for MySQL scripts.
+
+## Key Features:
+- Splits on the current delimiter only outside of:
+    - `'...'` and `"..."` strings (backslash escapes and doubled quotes),
+    - `` `...` `` quoted identifiers,
+    - `#` and `-- ` line comments and `/* ... */` block comments.
+- Understands the mysql-shell `DELIMITER` directive, so trigger and \
+    procedure bodies (`DELIMITER $$ ... END$$ DELIMITER ;`) come out as \
+    single statements that `mysql.connector` can execute.
+- Keeps `/*! ... */` executable comments (as written by `mysqldump`) as code.
+- Consumes input line by line and yields statements lazily, so large dump \
+    files are processed in constant memory.
+- Comment-only chunks (e.g. trailing notes after the last `;`) are skipped.
+
+## Usage:
+```py
+for statement in read_statements("schema.sql"):
+    cursor.execute(statement)
+```
+"""
+
+import re
+from collections.abc import Iterable, Iterator
+
+DEFAULT_DELIMITER = ";"
+
+_DELIMITER_DIRECTIVE = re.compile(r"\s*delimiter\s+(\S+)", re.IGNORECASE)
+_BLOCK_COMMENT_END = re.compile(r"\*/")
+_STRING_END = {
+    "'": re.compile(r"\\.|'", re.DOTALL),
+    '"': re.compile(r'\\.|"', re.DOTALL),
+    "`": re.compile(r"`"),
+}
+
+
+def _normal_pattern(delimiter: str) -> re.Pattern:
+    """Tokens that change the scanner state for a given delimiter."""
+    return re.compile(
+        "|".join([re.escape(delimiter), r"['\"`#]", r"--(?=\s|$)", r"/\*"])
+    )
+
+
+def iter_statements(lines: Iterable[str]) -> Iterator[str]:
+    """Yield statements (without the delimiter) from lines of SQL.
+
+    Args:
+        lines (Iterable[str]): SQL text, e.g. an open file; line endings kept
+
+    Yields:
+        str: one stripped statement at a time
+    """
+    delimiter = DEFAULT_DELIMITER
+    normal = _normal_pattern(delimiter)
+    buffer = []
+    has_code = False
+    state = None  # None, a quote character or "/*"
+
+    for line in lines:
+        if state is None and not has_code:
+            directive = _DELIMITER_DIRECTIVE.match(line)
+            if directive:
+                # Client side directive, never sent to the server
+                delimiter = directive.group(1)
+                normal = _normal_pattern(delimiter)
+                continue
+
+        pos = 0
+        end = len(line)
+        while pos < end:
+            if state is None:
+                match = normal.search(line, pos)
+                if match is None:
+                    if line[pos:].strip():
+                        has_code = True
+                    buffer.append(line[pos:])
+                    break
+                start, stop = match.span()
+                token = match.group()
+                if line[pos:start].strip():
+                    has_code = True
+
+                if token == delimiter:
+                    buffer.append(line[pos:start])
+                    if has_code:
+                        yield "".join(buffer).strip()
+                    buffer = []
+                    has_code = False
+                elif token in ("#", "--"):
+                    # Line comment runs to the end of the line
+                    buffer.append(line[pos:])
+                    stop = end
+                elif token == "/*":
+                    buffer.append(line[pos:stop])
+                    # `/*! ... */` and `/*+ ... */` are executed by the server
+                    if line.startswith(("!", "+"), stop):
+                        has_code = True
+                    state = "/*"
+                else:
+                    buffer.append(line[pos:stop])
+                    has_code = True
+                    state = token
+                pos = stop
+            elif state == "/*":
+                match = _BLOCK_COMMENT_END.search(line, pos)
+                if match is None:
+                    buffer.append(line[pos:])
+                    break
+                buffer.append(line[pos : match.end()])
+                state = None
+                pos = match.end()
+            else:
+                match = _STRING_END[state].search(line, pos)
+                if match is None:
+                    buffer.append(line[pos:])
+                    break
+                stop = match.end()
+                if match.group() == state:
+                    if line.startswith(state, stop):
+                        stop += 1  # doubled quote inside the string
+                    else:
+                        state = None
+                buffer.append(line[pos:stop])
+                pos = stop
+
+    if has_code:
+        yield "".join(buffer).strip()
+
+
+def split_statements(sql_script: str) -> list[str]:
+    """Split a script string into statements."""
+    return list(iter_statements(sql_script.splitlines(keepends=True)))
+
+
+def read_statements(path: str, encoding: str = "utf-8") -> Iterator[str]:
+    """Lazily yield statements from a SQL file."""
+    with open(path, "r", encoding=encoding) as sql_file:
+        yield from iter_statements(sql_file)
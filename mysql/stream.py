@@ -0,0 +1,147 @@
+"""
+Streaming output of large query results.
+
+## Key Features:
+- `GridWriter` prints a `tabulate` "grid" table batch by batch: column \
+    widths are fixed by the headers and the first batch, so the first rows \
+    show up before the rest of the result is fetched.
+- `iter_batches` drains a cursor with `fetchmany`, never holding more than \
+    one batch of rows in Python.
+- `stream_query` runs a query on an unbuffered cursor, so mysql-connector \
+    reads rows off the socket a batch at a time instead of buffering the \
+    whole result set.
+
+## Notes:
+- Values wider than their column in a later batch are printed in full and \
+    push that row's border out, rather than being truncated.
+- An unbuffered result must be read to the end before the connection runs \
+    anything else; `stream_query` discards what is left if printing fails.
+"""
+
+import sys
+from numbers import Number
+
+import mysql.connector as mysql
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def _cell(value) -> str:
+    return "" if value is None else str(value)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, Number) and not isinstance(value, bool)
+
+
+class GridWriter:
+    """Incremental `tabulate`-style grid.
+
+    Args:
+        headers (Sequence): column names
+        out (TextIO, optional): stream to write to. Defaults to stdout.
+    """
+
+    def __init__(self, headers, out=None):
+        self.headers = [str(header) for header in headers]
+        self.out = out if out is not None else sys.stdout
+        self.widths = None
+        self.numeric = None
+        self.rows = 0
+
+    def _line(self, fill: str) -> str:
+        return "+" + "+".join(fill * (width + 2) for width in self.widths) + "+"
+
+    def _row(self, cells) -> str:
+        padded = (
+            cell.rjust(width) if numeric else cell.ljust(width)
+            for cell, width, numeric in zip(cells, self.widths, self.numeric)
+        )
+        return "| " + " | ".join(padded) + " |"
+
+    def _start(self, rows: list) -> None:
+        # Right align the columns whose first batch values are all numbers
+        columns = list(zip(*rows))
+        self.numeric = [
+            any(value is not None for value in column)
+            and all(value is None or _is_number(value) for value in column)
+            for column in columns
+        ]
+        # Like `tabulate`, headers get two extra columns of padding
+        self.widths = [len(header) + 2 for header in self.headers]
+        for row in rows:
+            for index, value in enumerate(row):
+                self.widths[index] = max(self.widths[index], len(_cell(value)))
+        print(self._line("-"), file=self.out)
+        print(self._row(self.headers), file=self.out)
+        print(self._line("="), file=self.out)
+
+    def write(self, rows: list) -> None:
+        """Print one batch of rows (the first batch also prints the header)."""
+        if not rows:
+            return
+        if self.widths is None:
+            self._start(rows)
+        separator = self._line("-")
+        for row in rows:
+            print(self._row([_cell(value) for value in row]), file=self.out)
+            print(separator, file=self.out)
+        self.out.flush()
+        self.rows += len(rows)
+
+
+def iter_batches(cursor, batch_size: int = DEFAULT_BATCH_SIZE):
+    """Yield the remaining rows of a cursor, `batch_size` rows at a time."""
+    while rows := cursor.fetchmany(batch_size):
+        yield rows
+
+
+def print_stream(cursor, title: str, batch_size: int = DEFAULT_BATCH_SIZE, out=None):
+    """Print the current result of a cursor as it is fetched.
+
+    Args:
+        cursor (mysql.cursor.MySQLCursor): cursor with a pending result
+        title (str): printed before the table (not for empty results)
+        batch_size (int, optional): rows per `fetchmany`. Defaults to 500.
+        out (TextIO, optional): stream to write to. Defaults to stdout.
+
+    Returns:
+        int: number of rows printed
+    """
+    writer = None
+    for rows in iter_batches(cursor, batch_size):
+        if writer is None:
+            writer = GridWriter([column[0] for column in cursor.description], out)
+            print(title, file=writer.out)
+        writer.write(rows)
+    return writer.rows if writer else 0
+
+
+def stream_query(
+    cnx: mysql.MySQLConnection,
+    query: str,
+    params=None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    out=None,
+) -> int:
+    """Print a query result from an unbuffered cursor.
+
+    Args:
+        cnx (mysql.MySQLConnection): open connection
+        query (str): a single `SELECT` query
+        params (Sequence | Mapping, optional): query parameters
+        batch_size (int, optional): rows per `fetchmany`. Defaults to 500.
+        out (TextIO, optional): stream to write to. Defaults to stdout.
+
+    Returns:
+        int: number of rows printed
+    """
+    cursor = cnx.cursor(buffered=False)
+    try:
+        cursor.execute(query, params)
+        return print_stream(cursor, f"\n\n{query}", batch_size, out)
+    finally:
+        # Leave the connection usable when printing stopped half way
+        if cnx.unread_result:
+            cnx.consume_results()
+        cursor.close()
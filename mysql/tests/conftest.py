@@ -0,0 +1,53 @@
+import os
+
+import mysql.connector as mysql
+import pytest
+
+from schema import load_schema
+from seed import Workload, load
+
+# .env file variables
+MYSQL_DATABASE = os.environ.get("MYSQL_DATABASE", default="ems")
+MYSQL_HOST = os.environ.get("MYSQL_HOST", default="db")
+MYSQL_USER = os.environ.get("MYSQL_USER", default="root")
+MYSQL_PORT = int(os.environ.get("MYSQL_PORT", default=3306))  # Ensure it's an integer
+MYSQL_PASSWORD = os.environ.get("MYSQL_PASSWORD")
+RAISE_ON_WARNINGS = bool(os.environ.get("RAISE_ON_WARNINGS", default=True))
+
+conn_config = {
+    "user": MYSQL_USER,
+    "password": MYSQL_PASSWORD,
+    "host": MYSQL_HOST,
+    "port": MYSQL_PORT,
+    "database": MYSQL_DATABASE,
+}
+# Warnings raise errors: for the tests that run no statement reporting notes
+# (the schema's `INSERT IGNORE`, `EXPLAIN` and `ANALYZE TABLE` do)
+strict_config = {**conn_config, "raise_on_warnings": RAISE_ON_WARNINGS}
+
+
+@pytest.fixture(scope="module")
+def workload(request):
+    """A fresh schema loaded with a synthetic workload, once per module.
+
+    The seed is 1, or the value of an indirect parametrization:
+    `@pytest.mark.parametrize("workload", [7], indirect=True)`.
+    """
+    workload = Workload(scale=0.05, seed=getattr(request, "param", 1))
+    connection = mysql.connect(**conn_config)
+    try:
+        load_schema(connection)
+        load(connection, workload)
+        connection.commit()
+    finally:
+        connection.close()
+    return workload
+
+
+@pytest.fixture
+def connection(workload):
+    """A connection to the loaded workload, its changes rolled back."""
+    connection = mysql.connect(**conn_config)
+    yield connection
+    connection.rollback()
+    connection.close()
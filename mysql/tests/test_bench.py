@@ -0,0 +1,38 @@
+import json
+
+from conftest import strict_config
+
+from bench import QUERIES, percentile, run
+
+
+def test_percentile_nearest_rank():
+    samples = list(range(1, 101))
+
+    assert percentile(samples, 0.50) == 50
+    assert percentile(samples, 0.99) == 99
+    assert percentile([7], 0.95) == 7
+
+
+def test_run_reports_every_query():
+    report = run(strict_config, scales=(0.02,), repeat=3)
+
+    (scale,) = report["runs"]
+    assert set(scale["queries"]) == set(QUERIES)
+    for stats in scale["queries"].values():
+        assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
+        assert stats["plan"]
+    assert scale["queries"]["tests_history_by_email"]["rows"] > 0
+    assert 0 < scale["catalog"]["paper_bytes"] < scale["catalog"]["view_bytes"]
+    assert scale["writes"]["rows"] > 0
+    assert scale["writes"]["batched_rows_per_s"] > 0
+    assert scale["writes"]["scored_rows_per_s"] > 0
+    json.dumps(report)
+
+
+def test_events_are_padded_to_the_requested_volume():
+    report = run(strict_config, scales=(0.02,), repeat=1, write_rows=10, events=20000)
+
+    (scale,) = report["runs"]
+    assert scale["events"] == 20000
+    plan = scale["queries"]["proctor_alerts"]["plan"]
+    assert any(label.endswith(" using idx_events_suspicious") for label in plan)
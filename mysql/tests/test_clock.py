@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+import mysql.connector as mysql
+import pytest
+from conftest import conn_config
+
+from clock import SimulatedClock, using
+from schema import load_schema
+
+START = datetime(2025, 1, 6, 9, 0, 0)
+
+
+def load_sql_queries(filepath: str):
+    """Load and split SQL queries, without the shell's sleep section."""
+    with open(filepath, "r", encoding="utf-8") as f:
+        sql_script = f.read()
+    q1, q2 = sql_script.split("$$$testbreak", maxsplit=1)
+    return q1, q2.split("$$$sleeptestbreak", maxsplit=1)[1]
+
+
+def execute(connection, queries: str) -> None:
+    cursor = connection.cursor(buffered=True)
+    for query in queries.strip().split(";"):
+        if query.strip():
+            cursor.execute(query)
+    cursor.close()
+    connection.commit()
+
+
+def fetch(connection, query: str) -> list:
+    cursor = connection.cursor()
+    cursor.execute(query)
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+@pytest.fixture
+def connection():
+    connection = mysql.connect(**conn_config)
+    load_schema(connection)
+    yield connection
+    connection.close()
+
+
+def test_simulated_clock_drives_the_triggers(connection):
+    q1, q2 = load_sql_queries("queries.sql")
+    clock = SimulatedClock(START)
+    with using(connection, clock):
+        execute(connection, q1)
+    clock.sleep(90 * 60)
+    with using(connection, clock):
+        execute(connection, q2)
+
+    sessions = fetch(
+        connection,
+        "SELECT `start`, `end`, `duration_taken` FROM `tests_sessions` ORDER BY `id`",
+    )
+    assert sessions[0] == (
+        START,
+        START + timedelta(minutes=30),
+        timedelta(minutes=90),
+    )
+    assert sessions[1][2] == timedelta(minutes=90)
+    assert fetch(
+        connection, "SELECT `end` FROM `proctoring_sessions` WHERE `id` = 1"
+    ) == [(START + timedelta(minutes=90),)]
+
+
+def test_clock_is_reset_after_the_block(connection):
+    with using(connection, SimulatedClock(START)):
+        assert fetch(connection, "SELECT NOW()") == [(START,)]
+
+    ((now,),) = fetch(connection, "SELECT NOW()")
+    assert abs(now - datetime.now()) < timedelta(seconds=5)
+
+
+def test_clock_is_per_session(connection):
+    other = mysql.connect(**conn_config)
+    with using(connection, SimulatedClock(START)):
+        assert fetch(other, "SELECT NOW()") != [(START,)]
+    other.close()
@@ -1,28 +1,24 @@
-import os
-from time import sleep
+from datetime import timedelta
 
 import mysql.connector as mysql
 import pytest
+from conftest import conn_config
 
-# .env file variables
-MYSQL_DATABASE = os.environ.get("MYSQL_DATABASE", default="ems")
-MYSQL_HOST = os.environ.get("MYSQL_HOST", default="db")
-MYSQL_USER = os.environ.get("MYSQL_USER", default="root")
-MYSQL_PORT = int(os.environ.get("MYSQL_PORT", default=3306))  # Ensure it's an integer
-MYSQL_PASSWORD = os.environ.get("MYSQL_PASSWORD")
-RAISE_ON_WARNINGS = bool(os.environ.get("RAISE_ON_WARNINGS", default=True))
-
-conn_config = {
-    "user": MYSQL_USER,
-    "password": MYSQL_PASSWORD,
-    "host": MYSQL_HOST,
-    "port": MYSQL_PORT,
-    "database": MYSQL_DATABASE,
-}
-
+from clock import SimulatedClock, using
+from db import RESULT_INSERT
+from runner import write_batched
 
 TEST_COMPLETION_TIME = 3
 
+# What `tests_history` read before it was materialized
+HISTORY_JOIN = (
+    "SELECT `TS`.`student_id`, `T`.`title`, `R`.`total_score`, "
+    "`R`.`final_score`, `R`.`overall_feedback`, `TS`.`duration_taken` "
+    "FROM `reports` AS `R` "
+    "JOIN `tests_sessions` AS `TS` ON `R`.`test_session_id` = `TS`.`id` "
+    "JOIN `tests` AS `T` ON `TS`.`test_id` = `T`.`id`"
+)
+
 
 def execut_and_commit(cnx: mysql.MySQLConnection, queries: str, bufferd: bool = False):
     cursor = cnx.cursor(buffered=bufferd)
@@ -54,9 +50,12 @@ def db_connection():
     connection = mysql.connect(**conn_config)
     q1, q2 = load_sql_queries("queries.sql")
 
-    execut_and_commit(connection, q1)
-    sleep(TEST_COMPLETION_TIME)  # simulate async operation/wait
-    execut_and_commit(connection, q2)
+    clock = SimulatedClock()
+    with using(connection, clock):
+        execut_and_commit(connection, q1)
+    clock.sleep(TEST_COMPLETION_TIME)  # instant
+    with using(connection, clock):
+        execut_and_commit(connection, q2)
 
     yield connection
 
@@ -179,6 +178,19 @@ def test_final_reports_state(db_connection):
     assert reports == expected_reports
 
 
+def test_view_tests_sessions_live_scores(db_connection):
+    scores = fetch_results(
+        db_connection,
+        """
+        SELECT test_session_id, answered, correct
+        FROM tests_sessions_live_scores
+        ORDER BY test_session_id
+    """,
+    )
+
+    assert scores == [(1, 2, 2), (2, 2, 1)]
+
+
 def test_view_tests_history_john_doe(db_connection):
     history = fetch_results(
         db_connection,
@@ -214,6 +226,48 @@ def test_view_tests_history_john_doe(db_connection):
     assert formatted_history == expected_history
 
 
+def test_tests_history_summary_follows_reports(db_connection):
+    history = "SELECT * FROM `tests_history`"
+
+    db_connection.commit()
+    # Same rows as the join the view used to run on every read
+    before = sorted(fetch_results(db_connection, history))
+    joined = sorted(fetch_results(db_connection, HISTORY_JOIN))
+    cursor = db_connection.cursor()
+    cursor.execute("UPDATE `tests` SET `title` = 'renamed' WHERE `id` = 1")
+    cursor.close()
+    after = sorted(fetch_results(db_connection, history))
+    db_connection.rollback()
+
+    assert before == joined
+    assert [row[1] for row in after] == ["renamed", "renamed"]
+
+
+def test_tests_history_summary_follows_report_and_session_changes(db_connection):
+    db_connection.commit()
+    cursor = db_connection.cursor()
+    cursor.execute(
+        "UPDATE `reports` SET `total_score` = 99, `final_score` = 98 WHERE `id` = 1"
+    )
+    cursor.execute("DELETE FROM `reports` WHERE `id` = 2")
+    cursor.execute(
+        "UPDATE `tests_sessions` SET `student_id` = 2, `test_id` = 2, "
+        "`duration_taken` = '00:42:00' WHERE `id` = 1"
+    )
+    cursor.close()
+    history = sorted(fetch_results(db_connection, "SELECT * FROM `tests_history`"))
+    joined = sorted(fetch_results(db_connection, HISTORY_JOIN))
+    rows = fetch_results(
+        db_connection,
+        "SELECT `report_id`, `student_id`, `test_id`, `total_score`, `scored`, "
+        "`duration_taken` FROM `tests_history_summary` ORDER BY `report_id`",
+    )
+    db_connection.rollback()
+
+    assert history == joined
+    assert rows == [(1, 2, 2, 99, 98, timedelta(minutes=42))]
+
+
 def test_view_test_questions_option_search_demo(db_connection):
     options = fetch_results(
         db_connection,
@@ -246,3 +300,51 @@ def test_view_suspicious_behaviour_search_ended(db_connection):
     expected_suspicious = [(2, 2, "not present in front of screen")]
 
     assert suspicious == expected_suspicious
+
+
+def test_batched_results_fire_the_scoring_trigger(db_connection):
+    query = (
+        "SELECT `answered`, `correct` FROM `tests_sessions_scores` "
+        "WHERE `test_session_id` = 1"
+    )
+    # Session 1 answers its two questions again, one right and one wrong
+    answers = [(1, 1, 3), (1, 2, 6)] * 50
+
+    db_connection.commit()
+    (before,) = fetch_results(db_connection, query)
+    rows = write_batched(db_connection, RESULT_INSERT, answers, batch_size=16)
+    (after,) = fetch_results(db_connection, query)
+    db_connection.rollback()
+
+    assert rows == 100
+    assert (after[0] - before[0], after[1] - before[1]) == (100, 50)
+
+
+def test_corrected_and_deleted_answers_update_the_counters(db_connection):
+    db_connection.commit()
+    cursor = db_connection.cursor()
+    cursor.execute("UPDATE `results` SET `score` = 0 WHERE `id` = 1")
+    cursor.execute("UPDATE `results` SET `test_session_id` = 1 WHERE `id` = 3")
+    cursor.execute("DELETE FROM `results` WHERE `id` = 4")
+    cursor.close()
+    counters = fetch_results(
+        db_connection,
+        "SELECT `test_session_id`, `answered`, `correct` "
+        "FROM `tests_sessions_scores` ORDER BY `test_session_id`",
+    )
+    # Closing the session again reports from the corrected counters
+    cursor = db_connection.cursor()
+    cursor.execute(
+        "UPDATE `tests_sessions` SET `status` = 'in-progress' WHERE `id` = 1"
+    )
+    cursor.execute("UPDATE `tests_sessions` SET `status` = 'completed' WHERE `id` = 1")
+    cursor.close()
+    (report,) = fetch_results(
+        db_connection,
+        "SELECT `total_score`, `final_score`, `overall_feedback` FROM `reports` "
+        "WHERE `test_session_id` = 1 ORDER BY `id` DESC LIMIT 1",
+    )
+    db_connection.rollback()
+
+    assert counters == [(1, 3, 1), (2, 0, 0)]
+    assert report == (3, 1, "need-improvement")
@@ -0,0 +1,88 @@
+import csv
+import json
+import os
+
+import mysql.connector as mysql
+import pytest
+from conftest import strict_config
+
+from export import ResultExporter, export_query, make_sink
+
+# `cte_max_recursion_depth` defaults to 1000
+QUERY = (
+    "WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq "
+    "WHERE n < 900) SELECT n AS id, CONCAT('row ', n) AS label, "
+    "IF(n % 2 = 0, NULL, SEC_TO_TIME(n * 60)) AS taken FROM seq"
+)
+
+
+def test_export_query_csv_writes_header_and_rows(tmp_path):
+    connection = mysql.connect(**strict_config)
+    path = tmp_path / "rows.csv"
+
+    rows = export_query(connection, QUERY, path, "csv")
+
+    with open(path, newline="") as exported:
+        lines = list(csv.reader(exported))
+    assert rows == len(lines) - 1 == 900
+    assert lines[0] == ["id", "label", "taken"]
+    assert lines[1] == ["1", "row 1", "0:01:00"]
+    assert lines[2] == ["2", "row 2", ""]
+    connection.close()
+
+
+def test_export_query_jsonl_streams_every_row(tmp_path):
+    connection = mysql.connect(**strict_config)
+    path = tmp_path / "rows.jsonl"
+
+    rows = export_query(connection, QUERY, path, "jsonl", batch_size=100)
+
+    with open(path) as exported:
+        records = [json.loads(line) for line in exported]
+    assert rows == len(records) == 900
+    assert records[0] == {"id": 1, "label": "row 1", "taken": "0:01:00"}
+    assert records[1]["taken"] is None
+    # The unbuffered result was fully read, the connection is reusable
+    cursor = connection.cursor()
+    cursor.execute("SELECT 1")
+    assert cursor.fetchone() == (1,)
+    connection.close()
+
+
+def test_export_query_parquet_keeps_types(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    connection = mysql.connect(**strict_config)
+    path = tmp_path / "rows.parquet"
+
+    rows = export_query(connection, QUERY, path, "parquet", batch_size=100)
+
+    table = pq.read_table(path)
+    assert rows == table.num_rows == 900
+    assert pq.ParquetFile(path).num_row_groups == 9
+    assert str(table.schema.field("id").type) == "int64"
+    assert table.column("label")[899].as_py() == "row 900"
+    connection.close()
+
+
+def test_result_exporter_numbers_result_sets(tmp_path):
+    connection = mysql.connect(**strict_config)
+    exporter = ResultExporter(tmp_path / "out", "csv")
+
+    cursor = connection.cursor()
+    for query in ("SELECT 1 AS one", "SELECT 2 AS two FROM DUAL WHERE FALSE"):
+        cursor.execute(query)
+        exporter(cursor, query)
+    cursor.close()
+
+    assert [os.path.basename(path) for path, _ in exporter.files] == [
+        "result-001.csv",
+        "result-002.csv",
+    ]
+    assert [rows for _, rows in exporter.files] == [1, 0]
+    assert (tmp_path / "out" / "result-002.csv").read_text().splitlines() == ["two"]
+    connection.close()
+
+
+def test_make_sink_rejects_unknown_formats(tmp_path):
+    with pytest.raises(ValueError):
+        make_sink(tmp_path / "rows.xml", "xml")
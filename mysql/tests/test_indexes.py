@@ -0,0 +1,87 @@
+import mysql.connector as mysql
+import pytest
+from conftest import conn_config
+
+from bench import QUERIES, plan_shape
+from schema import load_schema
+from seed import DERIVED_TABLES, TABLES, Workload, load
+
+
+@pytest.fixture(scope="module")
+def connection():
+    connection = mysql.connect(**conn_config)
+    load_schema(connection)
+    # Large enough that the optimizer prefers indexes over full scans
+    load(connection, Workload(scale=0.5, seed=1))
+    cursor = connection.cursor()
+    names = ", ".join(f"`{table}`" for table in (*TABLES, *DERIVED_TABLES))
+    cursor.execute(f"ANALYZE TABLE {names}")
+    cursor.fetchall()
+    cursor.close()
+    yield connection
+    connection.close()
+
+
+def uses_index(connection, query, index):
+    shape = plan_shape(connection, query, {"id": 1})
+    return any(label.endswith(f" using {index}") for label in shape)
+
+
+def test_report_aggregates_use_results_index(connection):
+    # `update_status_end_final_score_all` aggregates results per session
+    query = (
+        "SELECT COUNT(*), IFNULL(SUM(`score`), 0), MAX(`feedback`) "
+        "FROM `results` WHERE `test_session_id` = %(id)s"
+    )
+    assert "ref on results using idx_results" in plan_shape(
+        connection, query, {"id": 1}
+    )
+
+
+def test_proctoring_session_lookups_use_index(connection):
+    assert uses_index(
+        connection,
+        "SELECT `id` FROM `proctoring_sessions` "
+        "WHERE `test_session_id` = %(id)s LIMIT 1",
+        "idx_proctoring_sessions",
+    )
+    assert uses_index(
+        connection,
+        "UPDATE `proctoring_sessions` SET `status` = 'completed' "
+        "WHERE `test_session_id` = %(id)s AND `status` = 'active'",
+        "idx_proctoring_sessions",
+    )
+
+
+def test_suspicious_behaviour_view_uses_event_index(connection):
+    assert uses_index(
+        connection,
+        "SELECT * FROM `test_sessions_suspicious_behaviour_search` "
+        "WHERE `test_session_id` = %(id)s",
+        "idx_events_suspicious",
+    )
+
+
+def test_proctor_alerts_use_the_proctor_and_suspicious_indexes(connection):
+    shape = plan_shape(connection, QUERIES["proctor_alerts"], {"proctor_id": 1})
+
+    keys = [label.rsplit(" using ", 1)[-1] for label in shape]
+    assert "idx_proctoring_sessions_proctor_id" in keys
+    assert "idx_events_suspicious" in keys
+    assert not [label for label in shape if label.startswith("ALL ")]
+
+
+def test_live_scores_view_is_a_key_lookup(connection):
+    assert uses_index(
+        connection,
+        "SELECT * FROM `tests_sessions_live_scores` WHERE `test_session_id` = %(id)s",
+        "PRIMARY",
+    )
+
+
+def test_tests_history_is_an_index_probe(connection):
+    assert uses_index(
+        connection,
+        "SELECT * FROM `tests_history` WHERE `student_id` = %(id)s",
+        "idx_tests_history_summary",
+    )
@@ -0,0 +1,146 @@
+import csv
+import gzip
+from datetime import date, datetime
+
+import mysql.connector as mysql
+import pytest
+from conftest import conn_config
+
+from clock import SimulatedClock, using
+from partitions import add_months, ensure_partitions, maintain, partitions
+from schema import load_schema
+
+START = datetime(2025, 1, 6, 9, 0, 0)
+
+with open("queries.sql", "r", encoding="utf-8") as sql_file:
+    Q1 = sql_file.read().split("$$$testbreak", maxsplit=1)[0]
+
+
+@pytest.fixture
+def connection():
+    connection = mysql.connect(**conn_config)
+    load_schema(connection)
+    yield connection
+    connection.close()
+
+
+def execute(connection, queries: str) -> None:
+    cursor = connection.cursor(buffered=True)
+    for query in queries.strip().split(";"):
+        if query.strip():
+            cursor.execute(query)
+    cursor.close()
+    connection.commit()
+
+
+def fetch(connection, query: str, params=None) -> list:
+    cursor = connection.cursor(buffered=True)
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def count(connection, partition):
+    query = f"SELECT COUNT(*) FROM `events` PARTITION (`{partition}`)"
+    return fetch(connection, query)[0][0]
+
+
+def months(connection):
+    return [f"{period:%Y%m}" for _, period in partitions(connection)]
+
+
+def test_add_months():
+    assert add_months(date(2025, 11, 20), 3) == date(2026, 2, 1)
+    assert add_months(date(2025, 1, 31), -1) == date(2024, 12, 1)
+
+
+def test_coming_partitions_are_created(connection):
+    today = date.today()
+
+    created = ensure_partitions(connection)
+
+    assert months(connection) == [f"{add_months(today, n):%Y%m}" for n in range(4)]
+    assert created == [f"p{month}" for month in months(connection)]
+    assert ensure_partitions(connection) == []
+
+
+def test_waiting_rows_get_their_partition(connection):
+    # The simulated test sessions run in January 2025: no partition yet
+    with using(connection, SimulatedClock(START)):
+        execute(connection, Q1)
+        waiting = count(connection, "p_future")
+        assert waiting > 0
+
+        created = ensure_partitions(connection, ahead=0)
+
+        assert created == ["p202501"]
+        assert count(connection, "p_future") == 0
+        assert count(connection, "p202501") == waiting
+        assert ensure_partitions(connection, ahead=0) == []
+
+
+def test_time_range_queries_only_scan_their_partition(connection):
+    with using(connection, SimulatedClock(START)):
+        execute(connection, Q1)
+    ensure_partitions(connection, since=datetime(2024, 11, 1))
+
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute(
+        "EXPLAIN SELECT * FROM `test_sessions_suspicious_behaviour_search` "
+        "WHERE `timestamp` >= %(since)s AND `timestamp` < %(until)s",
+        {"since": datetime(2025, 1, 1), "until": datetime(2025, 2, 1)},
+    )
+    plan = cursor.fetchall()
+    cursor.close()
+
+    scanned = {step["partitions"] for step in plan if step["table"] == "E"}
+    assert scanned == {"p202501"}
+
+
+def test_events_of_no_proctoring_session_are_rejected(connection):
+    execute(connection, Q1)
+    ((session,),) = fetch(connection, "SELECT MAX(`id`) FROM `proctoring_sessions`")
+    insert = "INSERT INTO `events` (`proctoring_session_id`, `type`) VALUES (%s, %s)"
+    cursor = connection.cursor()
+
+    with pytest.raises(mysql.DatabaseError, match="no such proctoring session"):
+        cursor.execute(insert, (session + 1, "suspicious-behavior"))
+    with pytest.raises(mysql.DatabaseError, match="no such proctoring session"):
+        cursor.execute(
+            "UPDATE `events` SET `proctoring_session_id` = %s "
+            "WHERE `proctoring_session_id` = %s",
+            (session + 1, session),
+        )
+    cursor.execute(insert, (session, "suspicious-behavior"))
+    cursor.close()
+    connection.rollback()
+
+
+def test_expired_partitions_are_archived_and_dropped(connection, tmp_path):
+    with using(connection, SimulatedClock(START)):
+        execute(connection, Q1)
+        execute(
+            connection,
+            "INSERT INTO `events` (`type`, `timestamp`, `description`) "
+            "VALUES ('suspicious-behavior', '2024-12-31 23:00:00', 'old')",
+        )
+    events = fetch(connection, "SELECT COUNT(*) FROM `events`")[0][0]
+    ensure_partitions(connection, ahead=0)
+    old = count(connection, "p202412")
+
+    # One year and a bit later, only the current month and the last 12 stay
+    with using(connection, SimulatedClock(datetime(2026, 1, 15))):
+        result = maintain(connection, keep_months=12, directory=tmp_path)
+
+    assert [name for name, _, _ in result["archived"]] == ["p202412"]
+    _, path, rows = result["archived"][0]
+    assert rows == old
+    with gzip.open(path, "rt", newline="") as archive:
+        archived = list(csv.DictReader(archive))
+    assert len(archived) == old
+    assert archived[-1]["description"] == "old"
+    assert "202412" not in months(connection)
+    assert "202501" in months(connection)
+    assert count(connection, "p_past") == 0
+    assert fetch(connection, "SELECT COUNT(*) FROM `events`")[0][0] == events - old
@@ -0,0 +1,106 @@
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+
+from conftest import strict_config
+
+from pool import LazyPool, Pool
+
+
+def connection_id(pool):
+    with pool.connection() as cnx:
+        return cnx.connection_id
+
+
+def test_pool_reuses_connections():
+    with Pool(strict_config, min_size=1, max_size=1) as pool:
+        assert connection_id(pool) == connection_id(pool)
+        assert pool.stats()["acquire_count"] == 2
+
+
+def test_pool_grows_up_to_max_size():
+    with Pool(strict_config, min_size=1, max_size=3) as pool:
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            ids = set(executor.map(lambda _: connection_id(pool), range(30)))
+
+        stats = pool.stats()
+    assert 1 <= len(ids) <= 3
+    assert stats["pool_size"] <= 3
+    assert stats["acquire_count"] == 30
+
+
+def test_pool_cleans_the_session_of_returned_connections():
+    cleanup = "SET @ems_scoring = NULL, TIMESTAMP = DEFAULT"
+    with Pool(strict_config, max_size=1, reset_session=False, cleanup=cleanup) as pool:
+        with pool.connection() as cnx:
+            cursor = cnx.cursor()
+            cursor.execute("SET @ems_scoring = 'bulk', TIMESTAMP = 1")
+            cursor.execute("PREPARE probe FROM 'SELECT 1'")
+            cursor.close()
+            first = cnx.connection_id
+
+        with pool.connection() as cnx:
+            cursor = cnx.cursor()
+            cursor.execute("SELECT @ems_scoring, @@timestamp > 1")
+            assert cursor.fetchall() == [(None, 1)]
+            # Not reset: the prepared statement survived the return
+            cursor.execute("EXECUTE probe")
+            assert cursor.fetchall() == [(1,)]
+            cursor.close()
+            assert cnx.connection_id == first
+
+
+def test_pool_replaces_idle_connections():
+    with Pool(strict_config, min_size=0, max_size=1, max_idle=0) as pool:
+        first = connection_id(pool)
+        second = connection_id(pool)
+    assert first != second
+
+
+def test_pool_shrinks_back_to_min_size_under_light_load():
+    with Pool(strict_config, min_size=1, max_size=3, max_idle=0.2) as pool:
+        with pool.connection() as first, pool.connection(), pool.connection():
+            first = first.connection_id
+        # The last returned connection is reused, the others go on idling
+        for _ in range(8):
+            assert connection_id(pool) == first
+            sleep(0.05)
+        assert pool.stats()["pool_size"] == 1
+
+
+def test_lazy_pool_opens_on_first_use():
+    opened = []
+
+    def factory():
+        opened.append(Pool(strict_config, min_size=1, max_size=1))
+        opened[-1].open()
+        return opened[-1]
+
+    lazy = LazyPool(factory)
+    assert not opened and lazy.stats() == {}
+    with lazy.connection():
+        pass
+    with lazy.connection():
+        pass
+    assert len(opened) == 1
+    assert lazy.stats()["acquire_count"] == 2
+    lazy.close()
+    assert not lazy.opened
+
+
+def test_import_does_not_connect(tmp_path):
+    # An unresolvable host would stall on connection retries if db connected
+    env = {
+        **os.environ,
+        "MYSQL_HOST": "unreachable.invalid",
+        "PYTHONPATH": os.getcwd(),
+    }
+    subprocess.run(
+        [sys.executable, "-c", "import db"],
+        cwd=tmp_path,
+        env=env,
+        check=True,
+        timeout=5,
+    )
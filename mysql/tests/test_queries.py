@@ -0,0 +1,99 @@
+import mysql.connector as mysql
+from conftest import strict_config
+
+from queries import LOOKUPS, StatementCache, cache_for
+
+
+def prepare_count(connection):
+    """Statements this session has prepared so far."""
+    cursor = connection.cursor()
+    cursor.execute("SHOW SESSION STATUS LIKE 'Com_stmt_prepare'")
+    count = int(cursor.fetchone()[1])
+    cursor.close()
+    return count
+
+
+def test_lookups_match_literal_queries(workload):
+    connection = mysql.connect(**strict_config)
+    cache = StatementCache(connection)
+    email = next(workload.students())[4]
+
+    rows = cache.lookup("tests_history_by_email", {"email": email})
+
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT * FROM `tests_history` WHERE `student_id` = ("
+        "SELECT `id` FROM `students` WHERE `email` = %s)",
+        (email,),
+    )
+    assert rows == cursor.fetchall()
+    cursor.close()
+    connection.close()
+
+
+def test_repeated_lookups_reuse_the_prepared_statement(workload):
+    connection = mysql.connect(**strict_config)
+    cache = StatementCache(connection)
+    title = next(workload.tests())[1]
+    before = prepare_count(connection)
+
+    for _ in range(3):
+        cache.lookup("test_questions_option_search_by_title", {"title": title})
+    cache.lookup(
+        "test_sessions_suspicious_behaviour_search_by_status", {"status": "ended"}
+    )
+
+    assert prepare_count(connection) - before == 2
+    assert cache.stats() == {
+        "hits": 2,
+        "misses": 2,
+        "evictions": 0,
+        "size": 2,
+        "maxsize": 100,
+    }
+    cache.close()
+    connection.close()
+
+
+def test_eviction_closes_the_oldest_statement(workload):
+    connection = mysql.connect(**strict_config)
+    cache = StatementCache(connection, maxsize=2)
+    before = prepare_count(connection)
+
+    for query in ("SELECT 1", "SELECT 2", "SELECT 1", "SELECT 3", "SELECT 2"):
+        cache.fetchall(query)
+
+    # "SELECT 2" was the least recently used when "SELECT 3" came in
+    assert prepare_count(connection) - before == 4
+    assert cache.stats()["evictions"] == 2
+    cache.close()
+    connection.close()
+
+
+def test_reset_session_prepares_again(workload):
+    connection = mysql.connect(**strict_config)
+    cache = StatementCache(connection)
+    cache.fetchall("SELECT 1")
+
+    connection.reset_session()
+
+    assert cache.fetchall("SELECT 1") == [(1,)]
+    assert cache.stats()["misses"] == 2
+    cache.close()
+    connection.close()
+
+
+def test_cache_for_keeps_one_cache_per_connection():
+    first = mysql.connect(**strict_config)
+    second = mysql.connect(**strict_config)
+
+    assert cache_for(first) is cache_for(first)
+    assert cache_for(first) is not cache_for(second)
+    assert set(LOOKUPS) == {
+        "tests_history_by_email",
+        "test_questions_option_search_by_title",
+        "test_questions_option_search_by_is_correct",
+        "test_sessions_suspicious_behaviour_search_by_status",
+    }
+    first.close()
+    second.close()
@@ -0,0 +1,109 @@
+from threading import Thread
+
+import mysql.connector as mysql
+import pytest
+from conftest import conn_config
+
+from runner import BATCH, SCRIPT, STATEMENT, ScriptRunner
+
+ROWS = "SELECT `id` FROM `runner_probe` ORDER BY `id`"
+
+
+def insert(id: int) -> str:
+    return f"INSERT INTO `runner_probe` (`id`) VALUES ({id})"
+
+
+def lock(id: int) -> str:
+    return f"UPDATE `runner_probe` SET `v` = `v` + 1 WHERE `id` = {id}"
+
+
+def execute(connection, query: str) -> list:
+    cursor = connection.cursor()
+    cursor.execute(query)
+    rows = cursor.fetchall() if cursor.with_rows else []
+    cursor.close()
+    return rows
+
+
+@pytest.fixture
+def connection():
+    connection = mysql.connect(**conn_config)
+    execute(connection, "DROP TABLE IF EXISTS `runner_probe`")
+    execute(
+        connection,
+        "CREATE TABLE `runner_probe` (`id` INT PRIMARY KEY, `v` INT DEFAULT 0)",
+    )
+    yield connection
+    connection.rollback()
+    execute(connection, "DROP TABLE `runner_probe`")
+    connection.close()
+
+
+@pytest.fixture
+def observer():
+    """Another session: only sees what the runner committed."""
+    observer = mysql.connect(**conn_config, autocommit=True)
+    yield observer
+    observer.close()
+
+
+def committed(observer) -> list:
+    return [id for (id,) in execute(observer, ROWS)]
+
+
+def test_a_failing_statement_is_rolled_back_alone(connection, observer):
+    runner = ScriptRunner(connection, mode=SCRIPT)
+    stats = runner.run(
+        [insert(1), insert(1), "SELECT * FROM `no_such_table`", insert(2)]
+    )
+
+    assert stats == {"executed": 2, "failed": 2, "commits": 1, "rolled_back": 0}
+    assert committed(observer) == [1, 2]
+
+
+@pytest.mark.parametrize(
+    "mode, batch_size, seen, commits",
+    [
+        (STATEMENT, 2, [[], [1], [1, 2], [1, 2, 3], [1, 2, 3, 4]], 5),
+        (BATCH, 2, [[], [], [1, 2], [1, 2], [1, 2, 3, 4]], 3),
+        (SCRIPT, 2, [[], [], [], [], []], 1),
+    ],
+)
+def test_commits_follow_the_mode(connection, observer, mode, batch_size, seen, commits):
+    visible = []
+    runner = ScriptRunner(connection, mode=mode, batch_size=batch_size)
+    stats = runner.run(
+        [insert(id) for id in range(1, 6)],
+        on_result=lambda cursor, query: visible.append(committed(observer)),
+    )
+
+    # What other sessions saw when each statement had just run
+    assert visible == seen
+    assert stats["commits"] == commits
+    assert committed(observer) == [1, 2, 3, 4, 5]
+
+
+def test_a_deadlock_loses_the_pending_statements(connection, observer):
+    execute(connection, "INSERT INTO `runner_probe` (`id`) VALUES (1), (2)")
+    connection.commit()
+    other = mysql.connect(**conn_config)
+    # Heavier than the runner's transaction: InnoDB rolls back the lighter one
+    others = ", ".join(f"({id})" for id in range(100, 110))
+    execute(other, f"INSERT INTO `runner_probe` (`id`) VALUES {others}")
+    execute(other, lock(2))
+    # Waits for the runner's lock on 1 while the runner waits for 2
+    waiter = Thread(target=execute, args=(other, lock(1)))
+
+    def on_result(cursor, query):
+        if query == lock(1):
+            waiter.start()
+
+    runner = ScriptRunner(connection, mode=SCRIPT)
+    stats = runner.run([insert(3), lock(1), lock(2), insert(4)], on_result=on_result)
+    waiter.join()
+    other.rollback()
+    other.close()
+
+    # 3 and the lock of 1 went with the deadlock, 4 ran in a new transaction
+    assert stats == {"executed": 3, "failed": 1, "commits": 1, "rolled_back": 2}
+    assert committed(observer) == [1, 2, 4]
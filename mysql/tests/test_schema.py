@@ -0,0 +1,35 @@
+import mysql.connector as mysql
+from conftest import strict_config
+
+from schema import load_schema
+
+
+def test_load_schema_in_process():
+    connection = mysql.connect(**strict_config)
+
+    timings = load_schema(connection)
+
+    cursor = connection.cursor()
+    cursor.execute("SHOW TRIGGERS")
+    triggers = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+
+    versions = [
+        f"{table}_version_{event}"
+        for table in ("tests", "questions", "questions_options")
+        for event in ("insert", "update", "delete")
+    ]
+    assert sorted(triggers) == sorted(
+        [
+            "add_events_starts",
+            "set_end_for_test_session",
+            "set_score_of_result",
+            "update_status_end_final_score_all",
+            "update_tests_history_title",
+            *versions,
+        ]
+    )
+    assert any(label.startswith("CREATE TRIGGER") for label, _ in timings)
+    # Warnings are only suppressed while the schema loads
+    assert connection.raise_on_warnings is True
+    connection.close()
@@ -0,0 +1,70 @@
+import mysql.connector as mysql
+from conftest import strict_config
+
+from schema import load_schema
+from seed import Workload, _infile_value, load
+
+
+def test_workload_is_deterministic():
+    first = Workload(scale=0.05, seed=7)
+    second = Workload(scale=0.05, seed=7)
+
+    assert list(first.results()) == list(second.results())
+    assert list(first.events()) == list(second.events())
+    assert list(first.results()) != list(Workload(scale=0.05, seed=8).results())
+
+
+def test_infile_values_are_escaped():
+    assert _infile_value(None) == "\\N"
+    assert _infile_value("a\tb\nc\\d") == "a\\tb\\nc\\\\d"
+
+
+def count(connection, query):
+    cursor = connection.cursor()
+    cursor.execute(query)
+    (value,) = cursor.fetchone()
+    cursor.close()
+    return value
+
+
+def test_load_runs_triggers():
+    workload = Workload(scale=0.05, seed=1)
+    connection = mysql.connect(**strict_config)
+    load_schema(connection)
+
+    stats = load(connection, workload)
+
+    assert count(connection, "SELECT COUNT(*) FROM `results`") == stats["results"][0]
+    assert count(connection, "SELECT COUNT(*) FROM `reports`") == stats["finish"][0]
+    # Reports are aggregated in one pass over the session's results
+    assert (
+        count(
+            connection,
+            "SELECT COUNT(*) FROM `reports` AS r WHERE (`total_score`, `final_score`) "
+            "<> (SELECT COUNT(*), SUM(`score`) FROM `results` "
+            "WHERE `test_session_id` = r.`test_session_id`)",
+        )
+        == 0
+    )
+    assert (
+        count(connection, "SELECT COUNT(*) FROM `results` WHERE `feedback` IS NULL")
+        == 0
+    )
+    assert count(
+        connection, "SELECT COUNT(*) FROM `events` WHERE `type` = 'started-test'"
+    ) == len(list(workload.proctoring_sessions()))
+    connection.close()
+
+
+def test_load_infile():
+    workload = Workload(scale=0.02, seed=3)
+    connection = mysql.connect(**strict_config, allow_local_infile=True)
+    load_schema(connection)
+
+    stats = load(connection, workload, infile=True)
+
+    assert count(connection, "SELECT COUNT(*) FROM `students`") == (
+        workload.students_count
+    )
+    assert count(connection, "SELECT COUNT(*) FROM `reports`") == stats["finish"][0]
+    connection.close()
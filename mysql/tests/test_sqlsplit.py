@@ -0,0 +1,70 @@
+import re
+
+from sqlsplit import read_statements, split_statements
+
+
+def test_split_ignores_semicolons_in_strings_and_identifiers():
+    statements = split_statements(
+        """
+        SELECT 'a;b', 'it\\'s;', "x;""y" FROM `odd;name`;
+        SELECT 1
+        """
+    )
+
+    assert statements == [
+        """SELECT 'a;b', 'it\\'s;', "x;""y" FROM `odd;name`""",
+        "SELECT 1",
+    ]
+
+
+def test_split_ignores_semicolons_in_comments():
+    statements = split_statements(
+        """
+        # hash; comment
+        SELECT 1 -- dash; comment
+        /* block; */;
+        SELECT 2--2;
+        /*!40101 SET NAMES utf8 */;
+        -- trailing comment only;
+        """
+    )
+
+    assert len(statements) == 3
+    assert statements[0].startswith("# hash; comment")
+    assert statements[1] == "SELECT 2--2"
+    assert statements[2] == "/*!40101 SET NAMES utf8 */"
+
+
+def test_split_follows_delimiter_directive():
+    statements = split_statements(
+        """
+        DELIMITER $$
+        CREATE TRIGGER t BEFORE INSERT ON x FOR EACH ROW
+        BEGIN
+            SET NEW.a = 1;
+            SET NEW.b = 2;
+        END$$
+        DELIMITER ;
+        SELECT 1;
+        """
+    )
+
+    assert len(statements) == 2
+    assert statements[0].startswith("CREATE TRIGGER t")
+    assert statements[0].endswith("END")
+    assert statements[1] == "SELECT 1"
+
+
+def test_read_statements_schema_triggers_stay_whole():
+    triggers = [
+        statement
+        for statement in read_statements("schema.sql")
+        if "CREATE TRIGGER" in statement
+    ]
+
+    with open("schema.sql", "r") as sql_file:
+        expected = re.findall(r"^CREATE TRIGGER", sql_file.read(), re.MULTILINE)
+
+    assert len(triggers) == len(expected) > 0
+    assert all(statement.endswith("END") for statement in triggers)
+    assert not any("DELIMITER" in statement for statement in triggers)
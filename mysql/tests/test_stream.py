@@ -0,0 +1,75 @@
+import io
+
+import mysql.connector as mysql
+from conftest import strict_config
+from tabulate import tabulate
+
+from stream import GridWriter, print_stream, stream_query
+
+# `cte_max_recursion_depth` defaults to 1000
+SEQUENCE = (
+    "WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq "
+    "WHERE n < 900) SELECT n FROM seq"
+)
+
+
+def test_grid_writer_matches_tabulate():
+    rows = [("john", 12, None), ("jane", 7, "great")]
+    out = io.StringIO()
+
+    writer = GridWriter(["name", "score", "feedback"], out)
+    writer.write(rows[:1])
+    writer.write(rows[1:])
+
+    expected = tabulate(rows, ["name", "score", "feedback"], tablefmt="grid")
+    assert out.getvalue() == expected + "\n"
+    assert writer.rows == 2
+
+
+def test_grid_writer_keeps_widths_across_batches():
+    out = io.StringIO()
+
+    writer = GridWriter(["id"], out)
+    writer.write([(1,), (22,)])
+    writer.write([(3,)])
+
+    lines = out.getvalue().splitlines()
+    assert len({len(line) for line in lines}) == 1
+    assert lines[-2] == "|    3 |"
+
+
+def test_print_stream_skips_empty_results():
+    connection = mysql.connect(**strict_config)
+    out = io.StringIO()
+    cursor = connection.cursor(buffered=True)
+    cursor.execute("SELECT 1 FROM DUAL WHERE FALSE")
+
+    assert print_stream(cursor, "empty", out=out) == 0
+    assert out.getvalue() == ""
+    cursor.close()
+    connection.close()
+
+
+def test_stream_query_reads_an_unbuffered_result():
+    connection = mysql.connect(**strict_config)
+    out = io.StringIO()
+    unread = []
+
+    class Recorder(io.StringIO):
+        def write(self, text):
+            # The rest of the result is still on the socket while rows print
+            if not unread:
+                unread.append(connection.unread_result)
+            return out.write(text)
+
+    rows = stream_query(connection, SEQUENCE, batch_size=100, out=Recorder())
+
+    assert rows == 900
+    assert unread == [True]
+    assert "| 900 |" in out.getvalue()
+    # The connection is usable again afterwards
+    cursor = connection.cursor()
+    cursor.execute("SELECT 1")
+    assert cursor.fetchall() == [(1,)]
+    cursor.close()
+    connection.close()
@@ -0,0 +1,106 @@
+import logging
+
+import mysql.connector as mysql
+import pytest
+from conftest import conn_config
+
+from runner import BATCH, ScriptRunner
+from timing import StatementTimer, explain_query, shorten
+
+
+@pytest.fixture
+def connection():
+    connection = mysql.connect(**conn_config)
+    cursor = connection.cursor()
+    cursor.execute("CREATE TEMPORARY TABLE `timing_probe` (`id` INT PRIMARY KEY)")
+    cursor.close()
+    yield connection
+    connection.close()
+
+
+def fetch(connection, query: str) -> list:
+    cursor = connection.cursor(buffered=True)
+    cursor.execute(query)
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def test_explain_query_skips_comments_and_ddl():
+    assert explain_query("-- comment\n# other\nSELECT 1") == "EXPLAIN SELECT 1"
+    assert explain_query("DELETE FROM t") == "EXPLAIN DELETE FROM t"
+    assert explain_query("CREATE TABLE t (id INT)") is None
+    label = shorten("-- Add things\nINSERT INTO t\nVALUES (1)")
+    assert label == "INSERT INTO t VALUES (1)"
+
+
+def test_runner_times_every_successful_statement(connection):
+    timer = StatementTimer(connection, slow_ms=float("inf"))
+    runner = ScriptRunner(connection, mode=BATCH, batch_size=2, timer=timer)
+
+    runner.run(
+        [
+            "INSERT INTO `timing_probe` VALUES (1), (2)",
+            "INSERT INTO `timing_probe` VALUES (1)",  # fails, not timed
+            "SELECT * FROM `timing_probe`",
+            "SELECT * FROM `timing_probe`",
+        ]
+    )
+
+    assert [record["rows"] for record in timer.records] == [2, 2, 2]
+    assert not any(record["slow"] or record["plan"] for record in timer.records)
+    summary = {entry["query"]: entry for entry in timer.summary()}
+    select = summary["SELECT * FROM `timing_probe`"]
+    assert select["calls"] == 2
+    assert select["rows"] == 4
+    assert select["total_ms"] >= select["max_ms"] > 0
+    assert summary["INSERT INTO `timing_probe` VALUES (1), (2)"]["calls"] == 1
+
+
+def test_server_time_comes_from_performance_schema(connection):
+    if fetch(connection, "SELECT @@performance_schema") != [(1,)]:
+        pytest.skip("performance_schema is off")
+    timer = StatementTimer(connection, slow_ms=float("inf"))
+
+    ScriptRunner(connection, timer=timer).run(["SELECT SLEEP(0.05)"])
+
+    (record,) = timer.records
+    assert 50 <= record["server_ms"] <= record["wall_ms"]
+
+
+def test_slow_statements_are_logged_with_their_plan(connection, caplog):
+    timer = StatementTimer(connection, slow_ms=0, server_time=False)
+    runner = ScriptRunner(connection, timer=timer)
+
+    with caplog.at_level(logging.DEBUG, logger="timing"):
+        runner.run(
+            [
+                "INSERT INTO `timing_probe` VALUES (1)",
+                "SELECT * FROM `timing_probe` WHERE `id` = 1",
+                "UPDATE `timing_probe` SET `id` = 2",
+                "DO 1",  # not explainable
+            ]
+        )
+
+    _, select, update, do = timer.records
+    assert "timing_probe" in select["plan"]
+    assert "UPDATE" in update["plan"]
+    assert do["plan"] is None
+    assert all(record["server_ms"] is None for record in timer.records)
+    # Explaining the update didn't run it a second time
+    assert fetch(connection, "SELECT `id` FROM `timing_probe`") == [(2,)]
+    slow = [record for record in caplog.records if hasattr(record, "timing")]
+    assert [record.levelno for record in slow] == [logging.WARNING] * 4
+
+
+def test_print_summary(connection, capsys):
+    timer = StatementTimer(connection, slow_ms=float("inf"), server_time=False)
+    ScriptRunner(connection, timer=timer).run(["SELECT 1", "SELECT 2", "SELECT 1"])
+
+    timer.print_summary("probe", limit=1)
+
+    out = capsys.readouterr().out
+    assert "TIMING: probe" in out
+    assert "SELECT 1" in out
+    assert "SELECT 2" not in out
+    assert "TOTAL (2 statements)" in out
@@ -0,0 +1,222 @@
+"""
+Per-statement timing and slow-query log for script execution.
+
+## Key Features:
+- `StatementTimer.record` is called by the runner (see `runner.py`) after \
+    every successful statement with its wall time (send, execute, receive):
+    - One structured log record per statement (`DEBUG`, `extra={"timing": \
+        {...}}` with `query`, `wall_ms`, `rows`, `server_ms`, `slow`), so a \
+        handler or formatter can ship the fields as they are.
+    - `server_ms` is the server's own time for the statement, read from \
+        `performance_schema.events_statements_history` (one extra round trip).
+    - Statements slower than `slow_ms` are logged as `WARNING` with their \
+        `EXPLAIN` plan.
+- `summary()` aggregates the records per statement (calls, total/max time, \
+    rows, slow calls), `print_summary()` prints the slowest as a table.
+
+## Notes:
+- `performance_schema` may be off or not readable by the user: the server \
+    time is then disabled for the timer (logged once) and left empty.
+- `EXPLAIN` doesn't execute the statement, writes are safe to explain.
+"""
+
+import logging
+import re
+
+import mysql.connector as mysql
+from tabulate import tabulate as tb
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_MS = 100.0
+DEFAULT_SUMMARY_LIMIT = 10
+
+EXPLAINABLE = re.compile(
+    r"^(SELECT|WITH|TABLE|INSERT|REPLACE|UPDATE|DELETE)\b", re.IGNORECASE
+)
+LEADING_COMMENTS = re.compile(r"^(\s*((--|#)[^\n]*(\n|$)|/\*.*?\*/))*\s*", re.DOTALL)
+
+# Last statement completed by this connection, timer in picoseconds
+SERVER_TIME = (
+    "SELECT TIMER_WAIT / 1e9 FROM performance_schema.events_statements_history "
+    "WHERE THREAD_ID = PS_CURRENT_THREAD_ID() AND NESTING_EVENT_ID IS NULL "
+    "ORDER BY EVENT_ID DESC LIMIT 1"
+)
+
+
+def strip_comments(query: str) -> str:
+    """The statement without the comments in front of it."""
+    return LEADING_COMMENTS.sub("", query, count=1)
+
+
+def shorten(query: str, width: int = 60) -> str:
+    """One-line prefix of a statement (comments skipped), for logs and tables."""
+    query = " ".join(strip_comments(query).split())
+    return query if len(query) <= width else f"{query[: width - 3]}..."
+
+
+def explain_query(query: str) -> str:
+    """The `EXPLAIN` for a statement, `None` if it can't be explained."""
+    query = strip_comments(query)
+    if not EXPLAINABLE.match(query):
+        return None
+    return f"EXPLAIN {query}"
+
+
+class StatementTimer:
+    """Timing records of the statements of one connection.
+
+    Args:
+        cnx (mysql.MySQLConnection): connection the statements run on
+        slow_ms (float, optional): threshold of the slow-query log. \
+            Defaults to 100.
+        explain (bool, optional): capture the plan of slow statements. \
+            Defaults to True.
+        server_time (bool, optional): read the server time of every \
+            statement from `performance_schema`. Defaults to True.
+    """
+
+    def __init__(
+        self,
+        cnx: mysql.MySQLConnection,
+        slow_ms: float = DEFAULT_SLOW_MS,
+        explain: bool = True,
+        server_time: bool = True,
+    ):
+        self.cnx = cnx
+        self.slow_ms = slow_ms
+        self.explain = explain
+        self.server_time = server_time
+        self.records = []
+
+    def _server_ms(self) -> float:
+        cursor = self.cnx.cursor(buffered=True)
+        try:
+            cursor.execute(SERVER_TIME)
+            row = cursor.fetchone()
+        except mysql.Error as err:
+            logger.info("Server statement times unavailable: %s", err)
+            self.server_time = False
+            return None
+        finally:
+            cursor.close()
+        return float(row[0]) if row and row[0] is not None else None
+
+    def _plan(self, query: str) -> str:
+        explain = explain_query(query)
+        if explain is None:
+            return None
+        cursor = self.cnx.cursor(buffered=True)
+        try:
+            cursor.execute(explain)
+            headers = [column[0] for column in cursor.description]
+            return tb(cursor.fetchall(), headers, tablefmt="psql")
+        except mysql.Error as err:
+            logger.info("Couldn't explain %s: %s", shorten(query), err)
+            return None
+        finally:
+            cursor.close()
+
+    def record(self, cursor, query: str, seconds: float) -> dict:
+        """Record (and log) one executed statement, explain it if slow.
+
+        Args:
+            cursor (mysql.connector.cursor.MySQLCursor): cursor of the \
+                statement, before its result is consumed
+            query (str): the statement
+            seconds (float): wall time of its execution
+
+        Returns:
+            dict: the timing record
+        """
+        wall_ms = seconds * 1000
+        record = {
+            "query": query,
+            "wall_ms": wall_ms,
+            "rows": cursor.rowcount if cursor.rowcount >= 0 else None,
+            # Read first: `EXPLAIN` would be the last statement
+            "server_ms": self._server_ms() if self.server_time else None,
+            "slow": wall_ms >= self.slow_ms,
+            "plan": None,
+        }
+        if record["slow"] and self.explain:
+            record["plan"] = self._plan(query)
+
+        self.records.append(record)
+        timing = {key: value for key, value in record.items() if key != "plan"}
+        logger.log(
+            logging.WARNING if record["slow"] else logging.DEBUG,
+            "%s statement (%.3f ms, %s rows): %s",
+            "Slow" if record["slow"] else "Timed",
+            wall_ms,
+            "?" if record["rows"] is None else record["rows"],
+            shorten(query),
+            extra={"timing": timing},
+        )
+        if record["plan"]:
+            logger.warning("Plan of %s\n%s", shorten(query), record["plan"])
+        return record
+
+    def summary(self) -> list:
+        """Records aggregated per statement, slowest (total time) first."""
+        statements = {}
+        for record in self.records:
+            entry = statements.setdefault(
+                record["query"],
+                {
+                    "query": record["query"],
+                    "calls": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "rows": None,
+                    "server_ms": None,
+                    "slow": 0,
+                },
+            )
+            entry["calls"] += 1
+            entry["total_ms"] += record["wall_ms"]
+            entry["max_ms"] = max(entry["max_ms"], record["wall_ms"])
+            if record["rows"] is not None:
+                # Unknown (reads) stays empty rather than counting as 0
+                entry["rows"] = (entry["rows"] or 0) + record["rows"]
+            entry["slow"] += record["slow"]
+            if record["server_ms"] is not None:
+                entry["server_ms"] = (entry["server_ms"] or 0) + record["server_ms"]
+        return sorted(statements.values(), key=lambda entry: -entry["total_ms"])
+
+    def print_summary(self, title: str = "", limit: int = DEFAULT_SUMMARY_LIMIT):
+        """Print the `limit` slowest statements and the script totals."""
+        summary = self.summary()
+        if not summary:
+            return
+        rows = [
+            (
+                shorten(entry["query"]),
+                entry["calls"],
+                f"{entry['total_ms']:.3f}",
+                f"{entry['max_ms']:.3f}",
+                entry["rows"],
+                "" if entry["server_ms"] is None else f"{entry['server_ms']:.3f}",
+                entry["slow"],
+            )
+            for entry in summary[:limit]
+        ]
+        server_ms = [entry["server_ms"] for entry in summary]
+        rows.append(
+            (
+                f"TOTAL ({len(summary)} statements)",
+                sum(entry["calls"] for entry in summary),
+                f"{sum(entry['total_ms'] for entry in summary):.3f}",
+                "",
+                sum(entry["rows"] or 0 for entry in summary),
+                (
+                    f"{sum(ms for ms in server_ms if ms is not None):.3f}"
+                    if any(ms is not None for ms in server_ms)
+                    else ""
+                ),
+                sum(entry["slow"] for entry in summary),
+            )
+        )
+        headers = ["statement", "calls", "total ms", "max ms", "rows", "server ms"]
+        print(f"\n\nTIMING: {title}")
+        print(tb(rows, headers + [f">= {self.slow_ms:g} ms"], tablefmt="grid"))
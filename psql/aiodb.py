@@ -0,0 +1,277 @@
+"""
+Asyncio variant of `db.py` for the Postgres database.
+
+## Key Features:
+- Same configuration (environment variables), scripts and output as `db.py`, \
+    on `psycopg.AsyncConnection`s borrowed from an `AsyncPool` (see `pool.py`).
+- Async equivalents of `create_schema`, `execute_and_print` and \
+    `insert_and_update`; scripts run through `AsyncScriptRunner` (see `runner.py`).
+- `submit` sends many small writes in pipeline mode: statements are queued \
+    client side and flushed together, one round trip per `batch_size` \
+    statements instead of one per statement (see `runner.write_pipelined`).
+- `submit_results` / `submit_events` are the front-end write paths (answer \
+    submissions and proctoring events), safe to call from thousands of \
+    concurrent tasks: callers share the pool's `POOL_MAX_SIZE` connections.
+
+## Usage:
+```sh
+python aiodb.py
+```
+```py
+await submit_results([(session_id, question_id, option_id), ...])
+```
+"""
+
+import asyncio
+from pathlib import Path
+
+import psycopg as psql
+from tabulate import tabulate as tb
+
+from clock import CLOCKS, using_async
+from db import (
+    BATCH_SIZE,
+    CLOCK,
+    EVENT_INSERT,
+    POOL_MAX_IDLE,
+    POOL_MAX_SIZE,
+    POOL_MIN_SIZE,
+    POOL_TIMEOUT,
+    POSTGRES_DATABASE,
+    RESULT_INSERT,
+    SLOW_QUERY_MS,
+    STATEMENT_TIMING,
+    TEST_COMPLETION_TIME,
+    TRANSACTION_MODE,
+    WRITE_BATCH_SIZE,
+    config,
+    create_database,
+    logger,
+    pretty_list,
+)
+from pool import AsyncLazyPool, AsyncPool
+from runner import AsyncScriptRunner, write_pipelined_async
+from schema import load_schema_async
+from sqlsplit import split_statements
+from timing import AsyncStatementTimer
+
+TABLES_QUERY = (
+    "SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'"
+)
+
+
+async def connect_to_psql(
+    config: dict, attempts: int = 3, delay: int = 2
+) -> psql.AsyncConnection:
+    """Connect to the Postgres database (create if it doesn't exist)
+
+    Args:
+        config (dict): connection configuration
+        attempts (int, optional): try to reconnect how many times. Defaults to 3.
+        delay (int, optional): delay between attempts in seconds. Defaults to 2.
+
+    Returns:
+        psycopg.AsyncConnection: connection object, None when all attempts failed
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return await psql.AsyncConnection.connect(**config)
+        except psql.OperationalError as e:
+            logger.info("OperationalError: %s", e)
+            if "does not exist" in str(e):
+                logger.info("Database does not exist, attempting to create it.")
+                await asyncio.to_thread(create_database)
+                continue
+            if attempt < attempts:
+                await asyncio.sleep(delay**attempt)
+    logger.info("Failed to connect, exiting without a connection.")
+    return None
+
+
+async def open_pool() -> AsyncPool:
+    """Open the async connection pool
+    - Make sure the server is up and the database exists first (with retries)
+
+    Raises:
+        psql.OperationalError: when no connection could be established
+
+    Returns:
+        AsyncPool: open connection pool
+    """
+    cnx = await connect_to_psql(config)
+    if cnx is None:
+        raise psql.OperationalError("Failed to connect to the database.")
+    await cnx.close()
+    pool = AsyncPool(
+        config,
+        min_size=POOL_MIN_SIZE,
+        max_size=POOL_MAX_SIZE,
+        max_idle=POOL_MAX_IDLE,
+        timeout=POOL_TIMEOUT,
+    )
+    await pool.open()
+    logger.info("Connected to the database successfully.")
+    return pool
+
+
+# Opened on first use, never at import time
+pool = AsyncLazyPool(open_pool)
+
+
+async def create_schema(name: str = "ems") -> None:
+    """Create table schema if it doesn't exist, then list the tables
+
+    Args:
+        name (str): database name
+    """
+    async with pool.connection() as cnx:
+        print("Connected to Postgres server.")
+        tables = await (await cnx.execute(TABLES_QUERY)).fetchall()
+        if not tables:
+            logger.info(f"Database `{name}` is empty. No tables found.")
+            await load_schema_async(cnx)
+            tables = await (await cnx.execute(TABLES_QUERY)).fetchall()
+        print(f"Tables in `{name}` the database (count:{len(tables)}):")
+        pretty_list(tables)
+
+
+async def print_result(cursor: psql.AsyncCursor, query: str) -> None:
+    """Print the current result of a cursor (or the statement if it has none)."""
+    if not cursor.description:
+        print(f"\n\nEXECUTED: {query}")
+        return
+    rows = await cursor.fetchall()
+    if not rows:
+        return
+    headers = [description[0] for description in cursor.description]
+    print(f"\n\n{query}")
+    print(tb(rows, headers, tablefmt="grid"))
+
+
+async def execute_and_print(
+    sql_script,
+    script_name="",
+    mode=TRANSACTION_MODE,
+    batch_size=BATCH_SIZE,
+    clock=None,
+    timing=STATEMENT_TIMING,
+):
+    """Executes SQL queries from a script string and prints results.
+    - Statements share one cursor and are committed per `mode`.
+
+    Args:
+        sql_script (str): SQL script, split with `sqlsplit`
+        script_name (str, optional): label printed before execution
+        mode (str, optional): `statement`, `script` or `batch` commits
+        batch_size (int, optional): statements per commit in `batch` mode
+        clock (clock.WallClock, optional): time seen by the triggers
+        timing (bool, optional): time every statement (see `db.execute_and_print`)
+
+    Returns:
+        dict: the runner's counters
+    """
+    print(f"\n--- Executing {script_name} ---")
+    async with pool.connection() as cnx, using_async(cnx, clock):
+        timer = AsyncStatementTimer(cnx, SLOW_QUERY_MS) if timing else None
+        runner = AsyncScriptRunner(cnx, mode=mode, batch_size=batch_size, timer=timer)
+        stats = await runner.run(split_statements(sql_script), on_result=print_result)
+    if timer is not None:
+        timer.print_summary(script_name)
+    logger.info(
+        f"{script_name} executed successfully "
+        f"({stats['executed']} ok, {stats['failed']} failed, "
+        f"{stats['commits']} commits)."
+    )
+    return stats
+
+
+async def submit(query: str, params_seq, batch_size: int = WRITE_BATCH_SIZE) -> int:
+    """Run one parameterized write for many rows in pipeline mode.
+
+    The rows are committed together: a failing row rolls back the whole call.
+
+    Args:
+        query (str): `INSERT`/`UPDATE` with `%s` placeholders
+        params_seq (Iterable[Sequence]): one parameter tuple per row
+        batch_size (int, optional): statements per pipeline sync (round trip)
+
+    Returns:
+        int: number of rows submitted
+    """
+    async with pool.connection() as cnx:
+        return await write_pipelined_async(cnx, query, params_seq, batch_size)
+
+
+async def submit_results(answers, batch_size: int = WRITE_BATCH_SIZE) -> int:
+    """Insert answers `(test_session_id, question_id, answer)`, scored by trigger."""
+    return await submit(RESULT_INSERT, answers, batch_size)
+
+
+async def submit_events(events, batch_size: int = WRITE_BATCH_SIZE) -> int:
+    """Insert proctoring events `(proctoring_session_id, type, description)`."""
+    return await submit(EVENT_INSERT, events, batch_size)
+
+
+async def insert_and_update(name: str, clock=None):
+    """Insert and update data in the database
+    - Show tables data.
+    Args:
+        name (str): database name
+        clock (clock.WallClock, optional): clock of the test completion wait. \
+            Defaults to a new `CLOCK` clock.
+    """
+    clock = CLOCKS[CLOCK]() if clock is None else clock
+    print(f"Hello from {name}-db!")
+
+    # Off the event loop: other tasks keep running while the file is read
+    queries_statements = await asyncio.to_thread(Path("queries.sql").read_text)
+
+    query_parts = queries_statements.split("$$$testbreak")
+    sql_queries_part1 = query_parts[0]
+    sql_queries_part2 = query_parts[1] if len(query_parts) > 1 else ""
+
+    await execute_and_print(
+        sql_queries_part1, "Queries Part 1 (Inserts/Selects)", clock=clock
+    )
+
+    logger.info(
+        f"Waiting {TEST_COMPLETION_TIME} seconds ({type(clock).__name__}) "
+        "to mimic test completion..."
+    )
+    await clock.sleep_async(TEST_COMPLETION_TIME)
+
+    if sql_queries_part2:
+        await execute_and_print(
+            sql_queries_part2, "Queries Part 2 (Updates/Selects)", clock=clock
+        )
+
+    logger.info("Data inserted and updated successfully.")
+
+    logger.info("Bye from ems-db!")
+    print("Further Explore Using `psql Shell`")
+
+    try:
+        async with pool.connection() as cnx:
+            tables = await (await cnx.execute(TABLES_QUERY)).fetchall()
+        print(f"Tables in `{name}` the database (count:{len(tables)}):")
+        pretty_list(tables)
+    except psql.Error as e:
+        logger.error(f"Could not fetch table names: {e}")
+
+
+async def main() -> int:
+    try:
+        await pool.open()
+    except psql.OperationalError:
+        logger.info("Failed to connect to the database. Exiting...")
+        return 1
+    try:
+        await create_schema(POSTGRES_DATABASE)
+        await insert_and_update(POSTGRES_DATABASE)
+    finally:
+        await pool.close()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(asyncio.run(main()))
@@ -0,0 +1,141 @@
+"""
+Injectable clock for the time-dependent triggers of the Postgres database.
+
+## Key Features:
+- The triggers and column defaults read "now" from `ems_now()` (see \
+    `schema.sql`): the session setting `ems.clock` when set, else \
+    `clock_timestamp()`.
+- `WallClock`: real time, `sleep` waits for real (the setting is cleared).
+- `SimulatedClock`: a fixed time that `sleep` moves forward instantly, so \
+    `duration_taken` & co. are exact and nothing waits.
+- `using(cnx, clock)` / `using_async(cnx, clock)`: set the clock of a \
+    (pooled) connection for a `with` block, then go back to the wall clock.
+- `CLOCKS` maps the names accepted by `CLOCK` (see `db.py`) to classes.
+
+## Notes:
+- The setting is session-level (`set_config(..., false)`): other sessions \
+    keep the wall clock. Settings are transactional though, and `using` \
+    never commits work pending when the block starts:
+    - Nothing pending: the setting is committed on its own and the block \
+        owns its transactions; leaving it commits its pending work with the \
+        reset, like `Pool.connection()`.
+    - A transaction pending: the setting and the reset join it, the caller \
+        commits or rolls back both with its work.
+- An exception rolls the transaction back (the caller's too), then the \
+    reset is committed on its own.
+
+## Usage:
+```py
+clock = SimulatedClock()
+with using(cnx, clock):
+    cnx.execute(part1)
+clock.sleep(3)  # instant
+with using(cnx, clock):
+    cnx.execute(part2)  # duration_taken = 00:00:03
+```
+"""
+
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timedelta
+from time import sleep
+
+import psycopg as psql
+from psycopg.pq import TransactionStatus
+
+SET_CLOCK = "SELECT set_config('ems.clock', %s, false)"
+
+
+class WallClock:
+    """Real time: the triggers use `clock_timestamp()`, waiting takes real time."""
+
+    def setting(self) -> tuple:
+        """Statement and parameters that make the triggers use this clock."""
+        return SET_CLOCK, ("",)
+
+    def sleep(self, seconds: float) -> None:
+        sleep(seconds)
+
+    async def sleep_async(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+
+class SimulatedClock(WallClock):
+    """A clock that only moves when told to.
+
+    Args:
+        start (datetime, optional): initial time (naive means local). \
+            Defaults to now, truncated to the second.
+    """
+
+    def __init__(self, start: datetime | None = None):
+        self.now = (start or datetime.now().replace(microsecond=0)).astimezone()
+
+    def setting(self) -> tuple:
+        return SET_CLOCK, (self.now.isoformat(),)
+
+    def sleep(self, seconds: float) -> None:
+        """Move the clock forward, instantly."""
+        self.now += timedelta(seconds=seconds)
+
+    async def sleep_async(self, seconds: float) -> None:
+        self.sleep(seconds)
+
+
+CLOCKS = {"wall": WallClock, "simulated": SimulatedClock}
+
+
+def _idle(cnx: psql.Connection | psql.AsyncConnection) -> bool:
+    """Whether no transaction is pending (nothing of the caller's to commit)."""
+    return cnx.info.transaction_status == TransactionStatus.IDLE
+
+
+def _set(cnx: psql.Connection, setting: tuple, commit: bool) -> None:
+    cnx.execute(*setting)
+    if commit and not cnx.autocommit:
+        cnx.commit()
+
+
+async def _set_async(cnx: psql.AsyncConnection, setting: tuple, commit: bool) -> None:
+    await cnx.execute(*setting)
+    if commit and not cnx.autocommit:
+        await cnx.commit()
+
+
+@contextmanager
+def using(cnx: psql.Connection, clock: WallClock | None = None):
+    """Make the triggers use `clock` for the duration of a `with` block
+    (no clock: leave the connection alone)."""
+    if clock is None:
+        yield cnx
+        return
+    owned = _idle(cnx)  # else the caller's transaction owns the setting
+    _set(cnx, clock.setting(), owned)
+    try:
+        yield cnx
+    except BaseException:
+        cnx.rollback()
+        raise
+    finally:
+        if cnx.info.transaction_status == TransactionStatus.INERROR:
+            cnx.rollback()  # a failed transaction can't run the reset
+        _set(cnx, WallClock().setting(), owned or _idle(cnx))
+
+
+@asynccontextmanager
+async def using_async(cnx: psql.AsyncConnection, clock: WallClock | None = None):
+    """`using` for an `AsyncConnection`."""
+    if clock is None:
+        yield cnx
+        return
+    owned = _idle(cnx)
+    await _set_async(cnx, clock.setting(), owned)
+    try:
+        yield cnx
+    except BaseException:
+        await cnx.rollback()
+        raise
+    finally:
+        if cnx.info.transaction_status == TransactionStatus.INERROR:
+            await cnx.rollback()
+        await _set_async(cnx, WallClock().setting(), owned or _idle(cnx))
@@ -8,19 +8,55 @@ using SQL scripts.
 - Creates the database if it does not exist.
 - Executes schema creation and data insertion using \
     SQL scripts (`schema.sql` and `queries.sql`).
+- Loads `schema.sql` in-process over the open connection (see `schema.py`), \
+    no database shell or `docker compose exec` required.
 - Logs all operations and errors to both the console \
     and a log file (`cpy-errors.log`).
 - Uses `psycopg` for database operations and \
     `tabulate` for pretty-printing query results.
 - Supports retry logic for database connection with \
     configurable attempts and delays.
+- Connects lazily: importing the module is instant, the pool (and its \
+    connection retries) is opened on first use.
+- Borrows connections from a pool (`POOL_MIN_SIZE`, `POOL_MAX_SIZE`, \
+    `POOL_MAX_IDLE`, `POOL_TIMEOUT`) with health checks and acquire-latency \
+    metrics, see `pool.py`.
+- Runs scripts over one shared cursor, committing once per script or per \
+    batch of statements (`TRANSACTION_MODE`, `BATCH_SIZE`), see `runner.py`.
 - Handles Postgres-specific errors gracefully, including \
     database and table existence checks.
 - Provides a clear, tabulated view of database contents after operations.
+- Optionally streams results (`STREAM_OUTPUT=1`) in `fetchmany` batches of \
+    `STREAM_BATCH_SIZE` rows, and `print_query` reads large tables through a \
+    server-side cursor, see `stream.py`.
+- Exports result sets to CSV, JSON Lines or Parquet files instead of \
+    printing them (`execute_and_print(..., export=...)`), see `export.py`.
+- Runs the hot lookups (`lookup`) as prepared statements, cached per pooled \
+    connection (`STATEMENT_CACHE_SIZE`), see `queries.py`.
+- Serves the catalog lookups from a read-through result cache \
+    (`RESULT_CACHE`, `RESULT_CACHE_TTL`, `RESULT_CACHE_MAX_BYTES`) with \
+    hit-rate metrics, emptied by `LISTEN/NOTIFY` when the catalog tables \
+    change, see `resultcache.py`.
+- Serves each test's question paper (`paper`) from the same cache, as a \
+    compact structure shared by all of the test's sessions, see `catalog.py`.
+- Submits answers, proctoring sessions and events in bulk (`submit_results`, \
+    `submit_proctoring_sessions`, `submit_events`) in pipeline mode, \
+    `WRITE_BATCH_SIZE` rows per round trip, see `runner.write_pipelined`.
+- Scores a submitted answer sheet in memory against the answer key of the \
+    cached paper (`submit_scored_results`), without the per-answer lookups \
+    of the scoring trigger, see `scoring.py`.
+- Times every statement of a script (opt-in, `STATEMENT_TIMING=1`): structured log \
+    records, a summary table per script and a slow-query log with the plans \
+    of statements over `SLOW_QUERY_MS`, see `timing.py`.
+- Partitions `events` by month with a retention policy \
+    (`EVENTS_PARTITIONS_AHEAD`, `EVENTS_RETENTION_MONTHS`, \
+    `EVENTS_ARCHIVE_DIR`): expired partitions are archived to compressed \
+    CSV files and dropped, see `partitions.py`.
+- Simulates the test completion wait between the two halves of \
+    `queries.sql` (`CLOCK=simulated`, the default): the triggers see the \
+    session clock move forward instantly instead of sleeping, see `clock.py`.
 
 ## Assumptions:
-- Postgres Shell is installed and accessible for executing \
-    complex SQL scripts (e.g., procedures, triggers).
 - Environment variables for database connection details \
     are defined in a `.env` file or system environment.
 - SQL scripts:
@@ -45,16 +81,29 @@ using SQL scripts.
     initialized via Docker Compose.
 - The script provides additional functionality for managing and \
     inspecting the database programmatically.
+- `aiodb.py` is the `asyncio` variant of this module.
 """
 
 import logging
 import os
-import subprocess
 from time import sleep
 
 import psycopg as psql
 from tabulate import tabulate as tb
 
+import catalog
+from clock import CLOCKS, using
+from partitions import ensure_partitions
+from pool import LazyPool, Pool
+from queries import CACHED_LOOKUPS, LOOKUPS, cache_for
+from resultcache import CATALOG_TABLES, ChangeListener, ResultCache
+from runner import SCRIPT, ScriptRunner, write_pipelined
+from schema import load_schema
+from scoring import answer_key, write_scored
+from sqlsplit import split_statements
+from stream import print_stream, stream_query
+from timing import StatementTimer
+
 # Set up logger
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -70,9 +119,79 @@ file_handler = logging.FileHandler("cpy-errors.log")
 file_handler.setFormatter(formatter)
 logger.addHandler(file_handler)
 
+# Helper modules log through the same handlers
+for helper in (
+    "export",
+    "partitions",
+    "pool",
+    "resultcache",
+    "runner",
+    "schema",
+    "timing",
+):
+    helper_logger = logging.getLogger(helper)
+    helper_logger.setLevel(logging.INFO)
+    helper_logger.addHandler(handler)
+    helper_logger.addHandler(file_handler)
+
 # In Seconds
 TEST_COMPLETION_TIME = 3
 
+# Opt-in: time every statement of a script (summary table at the end), log the
+# ones slower than `SLOW_QUERY_MS` with their plan, see `timing.py`
+STATEMENT_TIMING = os.environ.get("STATEMENT_TIMING", default="0") == "1"
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", default=100))
+
+# Monthly `events` partitions created in advance, months kept before the
+# current one, and where expired partitions are archived, see `partitions.py`
+EVENTS_PARTITIONS_AHEAD = int(os.environ.get("EVENTS_PARTITIONS_AHEAD", default=3))
+EVENTS_RETENTION_MONTHS = int(os.environ.get("EVENTS_RETENTION_MONTHS", default=12))
+EVENTS_ARCHIVE_DIR = os.environ.get("EVENTS_ARCHIVE_DIR", default="archive")
+
+# Clock of the time-dependent triggers: `simulated` (instant) or `wall`,
+# see `clock.py`
+CLOCK = os.environ.get("CLOCK", default="simulated")
+
+# Script execution: `statement`, `script` or `batch` commits
+TRANSACTION_MODE = os.environ.get("TRANSACTION_MODE", default=SCRIPT)
+BATCH_SIZE = int(os.environ.get("BATCH_SIZE", default=1000))
+
+# Connection pool sizing (idle/timeout in seconds)
+POOL_MIN_SIZE = int(os.environ.get("POOL_MIN_SIZE", default=1))
+POOL_MAX_SIZE = int(os.environ.get("POOL_MAX_SIZE", default=4))
+POOL_MAX_IDLE = float(os.environ.get("POOL_MAX_IDLE", default=300))
+POOL_TIMEOUT = float(os.environ.get("POOL_TIMEOUT", default=30))
+
+# Print results batch by batch instead of fetching them all first
+STREAM_OUTPUT = os.environ.get("STREAM_OUTPUT", default="0") == "1"
+STREAM_BATCH_SIZE = int(os.environ.get("STREAM_BATCH_SIZE", default=500))
+
+# Prepared statements kept per connection
+STATEMENT_CACHE_SIZE = int(os.environ.get("STATEMENT_CACHE_SIZE", default=100))
+
+# Result cache of the catalog lookups: seconds an entry is served and bound
+# of the estimated size of the cached rows, see `resultcache.py`
+RESULT_CACHE = os.environ.get("RESULT_CACHE", default="1") == "1"
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", default=300))
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", default=2**26))
+
+# Rows per network round trip for bulk submissions
+WRITE_BATCH_SIZE = int(os.environ.get("WRITE_BATCH_SIZE", default=500))
+
+# Bulk submissions, each row fires the table's triggers
+RESULT_INSERT = (
+    'INSERT INTO "results" ("test_session_id", "question_id", "answer") '
+    "VALUES (%s, %s, %s)"
+)
+PROCTORING_SESSION_INSERT = (
+    'INSERT INTO "proctoring_sessions" ("proctor_id", "test_session_id") '
+    "VALUES (%s, %s)"
+)
+EVENT_INSERT = (
+    'INSERT INTO "events" ("proctoring_session_id", "type", "description") '
+    "VALUES (%s, %s, %s)"
+)
+
 # .env file variables
 POSTGRES_DATABASE = os.environ.get("POSTGRES_DATABASE", default="ems")
 POSTGRES_HOST = os.environ.get("POSTGRES_HOST", default="db")
@@ -159,12 +278,38 @@ def connect_to_psql(config: dict, attempts: int = 3, delay: int = 2) -> psql.Con
     return None
 
 
-cnx = connect_to_psql(config)
-if cnx is None:
-    logger.info("Failed to connect to the database. Exiting...")
-    exit(1)
-else:
+def open_pool() -> Pool:
+    """Open the connection pool
+    - Make sure the server is up and the database exists first (with retries)
+
+    Raises:
+        psql.OperationalError: when no connection could be established
+
+    Returns:
+        Pool: open connection pool
+    """
+    cnx = connect_to_psql(config)
+    if cnx is None:
+        raise psql.OperationalError("Failed to connect to the database.")
+    cnx.close()
+    pool = Pool(
+        config,
+        min_size=POOL_MIN_SIZE,
+        max_size=POOL_MAX_SIZE,
+        max_idle=POOL_MAX_IDLE,
+        timeout=POOL_TIMEOUT,
+    )
+    pool.open()
     logger.info("Connected to the database successfully.")
+    return pool
+
+
+# Opened on first use, never at import time
+pool = LazyPool(open_pool)
+
+# Listens from the first cached lookup on
+result_cache = ResultCache(RESULT_CACHE_TTL, RESULT_CACHE_MAX_BYTES)
+cache_listener = ChangeListener(config, result_cache)
 
 
 def pretty_list(cursor):
@@ -172,36 +317,6 @@ def pretty_list(cursor):
         print(f"-{item[0]}")
 
 
-def run_create_schema_subprocess() -> None:
-    """Create schema using psql-shell
-    - Uses host to connect with Postgres-server.
-    """
-    # In this case
-    # We just make connection with `db` service as host
-    # running in container compose shared network.
-    cmd = [
-        "docker",
-        "compose",
-        "exec",
-        "db",
-        "sh",
-        "-c",
-        f"PGPASSWORD={POSTGRES_PASSWORD}",
-        "psql",
-        f"-h {POSTGRES_HOST}",
-        f"-U {POSTGRES_USER}",
-        f"{POSTGRES_DATABASE} < ./schema.sql",
-    ]
-
-    result = subprocess.run(" ".join(cmd), shell=True)
-
-    if result.returncode != 0:
-        print("Schema import failed")
-        exit(1)
-    else:
-        print("Schema import succeeded")
-
-
 def create_schema(name: str = "ems") -> None:
     """Create table schema if it doesn't exist
     - show databases
@@ -210,30 +325,43 @@ def create_schema(name: str = "ems") -> None:
     Args:
         name (str): database name
     """
-    db = cnx.cursor()
-    print("Connected to Postgres server.")
-    # List tables in the current database using information_schema
-    db.execute(
-        "SELECT table_name FROM \
-            information_schema.tables WHERE table_schema = 'public';"
-    )
-    tables = db.fetchall()
-    if not tables:
-        logger.info(f"Database `{name}` is empty. No tables found.")
-        run_create_schema_subprocess()
-        # After schema creation, re-fetch tables
+    with pool.connection() as cnx:
+        db = cnx.cursor()
+        print("Connected to Postgres server.")
+        # List tables in the current database using information_schema
         db.execute(
             "SELECT table_name FROM \
                 information_schema.tables WHERE table_schema = 'public';"
         )
         tables = db.fetchall()
+        if not tables:
+            logger.info(f"Database `{name}` is empty. No tables found.")
+            load_schema(cnx)
+            # After schema creation, re-fetch tables
+            db.execute(
+                "SELECT table_name FROM \
+                    information_schema.tables WHERE table_schema = 'public';"
+            )
+            tables = db.fetchall()
+        # Partitions of the coming months, also for databases created earlier
+        ensure_partitions(cnx, ahead=EVENTS_PARTITIONS_AHEAD)
 
-    logger.info(f"Tables created in `{name}` database (count:{len(tables)})")
-    db.close()  # Close the cursor before committing
-    cnx.commit()
+        logger.info(f"Tables created in `{name}` database (count:{len(tables)})")
+        db.close()  # Close the cursor before committing
+        cnx.commit()
 
 
-def pretty_print_table(cursor, state):
+def pretty_print_table(
+    cursor, state, stream=STREAM_OUTPUT, batch_size=STREAM_BATCH_SIZE
+):
+    if stream:
+        # Render each `fetchmany` batch as soon as it arrives
+        try:
+            print_stream(cursor, f"\n\n{state}", batch_size)
+        except psql.ProgrammingError:
+            pass
+        return
+
     # Fetch all rows from the cursor
     try:
         rows = cursor.fetchall()
@@ -247,35 +375,208 @@ def pretty_print_table(cursor, state):
         print(tb(rows, headers, tablefmt="grid"))
 
 
-def execute_and_print(sql_script, script_name=""):
-    """Executes SQL queries from a script string and prints results."""
+def print_query(query, params=None, batch_size=STREAM_BATCH_SIZE) -> int:
+    """Stream a (large) query result through a server-side cursor.
+
+    Args:
+        query (str): a single `SELECT` query
+        params (Sequence | Mapping, optional): query parameters
+        batch_size (int, optional): rows fetched per round trip
+
+    Returns:
+        int: number of rows printed
+    """
+    with pool.connection() as cnx:
+        return stream_query(cnx, query, params, batch_size)
+
+
+def lookup(name: str, params: dict, cached: bool = RESULT_CACHE) -> list:
+    """Run one of the `queries.LOOKUPS` as a prepared statement.
+    - The `queries.CACHED_LOOKUPS` are read through `result_cache`, which \
+        `cache_listener` empties when the catalog changes; without a \
+        listening connection they run uncached.
+
+    Args:
+        name (str): lookup name, e.g. `tests_history_by_email`
+        params (dict): query parameters, e.g. `{"email": ...}`
+        cached (bool, optional): use the result cache. Defaults to `RESULT_CACHE`.
+
+    Returns:
+        list: result rows (shared with the cache: don't modify them)
+    """
+
+    def load():
+        with pool.connection() as cnx:
+            return cache_for(cnx, STATEMENT_CACHE_SIZE).lookup(name, params)
+
+    tables = CACHED_LOOKUPS.get(name)
+    if not cached or tables is None or not _listening():
+        return load()
+    return result_cache.fetch(LOOKUPS[name], params, tables, load)
+
+
+def paper(test_id: int, cached: bool = RESULT_CACHE) -> catalog.Paper:
+    """The question paper of a test, loaded once for all of its sessions.
+    - Read through `result_cache` like the catalog lookups.
+
+    Args:
+        test_id (int): test id
+        cached (bool, optional): use the result cache. Defaults to `RESULT_CACHE`.
+
+    Raises:
+        KeyError: no such test
+
+    Returns:
+        catalog.Paper: the test, its questions and options (shared: don't \
+            modify it)
+    """
+
+    def load():
+        with pool.connection() as cnx:
+            return catalog.load_paper(cnx, test_id)
+
+    if not cached or not _listening():
+        return load()
+    return result_cache.fetch(
+        catalog.PAPER, {"test_id": test_id}, CATALOG_TABLES, load, catalog.sizeof
+    )
+
+
+def _listening() -> bool:
+    """Start `cache_listener` if needed, tell whether it listens."""
+    if not cache_listener.alive:
+        pool.open()
+        try:
+            cache_listener.start()
+        except psql.OperationalError as err:
+            logger.error("Result cache disabled, cannot listen: %s", err)
+    return cache_listener.alive
+
+
+def submit(query: str, params_seq, batch_size=WRITE_BATCH_SIZE) -> int:
+    """Run one parameterized write for many rows in pipeline mode.
+    - The rows are committed together: a failing row rolls back the whole call.
+
+    Args:
+        query (str): `INSERT`/`UPDATE` with `%s` placeholders
+        params_seq (Iterable[Sequence]): one parameter tuple per row
+        batch_size (int, optional): rows per round trip
+
+    Returns:
+        int: number of rows submitted
+    """
+    with pool.connection() as cnx:
+        return write_pipelined(cnx, query, params_seq, batch_size)
+
+
+def submit_results(answers, batch_size=WRITE_BATCH_SIZE) -> int:
+    """Insert answers `(test_session_id, question_id, answer)`, scored by trigger."""
+    return submit(RESULT_INSERT, answers, batch_size)
+
+
+def submit_scored_results(test_id: int, answers, batch_size=WRITE_BATCH_SIZE) -> int:
+    """Insert answers `(test_session_id, question_id, answer)` to one test.
+    - Scored against the answer key of its (cached) paper, not by trigger.
+
+    Raises:
+        KeyError: no such test
+        ValueError: an answer is not an option of its question
+    """
+    key = answer_key(paper(test_id))
+    with pool.connection() as cnx:
+        return write_scored(cnx, key, answers, batch_size)
+
+
+def submit_proctoring_sessions(sessions, batch_size=WRITE_BATCH_SIZE) -> int:
+    """Start proctoring sessions `(proctor_id, test_session_id)`, logged by trigger."""
+    return submit(PROCTORING_SESSION_INSERT, sessions, batch_size)
+
+
+def submit_events(events, batch_size=WRITE_BATCH_SIZE) -> int:
+    """Insert proctoring events `(proctoring_session_id, type, description)`."""
+    return submit(EVENT_INSERT, events, batch_size)
+
+
+def print_result(cursor, query):
+    """Print a statement result (rows for SELECT, the query otherwise)."""
+    # Only print if it's a SELECT statement or potentially modifies data
+    # (heuristic: check if cursor.description is set after execute)
+    if cursor.description:
+        pretty_print_table(cursor, query)
+    else:
+        # For non-SELECT, print the query itself for context
+        print(f"\n\nEXECUTED: {query}")
+
+
+def export_result(export):
+    """Build an `on_result` callback that writes result sets to `export`.
+
+    Args:
+        export (callable): called as `export(cursor, query)`, returns \
+            `(path, rows)`, e.g. `export.ResultExporter`
+
+    Returns:
+        callable: `on_result(cursor, query)` for `ScriptRunner.run`
+    """
+
+    def on_result(cursor, query):
+        if not cursor.description:
+            print_result(cursor, query)
+            return
+        path, rows = export(cursor, query)
+        print(f"\n\nEXPORTED {rows} rows to {path}: {query}")
+
+    return on_result
+
+
+def execute_and_print(
+    sql_script,
+    script_name="",
+    mode=TRANSACTION_MODE,
+    batch_size=BATCH_SIZE,
+    export=None,
+    clock=None,
+    timing=STATEMENT_TIMING,
+):
+    """Executes SQL queries from a script string and prints results.
+    - Statements share one cursor and are committed per `mode`.
+
+    Args:
+        sql_script (str): SQL script, split with `sqlsplit`
+        script_name (str, optional): label printed before execution
+        mode (str, optional): `statement`, `script` or `batch` commits
+        batch_size (int, optional): statements per commit in `batch` mode
+        export (callable, optional): write result sets to files instead of \
+            printing them, e.g. `export.ResultExporter("exports", "jsonl")`
+        clock (clock.WallClock, optional): time seen by the triggers, \
+            e.g. `clock.SimulatedClock()`
+        timing (bool, optional): time every statement, print a summary \
+            table and log the slow ones (`SLOW_QUERY_MS`) with their plan
+    """
     print(f"\n--- Executing {script_name} ---")
-    for query in sql_script.strip().split(";"):
-        if query.strip():  # Ensure query is not empty
-            try:
-                cursor = cnx.cursor()
-                cursor.execute(query)
-                # Only print if it's a SELECT statement or potentially modifies data
-                # (heuristic: check if cursor.description is set after execute)
-                if cursor.description:
-                    pretty_print_table(cursor, query.strip())
-                else:
-                    # For non-SELECT, print the query itself for context
-                    print(f"\n\nEXECUTED: {query.strip()}")
-            except psql.Error as e:
-                logger.error(f"Error executing query: {query.strip()}\n{e}")
-            finally:
-                cursor.close()
-                cnx.commit()
-    logger.info(f"{script_name} executed successfully.")
-
-
-def insert_and_update(name: str):
+    on_result = print_result if export is None else export_result(export)
+    with pool.connection() as cnx, using(cnx, clock):
+        timer = StatementTimer(cnx, SLOW_QUERY_MS) if timing else None
+        runner = ScriptRunner(cnx, mode=mode, batch_size=batch_size, timer=timer)
+        stats = runner.run(split_statements(sql_script), on_result=on_result)
+    if timer is not None:
+        timer.print_summary(script_name)
+    logger.info(
+        f"{script_name} executed successfully "
+        f"({stats['executed']} ok, {stats['failed']} failed, "
+        f"{stats['commits']} commits)."
+    )
+
+
+def insert_and_update(name: str, clock=None):
     """Insert and update data in the database
     - Show tables data.
     Args:
         name (str): database name
+        clock (clock.WallClock, optional): clock of the test completion wait. \
+            Defaults to a new `CLOCK` clock.
     """
+    clock = CLOCKS[CLOCK]() if clock is None else clock
     print(f"Hello from {name}-db!")
 
     # Open and read the SQL file
@@ -287,16 +588,21 @@ def insert_and_update(name: str):
     sql_queries_part2 = query_parts[1] if len(query_parts) > 1 else ""
 
     # Execute the first part of the queries script
-    execute_and_print(sql_queries_part1, "Queries Part 1 (Inserts/Selects)")
+    execute_and_print(
+        sql_queries_part1, "Queries Part 1 (Inserts/Selects)", clock=clock
+    )
 
-    sleep(TEST_COMPLETION_TIME)
     logger.info(
-        f"Sleeping for {TEST_COMPLETION_TIME} seconds to mimic test completion..."
+        f"Waiting {TEST_COMPLETION_TIME} seconds ({type(clock).__name__}) "
+        "to mimic test completion..."
     )
+    clock.sleep(TEST_COMPLETION_TIME)
 
     # Execute the second part of the queries script (if it exists)
     if sql_queries_part2:
-        execute_and_print(sql_queries_part2, "Queries Part 2 (Updates/Selects)")
+        execute_and_print(
+            sql_queries_part2, "Queries Part 2 (Updates/Selects)", clock=clock
+        )
 
     logger.info("Data inserted and updated successfully.")
 
@@ -305,25 +611,25 @@ def insert_and_update(name: str):
 
     try:
         # After schema creation, re-fetch tables
-        cursor = cnx.cursor()
-        cursor.execute(
-            "SELECT table_name FROM \
-                information_schema.tables WHERE table_schema = 'public';"
-        )
-        tables = cursor.fetchall()
+        with pool.connection() as cnx, cnx.cursor() as cursor:
+            cursor.execute(
+                "SELECT table_name FROM \
+                    information_schema.tables WHERE table_schema = 'public';"
+            )
+            tables = cursor.fetchall()
         print(f"Tables in `{name}` the database (count:{len(tables)}):")
         pretty_list(tables)
     except psql.Error as e:
         logger.error(f"Could not fetch table names: {e}")
-    finally:
-        if cursor:
-            cursor.close()
-        if cnx:
-            cnx.commit()
 
 
 if __name__ == "__main__":
+    try:
+        pool.open()
+    except psql.OperationalError:
+        logger.info("Failed to connect to the database. Exiting...")
+        exit(1)
     create_schema(POSTGRES_DATABASE)
     insert_and_update(POSTGRES_DATABASE)
-    if cnx:
-        cnx.close()
+    cache_listener.stop()
+    pool.close()
@@ -0,0 +1,189 @@
+"""
+Monthly partitions of `events`: creation, retention and archival.
+
+## Key Features:
+- `events` is range-partitioned by month of `timestamp` (`events_YYYYMM`, \
+    see `schema.sql`): a query with a time range, e.g. on the \
+    `test_sessions_suspicious_behaviour_search` view, only scans the \
+    partitions of that range.
+- `ensure_partitions` creates the partitions of the coming months and of \
+    the months of the rows waiting in `events_default` (no partition when \
+    they were inserted), and moves those rows in (`ems_events_partitions()`).
+- `archive_partitions` writes every partition older than the retention to \
+    `<directory>/events_YYYYMM.csv.gz` (`export.copy_csv`), then detaches \
+    and drops it.
+- `maintain` runs both; schedule it (e.g. a daily cron job) so that \
+    partitions exist before their month starts.
+
+## Notes:
+- "Now" is `ems_now()`, so months follow the trigger clock (see \
+    `clock.py`) and the session time zone.
+- Nothing is committed, the caller owns the transaction. An archive file \
+    is complete before its partition is dropped: if the transaction fails, \
+    the partition stays and the next run writes the same file again.
+
+## Usage:
+```sh
+python partitions.py --retention-months 12 --archive-dir archive
+python partitions.py --list
+```
+"""
+
+import argparse
+import logging
+import os
+import re
+from datetime import date, datetime
+
+import psycopg as psql
+from psycopg import sql
+
+from export import copy_csv
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AHEAD = 3  # months
+DEFAULT_RETENTION_MONTHS = 12
+DEFAULT_ARCHIVE_DIR = "archive"
+
+PARTITION = re.compile(r"^events_(\d{4})(\d{2})$")
+
+LIST_PARTITIONS = (
+    'SELECT "C"."relname" FROM "pg_inherits" "I" '
+    'JOIN "pg_class" "C" ON "C"."oid" = "I"."inhrelid" '
+    'WHERE "I"."inhparent" = \'"events"\'::regclass'
+)
+
+# The months of the rows waiting in "events_default", and from `since`
+# (default now) to `ahead` months after now
+ENSURE_PARTITIONS = """
+SELECT ems_events_partitions("month", "month")
+FROM (
+    SELECT DISTINCT date_trunc('month', "timestamp") AS "month"
+    FROM "events_default"
+) AS "waiting"
+UNION ALL
+SELECT ems_events_partitions(
+    COALESCE(%(since)s::TIMESTAMPTZ, ems_now()),
+    ems_now() + make_interval(months => %(ahead)s)
+)
+"""
+
+
+def add_months(day: date, months: int) -> date:
+    """First day of the month `months` after (or before) the month of `day`."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partitions(cnx: psql.Connection) -> list:
+    """`(name, first day of its month)` of the monthly partitions, oldest first."""
+    found = []
+    for (name,) in cnx.execute(LIST_PARTITIONS):
+        if match := PARTITION.match(name):
+            found.append((name, date(int(match[1]), int(match[2]), 1)))
+    return sorted(found, key=lambda partition: partition[1])
+
+
+def ensure_partitions(
+    cnx: psql.Connection, since: datetime | None = None, ahead: int = DEFAULT_AHEAD
+) -> list:
+    """Create the missing partitions, up to `ahead` months after now.
+
+    Args:
+        cnx (psycopg.Connection): open connection
+        since (datetime, optional): also cover the months from `since`, \
+            e.g. before loading old events. Defaults to now.
+        ahead (int, optional): months after the current one. Defaults to 3.
+
+    Returns:
+        list: names of the created partitions
+    """
+    rows = cnx.execute(ENSURE_PARTITIONS, {"since": since, "ahead": ahead})
+    created = [name for (name,) in rows]
+    if created:
+        logger.info("Created events partitions: %s", ", ".join(created))
+    return created
+
+
+def archive_partitions(
+    cnx: psql.Connection,
+    keep_months: int = DEFAULT_RETENTION_MONTHS,
+    directory: str = DEFAULT_ARCHIVE_DIR,
+) -> list:
+    """Archive and drop the partitions older than the retention.
+
+    The current month and the `keep_months` before it are kept.
+
+    Args:
+        cnx (psycopg.Connection): open connection
+        keep_months (int, optional): months kept before the current one. \
+            Defaults to 12.
+        directory (str, optional): archive directory, created if missing. \
+            Defaults to "archive".
+
+    Returns:
+        list: `(name, path, rows)` of the archived partitions
+    """
+    now = cnx.execute("SELECT ems_now()").fetchone()[0]
+    cutoff = add_months(now.date(), -keep_months)
+    archived = []
+    for name, period in partitions(cnx):
+        if period >= cutoff:
+            break
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}.csv.gz")
+        table = sql.Identifier(name)
+        query = sql.SQL('SELECT * FROM {} ORDER BY "id"').format(table)
+        rows = copy_csv(cnx, query.as_string(cnx), path)
+        cnx.execute(sql.SQL('ALTER TABLE "events" DETACH PARTITION {}').format(table))
+        cnx.execute(sql.SQL("DROP TABLE {}").format(table))
+        logger.info("Archived %s: %d rows -> %s", name, rows, path)
+        archived.append((name, path, rows))
+    return archived
+
+
+def maintain(
+    cnx: psql.Connection,
+    keep_months: int = DEFAULT_RETENTION_MONTHS,
+    directory: str = DEFAULT_ARCHIVE_DIR,
+    ahead: int = DEFAULT_AHEAD,
+) -> dict:
+    """Create the coming partitions, then archive the expired ones.
+
+    Returns:
+        dict: `created` partition names, `archived` `(name, path, rows)`
+    """
+    return {
+        "created": ensure_partitions(cnx, ahead=ahead),
+        "archived": archive_partitions(cnx, keep_months, directory),
+    }
+
+
+if __name__ == "__main__":
+    from tabulate import tabulate as tb
+
+    from db import (
+        EVENTS_ARCHIVE_DIR,
+        EVENTS_PARTITIONS_AHEAD,
+        EVENTS_RETENTION_MONTHS,
+        pool,
+    )
+
+    parser = argparse.ArgumentParser(description="Maintain the events partitions")
+    parser.add_argument("--retention-months", type=int, default=EVENTS_RETENTION_MONTHS)
+    parser.add_argument("--archive-dir", default=EVENTS_ARCHIVE_DIR)
+    parser.add_argument("--ahead", type=int, default=EVENTS_PARTITIONS_AHEAD)
+    parser.add_argument("--list", action="store_true", help="only list the partitions")
+    args = parser.parse_args()
+
+    with pool.connection() as cnx:
+        if not args.list:
+            maintain(cnx, args.retention_months, args.archive_dir, args.ahead)
+        listed = [(name, f"{period:%Y-%m}") for name, period in partitions(cnx)]
+        rows = []
+        for name, month in [*listed, ("events_default", "")]:
+            count = sql.SQL("SELECT COUNT(*) FROM {}").format(sql.Identifier(name))
+            rows.append((name, month, cnx.execute(count).fetchone()[0]))
+        print(tb(rows, ["partition", "month", "rows"], tablefmt="grid"))
+    pool.close()
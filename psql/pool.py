@@ -0,0 +1,302 @@
+"""
+Pooled connections for the Postgres database.
+
+## Key Features:
+- Thin layer over `psycopg_pool.ConnectionPool`:
+    - `min_size` connections are kept open, the pool grows up to `max_size`.
+    - Connections are health-checked (`check_connection`) before being handed out.
+    - Connections idle for more than `max_idle` seconds are closed \
+        (down to `min_size`).
+- Acquire-latency metrics (count, p50/p95/max) next to the pool's own counters.
+- `connection()` context manager: commits on success, rolls back on error and \
+    always returns the connection to the pool.
+- `LazyPool` handle: the pool (and the first connection) is only opened on \
+    first use, so importing a module that defines one never touches the network.
+- `AsyncPool` / `AsyncLazyPool`: the same over \
+    `psycopg_pool.AsyncConnectionPool`, for `asyncio` callers (see `aiodb.py`).
+
+## Usage:
+```py
+pool = Pool(config, min_size=1, max_size=4)
+with pool.connection() as cnx:
+    cnx.execute("SELECT 1")
+print(pool.stats())
+pool.close()
+```
+"""
+
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable
+from contextlib import asynccontextmanager, contextmanager
+from threading import Lock
+from time import perf_counter
+from typing import Self
+
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_SIZE = 1
+DEFAULT_MAX_SIZE = 4
+DEFAULT_MAX_IDLE = 300.0  # seconds
+DEFAULT_TIMEOUT = 30.0  # seconds
+
+
+class AcquireLatency:
+    """Rolling window of the time spent waiting for a connection."""
+
+    def __init__(self, window: int = 1024):
+        self._samples = deque(maxlen=window)
+        self._lock = Lock()
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.max = max(self.max, seconds)
+
+    def summary(self) -> dict:
+        """Latency figures in milliseconds (percentiles over the window)."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {"acquire_count": 0}
+        return {
+            "acquire_count": self.count,
+            "acquire_p50_ms": samples[len(samples) // 2] * 1000,
+            "acquire_p95_ms": samples[int(len(samples) * 0.95)] * 1000,
+            "acquire_max_ms": self.max * 1000,
+        }
+
+
+class Pool:
+    """Postgres connection pool with acquire-latency metrics.
+
+    Args:
+        config (dict): `psycopg.connect` keyword arguments
+        min_size (int, optional): connections kept open. Defaults to 1.
+        max_size (int, optional): upper bound of open connections. Defaults to 4.
+        max_idle (float, optional): seconds before an idle connection is closed.
+        timeout (float, optional): seconds to wait for a free connection.
+        check (bool, optional): health-check connections on checkout.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        min_size: int = DEFAULT_MIN_SIZE,
+        max_size: int = DEFAULT_MAX_SIZE,
+        max_idle: float = DEFAULT_MAX_IDLE,
+        timeout: float = DEFAULT_TIMEOUT,
+        check: bool = True,
+    ):
+        self.timeout = timeout
+        self.latency = AcquireLatency()
+        self._pool = ConnectionPool(
+            kwargs=config,
+            min_size=min_size,
+            max_size=max_size,
+            max_idle=max_idle,
+            timeout=timeout,
+            check=ConnectionPool.check_connection if check else None,
+            name=config.get("dbname"),
+            open=False,
+        )
+
+    def open(self) -> None:
+        """Open the pool and wait until `min_size` connections are ready."""
+        self._pool.open(wait=True, timeout=self.timeout)
+        logger.info(
+            "Connection pool ready (min %d, max %d)",
+            self._pool.min_size,
+            self._pool.max_size,
+        )
+
+    @contextmanager
+    def connection(self, timeout: float | None = None):
+        """Borrow a connection for the duration of a `with` block.
+
+        Args:
+            timeout (float, optional): seconds to wait for a free connection
+
+        Yields:
+            psycopg.Connection: pooled connection
+        """
+        started = perf_counter()
+        with self._pool.connection(timeout) as cnx:
+            self.latency.record(perf_counter() - started)
+            yield cnx
+
+    def stats(self) -> dict:
+        """Pool counters (`psycopg_pool` names) plus acquire latency."""
+        return {**self._pool.get_stats(), **self.latency.summary()}
+
+    def close(self) -> None:
+        self._pool.close()
+        logger.info("Connection pool closed: %s", self.stats())
+
+    def __enter__(self) -> Self:
+        self.open()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class LazyPool:
+    """Handle to a pool that is only opened when a connection is first needed.
+
+    Args:
+        factory (Callable[[], Pool]): opens the pool (with connection retries)
+    """
+
+    def __init__(self, factory: Callable[[], Pool]):
+        self._factory = factory
+        self._pool = None
+        self._lock = Lock()
+
+    @property
+    def opened(self) -> bool:
+        return self._pool is not None
+
+    def open(self) -> Pool:
+        """Open the pool now (once), e.g. to fail fast at program start."""
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = self._factory()
+        return self._pool
+
+    def connection(self, timeout: float | None = None):
+        """Same as `Pool.connection`, opening the pool first if needed."""
+        return self.open().connection(timeout)
+
+    def stats(self) -> dict:
+        return self._pool.stats() if self._pool is not None else {}
+
+    def close(self) -> None:
+        """Close the pool if it was opened; a later use opens a new one."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+
+
+class AsyncPool:
+    """`Pool` for `asyncio`: Postgres async connection pool with metrics.
+
+    Args:
+        config (dict): `psycopg.AsyncConnection.connect` keyword arguments
+        min_size (int, optional): connections kept open. Defaults to 1.
+        max_size (int, optional): upper bound of open connections. Defaults to 4.
+        max_idle (float, optional): seconds before an idle connection is closed.
+        timeout (float, optional): seconds to wait for a free connection.
+        check (bool, optional): health-check connections on checkout.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        min_size: int = DEFAULT_MIN_SIZE,
+        max_size: int = DEFAULT_MAX_SIZE,
+        max_idle: float = DEFAULT_MAX_IDLE,
+        timeout: float = DEFAULT_TIMEOUT,
+        check: bool = True,
+    ):
+        self.timeout = timeout
+        self.latency = AcquireLatency()
+        self._pool = AsyncConnectionPool(
+            kwargs=config,
+            min_size=min_size,
+            max_size=max_size,
+            max_idle=max_idle,
+            timeout=timeout,
+            check=AsyncConnectionPool.check_connection if check else None,
+            name=config.get("dbname"),
+            open=False,
+        )
+
+    async def open(self) -> None:
+        """Open the pool and wait until `min_size` connections are ready."""
+        await self._pool.open(wait=True, timeout=self.timeout)
+        logger.info(
+            "Async connection pool ready (min %d, max %d)",
+            self._pool.min_size,
+            self._pool.max_size,
+        )
+
+    @asynccontextmanager
+    async def connection(self, timeout: float | None = None):
+        """Borrow a connection for the duration of an `async with` block.
+
+        Args:
+            timeout (float, optional): seconds to wait for a free connection
+
+        Yields:
+            psycopg.AsyncConnection: pooled connection
+        """
+        started = perf_counter()
+        async with self._pool.connection(timeout) as cnx:
+            self.latency.record(perf_counter() - started)
+            yield cnx
+
+    def stats(self) -> dict:
+        """Pool counters (`psycopg_pool` names) plus acquire latency."""
+        return {**self._pool.get_stats(), **self.latency.summary()}
+
+    async def close(self) -> None:
+        await self._pool.close()
+        logger.info("Async connection pool closed: %s", self.stats())
+
+    async def __aenter__(self) -> Self:
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+
+class AsyncLazyPool:
+    """`LazyPool` for `asyncio`: the pool is opened on first use.
+
+    Args:
+        factory (Callable[[], Awaitable[AsyncPool]]): opens the pool
+    """
+
+    def __init__(self, factory: Callable[[], Awaitable[AsyncPool]]):
+        self._factory = factory
+        self._pool = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def opened(self) -> bool:
+        return self._pool is not None
+
+    async def open(self) -> AsyncPool:
+        """Open the pool now (once), e.g. to fail fast at program start."""
+        if self._pool is None:
+            async with self._lock:
+                if self._pool is None:
+                    self._pool = await self._factory()
+        return self._pool
+
+    @asynccontextmanager
+    async def connection(self, timeout: float | None = None):
+        """Same as `AsyncPool.connection`, opening the pool first if needed."""
+        pool = await self.open()
+        async with pool.connection(timeout) as cnx:
+            yield cnx
+
+    def stats(self) -> dict:
+        return self._pool.stats() if self._pool is not None else {}
+
+    async def close(self) -> None:
+        """Close the pool if it was opened; a later use opens a new one."""
+        async with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            await pool.close()
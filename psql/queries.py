@@ -0,0 +1,119 @@
+"""
+Parameterized hot lookups over server-side prepared statements.
+
+## Key Features:
+- `LOOKUPS`: the lookups the application runs over and over (history by \
+    email, options by title or correctness, suspicious behaviour by status), \
+    written with bound parameters instead of literal values.
+- `CACHED_LOOKUPS`: the catalog lookups, whose rows only change with the \
+    tables listed, served from the result cache by `db.lookup` (see \
+    `resultcache.py`).
+- `StatementCache` runs queries with `prepare=True`: Postgres parses and \
+    plans a statement once per connection, later calls only bind and execute.
+- The cache is a per-connection LRU of `maxsize` statements, kept in step \
+    with psycopg's own (`prepared_max`): evicting a query `DEALLOCATE`s it.
+- Hit/miss/eviction counters (`stats()`).
+- `cache_for(cnx)` returns the cache of a (pooled) connection, so repeated \
+    borrows of the same connection keep their prepared statements.
+
+## Notes:
+- psycopg drops every prepared statement after a `ROLLBACK` or DDL and \
+    silently prepares them again; those calls still count as hits.
+
+## Usage:
+```py
+with pool.connection() as cnx:
+    rows = cache_for(cnx).lookup("tests_history_by_email", {"email": email})
+```
+"""
+
+import weakref
+from collections import OrderedDict
+
+import psycopg as psql
+
+from resultcache import CATALOG_TABLES
+
+DEFAULT_CACHE_SIZE = 100
+
+LOOKUPS = {
+    "tests_history_by_email": (
+        'SELECT * FROM "tests_history" WHERE "student_id" = ('
+        'SELECT "id" FROM "students" WHERE "email" = %(email)s)'
+    ),
+    "test_questions_option_search_by_title": (
+        'SELECT * FROM "test_questions_option_search" WHERE "title" = %(title)s'
+    ),
+    "test_questions_option_search_by_is_correct": (
+        'SELECT * FROM "test_questions_option_search" '
+        'WHERE "is_correct" = %(is_correct)s'
+    ),
+    "test_sessions_suspicious_behaviour_search_by_status": (
+        'SELECT * FROM "test_sessions_suspicious_behaviour_search" '
+        'WHERE "test_session_status" = %(status)s'
+    ),
+}
+
+CACHED_LOOKUPS = {
+    "test_questions_option_search_by_title": CATALOG_TABLES,
+    "test_questions_option_search_by_is_correct": CATALOG_TABLES,
+}
+
+
+class StatementCache:
+    """LRU of the statements prepared on one connection.
+
+    Args:
+        cnx (psycopg.Connection): connection the statements are prepared on
+        maxsize (int, optional): prepared statements kept. Defaults to 100.
+    """
+
+    def __init__(self, cnx: psql.Connection, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.cnx = cnx
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._queries = OrderedDict()
+        # Same bound as ours, so psycopg evicts (and deallocates) in step
+        cnx.prepared_max = maxsize
+
+    def execute(self, query: str, params=None) -> psql.Cursor:
+        """Run a query as a prepared statement, return its cursor."""
+        if query in self._queries:
+            self.hits += 1
+            self._queries.move_to_end(query)
+        else:
+            self.misses += 1
+            self._queries[query] = None
+            if len(self._queries) > self.maxsize:
+                self._queries.popitem(last=False)
+                self.evictions += 1
+        return self.cnx.execute(query, params, prepare=True)
+
+    def fetchall(self, query: str, params=None) -> list:
+        return self.execute(query, params).fetchall()
+
+    def lookup(self, name: str, params: dict) -> list:
+        """Rows of one of the `LOOKUPS`."""
+        return self.fetchall(LOOKUPS[name], params)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._queries),
+            "maxsize": self.maxsize,
+        }
+
+
+_caches = weakref.WeakKeyDictionary()
+
+
+def cache_for(cnx: psql.Connection, maxsize: int = DEFAULT_CACHE_SIZE):
+    """The `StatementCache` of a connection, created on first use."""
+    cache = _caches.get(cnx)
+    if cache is None:
+        cache = _caches[cnx] = StatementCache(cnx, maxsize)
+    return cache
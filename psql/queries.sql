@@ -1,5 +1,7 @@
 -- INSERT/DELETE data from tables(reset-tables)
+DELETE FROM "tests_history_summary";
 DELETE FROM "reports";
+DELETE FROM "tests_sessions_scores";
 DELETE FROM "results";
 DELETE FROM "events";
 DELETE FROM "proctoring_sessions";
@@ -153,3 +155,8 @@ WHERE "is_correct" = 1;
 -- EXPLAIN QUERY PLAN
 SELECT * FROM "test_sessions_suspicious_behaviour_search"
 WHERE "test_session_status" = 'ended';
+
+-- Running score of a test session (live dashboards)
+-- EXPLAIN QUERY PLAN
+SELECT * FROM "tests_sessions_live_scores"
+WHERE "test_session_id" = 1;
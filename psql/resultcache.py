@@ -0,0 +1,315 @@
+"""
+Read-through cache of query results, invalidated by table changes.
+
+## Key Features:
+- `ResultCache` keeps the rows of read-only queries, keyed by the query \
+    (whitespace normalized) and its parameters; every entry records the \
+    tables it reads.
+- Entries expire after `ttl` seconds, and the least recently used ones are \
+    evicted to keep the estimated size of the cached rows under `max_bytes`.
+- `invalidate(tables)` drops the entries reading any of those tables. A load \
+    that overlaps an invalidation of its tables is returned, not cached.
+- `ChangeListener`: a dedicated connection `LISTEN`s on `ems_table_change`, \
+    which statement triggers on the catalog tables notify with the table \
+    name (see `schema.sql`), and invalidates the cache from a thread.
+- Hit rate, expirations, evictions and invalidations (`stats()`).
+
+## Notes:
+- Postgres sends notifications on commit and delivers them asynchronously: \
+    a change committed by another connection is seen a moment later.
+- An empty payload (the end of `schema.sql`) drops every entry.
+- If the listening connection fails, the cache is emptied and bypassed \
+    (`ChangeListener.alive`): rows come straight from the database.
+- Sizes are estimates (`sys.getsizeof` of the rows and their values).
+
+## Usage:
+```py
+cache = ResultCache(ttl=300, max_bytes=64 * 1024 * 1024)
+listener = ChangeListener(config, cache)
+listener.start()
+rows = cache.fetch(query, params, CATALOG_TABLES, lambda: load(query, params))
+print(cache.stats())
+listener.stop()
+```
+"""
+
+import logging
+import sys
+from collections import OrderedDict
+from collections.abc import Callable
+from threading import Event, Lock, Thread
+from time import monotonic
+
+import psycopg as psql
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 300.0  # seconds
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+CHANNEL = "ems_table_change"
+
+# Tables of the test catalog, the only ones the triggers report
+CATALOG_TABLES = ("tests", "questions", "questions_options")
+
+
+def normalize(query: str) -> str:
+    """The query with every run of whitespace collapsed to one space."""
+    return " ".join(query.split())
+
+
+def cache_key(query: str, params=None) -> tuple:
+    if isinstance(params, dict):
+        params = tuple(sorted(params.items()))
+    elif params is not None:
+        params = tuple(params)
+    return normalize(query), params
+
+
+def sizeof(rows: list) -> int:
+    """Estimated memory held by a result set, in bytes."""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+    return size
+
+
+class _Entry:
+    __slots__ = ("expires", "rows", "size", "tables")
+
+    def __init__(self, rows: list, tables: tuple, size: int, expires: float):
+        self.rows = rows
+        self.tables = tables
+        self.size = size
+        self.expires = expires
+
+
+class ResultCache:
+    """LRU of query results with a time to live and a memory bound.
+
+    Args:
+        ttl (float, optional): seconds an entry is served. Defaults to 300.
+        max_bytes (int, optional): estimated size of all the cached rows. \
+            Defaults to 64 MiB.
+        clock (Callable[[], float], optional): monotonic seconds. \
+            Defaults to `time.monotonic`.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        clock: Callable[[], float] = monotonic,
+    ):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.bytes = 0
+        self._entries = OrderedDict()
+        # Bumped by every invalidation of a table (`_epoch`: of all of them),
+        # see `fetch`
+        self._epoch = 0
+        self._generations = {}
+        self._lock = Lock()
+
+    def get(self, key: tuple):
+        """Cached rows of `key`, or `None` (counted as a miss)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= self.clock():
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.rows
+
+    def put(
+        self, key: tuple, rows, tables: tuple, generations=None, size: int | None = None
+    ) -> bool:
+        """Cache rows read from `tables`.
+
+        Args:
+            key (tuple): `cache_key(query, params)`
+            rows (list): result rows, not to be modified afterwards
+            tables (tuple): tables the query reads
+            generations (tuple, optional): `generations(tables)` taken \
+                before the rows were read: the rows are not cached if one \
+                of the tables was invalidated since.
+            size (int, optional): size of `rows` in bytes. \
+                Defaults to `sizeof(rows)`.
+
+        Returns:
+            bool: whether the rows were cached
+        """
+        size = (sizeof(rows) if size is None else size) + sys.getsizeof(key[0])
+        with self._lock:
+            if generations is not None and generations != self._generation(tables):
+                return False
+            if size > self.max_bytes:
+                return False
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(rows, tables, size, self.clock() + self.ttl)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def generations(self, tables: tuple) -> tuple:
+        with self._lock:
+            return self._generation(tables)
+
+    def fetch(
+        self,
+        query: str,
+        params,
+        tables: tuple,
+        load: Callable[[], list],
+        measure: Callable = sizeof,
+    ):
+        """Rows of a query, from the cache or from `load()` (then cached).
+
+        Args:
+            query (str): read-only query
+            params (Sequence | Mapping): query parameters
+            tables (tuple): tables the query reads
+            load (Callable[[], list]): runs the query, returns its rows
+            measure (Callable, optional): size in bytes of what `load` \
+                returns. Defaults to `sizeof`.
+
+        Returns:
+            list: result rows, shared with the cache: don't modify them
+        """
+        key = cache_key(query, params)
+        rows = self.get(key)
+        if rows is None:
+            generations = self.generations(tables)
+            rows = load()
+            self.put(key, rows, tables, generations, measure(rows))
+        return rows
+
+    def invalidate(self, tables=None) -> int:
+        """Drop the entries reading any of `tables` (all of them if `None`).
+
+        Returns:
+            int: number of dropped entries
+        """
+        with self._lock:
+            if tables is None:
+                self._epoch += 1
+                stale = list(self._entries)
+            else:
+                for table in tables:
+                    self._generations[table] = self._generations.get(table, 0) + 1
+                stale = [
+                    key
+                    for key, entry in self._entries.items()
+                    if not set(entry.tables).isdisjoint(tables)
+                ]
+            for key in stale:
+                self._drop(key)
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self) -> None:
+        self.invalidate()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _generation(self, tables: tuple) -> tuple:
+        return (self._epoch, *(self._generations.get(table, 0) for table in tables))
+
+    def _drop(self, key: tuple) -> None:
+        self.bytes -= self._entries.pop(key).size
+
+
+class ChangeListener:
+    """Invalidate a `ResultCache` on the notifications of `channel`.
+
+    Args:
+        config (dict): `psycopg.connect` keyword arguments
+        cache (ResultCache): cache to invalidate
+        channel (str, optional): notification channel. \
+            Defaults to "ems_table_change".
+        poll (float, optional): seconds between checks of `stop()`. \
+            Defaults to 0.5.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        cache: ResultCache,
+        channel: str = CHANNEL,
+        poll: float = 0.5,
+    ):
+        self.config = config
+        self.cache = cache
+        self.channel = channel
+        self.poll = poll
+        self.notifications = 0
+        self._cnx = None
+        self._thread = None
+        self._stopping = Event()
+        self._lock = Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Listen before returning: no change committed after it is missed."""
+        with self._lock:
+            if self.alive:
+                return
+            if self._cnx is not None:
+                self._cnx.close()
+            self._cnx = psql.connect(**self.config, autocommit=True)
+            self._cnx.execute(f'LISTEN "{self.channel}"')
+            # Whatever was cached before listening can't be trusted
+            self.cache.clear()
+            self._stopping.clear()
+            self._thread = Thread(target=self._listen, name="result-cache", daemon=True)
+            self._thread.start()
+        logger.info("Result cache listening on %s", self.channel)
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._cnx is None:
+                return
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+            self._cnx.close()
+            self._cnx = None
+        logger.info("Result cache closed: %s", self.cache.stats())
+
+    def _listen(self) -> None:
+        try:
+            while not self._stopping.is_set():
+                for notify in self._cnx.notifies(timeout=self.poll):
+                    self.notifications += 1
+                    self.cache.invalidate([notify.payload] if notify.payload else None)
+        except psql.Error as err:
+            logger.error("Result cache listener lost its connection: %s", err)
+            self.cache.clear()
@@ -0,0 +1,294 @@
+"""
+Script execution engine for running many SQL statements over one connection.
+
+## Key Features:
+- Reuses a single cursor for every statement of a script.
+- Transaction modes:
+    - `statement`: commit after every statement (previous behaviour).
+    - `script`: one commit at the end of the script.
+    - `batch`: commit every `batch_size` statements.
+- Wraps each statement in a savepoint (sent in the same round trip) so one \
+    failing statement is rolled back alone instead of aborting the transaction.
+- Optionally times every statement (`timer`, see `timing.py`).
+- `AsyncScriptRunner`: the same over a `psycopg.AsyncConnection`.
+- `write_pipelined` sends one parameterized write for many rows in pipeline \
+    mode: one network round trip per `batch_size` rows instead of one per row.
+- `copy_rows` streams rows into a table with `COPY FROM STDIN`.
+"""
+
+import logging
+from time import perf_counter
+
+import psycopg as psql
+
+logger = logging.getLogger(__name__)
+
+STATEMENT = "statement"
+SCRIPT = "script"
+BATCH = "batch"
+TRANSACTION_MODES = (STATEMENT, SCRIPT, BATCH)
+
+SAVEPOINT = "ems_stmt"
+
+DEFAULT_WRITE_BATCH_SIZE = 500
+
+
+def write_pipelined(
+    cnx: psql.Connection,
+    query: str,
+    params_seq,
+    batch_size: int = DEFAULT_WRITE_BATCH_SIZE,
+) -> int:
+    """Run one parameterized write for many rows in pipeline mode.
+
+    Statements are queued client side and flushed with a single sync every
+    `batch_size` rows. Nothing is committed: the caller owns the transaction,
+    and a failing row aborts it (the error is raised at the next sync).
+
+    Args:
+        cnx (psycopg.Connection): open connection
+        query (str): `INSERT`/`UPDATE` with `%s` placeholders
+        params_seq (Iterable[Sequence]): one parameter tuple per row
+        batch_size (int, optional): rows per round trip. Defaults to 500.
+
+    Returns:
+        int: number of rows written
+    """
+    rows = 0
+    with cnx.pipeline() as pipeline, cnx.cursor() as cursor:
+        for params in params_seq:
+            cursor.execute(query, params)
+            rows += 1
+            if rows % batch_size == 0:
+                pipeline.sync()
+    return rows
+
+
+def copy_rows(cursor: psql.Cursor, table: str, columns: tuple, rows) -> int:
+    """Stream rows into a table with `COPY FROM STDIN`, return the row count."""
+    names = ", ".join(f'"{column}"' for column in columns)
+    count = 0
+    with cursor.copy(f'COPY "{table}" ({names}) FROM STDIN') as copy:
+        for row in rows:
+            copy.write_row(row)
+            count += 1
+    return count
+
+
+async def write_pipelined_async(
+    cnx: psql.AsyncConnection,
+    query: str,
+    params_seq,
+    batch_size: int = DEFAULT_WRITE_BATCH_SIZE,
+) -> int:
+    """`write_pipelined` over an async connection."""
+    rows = 0
+    async with cnx.pipeline() as pipeline, cnx.cursor() as cursor:
+        for params in params_seq:
+            await cursor.execute(query, params)
+            rows += 1
+            if rows % batch_size == 0:
+                await pipeline.sync()
+    return rows
+
+
+class ScriptRunner:
+    """Execute statements over a shared cursor with batched commits.
+
+    Args:
+        cnx (psycopg.Connection): connection used for every statement
+        mode (str, optional): one of `TRANSACTION_MODES`. Defaults to "script".
+        batch_size (int, optional): statements per commit in `batch` mode.
+        savepoints (bool, optional): isolate failures with savepoints \
+            (ignored in `statement` mode). Defaults to True.
+        timer (timing.StatementTimer, optional): records the wall time of \
+            every successful statement.
+    """
+
+    def __init__(
+        self,
+        cnx: psql.Connection,
+        mode: str = SCRIPT,
+        batch_size: int = 1000,
+        savepoints: bool = True,
+        timer=None,
+    ):
+        if mode not in TRANSACTION_MODES:
+            raise ValueError(f"Unknown transaction mode: {mode}")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.cnx = cnx
+        self.mode = mode
+        self.batch_size = batch_size
+        self.savepoints = savepoints and mode != STATEMENT
+        self.timer = timer
+        self.stats = {"executed": 0, "failed": 0, "commits": 0, "rolled_back": 0}
+        self._pending = 0
+
+    def _wrap(self, query: str) -> str:
+        # Newlines keep a trailing `--` comment from swallowing the release
+        return f"SAVEPOINT {SAVEPOINT};\n{query}\n;\nRELEASE SAVEPOINT {SAVEPOINT}"
+
+    def _execute(self, cursor: psql.Cursor, query: str) -> None:
+        if self.savepoints:
+            cursor.execute(self._wrap(query))
+            # Skip the SAVEPOINT result, leave the cursor on the statement result
+            cursor.nextset()
+        else:
+            cursor.execute(query)
+
+    def _recover(self) -> None:
+        """Undo the failed statement (or the whole pending batch)."""
+        if self.savepoints:
+            with self.cnx.cursor() as cursor:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {SAVEPOINT}")
+            return
+        self.cnx.rollback()
+        if self._pending:
+            logger.error(
+                "Rolled back %d uncommitted statement(s) with the failed one",
+                self._pending,
+            )
+            self.stats["rolled_back"] += self._pending
+        self._pending = 0
+
+    def commit(self) -> None:
+        """Commit pending statements, if any."""
+        if self._pending:
+            self.cnx.commit()
+            self.stats["commits"] += 1
+            self._pending = 0
+
+    def run(self, statements, on_result=None) -> dict:
+        """Execute statements in order and commit according to `mode`.
+
+        Args:
+            statements (Iterable[str]): SQL statements without terminators
+            on_result (callable, optional): called as `on_result(cursor, query)` \
+                after each successful statement, while its result is current.
+
+        Returns:
+            dict: counters of executed, failed, commits and rolled back statements
+        """
+        cursor = self.cnx.cursor()
+        try:
+            for query in statements:
+                query = query.strip()
+                if not query:
+                    continue
+                try:
+                    started = perf_counter()
+                    self._execute(cursor, query)
+                    elapsed = perf_counter() - started
+                except psql.Error as e:
+                    logger.error(f"Error executing query: {query}\n{e}")
+                    self.stats["failed"] += 1
+                    self._recover()
+                    continue
+
+                self.stats["executed"] += 1
+                self._pending += 1
+                if self.timer is not None:
+                    self.timer.record(cursor, query, elapsed)
+                if on_result:
+                    on_result(cursor, query)
+
+                if self.mode == STATEMENT or (
+                    self.mode == BATCH and self._pending >= self.batch_size
+                ):
+                    self.commit()
+            self.commit()
+        except BaseException:
+            # Leave the connection usable for the caller
+            if not self.cnx.closed:
+                self.cnx.rollback()
+            raise
+        finally:
+            cursor.close()
+        return self.stats
+
+
+class AsyncScriptRunner(ScriptRunner):
+    """`ScriptRunner` over a `psycopg.AsyncConnection`.
+
+    Same arguments, modes and counters; `run`, `commit` and the `on_result`
+    callback are coroutines, `timer` is a `timing.AsyncStatementTimer`.
+    """
+
+    async def _execute(self, cursor: psql.AsyncCursor, query: str) -> None:
+        if self.savepoints:
+            await cursor.execute(self._wrap(query))
+            # Skip the SAVEPOINT result, leave the cursor on the statement result
+            cursor.nextset()
+        else:
+            await cursor.execute(query)
+
+    async def _recover(self) -> None:
+        """Undo the failed statement (or the whole pending batch)."""
+        if self.savepoints:
+            async with self.cnx.cursor() as cursor:
+                await cursor.execute(f"ROLLBACK TO SAVEPOINT {SAVEPOINT}")
+            return
+        await self.cnx.rollback()
+        if self._pending:
+            logger.error(
+                "Rolled back %d uncommitted statement(s) with the failed one",
+                self._pending,
+            )
+            self.stats["rolled_back"] += self._pending
+        self._pending = 0
+
+    async def commit(self) -> None:
+        """Commit pending statements, if any."""
+        if self._pending:
+            await self.cnx.commit()
+            self.stats["commits"] += 1
+            self._pending = 0
+
+    async def run(self, statements, on_result=None) -> dict:
+        """Execute statements in order and commit according to `mode`.
+
+        Args:
+            statements (Iterable[str]): SQL statements without terminators
+            on_result (callable, optional): awaited as `on_result(cursor, query)` \
+                after each successful statement, while its result is current.
+
+        Returns:
+            dict: counters of executed, failed, commits and rolled back statements
+        """
+        cursor = self.cnx.cursor()
+        try:
+            for query in statements:
+                query = query.strip()
+                if not query:
+                    continue
+                try:
+                    started = perf_counter()
+                    await self._execute(cursor, query)
+                    elapsed = perf_counter() - started
+                except psql.Error as e:
+                    logger.error(f"Error executing query: {query}\n{e}")
+                    self.stats["failed"] += 1
+                    await self._recover()
+                    continue
+
+                self.stats["executed"] += 1
+                self._pending += 1
+                if self.timer is not None:
+                    await self.timer.record(cursor, query, elapsed)
+                if on_result:
+                    await on_result(cursor, query)
+
+                if self.mode == STATEMENT or (
+                    self.mode == BATCH and self._pending >= self.batch_size
+                ):
+                    await self.commit()
+            await self.commit()
+        except BaseException:
+            # Leave the connection usable for the caller
+            if not self.cnx.closed:
+                await self.cnx.rollback()
+            raise
+        finally:
+            await cursor.close()
+        return self.stats
@@ -0,0 +1,105 @@
+"""
+In-process schema loading over an open psycopg connection.
+
+## Key Features:
+- Applies `schema.sql` statement by statement (split with `sqlsplit`), so \
+    plpgsql functions, triggers, views and indexes load without `psql` shell.
+- Runs the whole script inside one transaction: Postgres DDL is \
+    transactional, so a failing statement leaves the database untouched.
+- Logs the time taken by every DDL block.
+- `load_schema_async`: the same over a `psycopg.AsyncConnection`.
+"""
+
+import asyncio
+import logging
+from time import perf_counter
+
+import psycopg as psql
+
+from sqlsplit import read_statements
+
+logger = logging.getLogger(__name__)
+
+
+def describe(statement: str, width: int = 60) -> str:
+    """First line of code in a statement, used as its label in logs."""
+    for line in statement.splitlines():
+        line = line.strip()
+        if line and not line.startswith("--"):
+            return line if len(line) <= width else f"{line[: width - 3]}..."
+    return ""
+
+
+def load_schema(cnx: psql.Connection, path: str = "schema.sql") -> list:
+    """Apply a schema script inside one transaction.
+
+    Args:
+        cnx (psycopg.Connection): open connection (not in autocommit mode)
+        path (str, optional): schema script. Defaults to "schema.sql".
+
+    Returns:
+        list: `(statement label, seconds)` for every executed statement
+    """
+    timings = []
+    started = perf_counter()
+    # Start from a clean transaction so the schema commits (or fails) as a unit
+    cnx.commit()
+    try:
+        with cnx.cursor() as cursor:
+            for statement in read_statements(path):
+                label = describe(statement)
+                statement_started = perf_counter()
+                cursor.execute(statement)
+                elapsed = perf_counter() - statement_started
+                timings.append((label, elapsed))
+                logger.info("%8.2f ms  %s", elapsed * 1000, label)
+        cnx.commit()
+    except BaseException:
+        cnx.rollback()
+        logger.error("Schema import failed, rolled back %s", path)
+        raise
+    logger.info(
+        "Schema import succeeded: %d statements in %.2f ms",
+        len(timings),
+        (perf_counter() - started) * 1000,
+    )
+    return timings
+
+
+async def load_schema_async(
+    cnx: psql.AsyncConnection, path: str = "schema.sql"
+) -> list:
+    """`load_schema` over an async connection.
+
+    Args:
+        cnx (psycopg.AsyncConnection): open connection (not in autocommit mode)
+        path (str, optional): schema script. Defaults to "schema.sql".
+
+    Returns:
+        list: `(statement label, seconds)` for every executed statement
+    """
+    timings = []
+    started = perf_counter()
+    # The file is read in a thread, not on the event loop
+    statements = await asyncio.to_thread(list, read_statements(path))
+    await cnx.commit()
+    try:
+        async with cnx.cursor() as cursor:
+            for statement in statements:
+                label = describe(statement)
+                statement_started = perf_counter()
+                await cursor.execute(statement)
+                elapsed = perf_counter() - statement_started
+                timings.append((label, elapsed))
+                logger.info("%8.2f ms  %s", elapsed * 1000, label)
+        await cnx.commit()
+    except BaseException:
+        await cnx.rollback()
+        logger.error("Schema import failed, rolled back %s", path)
+        raise
+    logger.info(
+        "Schema import succeeded: %d statements in %.2f ms",
+        len(timings),
+        (perf_counter() - started) * 1000,
+    )
+    return timings
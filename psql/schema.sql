@@ -2,6 +2,7 @@
 DROP VIEW IF EXISTS "tests_history";
 DROP VIEW IF EXISTS "test_questions_option_search";
 DROP VIEW IF EXISTS "test_sessions_suspicious_behaviour_search";
+DROP VIEW IF EXISTS "tests_sessions_live_scores";
 
 
 DROP INDEX IF EXISTS "idx_tests_sessions";
@@ -12,10 +13,16 @@ DROP INDEX IF EXISTS "idx_questions_options";
 DROP INDEX IF EXISTS "idx_questions_options_is_correct";
 DROP INDEX IF EXISTS "idx_tests";
 DROP INDEX IF EXISTS "idx_questions";
-DROP INDEX IF EXISTS "idx_events";
+DROP INDEX IF EXISTS "idx_events_suspicious";
+DROP INDEX IF EXISTS "idx_proctoring_sessions";
+DROP INDEX IF EXISTS "idx_proctoring_sessions_proctor_id";
+DROP INDEX IF EXISTS "idx_results";
+DROP INDEX IF EXISTS "idx_tests_history_summary";
 
 
+DROP TABLE IF EXISTS "tests_history_summary";
 DROP TABLE IF EXISTS "reports";
+DROP TABLE IF EXISTS "tests_sessions_scores";
 DROP TABLE IF EXISTS "results";
 DROP TABLE IF EXISTS "events";
 DROP TABLE IF EXISTS "proctoring_sessions";
@@ -30,6 +37,18 @@ DROP TYPE IF EXISTS "events_type";
 DROP TYPE IF EXISTS "proctoring_session_status_type";
 DROP TYPE IF EXISTS "tests_session_status_type";
 
+-- Simulated time for the triggers (see `clock.py`): the session setting
+-- `ems.clock` if set, else the wall clock
+CREATE OR REPLACE FUNCTION ems_now()
+RETURNS TIMESTAMP WITH TIME ZONE AS $$
+BEGIN
+    RETURN COALESCE(
+        NULLIF(current_setting('ems.clock', true), '')::TIMESTAMP WITH TIME ZONE,
+        clock_timestamp()
+    );
+END;
+$$ LANGUAGE plpgsql;
+
 -- CREATE TABLES
 -- SET TIME ZONE LOCAL;
 
@@ -87,7 +106,7 @@ CREATE TABLE IF NOT EXISTS "tests_sessions" (
     "id" SERIAL,
     "test_id" INT,
     "student_id" INT,
-    "start" TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    "start" TIMESTAMP WITH TIME ZONE DEFAULT ems_now(),
     "end" TIMESTAMP WITH TIME ZONE, -- trigger added.
     "duration_taken" INTERVAL, -- changed from TIME to INTERVAL
     "status" "tests_session_status_type" NOT NULL DEFAULT 'in-progress',
@@ -114,7 +133,7 @@ CREATE TABLE IF NOT EXISTS "proctoring_sessions" (
     "id" SERIAL,
     "proctor_id" INT,
     "test_session_id" INT,
-    "start" TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    "start" TIMESTAMP WITH TIME ZONE DEFAULT ems_now(),
     "end" TIMESTAMP WITH TIME ZONE, -- trigger added
     "status" "proctoring_session_status_type" NOT NULL DEFAULT 'active',
     PRIMARY KEY("id"),
@@ -125,16 +144,54 @@ CREATE TABLE IF NOT EXISTS "proctoring_sessions" (
 
 -- Represents events occurring during proctoring sessions
 -- trigger added for some new auto updates and entries
+-- partitioned by month of "timestamp" (see `partitions.py`), rows of months
+-- without a partition wait in "events_default"
 CREATE TYPE "events_type" AS ENUM ('started-test', 'completed-test', 'ended-test', 'suspicious-behavior');
 CREATE TABLE IF NOT EXISTS "events" (
     "id" SERIAL,
     "proctoring_session_id" INT,
     "type" "events_type" NOT NULL,
-    "timestamp" TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    "timestamp" TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT ems_now(),
     "description" VARCHAR(32) DEFAULT 'OK',
-    PRIMARY KEY("id"),
+    PRIMARY KEY("id", "timestamp"),
     FOREIGN KEY("proctoring_session_id") REFERENCES "proctoring_sessions"("id")
-);
+) PARTITION BY RANGE ("timestamp");
+CREATE TABLE "events_default" PARTITION OF "events" DEFAULT;
+
+-- Create the monthly "events" partitions ("events_YYYYMM") covering
+-- [since, until], moving the rows of "events_default" that belong to them;
+-- returns the names of the new partitions
+CREATE OR REPLACE FUNCTION ems_events_partitions(since TIMESTAMPTZ, until TIMESTAMPTZ)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    period_start TIMESTAMPTZ := date_trunc('month', since);
+    period_end TIMESTAMPTZ;
+    partition TEXT;
+BEGIN
+    WHILE period_start <= until LOOP
+        period_end := period_start + INTERVAL '1 month';
+        partition := 'events_' || to_char(period_start, 'YYYYMM');
+        IF to_regclass(quote_ident(partition)) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I (LIKE "events" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                partition
+            );
+            EXECUTE format(
+                'WITH "moved" AS (DELETE FROM "events_default" '
+                'WHERE "timestamp" >= %L AND "timestamp" < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM "moved"',
+                period_start, period_end, partition
+            );
+            EXECUTE format(
+                'ALTER TABLE "events" ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                partition, period_start, period_end
+            );
+            RETURN NEXT partition;
+        END IF;
+        period_start := period_end;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
 
 
 -- Represents the results of test sessions
@@ -165,6 +222,33 @@ CREATE TABLE IF NOT EXISTS "reports" (
 );
 
 
+-- Represents the materialized `tests_history` view
+-- trigger added: one row per report, kept with the report
+CREATE TABLE IF NOT EXISTS "tests_history_summary" (
+    "report_id" INT,
+    "student_id" INT,
+    "test_id" INT,
+    "test_title" VARCHAR(300),
+    "total_score" INT,
+    "scored" INT,
+    "overall_feedback" VARCHAR(32),
+    "duration_taken" INTERVAL,
+    PRIMARY KEY("report_id"),
+    FOREIGN KEY("report_id") REFERENCES "reports"("id")
+);
+
+
+-- Represents the running score of test sessions
+-- trigger added: one row per session, updated on every answer
+CREATE TABLE IF NOT EXISTS "tests_sessions_scores" (
+    "test_session_id" INT,
+    "answered" INT NOT NULL DEFAULT 0,
+    "correct" INT NOT NULL DEFAULT 0,
+    PRIMARY KEY("test_session_id"),
+    FOREIGN KEY("test_session_id") REFERENCES "tests_sessions"("id")
+);
+
+
 -- CREATE TRIGGERS: to UPDATE and INSERT values
 -- Create a trigger to set the end time based on the tests duration
 CREATE OR REPLACE FUNCTION set_end_for_test_session_fn()
@@ -210,15 +294,68 @@ BEGIN
     ELSE
         NEW.feedback := 'great';
     END IF;
+
+    -- Count the answer in the running score of its session
+    IF NEW.test_session_id IS NOT NULL THEN
+        INSERT INTO "tests_sessions_scores" AS "S" ("test_session_id", "answered", "correct")
+        VALUES (NEW.test_session_id, 1, NEW.score)
+        ON CONFLICT ("test_session_id") DO UPDATE
+        SET
+            "answered" = "S"."answered" + 1,
+            "correct" = "S"."correct" + EXCLUDED."correct";
+    END IF;
     RETURN NEW;
 END;
 $$ LANGUAGE plpgsql;
 
+-- Answers scored by the application (`scoring.py`) come with their score:
+-- it sets `ems.scoring` to `bulk` for its transaction
 CREATE TRIGGER "set_score_of_result"
 BEFORE INSERT ON "results"
 FOR EACH ROW
+WHEN (current_setting('ems.scoring', true) IS DISTINCT FROM 'bulk')
 EXECUTE FUNCTION set_score_of_result_fn();
 
+-- Create triggers to keep the running scores with corrected and deleted answers
+CREATE OR REPLACE FUNCTION update_score_of_result_fn()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Take the old answer out of the running score of its session
+    IF OLD.test_session_id IS NOT NULL THEN
+        UPDATE "tests_sessions_scores"
+        SET
+            "answered" = "answered" - 1,
+            "correct" = "correct" - OLD.score
+        WHERE "test_session_id" = OLD.test_session_id;
+    END IF;
+
+    -- Count the corrected one in
+    IF TG_OP = 'UPDATE' AND NEW.test_session_id IS NOT NULL THEN
+        INSERT INTO "tests_sessions_scores" AS "S" ("test_session_id", "answered", "correct")
+        VALUES (NEW.test_session_id, 1, NEW.score)
+        ON CONFLICT ("test_session_id") DO UPDATE
+        SET
+            "answered" = "S"."answered" + 1,
+            "correct" = "S"."correct" + EXCLUDED."correct";
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "update_score_of_result"
+AFTER UPDATE OF "test_session_id", "score" ON "results"
+FOR EACH ROW
+WHEN (
+    OLD.test_session_id IS DISTINCT FROM NEW.test_session_id
+    OR OLD.score IS DISTINCT FROM NEW.score
+)
+EXECUTE FUNCTION update_score_of_result_fn();
+
+CREATE TRIGGER "delete_score_of_result"
+AFTER DELETE ON "results"
+FOR EACH ROW
+EXECUTE FUNCTION update_score_of_result_fn();
+
 -- create a trigger to update tests sessions, events, proctoring session and reports on tests session status update
 
 CREATE OR REPLACE FUNCTION update_status_end_final_score_all_fn()
@@ -226,8 +363,7 @@ RETURNS TRIGGER AS $$
 BEGIN
     IF NEW.status IN ('ended', 'completed') AND OLD.status NOT IN ('ended', 'completed') THEN
         -- Set the duration taken based on the tests duration
-        -- Add parentheses back to clock_timestamp() for function call
-        NEW.duration_taken := clock_timestamp() - NEW.start; 
+        NEW.duration_taken := ems_now() - NEW.start;
 
         -- Add event for test session
         INSERT INTO "events" ("proctoring_session_id", "type")
@@ -241,23 +377,26 @@ BEGIN
         LIMIT 1;
 
         -- Update end time and status for proctoring session
-        -- clock_timestamp without () is correct here in the UPDATE SET clause
         UPDATE "proctoring_sessions"
         SET
-            "end" = clock_timestamp(), 
+            "end" = ems_now(),
             "status" = 'completed'
         WHERE
             "test_session_id" = NEW.id
             AND "status" = 'active';
 
-        -- Add reports for test session
+        -- Add reports for test session from its running score (no results scan)
         INSERT INTO "reports" ("test_session_id", "total_score", "final_score", "overall_feedback")
-        VALUES (
+        SELECT
             NEW.id,
-            (SELECT COUNT(*) FROM "results" WHERE "test_session_id" = NEW.id),
-            (SELECT COALESCE(SUM("score"),0) FROM "results" WHERE "test_session_id" = NEW.id),
-            (SELECT MAX("feedback") FROM "results" WHERE "test_session_id" = NEW.id)
-        );
+            COALESCE("S"."answered", 0),
+            COALESCE("S"."correct", 0),
+            CASE
+                WHEN "S"."correct" < "S"."answered" THEN 'need-improvement'
+                WHEN "S"."answered" > 0 THEN 'great'
+            END
+        FROM (SELECT NEW.id AS "id") AS "TS"
+        LEFT JOIN "tests_sessions_scores" AS "S" ON "S"."test_session_id" = "TS"."id";
     END IF;
     RETURN NEW;
 END;
@@ -267,21 +406,126 @@ CREATE TRIGGER "update_status_end_final_score_all" BEFORE UPDATE ON
 "tests_sessions" FOR EACH ROW
 EXECUTE FUNCTION update_status_end_final_score_all_fn();
 
+-- Create a trigger to keep test titles of the materialized tests history
+CREATE OR REPLACE FUNCTION update_tests_history_title_fn()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE "tests_history_summary"
+    SET "test_title" = NEW.title
+    WHERE "test_id" = NEW.id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "update_tests_history_title" AFTER UPDATE OF "title" ON
+"tests" FOR EACH ROW
+EXECUTE FUNCTION update_tests_history_title_fn();
+
+-- Create a trigger to copy the reports of a session to the materialized tests
+-- history when it closes (its report is added by the trigger above), or when
+-- its student, test or duration taken changes
+CREATE OR REPLACE FUNCTION update_tests_history_session_fn()
+RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM "tests_history_summary"
+    WHERE "report_id" IN (
+        SELECT "id" FROM "reports" WHERE "test_session_id" = NEW.id
+    );
+
+    INSERT INTO "tests_history_summary" (
+        "report_id", "student_id", "test_id", "test_title",
+        "total_score", "scored", "overall_feedback", "duration_taken"
+    )
+    SELECT
+        "R"."id", NEW.student_id, NEW.test_id, "T"."title",
+        "R"."total_score", "R"."final_score",
+        "R"."overall_feedback", NEW.duration_taken
+    FROM "reports" AS "R"
+    JOIN "tests" AS "T" ON "T"."id" = NEW.test_id
+    WHERE "R"."test_session_id" = NEW.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "update_tests_history_session" AFTER UPDATE ON
+"tests_sessions" FOR EACH ROW
+WHEN (
+    (NEW.status IN ('ended', 'completed') AND OLD.status NOT IN ('ended', 'completed'))
+    OR OLD.student_id IS DISTINCT FROM NEW.student_id
+    OR OLD.test_id IS DISTINCT FROM NEW.test_id
+    OR OLD.duration_taken IS DISTINCT FROM NEW.duration_taken
+)
+EXECUTE FUNCTION update_tests_history_session_fn();
+
+-- Create triggers to keep corrected and deleted reports in the materialized
+-- tests history (deleted first: the history row references the report)
+CREATE OR REPLACE FUNCTION update_tests_history_report_fn()
+RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM "tests_history_summary" WHERE "report_id" = OLD.id;
+    IF TG_OP = 'DELETE' THEN
+        RETURN OLD;
+    END IF;
+
+    INSERT INTO "tests_history_summary" (
+        "report_id", "student_id", "test_id", "test_title",
+        "total_score", "scored", "overall_feedback", "duration_taken"
+    )
+    SELECT
+        NEW.id, "TS"."student_id", "TS"."test_id", "T"."title",
+        NEW.total_score, NEW.final_score,
+        NEW.overall_feedback, "TS"."duration_taken"
+    FROM "tests_sessions" AS "TS"
+    JOIN "tests" AS "T" ON "T"."id" = "TS"."test_id"
+    WHERE "TS"."id" = NEW.test_session_id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "update_tests_history_report" AFTER UPDATE ON
+"reports" FOR EACH ROW
+EXECUTE FUNCTION update_tests_history_report_fn();
+
+CREATE TRIGGER "delete_tests_history_report" BEFORE DELETE ON
+"reports" FOR EACH ROW
+EXECUTE FUNCTION update_tests_history_report_fn();
+
+-- Create triggers to notify changes of the test catalog (once per statement,
+-- sent on commit) to the result caches, see `resultcache.py`
+CREATE OR REPLACE FUNCTION notify_table_change_fn()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('ems_table_change', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "notify_tests_change"
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "tests"
+FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change_fn();
+
+CREATE TRIGGER "notify_questions_change"
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "questions"
+FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change_fn();
+
+CREATE TRIGGER "notify_questions_options_change"
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "questions_options"
+FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change_fn();
+
 
 -- CREATE VIEWS: to simplify quering
 
 -- VIEW all students test performance history in test they took
+-- (reads the trigger-maintained "tests_history_summary", no joins)
 CREATE VIEW "tests_history" AS
 SELECT
-    "TS"."student_id",
-    "T"."title" AS "test_title",
-    "R"."total_score",
-    "R"."final_score" AS "scored",
-    "R"."overall_feedback",
-    "TS"."duration_taken"
-FROM "reports" AS "R"
-JOIN "tests_sessions" AS "TS" ON "R"."test_session_id" = "TS"."id"
-JOIN "tests" AS "T" ON "TS"."test_id" = "T"."id";
+    "student_id",
+    "test_title",
+    "total_score",
+    "scored",
+    "overall_feedback",
+    "duration_taken"
+FROM "tests_history_summary";
 
 
 -- VIEW all tests and their questions as well as options
@@ -318,6 +562,17 @@ JOIN "proctoring_sessions" "PS" ON "TS"."id" = "PS"."test_session_id"
 JOIN "events" "E" ON "PS"."id" = "E"."proctoring_session_id"
 WHERE "E"."type" = 'suspicious-behavior';
 
+-- VIEW running score of test sessions, one primary key probe per session
+CREATE VIEW "tests_sessions_live_scores" AS
+SELECT
+    "TS"."id" AS "test_session_id",
+    "TS"."student_id",
+    "TS"."status" "test_session_status",
+    COALESCE("S"."answered", 0) "answered",
+    COALESCE("S"."correct", 0) "correct"
+FROM "tests_sessions" "TS"
+LEFT JOIN "tests_sessions_scores" "S" ON "S"."test_session_id" = "TS"."id";
+
 
 -- CREATE INDEXES: to speed common searches
 CREATE INDEX "idx_tests_sessions" ON "tests_sessions" ("student_id", "test_id", "id");
@@ -328,7 +583,24 @@ CREATE INDEX "idx_questions_options" ON "questions_options" ("question_id", "is_
 CREATE INDEX "idx_questions_options_is_correct" ON "questions_options" ("is_correct") WHERE "is_correct" = 1;
 CREATE INDEX "idx_tests" ON "tests" ("title");
 CREATE INDEX "idx_questions" ON "questions" ("test_id", "id");
-CREATE INDEX "idx_events" ON "events" ("type");
+
+-- Trigger and view access paths: `results` is aggregated per test session,
+-- `proctoring_sessions` is updated per test session and the suspicious
+-- behaviour view joins `events` per proctoring session
+CREATE INDEX "idx_results" ON "results" ("test_session_id", "score", "feedback");
+CREATE INDEX "idx_proctoring_sessions" ON "proctoring_sessions" ("test_session_id", "status");
+-- The proctor alert screen: sessions of a proctor, then their suspicious
+-- events only (a few percent of `events`), read from the index alone
+CREATE INDEX "idx_proctoring_sessions_proctor_id" ON "proctoring_sessions" ("proctor_id");
+CREATE INDEX "idx_events_suspicious" ON "events" ("proctoring_session_id") INCLUDE ("type", "timestamp", "description") WHERE "type" = 'suspicious-behavior';
+CREATE INDEX "idx_tests_history_summary" ON "tests_history_summary" ("student_id");
+
+-- Partitions of the current month and the next three, `partitions.py`
+-- creates the later ones (indexes are created on every partition)
+SELECT ems_events_partitions(ems_now(), ems_now() + INTERVAL '3 months');
+
+-- The tables were recreated: drop every cached result
+NOTIFY "ems_table_change";
 
 -- check errors
 SET TIME ZONE LOCAL;
\ No newline at end of file
@@ -0,0 +1,126 @@
+"""
+Bulk answer scoring against an answer key, without the per-row trigger.
+
+## Key Features:
+- `answer_key(*papers)`: for every question of the tests, whether each of \
+    its options is correct, from their papers (see `catalog.py`).
+- `score_answers(key, answers)`: `(test_session_id, question_id, answer, \
+    score, feedback)` rows, scored like `set_score_of_result` does, in memory.
+- `session_totals(scored)`: answers and correct answers per session, one \
+    `tests_sessions_scores` upsert per session instead of one per answer.
+- `write_scored(cnx, key, answers)` copies the scored rows in (`COPY`, \
+    one stream instead of one statement per answer) with the trigger \
+    switched off (`ems.scoring` = `bulk`, local to the transaction, see \
+    `schema.sql`), then adds the totals: no `questions_options` lookup per \
+    answer.
+
+## Notes:
+- Only an option of the answered question is accepted (`ValueError`), the \
+    trigger would score an option of another question by its own correctness.
+- Nothing is committed, the caller owns the transaction.
+
+## Usage:
+```py
+key = answer_key(db.paper(test_id))
+with pool.connection() as cnx:
+    write_scored(cnx, key, [(session_id, question_id, option_id), ...])
+```
+"""
+
+import psycopg as psql
+
+from runner import DEFAULT_WRITE_BATCH_SIZE, copy_rows, write_pipelined
+
+# `set_score_of_result`: 0 is "need-improvement", anything else "great"
+FEEDBACK = {0: "need-improvement", 1: "great"}
+
+BULK_SCORING = "SELECT set_config('ems.scoring', 'bulk', true)"
+TRIGGER_SCORING = "SELECT set_config('ems.scoring', '', true)"
+
+SCORED_COLUMNS = ("test_session_id", "question_id", "answer", "score", "feedback")
+SESSION_SCORES_UPSERT = (
+    'INSERT INTO "tests_sessions_scores" AS "S" '
+    '("test_session_id", "answered", "correct") VALUES (%s, %s, %s) '
+    'ON CONFLICT ("test_session_id") DO UPDATE SET '
+    '"answered" = "S"."answered" + EXCLUDED."answered", '
+    '"correct" = "S"."correct" + EXCLUDED."correct"'
+)
+
+
+def answer_key(*papers) -> dict:
+    """`{question_id: {option_id: is_correct}}` of the questions of `papers`."""
+    return {
+        question.id: {option.id: option.is_correct for option in question.options}
+        for paper in papers
+        for question in paper.questions
+    }
+
+
+def score_answers(key: dict, answers) -> list:
+    """Score answers `(test_session_id, question_id, answer)`.
+
+    Args:
+        key (dict): `answer_key` of the answered tests
+        answers (Iterable[Sequence]): one answer per row
+
+    Raises:
+        ValueError: an answer is not an option of its question
+
+    Returns:
+        list: `(test_session_id, question_id, answer, score, feedback)` rows
+    """
+    scored = []
+    for test_session_id, question_id, answer in answers:
+        try:
+            score = key[question_id][answer]
+        except KeyError:
+            raise ValueError(
+                f"answer {answer} is not an option of question {question_id}"
+            ) from None
+        scored.append((test_session_id, question_id, answer, score, FEEDBACK[score]))
+    return scored
+
+
+def session_totals(scored: list) -> list:
+    """`(test_session_id, answered, correct)` of the sessions of scored rows."""
+    totals = {}
+    for test_session_id, _, _, score, _ in scored:
+        # Like the trigger, answers without a session count nowhere
+        if test_session_id is not None:
+            answered, correct = totals.get(test_session_id, (0, 0))
+            totals[test_session_id] = (answered + 1, correct + score)
+    return [(session, *counts) for session, counts in totals.items()]
+
+
+def write_scored(
+    cnx: psql.Connection,
+    key: dict,
+    answers,
+    batch_size: int = DEFAULT_WRITE_BATCH_SIZE,
+) -> int:
+    """Score answers in memory and insert them, bypassing the scoring trigger.
+
+    Args:
+        cnx (psycopg.Connection): open connection
+        key (dict): `answer_key` of the answered tests
+        answers (Iterable[Sequence]): `(test_session_id, question_id, answer)`
+        batch_size (int, optional): session totals per round trip. \
+            Defaults to 500.
+
+    Raises:
+        ValueError: an answer is not an option of its question (nothing \
+            is written)
+
+    Returns:
+        int: number of answers written
+    """
+    scored = score_answers(key, answers)
+    # A savepoint, or the transaction itself in autocommit mode: the setting
+    # must cover the inserts and only them
+    with cnx.transaction():
+        cnx.execute(BULK_SCORING)
+        with cnx.cursor() as cursor:
+            rows = copy_rows(cursor, "results", SCORED_COLUMNS, scored)
+        write_pipelined(cnx, SESSION_SCORES_UPSERT, session_totals(scored), batch_size)
+        cnx.execute(TRIGGER_SCORING)
+    return rows
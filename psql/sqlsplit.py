@@ -0,0 +1,154 @@
+"""
+Streaming SQL statement splitter for Postgres scripts.
+
+## Key Features:
+- Splits on `;` only outside of:
+    - single quoted strings (`''` doubling and `E'...'` backslash escapes),
+    - double quoted identifiers,
+    - `--` line comments and nested `/* ... */` block comments,
+    - dollar quoted bodies (`$$ ... $$`, `$fn$ ... $fn$`) used by plpgsql.
+- Consumes input line by line and yields statements lazily, so large dump \
+    files are processed in constant memory.
+- Comment-only chunks (e.g. trailing notes after the last `;`) are skipped.
+
+## Usage:
+```py
+for statement in read_statements("schema.sql"):
+    cursor.execute(statement)
+```
+"""
+
+import re
+from collections.abc import Iterable, Iterator
+
+# Tokens that change the scanner state outside of strings and comments
+_NORMAL = re.compile(r"""[;'"]|--|/\*|\$(?:[^\W\d]\w*)?\$""")
+_BLOCK_COMMENT = re.compile(r"/\*|\*/")
+_QUOTE = re.compile(r"'")
+_ESCAPED_QUOTE = re.compile(r"\\.|'", re.DOTALL)
+_IDENTIFIER = re.compile(r'"')
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char in "_$"
+
+
+def iter_statements(lines: Iterable[str]) -> Iterator[str]:
+    """Yield statements (without the terminating `;`) from lines of SQL.
+
+    Args:
+        lines (Iterable[str]): SQL text, e.g. an open file; line endings kept
+
+    Yields:
+        str: one stripped statement at a time
+    """
+    buffer = []
+    has_code = False
+    state = None  # None, "'", '"', "/*" or a dollar quote tag
+    escapes = False
+    depth = 0
+
+    for line in lines:
+        pos = 0
+        end = len(line)
+        while pos < end:
+            if state is None:
+                match = _NORMAL.search(line, pos)
+                if match is None:
+                    if line[pos:].strip():
+                        has_code = True
+                    buffer.append(line[pos:])
+                    break
+                start, stop = match.span()
+                token = match.group()
+                if line[pos:start].strip():
+                    has_code = True
+
+                if token == ";":
+                    buffer.append(line[pos:start])
+                    if has_code:
+                        yield "".join(buffer).strip()
+                    buffer = []
+                    has_code = False
+                elif token == "--":
+                    # Line comment runs to the end of the line
+                    buffer.append(line[pos:])
+                    stop = end
+                elif token == "/*":
+                    buffer.append(line[pos:stop])
+                    state, depth = "/*", 1
+                elif token[0] == "$" and start and _is_word_char(line[start - 1]):
+                    # `$` inside an identifier, not a quote
+                    buffer.append(line[pos : start + 1])
+                    stop = start + 1
+                    has_code = True
+                else:
+                    buffer.append(line[pos:stop])
+                    has_code = True
+                    state = token
+                    escapes = (
+                        token == "'"
+                        and start > 0
+                        and line[start - 1] in "eE"
+                        and (start < 2 or not _is_word_char(line[start - 2]))
+                    )
+                pos = stop
+            elif state == "/*":
+                match = _BLOCK_COMMENT.search(line, pos)
+                if match is None:
+                    buffer.append(line[pos:])
+                    break
+                depth += 1 if match.group() == "/*" else -1
+                if depth == 0:
+                    state = None
+                buffer.append(line[pos : match.end()])
+                pos = match.end()
+            elif state == "'":
+                match = (_ESCAPED_QUOTE if escapes else _QUOTE).search(line, pos)
+                if match is None:
+                    buffer.append(line[pos:])
+                    break
+                stop = match.end()
+                if match.group() == "'":
+                    if line.startswith("'", stop):
+                        stop += 1  # doubled quote inside the string
+                    else:
+                        state = None
+                buffer.append(line[pos:stop])
+                pos = stop
+            elif state == '"':
+                match = _IDENTIFIER.search(line, pos)
+                if match is None:
+                    buffer.append(line[pos:])
+                    break
+                stop = match.end()
+                if line.startswith('"', stop):
+                    stop += 1
+                else:
+                    state = None
+                buffer.append(line[pos:stop])
+                pos = stop
+            else:
+                # Inside a dollar quoted body, look for the closing tag only
+                close = line.find(state, pos)
+                if close == -1:
+                    buffer.append(line[pos:])
+                    break
+                stop = close + len(state)
+                buffer.append(line[pos:stop])
+                state = None
+                pos = stop
+
+    if has_code:
+        yield "".join(buffer).strip()
+
+
+def split_statements(sql_script: str) -> list[str]:
+    """Split a script string into statements."""
+    return list(iter_statements(sql_script.splitlines(keepends=True)))
+
+
+def read_statements(path: str, encoding: str = "utf-8") -> Iterator[str]:
+    """Lazily yield statements from a SQL file."""
+    with open(path, "r", encoding=encoding) as sql_file:
+        yield from iter_statements(sql_file)
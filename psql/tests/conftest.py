@@ -0,0 +1,45 @@
+import os
+
+import psycopg as psql
+import pytest
+
+from schema import load_schema
+from seed import Workload, load
+
+# .env file variables
+POSTGRES_DATABASE = os.environ.get("POSTGRES_DATABASE", default="ems")
+POSTGRES_HOST = os.environ.get("POSTGRES_HOST", default="db")
+POSTGRES_USER = os.environ.get("POSTGRES_USER", default="postgres")
+POSTGRES_PORT = os.environ.get("POSTGRES_PORT", default=5432)
+POSTGRES_PASSWORD = os.environ.get("POSTGRES_PASSWORD")
+
+# Postgres database configuration
+conn_config = {
+    "user": POSTGRES_USER,
+    "password": POSTGRES_PASSWORD,
+    "host": POSTGRES_HOST,
+    "port": POSTGRES_PORT,
+    "dbname": POSTGRES_DATABASE,
+}
+
+
+@pytest.fixture(scope="module")
+def workload(request):
+    """A fresh schema loaded with a synthetic workload, once per module.
+
+    The seed is 1, or the value of an indirect parametrization:
+    `@pytest.mark.parametrize("workload", [7], indirect=True)`.
+    """
+    workload = Workload(scale=0.05, seed=getattr(request, "param", 1))
+    with psql.connect(**conn_config) as connection:
+        load_schema(connection)
+        load(connection, workload)
+    return workload
+
+
+@pytest.fixture
+def connection(workload):
+    """A connection to the loaded workload, its changes rolled back."""
+    with psql.connect(**conn_config) as connection:
+        yield connection
+        connection.rollback()
@@ -0,0 +1,136 @@
+import asyncio
+
+import psycopg as psql
+import pytest
+from conftest import POSTGRES_DATABASE, conn_config
+
+import aiodb
+from pool import AsyncPool
+from runner import BATCH, AsyncScriptRunner
+from schema import load_schema, load_schema_async
+from seed import Workload, load
+
+
+def run(coroutine):
+    """Run a scenario on a fresh event loop, closing the module pool after it."""
+
+    async def scenario():
+        try:
+            return await coroutine
+        finally:
+            await aiodb.pool.close()
+
+    return asyncio.run(scenario())
+
+
+@pytest.fixture
+def empty_database():
+    with psql.connect(**conn_config) as connection:
+        connection.execute("DROP SCHEMA public CASCADE")
+        connection.execute("CREATE SCHEMA public")
+
+
+def count(query, params=None):
+    with psql.connect(**conn_config) as connection:
+        return connection.execute(query, params).fetchone()[0]
+
+
+def test_load_schema_async_creates_the_schema(empty_database):
+    async def scenario():
+        async with await psql.AsyncConnection.connect(**conn_config) as cnx:
+            return await load_schema_async(cnx)
+
+    timings = asyncio.run(scenario())
+
+    assert timings
+    assert count("SELECT to_regclass('results') IS NOT NULL")
+
+
+def test_async_runner_isolates_failing_statements(empty_database):
+    async def scenario():
+        async with await psql.AsyncConnection.connect(**conn_config) as cnx:
+            await cnx.execute('CREATE TABLE "runner_probe" ("id" INT PRIMARY KEY)')
+            await cnx.commit()
+            runner = AsyncScriptRunner(cnx, mode=BATCH, batch_size=2)
+            seen = []
+
+            async def on_result(cursor, query):
+                if cursor.description:
+                    seen.append(await cursor.fetchall())
+
+            stats = await runner.run(
+                [
+                    'INSERT INTO "runner_probe" VALUES (1)',
+                    'INSERT INTO "runner_probe" VALUES (1)',
+                    'INSERT INTO "runner_probe" VALUES (2)',
+                    'SELECT COUNT(*) FROM "runner_probe"',
+                ],
+                on_result=on_result,
+            )
+            return stats, seen
+
+    stats, seen = asyncio.run(scenario())
+
+    assert stats == {"executed": 3, "failed": 1, "commits": 2, "rolled_back": 0}
+    assert seen == [[(2,)]]
+    assert count('SELECT COUNT(*) FROM "runner_probe"') == 2
+
+
+def test_async_pool_serves_concurrent_tasks():
+    async def backend_pid(pool):
+        async with pool.connection() as cnx:
+            await asyncio.sleep(0.01)
+            return (await (await cnx.execute("SELECT pg_backend_pid()")).fetchone())[0]
+
+    async def scenario():
+        async with AsyncPool(conn_config, min_size=1, max_size=3) as pool:
+            pids = await asyncio.gather(*(backend_pid(pool) for _ in range(30)))
+            return set(pids), pool.stats()
+
+    pids, stats = asyncio.run(scenario())
+
+    assert 1 <= len(pids) <= 3
+    assert stats["acquire_count"] == 30
+
+
+def test_execute_and_print_runs_the_script(empty_database, capsys):
+    async def scenario():
+        await aiodb.create_schema(POSTGRES_DATABASE)
+        return await aiodb.execute_and_print(
+            'INSERT INTO "students" ("first_name", "last_name", "password", "email") '
+            "VALUES ('Ada', 'Lovelace', 'secret', 'ada@example.com');\n"
+            'SELECT "first_name" FROM "students";\n'
+            'SELECT * FROM "missing_table";',
+            "probe",
+        )
+
+    stats = run(scenario())
+
+    out = capsys.readouterr().out
+    assert stats["executed"] == 2 and stats["failed"] == 1
+    assert "--- Executing probe ---" in out
+    assert "| Ada" in out
+
+
+def test_submit_results_from_concurrent_clients():
+    workload = Workload(scale=0.05, seed=4)
+    with psql.connect(**conn_config) as connection:
+        load_schema(connection)
+        load(connection, workload)
+        # Keep the sessions, the answers are submitted again below
+        connection.execute('DELETE FROM "tests_sessions_scores"')
+        connection.execute('DELETE FROM "results"')
+    answers = list(workload.results())
+    clients = [answers[i::20] for i in range(20)]
+
+    async def scenario():
+        return await asyncio.gather(
+            *(aiodb.submit_results(rows, batch_size=16) for rows in clients)
+        )
+
+    submitted = run(scenario())
+
+    assert sum(submitted) == len(answers)
+    assert count('SELECT COUNT(*) FROM "results"') == len(answers)
+    # The scoring trigger ran for every pipelined insert
+    assert count('SELECT COUNT(*) FROM "results" WHERE "feedback" IS NULL') == 0
@@ -0,0 +1,67 @@
+import pytest
+
+import db
+from catalog import load_paper, sizeof
+from queries import LOOKUPS
+from resultcache import sizeof as rows_sizeof
+
+BY_TITLE = LOOKUPS["test_questions_option_search_by_title"]
+
+
+def test_paper_rows_match_the_view(workload, connection):
+    for test_id, title, *_ in workload.tests():
+        paper = load_paper(connection, test_id)
+        view = connection.execute(BY_TITLE, {"title": title}).fetchall()
+
+        assert sorted(paper.rows()) == sorted(view)
+
+
+def test_options_are_grouped_by_question_in_id_order(workload, connection):
+    paper = load_paper(connection, 1)
+    ids = [question.id for question in paper.questions]
+    expected = [
+        (question_id, id, option, is_correct)
+        for id, question_id, option, is_correct in workload.questions_options()
+        if question_id in ids
+    ]
+
+    assert ids == sorted(ids)
+    assert [
+        (question.id, option.id, option.option, option.is_correct)
+        for question in paper.questions
+        for option in question.options
+    ] == expected
+
+
+def test_repeated_strings_are_shared(connection):
+    first, second = load_paper(connection, 1), load_paper(connection, 2)
+    questions = first.questions + second.questions
+
+    assert len({id(question.type) for question in questions}) == len(
+        {question.type for question in questions}
+    )
+    assert first.questions[0].options[0].option is second.questions[0].options[0].option
+
+
+def test_a_paper_is_smaller_than_the_view_rows(workload, connection):
+    _, title, *_ = next(workload.tests())
+    view = connection.execute(BY_TITLE, {"title": title}).fetchall()
+
+    assert sizeof(load_paper(connection, 1)) < rows_sizeof(view) / 2
+
+
+def test_unknown_tests_raise_key_error(connection):
+    with pytest.raises(KeyError):
+        load_paper(connection, 0)
+
+
+def test_db_paper_is_shared_until_the_catalog_changes(workload):
+    try:
+        first = db.paper(1)
+        assert db.paper(1) is first
+        assert db.paper(1, cached=False) is not first
+        db.result_cache.invalidate(["questions_options"])
+        assert db.paper(1) is not first
+    finally:
+        db.cache_listener.stop()
+        db.pool.close()
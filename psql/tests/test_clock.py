@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+import psycopg as psql
+import pytest
+from conftest import conn_config
+
+from clock import SimulatedClock, WallClock, using
+
+START = datetime(2025, 1, 6, 9, 0, 0).astimezone()
+
+with open("queries.sql", "r") as sql_file:
+    Q1, Q2 = sql_file.read().split("$$$testbreak", maxsplit=1)
+
+
+@pytest.fixture
+def connection():
+    connection = psql.connect(**conn_config, autocommit=True)
+    with open("schema.sql", "r") as sql_file:
+        connection.execute(sql_file.read())
+    yield connection
+    connection.close()
+
+
+def ems_now(connection):
+    return connection.execute("SELECT ems_now()").fetchone()[0]
+
+
+def test_simulated_clock_drives_the_triggers(connection):
+    clock = SimulatedClock(START)
+    with using(connection, clock):
+        connection.execute(Q1)
+    clock.sleep(90 * 60)
+    with using(connection, clock):
+        connection.execute(Q2)
+
+    sessions = connection.execute(
+        'SELECT "start", "end", "duration_taken" FROM "tests_sessions" ORDER BY "id"'
+    ).fetchall()
+    assert sessions[0] == (
+        START,
+        START + timedelta(minutes=30),
+        timedelta(minutes=90),
+    )
+    assert sessions[1][2] == timedelta(minutes=90)
+    (proctoring_end,) = connection.execute(
+        'SELECT "end" FROM "proctoring_sessions" WHERE "id" = 1'
+    ).fetchone()
+    assert proctoring_end == START + timedelta(minutes=90)
+
+
+def test_clock_is_reset_after_the_block(connection):
+    with using(connection, SimulatedClock(START)):
+        assert ems_now(connection) == START
+
+    assert abs(ems_now(connection) - datetime.now().astimezone()) < timedelta(seconds=5)
+
+
+def test_clock_is_per_session(connection):
+    other = psql.connect(**conn_config, autocommit=True)
+    with using(connection, SimulatedClock(START)):
+        assert ems_now(other) != START
+    other.close()
+
+
+def test_failed_transaction_still_resets_the_clock(connection):
+    connection.autocommit = False
+    with (
+        pytest.raises(psql.errors.UndefinedTable),
+        using(connection, SimulatedClock(START)),
+    ):
+        connection.execute('SELECT * FROM "no_such_table"')
+
+    assert ems_now(connection) != START
+    with using(connection, WallClock()):
+        assert ems_now(connection) != START
+    connection.rollback()
+
+
+def test_clock_does_not_commit_pending_work(connection):
+    connection.autocommit = False
+    connection.execute('CREATE TABLE "clock_probe" ("id" INTEGER)')
+    with using(connection, SimulatedClock(START)):
+        assert ems_now(connection) == START
+    connection.rollback()
+
+    probe = connection.execute("SELECT to_regclass('clock_probe')").fetchone()
+    assert probe == (None,)
+    assert ems_now(connection) != START
+    connection.rollback()
+    # Entered with nothing pending: committed on its own
+    with using(connection, SimulatedClock(START)):
+        connection.execute('CREATE TABLE "clock_probe" ("id" INTEGER)')
+        connection.rollback()
+        assert ems_now(connection) == START
+    connection.rollback()
+    assert ems_now(connection) != START
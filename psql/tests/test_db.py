@@ -1,27 +1,24 @@
-import os
-from time import sleep
+from datetime import timedelta
 
 import psycopg as psql
 import pytest
+from conftest import conn_config
 
-# .env file variables
-POSTGRES_DATABASE = os.environ.get("POSTGRES_DATABASE", default="ems")
-POSTGRES_HOST = os.environ.get("POSTGRES_HOST", default="db")
-POSTGRES_USER = os.environ.get("POSTGRES_USER", default="postgres")
-POSTGRES_PORT = os.environ.get("POSTGRES_PORT", default=5432)
-POSTGRES_PASSWORD = os.environ.get("POSTGRES_PASSWORD")
-
-# Postgres database configuration
-conn_config = {
-    "user": POSTGRES_USER,
-    "password": POSTGRES_PASSWORD,
-    "host": POSTGRES_HOST,
-    "port": POSTGRES_PORT,
-    "dbname": POSTGRES_DATABASE,
-}
+from clock import SimulatedClock, using
+from db import RESULT_INSERT
+from runner import write_pipelined
 
 TEST_COMPLETION_TIME = 3
 
+# What `tests_history` read before it was materialized
+HISTORY_JOIN = (
+    'SELECT "TS"."student_id", "T"."title", "R"."total_score", '
+    '"R"."final_score", "R"."overall_feedback", "TS"."duration_taken" '
+    'FROM "reports" AS "R" '
+    'JOIN "tests_sessions" AS "TS" ON "R"."test_session_id" = "TS"."id" '
+    'JOIN "tests" AS "T" ON "TS"."test_id" = "T"."id"'
+)
+
 
 def run_create_schema(connection) -> None:
     """Create schema using SQL executed directly via psycopg, supports large scripts."""
@@ -49,13 +46,14 @@ def db_connection():
     run_create_schema(connection)
     q1, q2 = load_sql_queries("queries.sql")
 
-    with connection.cursor() as cursor:
+    clock = SimulatedClock()
+    with using(connection, clock), connection.cursor() as cursor:
         cursor.execute(q1)
         connection.commit()
 
-    sleep(TEST_COMPLETION_TIME)  # simulate async operation/wait
+    clock.sleep(TEST_COMPLETION_TIME)  # instant
 
-    with connection.cursor() as cursor:
+    with using(connection, clock), connection.cursor() as cursor:
         cursor.execute(q2)
         connection.commit()
 
@@ -176,6 +174,19 @@ def test_final_reports_state(db_connection):
     assert reports == expected_reports
 
 
+def test_view_tests_sessions_live_scores(db_connection):
+    scores = fetch_results(
+        db_connection,
+        """
+        SELECT test_session_id, answered, correct
+        FROM tests_sessions_live_scores
+        ORDER BY test_session_id
+    """,
+    )
+
+    assert scores == [(1, 2, 2), (2, 2, 1)]
+
+
 def test_view_tests_history_john_doe(db_connection):
     history = fetch_results(
         db_connection,
@@ -192,6 +203,43 @@ def test_view_tests_history_john_doe(db_connection):
     assert history == expected_history
 
 
+def test_tests_history_summary_follows_reports(db_connection):
+    history = 'SELECT * FROM "tests_history"'
+
+    with db_connection.transaction(force_rollback=True):
+        # Same rows as the join the view used to run on every read
+        before = sorted(fetch_results(db_connection, history))
+        joined = sorted(fetch_results(db_connection, HISTORY_JOIN))
+        db_connection.execute('UPDATE "tests" SET "title" = \'renamed\' WHERE "id" = 1')
+        after = sorted(fetch_results(db_connection, history))
+
+    assert before == joined
+    assert [row[1] for row in after] == ["renamed", "renamed"]
+
+
+def test_tests_history_summary_follows_report_and_session_changes(db_connection):
+    summary = (
+        'SELECT "report_id", "student_id", "test_id", "total_score", "scored", '
+        '"duration_taken" FROM "tests_history_summary" ORDER BY "report_id"'
+    )
+
+    with db_connection.transaction(force_rollback=True):
+        db_connection.execute(
+            'UPDATE "reports" SET "total_score" = 99, "final_score" = 98 WHERE "id" = 1'
+        )
+        db_connection.execute('DELETE FROM "reports" WHERE "id" = 2')
+        db_connection.execute(
+            'UPDATE "tests_sessions" SET "student_id" = 2, "test_id" = 2, '
+            '"duration_taken" = \'00:42:00\' WHERE "id" = 1'
+        )
+        history = sorted(fetch_results(db_connection, 'SELECT * FROM "tests_history"'))
+        joined = sorted(fetch_results(db_connection, HISTORY_JOIN))
+        rows = fetch_results(db_connection, summary)
+
+    assert history == joined
+    assert rows == [(1, 2, 2, 99, 98, timedelta(minutes=42))]
+
+
 def test_view_test_questions_option_search_demo(db_connection):
     options = fetch_results(
         db_connection,
@@ -224,3 +272,50 @@ def test_view_suspicious_behaviour_search_ended(db_connection):
     expected_suspicious = [(2, 2, "not present in front of screen")]
 
     assert suspicious == expected_suspicious
+
+
+def test_pipelined_results_fire_the_scoring_trigger(db_connection):
+    query = (
+        'SELECT "answered", "correct" FROM "tests_sessions_scores" '
+        'WHERE "test_session_id" = 1'
+    )
+    # Session 1 answers its two questions again, one right and one wrong
+    answers = [(1, 1, 3), (1, 2, 6)] * 50
+
+    with db_connection.transaction(force_rollback=True):
+        (before,) = fetch_results(db_connection, query)
+        rows = write_pipelined(db_connection, RESULT_INSERT, answers, batch_size=16)
+        (after,) = fetch_results(db_connection, query)
+
+    assert rows == 100
+    assert (after[0] - before[0], after[1] - before[1]) == (100, 50)
+
+
+def test_corrected_and_deleted_answers_update_the_counters(db_connection):
+    scores = (
+        'SELECT "test_session_id", "answered", "correct" '
+        'FROM "tests_sessions_scores" ORDER BY "test_session_id"'
+    )
+    last_report = (
+        'SELECT "total_score", "final_score", "overall_feedback" FROM "reports" '
+        'WHERE "test_session_id" = 1 ORDER BY "id" DESC LIMIT 1'
+    )
+
+    with db_connection.transaction(force_rollback=True):
+        db_connection.execute('UPDATE "results" SET "score" = 0 WHERE "id" = 1')
+        db_connection.execute(
+            'UPDATE "results" SET "test_session_id" = 1 WHERE "id" = 3'
+        )
+        db_connection.execute('DELETE FROM "results" WHERE "id" = 4')
+        counters = fetch_results(db_connection, scores)
+        # Closing the session again reports from the corrected counters
+        db_connection.execute(
+            'UPDATE "tests_sessions" SET "status" = \'in-progress\' WHERE "id" = 1'
+        )
+        db_connection.execute(
+            'UPDATE "tests_sessions" SET "status" = \'completed\' WHERE "id" = 1'
+        )
+        (report,) = fetch_results(db_connection, last_report)
+
+    assert counters == [(1, 3, 1), (2, 0, 0)]
+    assert report == (3, 1, "need-improvement")
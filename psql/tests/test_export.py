@@ -0,0 +1,82 @@
+import csv
+import json
+import os
+
+import psycopg as psql
+import pytest
+from conftest import conn_config
+
+from export import ResultExporter, copy_csv, export_query, make_sink
+
+QUERY = (
+    "SELECT n AS id, 'row ' || n AS label, "
+    "CASE WHEN n % 2 = 0 THEN NULL ELSE n * interval '1 minute' END AS taken "
+    "FROM generate_series(1, 1200) AS n"
+)
+
+
+def test_copy_csv_matches_the_query(tmp_path):
+    connection = psql.connect(**conn_config)
+    path = tmp_path / "rows.csv"
+
+    rows = copy_csv(connection, QUERY, path)
+
+    with open(path, newline="") as exported:
+        lines = list(csv.reader(exported))
+    assert rows == 1200
+    assert lines[0] == ["id", "label", "taken"]
+    assert lines[1] == ["1", "row 1", "00:01:00"]
+    assert lines[2] == ["2", "row 2", ""]
+    connection.close()
+
+
+def test_export_query_jsonl_streams_every_row(tmp_path):
+    connection = psql.connect(**conn_config)
+    path = tmp_path / "rows.jsonl"
+
+    rows = export_query(connection, QUERY, path, "jsonl", batch_size=100)
+
+    with open(path) as exported:
+        records = [json.loads(line) for line in exported]
+    assert rows == len(records) == 1200
+    assert records[0] == {"id": 1, "label": "row 1", "taken": "0:01:00"}
+    assert records[1]["taken"] is None
+    connection.close()
+
+
+def test_export_query_parquet_keeps_types(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    connection = psql.connect(**conn_config)
+    path = tmp_path / "rows.parquet"
+
+    rows = export_query(connection, QUERY, path, "parquet", batch_size=100)
+
+    table = pq.read_table(path)
+    assert rows == table.num_rows == 1200
+    assert pq.ParquetFile(path).num_row_groups == 12
+    assert str(table.schema.field("id").type) == "int64"
+    assert table.column("label")[1199].as_py() == "row 1200"
+    connection.close()
+
+
+def test_result_exporter_numbers_result_sets(tmp_path):
+    connection = psql.connect(**conn_config)
+    exporter = ResultExporter(tmp_path / "out", "csv")
+
+    with connection.cursor() as cursor:
+        for query in ("SELECT 1 AS one", "SELECT 2 AS two WHERE false"):
+            cursor.execute(query)
+            exporter(cursor, query)
+
+    assert [os.path.basename(path) for path, _ in exporter.files] == [
+        "result-001.csv",
+        "result-002.csv",
+    ]
+    assert [rows for _, rows in exporter.files] == [1, 0]
+    assert (tmp_path / "out" / "result-002.csv").read_text().splitlines() == ["two"]
+    connection.close()
+
+
+def test_make_sink_rejects_unknown_formats(tmp_path):
+    with pytest.raises(ValueError):
+        make_sink(tmp_path / "rows.xml", "xml")
@@ -0,0 +1,97 @@
+import psycopg as psql
+import pytest
+from conftest import conn_config
+
+from bench import QUERIES, plan_shape
+from schema import load_schema
+from seed import Workload, load
+
+
+@pytest.fixture(scope="module")
+def connection():
+    connection = psql.connect(**conn_config)
+    load_schema(connection)
+    # Large enough that the planner prefers indexes over sequential scans
+    load(connection, Workload(scale=0.5, seed=1))
+    connection.commit()
+    connection.autocommit = True
+    connection.execute("VACUUM ANALYZE")
+    yield connection
+    connection.close()
+
+
+def uses_index(connection, query, index):
+    shape = plan_shape(connection, query, {"id": 1})
+    return any(f" using {index} " in label for label in shape)
+
+
+def reads_suspicious_index(shape):
+    # `idx_events_suspicious` as created on the partitions of `events`
+    return any(
+        label.startswith("Index Only Scan using events_")
+        and "_proctoring_session_id_" in label
+        for label in shape
+    )
+
+
+def test_report_aggregates_use_results_index(connection):
+    # `update_status_end_final_score_all` aggregates results per session
+    query = (
+        'SELECT COUNT(*), COALESCE(SUM("score"), 0), MAX("feedback") '
+        'FROM "results" WHERE "test_session_id" = %(id)s'
+    )
+    shape = plan_shape(connection, query, {"id": 1})
+    assert "Index Only Scan using idx_results on results" in shape
+
+
+def test_proctoring_session_lookups_use_index(connection):
+    assert uses_index(
+        connection,
+        'SELECT "id" FROM "proctoring_sessions" '
+        'WHERE "test_session_id" = %(id)s LIMIT 1',
+        "idx_proctoring_sessions",
+    )
+    assert uses_index(
+        connection,
+        'UPDATE "proctoring_sessions" SET "status" = \'completed\' '
+        'WHERE "test_session_id" = %(id)s AND "status" = \'active\'',
+        "idx_proctoring_sessions",
+    )
+
+
+def test_suspicious_behaviour_view_uses_partial_index(connection):
+    # `events` is partitioned by month, `idx_events_suspicious` is created on
+    # every partition and holds the projected columns
+    shape = plan_shape(
+        connection,
+        'SELECT * FROM "test_sessions_suspicious_behaviour_search" '
+        'WHERE "test_session_id" = %(id)s',
+        {"id": 1},
+    )
+    assert reads_suspicious_index(shape)
+
+
+def test_proctor_alerts_use_the_proctor_and_partial_indexes(connection):
+    shape = plan_shape(connection, QUERIES["proctor_alerts"], {"proctor_id": 1})
+
+    assert any("using idx_proctoring_sessions_proctor_id" in label for label in shape)
+    assert reads_suspicious_index(shape)
+    # Months with a handful of rows may still be cheaper to scan
+    assert "Seq Scan on proctoring_sessions" not in shape
+    assert "Seq Scan on tests_sessions" not in shape
+
+
+def test_live_scores_view_is_a_key_lookup(connection):
+    assert uses_index(
+        connection,
+        'SELECT * FROM "tests_sessions_live_scores" WHERE "test_session_id" = %(id)s',
+        "tests_sessions_scores_pkey",
+    )
+
+
+def test_tests_history_is_an_index_probe(connection):
+    assert uses_index(
+        connection,
+        'SELECT * FROM "tests_history" WHERE "student_id" = %(id)s',
+        "idx_tests_history_summary",
+    )
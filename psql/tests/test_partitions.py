@@ -0,0 +1,105 @@
+import csv
+import gzip
+from datetime import date, datetime
+
+import psycopg as psql
+import pytest
+from conftest import conn_config
+
+from bench import plan_shape
+from clock import SimulatedClock, using
+from partitions import add_months, ensure_partitions, maintain, partitions
+
+START = datetime(2025, 1, 6, 9, 0, 0).astimezone()
+
+with open("queries.sql", "r") as sql_file:
+    Q1, Q2 = sql_file.read().split("$$$testbreak", maxsplit=1)
+
+
+@pytest.fixture
+def connection():
+    connection = psql.connect(**conn_config, autocommit=True)
+    with open("schema.sql", "r") as sql_file:
+        connection.execute(sql_file.read())
+    yield connection
+    connection.close()
+
+
+def count(connection, table):
+    return connection.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+
+def months(connection):
+    return [f"{period:%Y%m}" for _, period in partitions(connection)]
+
+
+def test_add_months():
+    assert add_months(date(2025, 11, 20), 3) == date(2026, 2, 1)
+    assert add_months(date(2025, 1, 31), -1) == date(2024, 12, 1)
+
+
+def test_schema_creates_the_coming_partitions(connection):
+    today = date.today()
+
+    assert months(connection) == [f"{add_months(today, n):%Y%m}" for n in range(4)]
+
+
+def test_waiting_rows_get_their_partition(connection):
+    # The simulated test sessions run in January 2025: no partition yet
+    with using(connection, SimulatedClock(START)):
+        connection.execute(Q1)
+    waiting = count(connection, "events_default")
+    assert waiting > 0
+
+    created = ensure_partitions(connection, ahead=0)
+
+    assert created == ["events_202501"]
+    assert count(connection, "events_default") == 0
+    assert count(connection, "events_202501") == waiting
+    assert ensure_partitions(connection, ahead=0) == []
+
+
+def test_time_range_queries_only_scan_their_partition(connection):
+    with using(connection, SimulatedClock(START)):
+        connection.execute(Q1)
+    ensure_partitions(connection, since=datetime(2024, 11, 1).astimezone())
+
+    shape = plan_shape(
+        connection,
+        'SELECT * FROM "test_sessions_suspicious_behaviour_search" '
+        'WHERE "timestamp" >= %(since)s AND "timestamp" < %(until)s',
+        {
+            "since": datetime(2025, 1, 1).astimezone(),
+            "until": datetime(2025, 2, 1).astimezone(),
+        },
+    )
+
+    scanned = {label.rsplit(" on ", 1)[1] for label in shape if " on events" in label}
+    assert scanned == {"events_202501"}
+
+
+def test_expired_partitions_are_archived_and_dropped(connection, tmp_path):
+    with using(connection, SimulatedClock(START)):
+        connection.execute(Q1)
+        connection.execute(
+            'INSERT INTO "events" ("type", "timestamp", "description") '
+            "VALUES ('suspicious-behavior', '2024-12-31 23:00:00', 'old')"
+        )
+    events = count(connection, "events")
+    ensure_partitions(connection, ahead=0)
+    old = count(connection, "events_202412")
+
+    # One year and a bit later, only the current month and the last 12 stay
+    with using(connection, SimulatedClock(datetime(2026, 1, 15).astimezone())):
+        result = maintain(connection, keep_months=12, directory=tmp_path)
+
+    assert [name for name, _, _ in result["archived"]] == ["events_202412"]
+    _, path, rows = result["archived"][0]
+    assert rows == old
+    with gzip.open(path, "rt", newline="") as archive:
+        archived = list(csv.DictReader(archive))
+    assert len(archived) == old
+    assert archived[-1]["description"] == "old"
+    assert "202412" not in months(connection)
+    assert "202501" in months(connection)
+    assert count(connection, "events") == events - old
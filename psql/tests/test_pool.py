@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import conn_config
+
+from pool import LazyPool, Pool
+
+
+def backend_pid(pool):
+    with pool.connection() as cnx:
+        return cnx.execute("SELECT pg_backend_pid()").fetchone()[0]
+
+
+def test_pool_reuses_connections():
+    with Pool(conn_config, min_size=1, max_size=1) as pool:
+        assert backend_pid(pool) == backend_pid(pool)
+        assert pool.stats()["acquire_count"] == 2
+
+
+def test_pool_serves_concurrent_callers():
+    with Pool(conn_config, min_size=1, max_size=3) as pool:
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            pids = set(executor.map(lambda _: backend_pid(pool), range(30)))
+
+        stats = pool.stats()
+    assert 1 <= len(pids) <= 3
+    assert stats["acquire_count"] == 30
+    assert stats["acquire_max_ms"] >= stats["acquire_p50_ms"] >= 0
+
+
+def test_pool_rolls_back_on_error():
+    with Pool(conn_config, min_size=1, max_size=1) as pool:
+        try:
+            with pool.connection() as cnx:
+                cnx.execute('CREATE TABLE "pool_probe" ("id" INT)')
+                raise RuntimeError("abort")
+        except RuntimeError:
+            pass
+
+        with pool.connection() as cnx:
+            exists = cnx.execute("SELECT to_regclass('pool_probe')").fetchone()[0]
+    assert exists is None
+
+
+def test_lazy_pool_opens_on_first_use():
+    opened = []
+
+    def factory():
+        opened.append(Pool(conn_config, min_size=1, max_size=1))
+        opened[-1].open()
+        return opened[-1]
+
+    lazy = LazyPool(factory)
+    assert not opened and lazy.stats() == {}
+    with lazy.connection():
+        pass
+    with lazy.connection():
+        pass
+    assert len(opened) == 1
+    assert lazy.stats()["acquire_count"] == 2
+    lazy.close()
+    assert not lazy.opened
+
+
+def test_import_does_not_connect(tmp_path):
+    # An unresolvable host would stall on connection retries if db connected
+    env = {
+        **os.environ,
+        "POSTGRES_HOST": "unreachable.invalid",
+        "PYTHONPATH": os.getcwd(),
+    }
+    subprocess.run(
+        [sys.executable, "-c", "import db"],
+        cwd=tmp_path,
+        env=env,
+        check=True,
+        timeout=5,
+    )
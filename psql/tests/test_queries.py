@@ -0,0 +1,77 @@
+import psycopg as psql
+from conftest import conn_config
+
+from queries import LOOKUPS, StatementCache, cache_for
+
+
+def prepared(connection):
+    return {
+        row[0]
+        for row in connection.execute(
+            "SELECT statement FROM pg_prepared_statements"
+        ).fetchall()
+    }
+
+
+def test_lookups_match_literal_queries(workload, connection):
+    cache = StatementCache(connection)
+    email = next(workload.students())[4]
+
+    rows = cache.lookup("tests_history_by_email", {"email": email})
+
+    literal = connection.execute(
+        'SELECT * FROM "tests_history" WHERE "student_id" = ('
+        'SELECT "id" FROM "students" WHERE "email" = %s)',
+        (email,),
+        prepare=False,
+    ).fetchall()
+    assert rows == literal
+
+
+def test_repeated_lookups_reuse_the_prepared_statement(workload, connection):
+    cache = StatementCache(connection)
+    title = next(workload.tests())[1]
+
+    for _ in range(3):
+        cache.lookup("test_questions_option_search_by_title", {"title": title})
+    cache.lookup(
+        "test_sessions_suspicious_behaviour_search_by_status", {"status": "ended"}
+    )
+
+    assert cache.stats() == {
+        "hits": 2,
+        "misses": 2,
+        "evictions": 0,
+        "size": 2,
+        "maxsize": 100,
+    }
+    assert len(prepared(connection)) == 2
+
+
+def test_eviction_deallocates_the_oldest_statement(connection):
+    cache = StatementCache(connection, maxsize=2)
+
+    for query in ("SELECT 1", "SELECT 2", "SELECT 1", "SELECT 3"):
+        cache.execute(query).fetchall()
+
+    assert cache.stats()["evictions"] == 1
+    # "SELECT 2" was the least recently used
+    statements = prepared(connection)
+    assert len(statements) == 2
+    assert not any("2" in statement for statement in statements)
+
+
+def test_cache_for_keeps_one_cache_per_connection():
+    first = psql.connect(**conn_config)
+    second = psql.connect(**conn_config)
+
+    assert cache_for(first) is cache_for(first)
+    assert cache_for(first) is not cache_for(second)
+    assert set(LOOKUPS) == {
+        "tests_history_by_email",
+        "test_questions_option_search_by_title",
+        "test_questions_option_search_by_is_correct",
+        "test_sessions_suspicious_behaviour_search_by_status",
+    }
+    first.close()
+    second.close()
@@ -0,0 +1,188 @@
+from time import monotonic, sleep
+
+import psycopg as psql
+import pytest
+from conftest import conn_config
+
+import db
+from queries import CACHED_LOOKUPS, LOOKUPS
+from resultcache import CATALOG_TABLES, ChangeListener, ResultCache, cache_key
+from schema import load_schema
+from seed import load
+
+BY_TITLE = LOOKUPS["test_questions_option_search_by_title"]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hits_misses_and_normalized_keys():
+    cache = ResultCache()
+    loads = []
+
+    def load():
+        loads.append(1)
+        return [(1, "a")]
+
+    cache.fetch("SELECT  *\n FROM t WHERE x = %(x)s", {"x": 1}, ("t",), load)
+    rows = cache.fetch("SELECT * FROM t WHERE x = %(x)s", {"x": 1}, ("t",), load)
+    cache.fetch("SELECT * FROM t WHERE x = %(x)s", {"x": 2}, ("t",), load)
+
+    assert rows == [(1, "a")]
+    assert len(loads) == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["hit_rate"] == pytest.approx(1 / 3)
+
+
+def test_entries_expire_after_the_ttl():
+    clock = FakeClock()
+    cache = ResultCache(ttl=10, clock=clock)
+    key = cache_key("SELECT 1")
+    cache.put(key, [(1,)], ("t",))
+
+    clock.now = 9.9
+    assert cache.get(key) == [(1,)]
+    clock.now = 10
+    assert cache.get(key) is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["bytes"] == 0
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    rows = [(n, "x" * 100) for n in range(10)]
+    probe = ResultCache()
+    probe.put(cache_key("SELECT 0"), rows, ("t",))
+    cache = ResultCache(max_bytes=probe.bytes * 2)
+
+    for n in range(3):
+        cache.put(cache_key(f"SELECT {n}"), rows, ("t",))
+        # "SELECT 0" stays the most recently used
+        cache.get(cache_key("SELECT 0"))
+
+    assert cache.get(cache_key("SELECT 1")) is None
+    assert cache.get(cache_key("SELECT 0")) == rows
+    assert cache.stats()["evictions"] == 1
+    assert cache.bytes <= cache.max_bytes
+    # Larger than the whole cache: not cached at all
+    assert not cache.put(cache_key("SELECT big"), rows * 3, ("t",))
+
+
+def test_invalidation_drops_the_entries_of_a_table():
+    cache = ResultCache()
+    cache.put(cache_key("SELECT 1"), [(1,)], ("tests", "questions"))
+    cache.put(cache_key("SELECT 2"), [(2,)], ("students",))
+
+    assert cache.invalidate(["questions"]) == 1
+    assert cache.get(cache_key("SELECT 1")) is None
+    assert cache.get(cache_key("SELECT 2")) == [(2,)]
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
+
+
+def test_a_load_overlapping_an_invalidation_is_not_cached():
+    cache = ResultCache()
+
+    def load():
+        # The table changes while its rows are being read
+        cache.invalidate(["tests"])
+        return [(1,)]
+
+    assert cache.fetch("SELECT 1", None, ("tests",), load) == [(1,)]
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.fixture
+def listener(workload):
+    listener = ChangeListener(conn_config, ResultCache(), poll=0.05)
+    listener.start()
+    yield listener
+    listener.stop()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = monotonic() + timeout
+    while not condition():
+        assert monotonic() < deadline, "no notification received"
+        sleep(0.01)
+
+
+def test_catalog_changes_invalidate_cached_lookups(workload, listener):
+    cache = listener.cache
+    title = next(workload.tests())[1]
+    params = {"title": title}
+    tables = CACHED_LOOKUPS["test_questions_option_search_by_title"]
+    assert tables == CATALOG_TABLES
+
+    with psql.connect(**conn_config) as connection:
+
+        def read():
+            def load():
+                return connection.execute(BY_TITLE, params).fetchall()
+
+            return cache.fetch(BY_TITLE, params, tables, load)
+
+        before = read()
+        assert read() is before
+        connection.commit()
+
+        with psql.connect(**conn_config) as writer:
+            writer.execute(
+                'UPDATE "questions_options" SET "option" = "option" || \'!\' '
+                'WHERE "question_id" IN (SELECT "id" FROM "questions" '
+                'WHERE "test_id" = (SELECT "id" FROM "tests" WHERE "title" = %s))',
+                (title,),
+            )
+        wait_for(lambda: cache.stats()["entries"] == 0)
+
+        after = read()
+        assert len(after) == len(before) > 0
+        assert not any(option.endswith("!") for *_, option, _ in before)
+        assert all(option.endswith("!") for *_, option, _ in after)
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_uncommitted_changes_do_not_invalidate(workload, listener):
+    cache = listener.cache
+    cache.put(cache_key(BY_TITLE, {"title": "x"}), [], CATALOG_TABLES)
+
+    with psql.connect(**conn_config) as writer:
+        writer.execute('UPDATE "tests" SET "duration" = "duration"')
+        writer.rollback()
+    # Give a (wrong) notification time to arrive
+    sleep(0.2)
+
+    assert listener.notifications == 0
+    assert cache.stats()["entries"] == 1
+
+
+def test_reloading_the_schema_drops_every_entry(workload, listener):
+    cache = listener.cache
+    cache.put(cache_key("SELECT 1"), [(1,)], ("students",))
+
+    with psql.connect(**conn_config) as connection:
+        load_schema(connection)
+        load(connection, workload)
+
+    wait_for(lambda: cache.stats()["entries"] == 0)
+
+
+def test_db_lookup_reads_catalog_lookups_through_the_cache(workload):
+    params = {"title": next(workload.tests())[1]}
+    hits = db.result_cache.hits
+    try:
+        first = db.lookup("test_questions_option_search_by_title", params)
+        second = db.lookup("test_questions_option_search_by_title", params)
+        uncached = db.lookup("test_questions_option_search_by_title", params, False)
+    finally:
+        db.cache_listener.stop()
+        db.pool.close()
+
+    assert second is first
+    assert uncached == first and uncached is not first
+    assert db.result_cache.hits == hits + 1
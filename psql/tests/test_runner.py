@@ -0,0 +1,89 @@
+import psycopg as psql
+import pytest
+from conftest import conn_config
+
+from runner import BATCH, SCRIPT, STATEMENT, ScriptRunner
+
+ROWS = 'SELECT "id" FROM "runner_probe" ORDER BY "id"'
+# Raised like a real deadlock, the other session isn't needed
+DEADLOCK = (
+    "DO $$ BEGIN RAISE EXCEPTION 'deadlock' USING ERRCODE = 'deadlock_detected'; END $$"
+)
+
+
+def insert(id: int) -> str:
+    return f'INSERT INTO "runner_probe" ("id") VALUES ({id})'
+
+
+@pytest.fixture
+def connection():
+    connection = psql.connect(**conn_config)
+    connection.execute('DROP TABLE IF EXISTS "runner_probe"')
+    connection.execute('CREATE TABLE "runner_probe" ("id" INTEGER PRIMARY KEY)')
+    connection.commit()
+    yield connection
+    connection.rollback()
+    connection.execute('DROP TABLE "runner_probe"')
+    connection.commit()
+    connection.close()
+
+
+@pytest.fixture
+def observer():
+    """Another session: only sees what the runner committed."""
+    observer = psql.connect(**conn_config, autocommit=True)
+    yield observer
+    observer.close()
+
+
+def committed(observer) -> list:
+    return [id for (id,) in observer.execute(ROWS).fetchall()]
+
+
+def test_a_failing_statement_is_rolled_back_alone(connection):
+    runner = ScriptRunner(connection, mode=SCRIPT)
+    stats = runner.run([insert(1), insert(1), "SELECT 1 / 0", insert(2)])
+
+    assert stats == {"executed": 2, "failed": 2, "commits": 1, "rolled_back": 0}
+    assert connection.execute(ROWS).fetchall() == [(1,), (2,)]
+
+
+@pytest.mark.parametrize(
+    "mode, batch_size, seen, commits",
+    [
+        (STATEMENT, 2, [[], [1], [1, 2], [1, 2, 3], [1, 2, 3, 4]], 5),
+        (BATCH, 2, [[], [], [1, 2], [1, 2], [1, 2, 3, 4]], 3),
+        (SCRIPT, 2, [[], [], [], [], []], 1),
+    ],
+)
+def test_commits_follow_the_mode(connection, observer, mode, batch_size, seen, commits):
+    visible = []
+    runner = ScriptRunner(connection, mode=mode, batch_size=batch_size)
+    stats = runner.run(
+        [insert(id) for id in range(1, 6)],
+        on_result=lambda cursor, query: visible.append(committed(observer)),
+    )
+
+    # What other sessions saw when each statement had just run
+    assert visible == seen
+    assert stats["commits"] == commits
+    assert committed(observer) == [1, 2, 3, 4, 5]
+
+
+def test_a_deadlock_only_loses_its_statement_with_savepoints(connection):
+    runner = ScriptRunner(connection, mode=BATCH, batch_size=10)
+    stats = runner.run([insert(1), DEADLOCK, insert(2)])
+
+    assert stats == {"executed": 2, "failed": 1, "commits": 1, "rolled_back": 0}
+    assert connection.execute(ROWS).fetchall() == [(1,), (2,)]
+
+
+def test_a_deadlock_rolls_back_the_pending_batch_without_savepoints(
+    connection, observer
+):
+    runner = ScriptRunner(connection, mode=BATCH, batch_size=2, savepoints=False)
+    stats = runner.run([insert(1), insert(2), insert(3), DEADLOCK, insert(4)])
+
+    # 1 and 2 were committed as a batch, 3 was pending with the deadlock
+    assert stats == {"executed": 4, "failed": 1, "commits": 2, "rolled_back": 1}
+    assert committed(observer) == [1, 2, 4]
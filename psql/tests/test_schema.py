@@ -0,0 +1,39 @@
+import psycopg as psql
+import pytest
+from conftest import conn_config
+
+from schema import load_schema
+
+
+def fetch_tables(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT table_name FROM information_schema.tables "
+            "WHERE table_schema = 'public' ORDER BY table_name"
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def test_load_schema_in_process():
+    connection = psql.connect(**conn_config)
+
+    timings = load_schema(connection)
+
+    assert "tests_sessions" in fetch_tables(connection)
+    assert any(label.startswith("CREATE TRIGGER") for label, _ in timings)
+    assert all(elapsed >= 0 for _, elapsed in timings)
+    connection.close()
+
+
+def test_load_schema_rolls_back_on_failure(tmp_path):
+    broken = tmp_path / "schema.sql"
+    broken.write_text(
+        'CREATE TABLE "schema_probe" ("id" INT);\nSELECT * FROM "missing_table";\n'
+    )
+    connection = psql.connect(**conn_config)
+
+    with pytest.raises(psql.errors.UndefinedTable):
+        load_schema(connection, str(broken))
+
+    assert "schema_probe" not in fetch_tables(connection)
+    connection.close()
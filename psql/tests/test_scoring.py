@@ -0,0 +1,125 @@
+from itertools import islice
+
+import psycopg as psql
+import pytest
+from conftest import conn_config
+
+import db
+from catalog import Option, Paper, Question, load_paper
+from runner import write_pipelined
+from scoring import answer_key, score_answers, session_totals, write_scored
+
+NEW_RESULTS = (
+    'SELECT "test_session_id", "question_id", "answer", "score", "feedback" '
+    'FROM "results" WHERE "id" > %s ORDER BY "id"'
+)
+SCORES = 'SELECT * FROM "tests_sessions_scores" ORDER BY "test_session_id"'
+SESSION_SCORE = (
+    'SELECT "answered", "correct" FROM "tests_sessions_scores" '
+    'WHERE "test_session_id" = 1'
+)
+
+
+def paper(*questions):
+    return Paper(1, "t", "d", None, "i", "c", questions)
+
+
+def question(id, *options):
+    return Question(id, "q", "multiple-choice", "x", None, options)
+
+
+KEY = answer_key(
+    paper(
+        question(1, Option(1, "a", 0), Option(2, "b", 1)),
+        question(2, Option(3, "c", 1)),
+    )
+)
+
+
+def test_answers_are_scored_against_the_key():
+    scored = score_answers(KEY, [(7, 1, 1), (7, 1, 2), (8, 2, 3), (None, 2, 3)])
+
+    assert scored == [
+        (7, 1, 1, 0, "need-improvement"),
+        (7, 1, 2, 1, "great"),
+        (8, 2, 3, 1, "great"),
+        (None, 2, 3, 1, "great"),
+    ]
+    assert session_totals(scored) == [(7, 2, 1), (8, 1, 1)]
+
+
+def test_an_option_of_another_question_is_rejected():
+    with pytest.raises(ValueError, match="answer 3 is not an option of question 1"):
+        score_answers(KEY, [(7, 1, 3)])
+
+
+@pytest.fixture
+def key(workload, connection):
+    tests = [test_id for test_id, *_ in workload.tests()]
+    return answer_key(*(load_paper(connection, test_id) for test_id in tests))
+
+
+def submitted(connection, write) -> tuple:
+    """Rows and running scores written by `write()`, then rolled back."""
+    (last,) = connection.execute('SELECT MAX("id") FROM "results"').fetchone()
+    write()
+    rows = connection.execute(NEW_RESULTS, (last,)).fetchall()
+    scores = connection.execute(SCORES).fetchall()
+    connection.rollback()
+    return rows, scores
+
+
+def test_bulk_scoring_matches_the_trigger(workload, connection, key):
+    answers = list(islice(workload.results(), 400))
+    answers.append((None, *answers[0][1:]))
+
+    def insert():
+        write_pipelined(connection, db.RESULT_INSERT, answers)
+
+    by_trigger = submitted(connection, insert)
+    in_bulk = submitted(connection, lambda: write_scored(connection, key, answers))
+
+    assert in_bulk == by_trigger
+    rows, _ = in_bulk
+    assert {score for *_, score, _ in rows} == {0, 1}
+
+
+def test_the_trigger_scores_again_after_a_bulk_write(workload, connection, key):
+    session, question, answer = next(workload.results())
+    (last,) = connection.execute('SELECT MAX("id") FROM "results"').fetchone()
+    (answered,) = connection.execute(
+        'SELECT "answered" FROM "tests_sessions_scores" WHERE "test_session_id" = %s',
+        (session,),
+    ).fetchone()
+
+    write_scored(connection, key, [(session, question, answer)])
+    connection.execute(
+        'INSERT INTO "results" ("test_session_id", "question_id", "answer") '
+        "VALUES (%s, %s, %s)",
+        (session, question, answer),
+    )
+
+    first, second = connection.execute(NEW_RESULTS, (last,)).fetchall()
+    assert second == first
+    assert connection.execute(
+        'SELECT "answered" FROM "tests_sessions_scores" WHERE "test_session_id" = %s',
+        (session,),
+    ).fetchone() == (answered + 2,)
+
+
+def test_db_submit_scored_results(workload):
+    test_id = next(workload.tests_sessions())[1]
+    answers = [answer for answer in islice(workload.results(), 50) if answer[0] == 1]
+    with psql.connect(**conn_config) as connection:
+        key = answer_key(load_paper(connection, test_id))
+        before = connection.execute(SESSION_SCORE).fetchone()
+    try:
+        assert db.submit_scored_results(test_id, answers) == len(answers) > 0
+    finally:
+        db.cache_listener.stop()
+        db.pool.close()
+
+    with psql.connect(**conn_config) as connection:
+        after = connection.execute(SESSION_SCORE).fetchone()
+    correct = sum(score for *_, score, _ in score_answers(key, answers))
+    assert after == (before[0] + len(answers), before[1] + correct)
@@ -0,0 +1,60 @@
+import psycopg as psql
+from conftest import conn_config
+
+from schema import load_schema
+from seed import Workload, load
+
+
+def test_workload_is_deterministic():
+    first = Workload(scale=0.05, seed=7)
+    second = Workload(scale=0.05, seed=7)
+
+    assert list(first.results()) == list(second.results())
+    assert list(first.events()) == list(second.events())
+    assert list(first.results()) != list(Workload(scale=0.05, seed=8).results())
+
+
+def test_workload_references_are_consistent():
+    workload = Workload(scale=0.05, seed=1)
+    options = {row[0]: row[1] for row in workload.questions_options()}
+    questions = {row[0]: row[1] for row in workload.questions()}
+    sessions = {row[0]: row[1] for row in workload.tests_sessions()}
+
+    for session, question, answer in workload.results():
+        assert options[answer] == question
+        assert questions[question] == sessions[session]
+
+
+def test_load_runs_triggers():
+    workload = Workload(scale=0.05, seed=1)
+    connection = psql.connect(**conn_config)
+    load_schema(connection)
+
+    stats = load(connection, workload)
+
+    def count(query):
+        return connection.execute(query).fetchone()[0]
+
+    assert count('SELECT COUNT(*) FROM "results"') == stats["results"][0]
+    assert count('SELECT COUNT(*) FROM "reports"') == stats["finish"][0]
+    # Reports are aggregated in one pass over the session's results
+    assert (
+        count(
+            'SELECT COUNT(*) FROM "reports" AS r WHERE ("total_score", "final_score") '
+            '<> (SELECT COUNT(*), SUM("score") FROM "results" '
+            'WHERE "test_session_id" = r."test_session_id")'
+        )
+        == 0
+    )
+    assert count('SELECT COUNT(*) FROM "results" WHERE "feedback" IS NULL') == 0
+    assert count(
+        'SELECT COUNT(*) FROM "events" WHERE "type" = \'started-test\''
+    ) == len(list(workload.proctoring_sessions()))
+    # Sequences continue after the loaded ids
+    new_id = count(
+        'INSERT INTO "students" ("first_name", "last_name", "password", "email") '
+        "VALUES ('New', 'Student', 'pass', 'new@example.com') RETURNING \"id\""
+    )
+    assert new_id == workload.students_count + 1
+    connection.rollback()
+    connection.close()
@@ -0,0 +1,62 @@
+import re
+
+from sqlsplit import read_statements, split_statements
+
+
+def test_split_ignores_semicolons_in_strings_and_identifiers():
+    statements = split_statements(
+        """
+        SELECT 'a;b', 'it''s;' FROM "odd;name";
+        SELECT E'escaped\\';quote';
+        """
+    )
+
+    assert statements == [
+        """SELECT 'a;b', 'it''s;' FROM "odd;name\"""",
+        "SELECT E'escaped\\';quote'",
+    ]
+
+
+def test_split_ignores_semicolons_in_comments():
+    statements = split_statements(
+        """
+        -- leading; comment
+        SELECT 1 /* block; /* nested; */ still; */;
+        -- trailing comment only;
+        """
+    )
+
+    assert statements == [
+        "-- leading; comment\n        SELECT 1 /* block; /* nested; */ still; */"
+    ]
+
+
+def test_split_keeps_dollar_quoted_bodies():
+    statements = split_statements(
+        """
+        CREATE FUNCTION f() RETURNS INT AS $$ BEGIN RETURN 1; END; $$ LANGUAGE plpgsql;
+        CREATE FUNCTION g() RETURNS TEXT AS $body$ SELECT '$$;' $body$ LANGUAGE sql;
+        SELECT 2
+        """
+    )
+
+    assert len(statements) == 3
+    assert statements[0].endswith("$$ LANGUAGE plpgsql")
+    assert statements[1].endswith("$body$ LANGUAGE sql")
+    assert statements[2] == "SELECT 2"
+
+
+def test_read_statements_schema_functions_stay_whole():
+    functions = [
+        statement
+        for statement in read_statements("schema.sql")
+        if "CREATE OR REPLACE FUNCTION" in statement
+    ]
+
+    with open("schema.sql", "r") as sql_file:
+        expected = re.findall(
+            r"^CREATE OR REPLACE FUNCTION", sql_file.read(), re.MULTILINE
+        )
+
+    assert len(functions) == len(expected) > 0
+    assert all(statement.endswith("$$ LANGUAGE plpgsql") for statement in functions)
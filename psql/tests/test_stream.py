@@ -0,0 +1,71 @@
+import io
+
+import psycopg as psql
+from conftest import conn_config
+from tabulate import tabulate
+
+from stream import GridWriter, print_stream, stream_query
+
+
+def test_grid_writer_matches_tabulate():
+    rows = [("john", 12, None), ("jane", 7, "great")]
+    out = io.StringIO()
+
+    writer = GridWriter(["name", "score", "feedback"], out)
+    writer.write(rows[:1])
+    writer.write(rows[1:])
+
+    expected = tabulate(rows, ["name", "score", "feedback"], tablefmt="grid")
+    assert out.getvalue() == expected + "\n"
+    assert writer.rows == 2
+
+
+def test_grid_writer_keeps_widths_across_batches():
+    out = io.StringIO()
+
+    writer = GridWriter(["id"], out)
+    writer.write([(1,), (22,)])
+    writer.write([(3,)])
+
+    lines = out.getvalue().splitlines()
+    assert len({len(line) for line in lines}) == 1
+    assert lines[-2] == "|    3 |"
+
+
+def test_print_stream_skips_empty_results():
+    connection = psql.connect(**conn_config)
+    out = io.StringIO()
+    cursor = connection.execute("SELECT 1 WHERE false")
+
+    assert print_stream(cursor, "empty", out=out) == 0
+    assert out.getvalue() == ""
+    connection.close()
+
+
+def test_stream_query_uses_a_server_side_cursor():
+    connection = psql.connect(**conn_config)
+    out = io.StringIO()
+    fetched = []
+
+    class Recorder(io.StringIO):
+        def write(self, text):
+            # The cursor is still open on the server while rows are printed
+            if not fetched:
+                fetched.append(
+                    connection.execute(
+                        "SELECT COUNT(*) FROM pg_cursors WHERE name = 'ems_stream'"
+                    ).fetchone()[0]
+                )
+            return out.write(text)
+
+    rows = stream_query(
+        connection,
+        "SELECT generate_series(1, 2000) AS n",
+        batch_size=100,
+        out=Recorder(),
+    )
+
+    assert rows == 2000
+    assert fetched == [1]
+    assert "| 2000 |" in out.getvalue()
+    connection.close()
@@ -0,0 +1,100 @@
+import logging
+
+import psycopg as psql
+import pytest
+from conftest import conn_config
+
+from runner import BATCH, ScriptRunner
+from timing import StatementTimer, explain_query, shorten
+
+
+@pytest.fixture
+def connection():
+    connection = psql.connect(**conn_config)
+    connection.execute('CREATE TEMP TABLE "timing_probe" ("id" INT PRIMARY KEY)')
+    yield connection
+    connection.close()
+
+
+def test_explain_query_only_analyzes_reads():
+    read = explain_query("-- comment\nSELECT 1")
+    assert read == "EXPLAIN (ANALYZE, BUFFERS) SELECT 1"
+    assert explain_query("DELETE FROM t") == "EXPLAIN DELETE FROM t"
+    assert explain_query("CREATE TABLE t (id INT)") is None
+    label = shorten("-- Add things\nINSERT INTO t\nVALUES (1)")
+    assert label == "INSERT INTO t VALUES (1)"
+
+
+def test_runner_times_every_successful_statement(connection):
+    timer = StatementTimer(connection, slow_ms=float("inf"))
+    runner = ScriptRunner(connection, mode=BATCH, batch_size=2, timer=timer)
+
+    runner.run(
+        [
+            'INSERT INTO "timing_probe" VALUES (1), (2)',
+            'INSERT INTO "timing_probe" VALUES (1)',  # fails, not timed
+            'SELECT * FROM "timing_probe"',
+            'SELECT * FROM "timing_probe"',
+        ]
+    )
+
+    assert [record["rows"] for record in timer.records] == [2, 2, 2]
+    assert not any(record["slow"] or record["plan"] for record in timer.records)
+    summary = {entry["query"]: entry for entry in timer.summary()}
+    select = summary['SELECT * FROM "timing_probe"']
+    insert = summary['INSERT INTO "timing_probe" VALUES (1), (2)']
+    assert select["calls"] == 2
+    assert select["rows"] == 4
+    assert select["total_ms"] >= select["max_ms"] > 0
+    assert insert["calls"] == 1
+
+
+def test_slow_statements_are_logged_with_their_plan(connection, caplog):
+    connection.execute('INSERT INTO "timing_probe" VALUES (1)')
+    timer = StatementTimer(connection, slow_ms=0)
+    runner = ScriptRunner(connection, timer=timer)
+
+    with caplog.at_level(logging.DEBUG, logger="timing"):
+        runner.run(
+            [
+                'SELECT * FROM "timing_probe"',
+                'UPDATE "timing_probe" SET "id" = 2',
+            ]
+        )
+
+    read, write = timer.records
+    assert "Seq Scan on timing_probe" in read["plan"]
+    assert read["server_ms"] is not None
+    assert write["plan"].startswith("Update on timing_probe")
+    assert write["server_ms"] is None  # not re-run
+    # Explaining the update didn't run it a second time
+    assert connection.execute('SELECT "id" FROM "timing_probe"').fetchall() == [(2,)]
+    slow = [record for record in caplog.records if hasattr(record, "timing")]
+    assert [record.levelno for record in slow] == [logging.WARNING] * 2
+    assert slow[0].timing["query"] == 'SELECT * FROM "timing_probe"'
+
+
+def test_failing_explain_keeps_the_transaction(connection):
+    timer = StatementTimer(connection, slow_ms=0)
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        timer._plan("SELECT * FROM missing_table")
+        cursor.execute('INSERT INTO "timing_probe" VALUES (1)')
+        record = timer.record(cursor, "SELECT 1", 0.001)
+
+    assert record["plan"].startswith("Result")
+    assert connection.execute('SELECT COUNT(*) FROM "timing_probe"').fetchone() == (1,)
+
+
+def test_print_summary(connection, capsys):
+    timer = StatementTimer(connection, slow_ms=float("inf"))
+    ScriptRunner(connection, timer=timer).run(["SELECT 1", "SELECT 2", "SELECT 1"])
+
+    timer.print_summary("probe", limit=1)
+
+    out = capsys.readouterr().out
+    assert "TIMING: probe" in out
+    assert "SELECT 1" in out
+    assert "SELECT 2" not in out
+    assert "TOTAL (2 statements)" in out
@@ -0,0 +1,230 @@
+"""
+Per-statement timing and slow-query log for script execution.
+
+## Key Features:
+- `StatementTimer.record` is called by the runners (see `runner.py`) after \
+    every successful statement with its wall time (send, execute, receive):
+    - One structured log record per statement (`DEBUG`, `extra={"timing": \
+        {...}}` with `query`, `wall_ms`, `rows`, `server_ms`, `slow`), so a \
+        handler or formatter can ship the fields as they are.
+    - Statements slower than `slow_ms` are logged as `WARNING` with their \
+        plan: `EXPLAIN (ANALYZE, BUFFERS)` for reads, which also reports the \
+        server's execution time (`server_ms`), plain `EXPLAIN` for writes.
+- `summary()` aggregates the records per statement (calls, total/max time, \
+    rows, slow calls), `print_summary()` prints the slowest as a table.
+- `AsyncStatementTimer`: the same over a `psycopg.AsyncConnection`.
+
+## Notes:
+- Postgres doesn't report per-statement server time in the protocol: \
+    `server_ms` is only known for slow reads, which are run a second time \
+    by `EXPLAIN ANALYZE`. Writes are never re-run.
+- Plans are captured inside a savepoint, a statement that can't be \
+    explained doesn't abort the script's transaction.
+"""
+
+import logging
+import re
+
+import psycopg as psql
+from tabulate import tabulate as tb
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_MS = 100.0
+DEFAULT_SUMMARY_LIMIT = 10
+
+EXPLAINABLE = re.compile(
+    r"^(SELECT|WITH|VALUES|TABLE|INSERT|UPDATE|DELETE)\b", re.IGNORECASE
+)
+# Safe to run twice (`EXPLAIN ANALYZE` executes the statement)
+READ_ONLY = re.compile(r"^(SELECT|VALUES|TABLE)\b", re.IGNORECASE)
+EXECUTION_TIME = re.compile(r"Execution Time: ([\d.]+) ms")
+LEADING_COMMENTS = re.compile(r"^(\s*(--[^\n]*(\n|$)|/\*.*?\*/))*\s*", re.DOTALL)
+
+
+def strip_comments(query: str) -> str:
+    """The statement without the comments in front of it."""
+    return LEADING_COMMENTS.sub("", query, count=1)
+
+
+def shorten(query: str, width: int = 60) -> str:
+    """One-line prefix of a statement (comments skipped), for logs and tables."""
+    query = " ".join(strip_comments(query).split())
+    return query if len(query) <= width else f"{query[: width - 3]}..."
+
+
+def explain_query(query: str) -> str:
+    """The `EXPLAIN` for a statement, `None` if it can't be explained."""
+    query = strip_comments(query)
+    if not EXPLAINABLE.match(query):
+        return None
+    if READ_ONLY.match(query):
+        return f"EXPLAIN (ANALYZE, BUFFERS) {query}"
+    return f"EXPLAIN {query}"
+
+
+def parse_plan(rows: list) -> tuple:
+    """`(plan text, server execution time in ms or None)` of `EXPLAIN` rows."""
+    plan = "\n".join(row[0] for row in rows)
+    match = EXECUTION_TIME.search(plan)
+    return plan, float(match.group(1)) if match else None
+
+
+class StatementTimer:
+    """Timing records of the statements of one connection.
+
+    Args:
+        cnx (psycopg.Connection): connection the statements run on
+        slow_ms (float, optional): threshold of the slow-query log. \
+            Defaults to 100.
+        explain (bool, optional): capture the plan of slow statements. \
+            Defaults to True.
+    """
+
+    def __init__(
+        self,
+        cnx: psql.Connection,
+        slow_ms: float = DEFAULT_SLOW_MS,
+        explain: bool = True,
+    ):
+        self.cnx = cnx
+        self.slow_ms = slow_ms
+        self.explain = explain
+        self.records = []
+
+    def _record(self, cursor, query: str, seconds: float) -> dict:
+        wall_ms = seconds * 1000
+        return {
+            "query": query,
+            "wall_ms": wall_ms,
+            "rows": cursor.rowcount if cursor.rowcount >= 0 else None,
+            "server_ms": None,
+            "slow": wall_ms >= self.slow_ms,
+            "plan": None,
+        }
+
+    def _log(self, record: dict) -> dict:
+        self.records.append(record)
+        timing = {key: value for key, value in record.items() if key != "plan"}
+        level = logging.WARNING if record["slow"] else logging.DEBUG
+        logger.log(
+            level,
+            "%s statement (%.3f ms, %s rows): %s",
+            "Slow" if record["slow"] else "Timed",
+            record["wall_ms"],
+            "?" if record["rows"] is None else record["rows"],
+            shorten(record["query"]),
+            extra={"timing": timing},
+        )
+        if record["plan"]:
+            logger.warning("Plan of %s\n%s", shorten(record["query"]), record["plan"])
+        return record
+
+    def _plan(self, query: str) -> tuple:
+        explain = explain_query(query)
+        if explain is None:
+            return None, None
+        try:
+            with self.cnx.transaction(), self.cnx.cursor() as cursor:
+                cursor.execute(explain)
+                return parse_plan(cursor.fetchall())
+        except psql.Error as err:
+            logger.info("Couldn't explain %s: %s", shorten(query), err)
+            return None, None
+
+    def record(self, cursor: psql.Cursor, query: str, seconds: float) -> dict:
+        """Record (and log) one executed statement, explain it if slow.
+
+        Args:
+            cursor (psycopg.Cursor): cursor positioned on the statement result
+            query (str): the statement
+            seconds (float): wall time of its execution
+
+        Returns:
+            dict: the timing record
+        """
+        record = self._record(cursor, query, seconds)
+        if record["slow"] and self.explain:
+            record["plan"], record["server_ms"] = self._plan(query)
+        return self._log(record)
+
+    def summary(self) -> list:
+        """Records aggregated per statement, slowest (total time) first."""
+        statements = {}
+        for record in self.records:
+            entry = statements.setdefault(
+                record["query"],
+                {
+                    "query": record["query"],
+                    "calls": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "rows": None,
+                    "server_ms": None,
+                    "slow": 0,
+                },
+            )
+            entry["calls"] += 1
+            entry["total_ms"] += record["wall_ms"]
+            entry["max_ms"] = max(entry["max_ms"], record["wall_ms"])
+            if record["rows"] is not None:
+                # Unknown (reads) stays empty rather than counting as 0
+                entry["rows"] = (entry["rows"] or 0) + record["rows"]
+            entry["slow"] += record["slow"]
+            if record["server_ms"] is not None:
+                entry["server_ms"] = (entry["server_ms"] or 0) + record["server_ms"]
+        return sorted(statements.values(), key=lambda entry: -entry["total_ms"])
+
+    def print_summary(self, title: str = "", limit: int = DEFAULT_SUMMARY_LIMIT):
+        """Print the `limit` slowest statements and the script totals."""
+        summary = self.summary()
+        if not summary:
+            return
+        rows = [
+            (
+                shorten(entry["query"]),
+                entry["calls"],
+                f"{entry['total_ms']:.3f}",
+                f"{entry['max_ms']:.3f}",
+                entry["rows"],
+                "" if entry["server_ms"] is None else f"{entry['server_ms']:.3f}",
+                entry["slow"],
+            )
+            for entry in summary[:limit]
+        ]
+        rows.append(
+            (
+                f"TOTAL ({len(summary)} statements)",
+                sum(entry["calls"] for entry in summary),
+                f"{sum(entry['total_ms'] for entry in summary):.3f}",
+                "",
+                sum(entry["rows"] or 0 for entry in summary),
+                "",
+                sum(entry["slow"] for entry in summary),
+            )
+        )
+        headers = ["statement", "calls", "total ms", "max ms", "rows", "server ms"]
+        print(f"\n\nTIMING: {title}")
+        print(tb(rows, headers + [f">= {self.slow_ms:g} ms"], tablefmt="grid"))
+
+
+class AsyncStatementTimer(StatementTimer):
+    """`StatementTimer` over a `psycopg.AsyncConnection`."""
+
+    async def _plan(self, query: str) -> tuple:
+        explain = explain_query(query)
+        if explain is None:
+            return None, None
+        try:
+            async with self.cnx.transaction(), self.cnx.cursor() as cursor:
+                await cursor.execute(explain)
+                return parse_plan(await cursor.fetchall())
+        except psql.Error as err:
+            logger.info("Couldn't explain %s: %s", shorten(query), err)
+            return None, None
+
+    async def record(self, cursor: psql.AsyncCursor, query: str, seconds: float):
+        record = self._record(cursor, query, seconds)
+        if record["slow"] and self.explain:
+            record["plan"], record["server_ms"] = await self._plan(query)
+        return self._log(record)
@@ -0,0 +1,243 @@
+"""
+Concurrent access to the SQLite database: one writer thread, many readers.
+
+## Key Features:
+- `Writer`: a dedicated thread owns the only writable connection and \
+    consumes a queue of write batches (one parameterized statement for many \
+    rows, e.g. a candidate's answer page):
+    - Group commit: every batch queued while the previous transaction was \
+        committing goes into the next one (up to `group_size`), so many \
+        submissions share a single `COMMIT` (and fsync).
+    - Each batch runs inside a savepoint: a failing batch is rolled back \
+        alone and its caller gets the error, the rest of the group commits.
+    - Callers get a `Future` (`submit`) or block until committed (`write`).
+- Readers borrow read-only connections (`mode=ro`) from a `Pool` (see \
+    `pool.py`). In WAL mode they read the last committed snapshot and never \
+    wait for the writer, nor make it wait.
+- `AccessLayer` puts both together, `stats()` reports the writer counters.
+
+## Notes:
+- The database is switched to WAL; the `performance` profile (see \
+    `pragmas.py`) is used by default for the writer and the readers.
+- Writes from other processes are still possible, they wait on \
+    `busy_timeout` like any SQLite writer.
+
+## Usage:
+```py
+with AccessLayer("ems.db") as ems:
+    ems.write(RESULT_INSERT, [(session_id, question_id, option_id), ...])
+    rows = ems.read('SELECT * FROM "test_sessions_suspicious_behaviour_search"')
+```
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import Self
+
+from pool import Pool
+from pragmas import apply_profile, close_connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE = "performance"
+DEFAULT_GROUP_SIZE = 64  # batches per transaction
+DEFAULT_READERS = 8
+
+SAVEPOINT = "ems_batch"
+
+# Answers are scored by the `results` triggers of `schema.sql`
+RESULT_INSERT = (
+    'INSERT INTO "results" ("test_session_id", "question_id", "answer") '
+    "VALUES (?, ?, ?)"
+)
+
+_STOP = object()
+
+
+class WriteBatch:
+    """One statement and its rows, with the `Future` of its row count."""
+
+    def __init__(self, query: str, params_seq):
+        self.query = query
+        self.params_seq = params_seq
+        self.future = Future()
+
+
+class Writer(threading.Thread):
+    """Thread that applies queued write batches with group commits.
+
+    Args:
+        database (str): database file
+        profile (str, optional): one of `pragmas.PROFILES`, WAL is enabled \
+            on top of it. Defaults to "performance".
+        group_size (int, optional): most batches per transaction. Defaults to 64.
+    """
+
+    def __init__(
+        self,
+        database: str,
+        profile: str = DEFAULT_PROFILE,
+        group_size: int = DEFAULT_GROUP_SIZE,
+    ):
+        super().__init__(name="ems-writer", daemon=True)
+        self.database = database
+        self.profile = profile
+        self.group_size = group_size
+        self.stats = {"batches": 0, "failed": 0, "rows": 0, "commits": 0}
+        self._queue = queue.Queue()
+        self._ready = threading.Event()
+        self._error = None
+
+    def start(self) -> None:
+        """Start the thread and wait until the database is in WAL mode."""
+        super().start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode: transactions are issued explicitly below
+        cnx = sqlite3.connect(self.database, isolation_level=None)
+        apply_profile(cnx, self.profile)
+        (mode,) = cnx.execute("PRAGMA journal_mode = WAL").fetchone()
+        if mode != "wal":
+            cnx.close()
+            raise sqlite3.OperationalError(
+                f"{self.database} can't use WAL (journal_mode={mode})"
+            )
+        return cnx
+
+    def run(self) -> None:
+        try:
+            cnx = self._connect()
+        except sqlite3.Error as err:
+            self._error = err
+            self._ready.set()
+            return
+        self._ready.set()
+        try:
+            stopping = False
+            while not stopping:
+                batch = self._queue.get()
+                if batch is _STOP:
+                    break
+                group = [batch]
+                while len(group) < self.group_size:
+                    try:
+                        batch = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if batch is _STOP:
+                        stopping = True
+                        break
+                    group.append(batch)
+                self._commit(cnx, group)
+        finally:
+            close_connection(cnx, self.profile)
+
+    def _commit(self, cnx: sqlite3.Connection, group: list) -> None:
+        """Apply a group of batches in one transaction, then settle their futures."""
+        done = []
+        try:
+            cnx.execute("BEGIN IMMEDIATE")
+            for batch in group:
+                cnx.execute(f"SAVEPOINT {SAVEPOINT}")
+                try:
+                    rows = cnx.executemany(batch.query, batch.params_seq).rowcount
+                except sqlite3.Error as err:
+                    cnx.execute(f"ROLLBACK TO {SAVEPOINT}")
+                    cnx.execute(f"RELEASE {SAVEPOINT}")
+                    self.stats["failed"] += 1
+                    batch.future.set_exception(err)
+                    continue
+                cnx.execute(f"RELEASE {SAVEPOINT}")
+                done.append((batch, rows))
+            cnx.execute("COMMIT")
+        except sqlite3.Error as err:
+            logger.error("Write group of %d batch(es) failed: %s", len(group), err)
+            if cnx.in_transaction:
+                cnx.execute("ROLLBACK")
+            for batch, _ in done:
+                batch.future.set_exception(err)
+            for batch in group:
+                if not batch.future.done():
+                    batch.future.set_exception(err)
+            return
+        self.stats["commits"] += 1
+        for batch, rows in done:
+            self.stats["batches"] += 1
+            self.stats["rows"] += rows
+            batch.future.set_result(rows)
+
+    def submit(self, query: str, params_seq) -> Future:
+        """Queue one statement for many rows, return the `Future` of its row count."""
+        batch = WriteBatch(query, list(params_seq))
+        self._queue.put(batch)
+        return batch.future
+
+    def write(self, query: str, params_seq, timeout: float | None = None) -> int:
+        """Queue a batch and wait until it is committed, return its row count."""
+        return self.submit(query, params_seq).result(timeout)
+
+    def close(self) -> None:
+        """Commit what is queued, then stop the thread."""
+        if self.is_alive():
+            self._queue.put(_STOP)
+            self.join()
+
+
+class AccessLayer:
+    """Writer thread plus a pool of read-only connections.
+
+    Args:
+        database (str): database file
+        readers (int, optional): concurrent readers. Defaults to 8.
+        profile (str, optional): one of `pragmas.PROFILES`. \
+            Defaults to "performance".
+        group_size (int, optional): most write batches per transaction.
+    """
+
+    def __init__(
+        self,
+        database: str,
+        readers: int = DEFAULT_READERS,
+        profile: str = DEFAULT_PROFILE,
+        group_size: int = DEFAULT_GROUP_SIZE,
+    ):
+        self.writer = Writer(database, profile, group_size)
+        self.writer.start()
+        self.readers = Pool(
+            database, min_size=0, max_size=readers, profile=profile, read_only=True
+        )
+
+    def read(self, query: str, params=()) -> list:
+        """Run a query on a read-only connection, return its rows."""
+        with self.readers.connection() as cnx:
+            return cnx.execute(query, params).fetchall()
+
+    def submit(self, query: str, params_seq) -> Future:
+        return self.writer.submit(query, params_seq)
+
+    def write(self, query: str, params_seq, timeout: float | None = None) -> int:
+        return self.writer.write(query, params_seq, timeout)
+
+    def stats(self) -> dict:
+        """Writer counters (mean batches per commit) and reader pool counters."""
+        writer = dict(self.writer.stats)
+        writer["batches_per_commit"] = (
+            writer["batches"] / writer["commits"] if writer["commits"] else 0
+        )
+        return {"writer": writer, "readers": self.readers.stats()}
+
+    def close(self) -> None:
+        self.writer.close()
+        self.readers.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
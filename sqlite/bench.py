@@ -0,0 +1,547 @@
+"""
+Benchmark of the EMS hot queries on SQLite.
+
+## Key Features:
+- Loads the schema and a synthetic workload (`seed.py`) at every requested \
+    scale, then runs the "queries of interest" from `queries.sql`.
+- Per query:
+    - `cold`: first execution on a brand new connection (empty page cache \
+        and statement cache; the OS file cache is not flushed).
+    - `warm`: `--repeat` further executions on one connection, reported \
+        as p50/p95/p99 latency and rows/s.
+    - `plan`: `EXPLAIN QUERY PLAN` details, so a lost index shows up as \
+        a `SCAN` in the diff.
+- Question papers (`catalog`): the per-request view query \
+    (`test_questions_option_search` by title) against `catalog.load_paper` \
+    and against the paper served from a `ResultCache`, with the memory of \
+    the view rows and of the paper of one test.
+- `scoring`: answers inserted and scored by the `set_score_of_result` \
+    trigger against the same answers scored in memory against the answer key \
+    of the papers (`scoring.write_scored`, the trigger switched off), \
+    reported as rows/s; both are rolled back.
+- `concurrency`: `--writers` threads submitting answer pages while \
+    `--readers` threads run the suspicious-behaviour search, for \
+    `--concurrency-seconds`, reported as written rows/s, reads/s and \
+    p50/p99 latency of both:
+    - `single_connection`: everyone shares one connection behind a lock.
+    - `writer_thread`: `access.AccessLayer`, group commits and read-only \
+        WAL readers.
+- `--events` pads `events` with routine (not suspicious) events up to a \
+    total volume, e.g. 50M, so that `proctor_alerts` (the proctor alert \
+    screen) is measured at production size without loading millions of \
+    students: it reads `idx_events_suspicious` (and its copy on every month \
+    table), whose size only depends on the suspicious events.
+- Every run uses one connection profile (`--profiles`, see `pragmas.py`) \
+    on a freshly created database file, so profiles can be compared side by \
+    side (WAL stays on in a file once enabled).
+- Prints one JSON document (or writes it with `--output`), meant to be \
+    stored and compared between schema changes.
+
+## Usage:
+```sh
+python bench.py --scales 1 10 --repeat 50 --output bench-sqlite.json
+python bench.py --profiles default performance
+python bench.py --profiles performance --writers 8 --readers 8
+python bench.py --profiles performance --events 50000000
+```
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from itertools import cycle, islice
+from time import perf_counter
+
+from access import RESULT_INSERT, AccessLayer
+from catalog import PAPER, load_paper
+from catalog import sizeof as paper_sizeof
+from partitions import ensure_partitions
+from pragmas import DEFAULT_PROFILE, PROFILES, apply_profile, close_connection
+from resultcache import CATALOG_TABLES, ResultCache
+from resultcache import sizeof as rows_sizeof
+from scoring import answer_key, write_scored
+from seed import BATCH_SIZE, COLUMNS, Workload, insert_rows, load
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCALES = (1,)
+DEFAULT_REPEAT = 30
+DEFAULT_DATABASE = "bench.db"  # recreated by every run, never `ems.db`
+DEFAULT_CONCURRENCY_SECONDS = 2.0  # per mode, 0 skips the concurrency run
+DEFAULT_WRITERS = 4
+DEFAULT_READERS = 4
+DEFAULT_EVENTS = 0  # no padding
+SCORED_ANSWERS = 20000  # rows per scoring run
+ANSWERS_PER_PAGE = 20  # rows per write batch
+
+# Queries of interest (see the end of `queries.sql`), parameters come from
+# the loaded workload
+QUERIES = {
+    "tests_history_by_name": (
+        'SELECT * FROM "tests_history" WHERE "student_id" = ('
+        'SELECT "id" FROM "students" WHERE "first_name" = :first_name '
+        'AND "last_name" = :last_name)'
+    ),
+    "tests_history_by_email": (
+        'SELECT * FROM "tests_history" WHERE "student_id" = ('
+        'SELECT "id" FROM "students" WHERE "email" = :email)'
+    ),
+    "test_questions_option_search_by_title": (
+        'SELECT * FROM "test_questions_option_search" WHERE "title" = :title'
+    ),
+    "test_questions_option_search_by_is_correct": (
+        'SELECT * FROM "test_questions_option_search" WHERE "is_correct" = 1'
+    ),
+    "test_sessions_suspicious_behaviour_search_by_status": (
+        'SELECT * FROM "test_sessions_suspicious_behaviour_search" '
+        "WHERE \"test_session_status\" = 'ended'"
+    ),
+    "proctor_alerts": (
+        'SELECT * FROM "test_sessions_suspicious_behaviour_search" '
+        'WHERE "proctor_id" = :proctor_id '
+        "AND \"test_session_status\" = 'in-progress'"
+    ),
+}
+
+
+def percentile(samples: list, fraction: float) -> float:
+    """Nearest-rank percentile of already sorted samples."""
+    index = max(0, min(len(samples) - 1, round(fraction * len(samples)) - 1))
+    return samples[index]
+
+
+def query_params(workload: Workload) -> dict:
+    """Look up a student, a test and a proctor that exist in the workload."""
+    _, first_name, last_name, _, email = next(workload.students())
+    test_id, title, *_ = next(workload.tests())
+    return {
+        "first_name": first_name,
+        "last_name": last_name,
+        "email": email,
+        "test_id": test_id,
+        "title": title,
+        "proctor_id": next(workload.proctors())[0],
+    }
+
+
+def plan_shape(cnx: sqlite3.Connection, query: str, params: dict) -> list:
+    """`EXPLAIN QUERY PLAN` details, depth first."""
+    return [
+        detail for _, _, _, detail in cnx.execute(f"EXPLAIN QUERY PLAN {query}", params)
+    ]
+
+
+def connect(database: str, profile: str = DEFAULT_PROFILE) -> sqlite3.Connection:
+    cnx = sqlite3.connect(database)
+    apply_profile(cnx, profile)
+    return cnx
+
+
+def remove_database(database: str) -> None:
+    """Delete a database file with its WAL and shared-memory files."""
+    for path in (database, f"{database}-wal", f"{database}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def time_query(cnx: sqlite3.Connection, query: str, params: dict) -> tuple:
+    """Run a query once, return `(seconds, rows)` including the fetch."""
+    started = perf_counter()
+    rows = len(cnx.execute(query, params).fetchall())
+    return perf_counter() - started, rows
+
+
+def pad_events(cnx: sqlite3.Connection, workload: Workload, total: int) -> int:
+    """Add routine events until `events_all` holds `total` rows, return its size.
+
+    The added events of closed months are moved to their month table.
+    """
+    (count,) = cnx.execute('SELECT COUNT(*) FROM "events_all"').fetchone()
+    if total > count:
+        started = perf_counter()
+        added = insert_rows(
+            cnx.cursor(),
+            "events",
+            COLUMNS["events"],
+            workload.background_events(total - count),
+            BATCH_SIZE,
+        )
+        ensure_partitions(cnx)
+        cnx.commit()
+        logger.info("events padded: %d rows in %.2f s", added, perf_counter() - started)
+        count = total
+    return count
+
+
+def bench_query(
+    database: str,
+    query: str,
+    params: dict,
+    repeat: int,
+    profile: str = DEFAULT_PROFILE,
+) -> dict:
+    cold = connect(database, profile)
+    cold_seconds, rows = time_query(cold, query, params)
+    close_connection(cold, profile)
+
+    cnx = connect(database, profile)
+    samples = sorted(time_query(cnx, query, params)[0] for _ in range(repeat))
+    plan = plan_shape(cnx, query, params)
+    close_connection(cnx, profile)
+    mean = sum(samples) / len(samples)
+    return {
+        "rows": rows,
+        "cold_ms": cold_seconds * 1000,
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+        "rows_per_s": rows / mean if mean else None,
+        "plan": plan,
+    }
+
+
+def bench_catalog(
+    database: str, params: dict, repeat: int, profile: str = DEFAULT_PROFILE
+) -> dict:
+    """Time and size the view rows and the paper of one test."""
+    view = QUERIES["test_questions_option_search_by_title"]
+    cache = ResultCache()
+    cnx = connect(database, profile)
+    try:
+
+        def read_view():
+            return cnx.execute(view, params).fetchall()
+
+        def read_paper():
+            return load_paper(cnx, params["test_id"])
+
+        def serve_paper():
+            return cache.fetch(PAPER, params, CATALOG_TABLES, read_paper, paper_sizeof)
+
+        timings = {}
+        for name, read in (
+            ("view", read_view),
+            ("load", read_paper),
+            ("cached", serve_paper),
+        ):
+            samples = []
+            for _ in range(repeat):
+                started = perf_counter()
+                read()
+                samples.append(perf_counter() - started)
+            timings[f"{name}_p50_ms"] = percentile(sorted(samples), 0.50) * 1000
+        rows = read_view()
+        paper = read_paper()
+    finally:
+        close_connection(cnx, profile)
+    return {
+        "rows": len(rows),
+        "questions": len(paper.questions),
+        "view_bytes": rows_sizeof(rows),
+        "paper_bytes": paper_sizeof(paper),
+        **timings,
+    }
+
+
+def bench_scoring(
+    database: str, workload: Workload, profile: str = DEFAULT_PROFILE
+) -> dict:
+    """Insert the same answers scored by trigger, then against the answer key."""
+    answers = list(islice(workload.results(), SCORED_ANSWERS))
+    cnx = connect(database, profile)
+    try:
+        started = perf_counter()
+        cnx.executemany(RESULT_INSERT, answers)
+        trigger_seconds = perf_counter() - started
+        cnx.rollback()
+
+        tests = [test_id for test_id, *_ in workload.tests()]
+        key = answer_key(*(load_paper(cnx, test_id) for test_id in tests))
+        started = perf_counter()
+        write_scored(cnx, key, answers)
+        scored_seconds = perf_counter() - started
+        cnx.rollback()
+    finally:
+        close_connection(cnx, profile)
+    return {
+        "rows": len(answers),
+        "trigger_rows_per_s": len(answers) / trigger_seconds,
+        "scored_rows_per_s": len(answers) / scored_seconds,
+        "speedup": trigger_seconds / scored_seconds,
+    }
+
+
+def drive(seconds: float, writers: int, readers: int, write, read, pages) -> dict:
+    """Run writer and reader threads for `seconds`, return their throughput
+    and latency (a write is timed until it is committed)."""
+    rows = []
+    write_samples = []
+    read_samples = []
+    deadline = perf_counter() + seconds
+
+    def writer():
+        for page in pages:
+            started = perf_counter()
+            if started >= deadline:
+                break
+            rows.append(write(page))
+            write_samples.append(perf_counter() - started)
+
+    def reader():
+        while True:
+            started = perf_counter()
+            if started >= deadline:
+                break
+            read()
+            read_samples.append(perf_counter() - started)
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    started = perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = perf_counter() - started
+    report = {
+        "write_rows_per_s": sum(rows) / elapsed,
+        "reads_per_s": len(read_samples) / elapsed,
+    }
+    for name, samples in (("write", write_samples), ("read", read_samples)):
+        if samples:
+            samples.sort()
+            report[f"{name}_p50_ms"] = percentile(samples, 0.50) * 1000
+            report[f"{name}_p99_ms"] = percentile(samples, 0.99) * 1000
+    return report
+
+
+def bench_concurrency(
+    database: str,
+    workload: Workload,
+    seconds: float,
+    writers: int = DEFAULT_WRITERS,
+    readers: int = DEFAULT_READERS,
+    profile: str = DEFAULT_PROFILE,
+) -> dict:
+    """Mixed answer submissions and searches: one shared connection vs
+    the writer thread with read-only WAL readers (see `access.py`)."""
+    answers = list(islice(workload.results(), 50 * ANSWERS_PER_PAGE))
+    pages = [
+        answers[i : i + ANSWERS_PER_PAGE]
+        for i in range(0, len(answers), ANSWERS_PER_PAGE)
+    ]
+    query = QUERIES["test_sessions_suspicious_behaviour_search_by_status"]
+
+    cnx = sqlite3.connect(database, check_same_thread=False)
+    apply_profile(cnx, profile)
+    lock = threading.Lock()
+
+    def write_shared(page):
+        with lock:
+            rows = cnx.executemany(RESULT_INSERT, page).rowcount
+            cnx.commit()
+        return rows
+
+    def read_shared():
+        with lock:
+            return cnx.execute(query).fetchall()
+
+    single = drive(seconds, writers, readers, write_shared, read_shared, cycle(pages))
+    close_connection(cnx, profile)
+
+    with AccessLayer(database, readers=readers, profile=profile) as ems:
+        grouped = drive(
+            seconds,
+            writers,
+            readers,
+            lambda page: ems.write(RESULT_INSERT, page),
+            lambda: ems.read(query),
+            cycle(pages),
+        )
+        grouped["batches_per_commit"] = ems.stats()["writer"]["batches_per_commit"]
+    return {
+        "writers": writers,
+        "readers": readers,
+        "single_connection": single,
+        "writer_thread": grouped,
+    }
+
+
+def bench_scale(
+    database: str,
+    scale: float,
+    seed: int,
+    repeat: int,
+    profile: str = DEFAULT_PROFILE,
+    concurrency_seconds: float = 0,
+    writers: int = DEFAULT_WRITERS,
+    readers: int = DEFAULT_READERS,
+    events: int = DEFAULT_EVENTS,
+) -> dict:
+    """Recreate the database at one scale and benchmark every query."""
+    workload = Workload(scale, seed)
+    remove_database(database)
+    cnx = connect(database, profile)
+    with open("schema.sql", "r") as sql_file:
+        cnx.executescript(sql_file.read())
+    started = perf_counter()
+    tables = load(cnx, workload)
+    load_seconds = perf_counter() - started
+    events = pad_events(cnx, workload, events)
+    cnx.execute("ANALYZE")
+    cnx.commit()
+    close_connection(cnx, profile)
+
+    params = query_params(workload)
+    queries = {}
+    for name, query in QUERIES.items():
+        queries[name] = bench_query(database, query, params, repeat, profile)
+        logger.info(
+            "%-11s scale %-6s %-52s p50 %8.3f ms  p99 %8.3f ms",
+            profile,
+            scale,
+            name,
+            queries[name]["p50_ms"],
+            queries[name]["p99_ms"],
+        )
+    papers = bench_catalog(database, params, repeat, profile)
+    logger.info(
+        "%-11s scale %-6s %-52s %8d -> %8d bytes per test",
+        profile,
+        scale,
+        "paper",
+        papers["view_bytes"],
+        papers["paper_bytes"],
+    )
+    scoring = bench_scoring(database, workload, profile)
+    logger.info(
+        "%-11s scale %-6s %-52s %8.0f -> %8.0f rows/s",
+        profile,
+        scale,
+        "scoring",
+        scoring["trigger_rows_per_s"],
+        scoring["scored_rows_per_s"],
+    )
+    report = {
+        "profile": profile,
+        "scale": scale,
+        "rows": {table: count for table, (count, _) in tables.items()},
+        "events": events,
+        "load_s": load_seconds,
+        "queries": queries,
+        "catalog": papers,
+        "scoring": scoring,
+    }
+    if concurrency_seconds:
+        report["concurrency"] = concurrency = bench_concurrency(
+            database, workload, concurrency_seconds, writers, readers, profile
+        )
+        for mode in ("single_connection", "writer_thread"):
+            logger.info(
+                "%-11s scale %-6s %-52s %8.0f rows/s %8.0f reads/s read p99 %8.3f ms",
+                profile,
+                scale,
+                f"concurrency {mode}",
+                concurrency[mode]["write_rows_per_s"],
+                concurrency[mode]["reads_per_s"],
+                concurrency[mode].get("read_p99_ms", 0),
+            )
+    return report
+
+
+def run(
+    database=DEFAULT_DATABASE,
+    scales=DEFAULT_SCALES,
+    seed=0,
+    repeat=DEFAULT_REPEAT,
+    profiles=(DEFAULT_PROFILE,),
+    concurrency_seconds=DEFAULT_CONCURRENCY_SECONDS,
+    writers=DEFAULT_WRITERS,
+    readers=DEFAULT_READERS,
+    events=DEFAULT_EVENTS,
+) -> dict:
+    """Benchmark every profile at every scale, return the JSON-ready report."""
+    return {
+        "backend": "sqlite",
+        "server_version": sqlite3.sqlite_version,
+        "seed": seed,
+        "repeat": repeat,
+        "runs": [
+            bench_scale(
+                database,
+                scale,
+                seed,
+                repeat,
+                profile,
+                concurrency_seconds,
+                writers,
+                readers,
+                events,
+            )
+            for profile in profiles
+            for scale in scales
+        ],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the EMS hot queries")
+    parser.add_argument(
+        "--scales", type=float, nargs="+", default=DEFAULT_SCALES, help="data sizes"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument(
+        "--repeat", type=int, default=DEFAULT_REPEAT, help="warm runs per query"
+    )
+    parser.add_argument("--output", help="write the JSON report to a file")
+    parser.add_argument(
+        "--database", default=DEFAULT_DATABASE, help="scratch database file"
+    )
+    parser.add_argument(
+        "--profiles",
+        nargs="+",
+        choices=PROFILES,
+        default=(DEFAULT_PROFILE,),
+        help="connection PRAGMA profiles to compare",
+    )
+    parser.add_argument(
+        "--concurrency-seconds",
+        type=float,
+        default=DEFAULT_CONCURRENCY_SECONDS,
+        help="duration of each concurrent read/write run (0 to skip)",
+    )
+    parser.add_argument(
+        "--writers", type=int, default=DEFAULT_WRITERS, help="writer threads"
+    )
+    parser.add_argument(
+        "--readers", type=int, default=DEFAULT_READERS, help="reader threads"
+    )
+    parser.add_argument(
+        "--events",
+        type=int,
+        default=DEFAULT_EVENTS,
+        help="pad events with routine rows up to this total",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = run(
+        args.database,
+        args.scales,
+        args.seed,
+        args.repeat,
+        args.profiles,
+        args.concurrency_seconds,
+        args.writers,
+        args.readers,
+        args.events,
+    )
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
@@ -0,0 +1,92 @@
+"""
+Injectable clock for the time-dependent triggers of the SQLite database.
+
+## Key Features:
+- The triggers read "now" from the `ems_now` view of `schema.sql`: the \
+    simulated time stored in the one-row `clock` table, or local time when \
+    the table is empty.
+- `WallClock`: real time, `sleep` waits for real (the table is emptied).
+- `SimulatedClock`: a fixed time that `sleep` moves forward instantly, so \
+    `duration_taken` & co. are exact and nothing waits.
+- `using(cnx, clock)`: sets the clock for a `with` block, then goes back \
+    to the wall clock, inside the connection's transaction.
+- `CLOCKS` maps the names accepted by `CLOCK` (see `db.py`) to classes.
+
+## Notes:
+- SQLite has no session variables and the schema's views can't read a \
+    `TEMP` table, so the clock is a row of the database file. `using` writes \
+    it in the connection's transaction (opening one if needed) and deletes \
+    it before the block ends: other connections never see it, unless the \
+    block commits (`executescript` does) while it's set.
+- Only session starts left out (`NULL`) follow the clock, explicit ones are \
+    kept.
+
+## Usage:
+```py
+clock = SimulatedClock()
+with using(cnx, clock):
+    cnx.executescript(part1)
+clock.sleep(3)  # instant
+with using(cnx, clock):
+    cnx.executescript(part2)  # duration_taken = 00:00:03
+```
+"""
+
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from time import sleep
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SET_CLOCK = 'INSERT OR REPLACE INTO "clock" ("id", "now") VALUES (1, ?)'
+RESET_CLOCK = 'DELETE FROM "clock"'
+
+
+class WallClock:
+    """Real time: the triggers use local time, waiting takes as long as it says."""
+
+    def setting(self) -> tuple:
+        """Statement and parameters that make the triggers use this clock."""
+        return RESET_CLOCK, ()
+
+    def sleep(self, seconds: float) -> None:
+        sleep(seconds)
+
+
+class SimulatedClock(WallClock):
+    """A clock that only moves when told to.
+
+    Args:
+        start (datetime, optional): initial (local) time. Defaults to now, \
+            truncated to the second.
+    """
+
+    def __init__(self, start: datetime | None = None):
+        self.now = start or datetime.now().replace(microsecond=0)
+
+    def setting(self) -> tuple:
+        return SET_CLOCK, (self.now.strftime(TIMESTAMP_FORMAT),)
+
+    def sleep(self, seconds: float) -> None:
+        """Move the clock forward, instantly."""
+        self.now += timedelta(seconds=seconds)
+
+
+CLOCKS = {"wall": WallClock, "simulated": SimulatedClock}
+
+
+@contextmanager
+def using(cnx: sqlite3.Connection, clock: WallClock | None = None):
+    """Make the triggers use `clock` for the duration of a `with` block
+    (no clock: leave the connection alone)."""
+    if clock is None:
+        yield cnx
+        return
+    if not cnx.in_transaction:
+        cnx.execute("BEGIN")
+    cnx.execute(*clock.setting())
+    try:
+        yield cnx
+    finally:
+        cnx.execute(RESET_CLOCK)
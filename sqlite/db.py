@@ -1,9 +1,22 @@
+import argparse
 import logging
+import os
 import sqlite3
-from time import sleep
+from time import perf_counter
 
 from tabulate import tabulate as tb
 
+import catalog
+from clock import CLOCKS, using
+from partitions import drop_partitions
+from pool import Pool
+from pragmas import PROFILES
+from queries import CACHED_LOOKUPS, LOOKUPS, cache_for
+from resultcache import CATALOG_TABLES, ResultCache, VersionWatcher
+from sqlsplit import split_statements
+from stream import print_stream, stream_query
+from timing import StatementTimer
+
 # Set up logger
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -19,10 +32,65 @@ file_handler = logging.FileHandler("cpy-errors.log")
 file_handler.setFormatter(formatter)
 logger.addHandler(file_handler)
 
+# Helper modules log through the same handlers
+for helper in ("export", "partitions", "pool", "resultcache", "timing"):
+    helper_logger = logging.getLogger(helper)
+    helper_logger.setLevel(logging.INFO)
+    helper_logger.addHandler(handler)
+    helper_logger.addHandler(file_handler)
+
 TEST_COMPLETION_TIME = 3  # in seconds
 
+# Opt-in: time every statement of a script (summary table at the end), log the
+# ones slower than `SLOW_QUERY_MS` with their plan, see `timing.py`
+STATEMENT_TIMING = os.environ.get("STATEMENT_TIMING", default="0") == "1"
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", default=100))
+
+# Months of `events` kept before the current one, and where expired months
+# are archived, see `partitions.py`
+EVENTS_RETENTION_MONTHS = int(os.environ.get("EVENTS_RETENTION_MONTHS", default=12))
+EVENTS_ARCHIVE_DIR = os.environ.get("EVENTS_ARCHIVE_DIR", default="archive")
+
+# Clock of the time-dependent triggers: `simulated` (instant) or `wall`,
+# see `clock.py`
+CLOCK = os.environ.get("CLOCK", default="simulated")
+
+# Print results batch by batch instead of fetching them all first
+STREAM_OUTPUT = os.environ.get("STREAM_OUTPUT", default="0") == "1"
+STREAM_BATCH_SIZE = int(os.environ.get("STREAM_BATCH_SIZE", default=500))
+
+# Compiled statements kept per connection
+STATEMENT_CACHE_SIZE = int(os.environ.get("STATEMENT_CACHE_SIZE", default=128))
+
+# Result cache of the catalog lookups: seconds an entry is served, bound of
+# the estimated size of the cached rows and seconds between two reads of the
+# change counters (0: before every lookup), see `resultcache.py`
+RESULT_CACHE = os.environ.get("RESULT_CACHE", default="1") == "1"
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", default=300))
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", default=2**26))
+RESULT_CACHE_CHECK_INTERVAL = float(
+    os.environ.get("RESULT_CACHE_CHECK_INTERVAL", default=0)
+)
+
+# Connection PRAGMAs: `default` or `performance` (WAL, mmap, ...), see `pragmas.py`
+SQLITE_PROFILE = os.environ.get("SQLITE_PROFILE", default="default")
+
+# One connection per thread, opened on first use
+pool = Pool("ems.db", cached_statements=STATEMENT_CACHE_SIZE, profile=SQLITE_PROFILE)
+
+# Shared by the threads, invalidated through the `ems_table_versions` counters
+result_cache = ResultCache(RESULT_CACHE_TTL, RESULT_CACHE_MAX_BYTES)
+cache_watcher = VersionWatcher(result_cache, RESULT_CACHE_CHECK_INTERVAL)
+
+
+def pretty_print_table(
+    cursor, name="", stream=STREAM_OUTPUT, batch_size=STREAM_BATCH_SIZE
+):
+    if stream:
+        # Render each `fetchmany` batch as soon as SQLite produces it
+        print_stream(cursor, f"\n\nSTATEMENT: {name}", batch_size)
+        return
 
-def pretty_print_table(cursor, name=""):
     # Fetch all rows from the cursor
     rows = cursor.fetchall()
     if not rows:
@@ -35,26 +103,116 @@ def pretty_print_table(cursor, name=""):
     print(tb(rows, headers, tablefmt="grid"))
 
 
-def execute_and_print(cursor, sql_script, script_name=""):
-    """Executes SQL queries from a script string and prints results."""
+def print_query(query, params=(), batch_size=STREAM_BATCH_SIZE) -> int:
+    """Stream a (large) query result batch by batch.
+
+    Args:
+        query (str): a single `SELECT` query
+        params (Sequence | Mapping, optional): query parameters
+        batch_size (int, optional): rows per `fetchmany`
+
+    Returns:
+        int: number of rows printed
+    """
+    with pool.connection() as connection:
+        return stream_query(connection, query, params, batch_size)
+
+
+def lookup(name: str, params: dict, cached: bool = RESULT_CACHE) -> list:
+    """Run one of the `queries.LOOKUPS` with bound parameters.
+    - The `queries.CACHED_LOOKUPS` are read through `result_cache`, after \
+        `cache_watcher` dropped what changed since its last check.
+
+    Args:
+        name (str): lookup name, e.g. `tests_history_by_email`
+        params (dict): query parameters, e.g. `{"email": ...}`
+        cached (bool, optional): use the result cache. Defaults to `RESULT_CACHE`.
+
+    Returns:
+        list: result rows (shared with the cache: don't modify them)
+    """
+    with pool.connection() as connection:
+
+        def load():
+            return cache_for(connection, STATEMENT_CACHE_SIZE).lookup(name, params)
+
+        tables = CACHED_LOOKUPS.get(name)
+        if not cached or tables is None:
+            return load()
+        if cache_watcher.due():
+            cache_watcher.check(connection)
+        return result_cache.fetch(LOOKUPS[name], params, tables, load)
+
+
+def paper(test_id: int, cached: bool = RESULT_CACHE) -> catalog.Paper:
+    """The question paper of a test, loaded once for all of its sessions.
+    - Read through `result_cache` like the catalog lookups.
+
+    Args:
+        test_id (int): test id
+        cached (bool, optional): use the result cache. Defaults to `RESULT_CACHE`.
+
+    Raises:
+        KeyError: no such test
+
+    Returns:
+        catalog.Paper: the test, its questions and options (shared: don't \
+            modify it)
+    """
+    with pool.connection() as connection:
+
+        def load():
+            return catalog.load_paper(connection, test_id)
+
+        if not cached:
+            return load()
+        if cache_watcher.due():
+            cache_watcher.check(connection)
+        return result_cache.fetch(
+            catalog.PAPER, {"test_id": test_id}, CATALOG_TABLES, load, catalog.sizeof
+        )
+
+
+def execute_and_print(
+    cursor, sql_script, script_name="", export=None, timing=STATEMENT_TIMING
+):
+    """Executes SQL queries from a script string and prints results.
+
+    Args:
+        cursor (sqlite3.Cursor): cursor to run the statements on
+        sql_script (str): statements separated by `;`
+        script_name (str, optional): label printed before execution
+        export (callable, optional): write result sets to files instead of \
+            printing them, e.g. `export.ResultExporter("exports", "jsonl")`
+        timing (bool, optional): time every statement, print a summary \
+            table and log the slow ones (`SLOW_QUERY_MS`) with their plan
+    """
     print(f"\n--- Executing {script_name} ---")
-    for query in sql_script.strip().split(";"):
-        if query.strip():  # Ensure query is not empty
-            try:
-                cursor.execute(query)
-                # Only print if it's a SELECT statement or potentially modifies data
-                # (heuristic: check if cursor.description is set after execute)
-                if cursor.description:
-                    pretty_print_table(cursor, query.strip())
-                else:
-                    # For non-SELECT, print the query itself for context
-                    print(f"\n\nEXECUTED: {query.strip()}")
-            except sqlite3.Error as e:
-                logger.error(f"Error executing query: {query.strip()}\n{e}")
+    timer = StatementTimer(cursor.connection, SLOW_QUERY_MS) if timing else None
+    for query in split_statements(sql_script):
+        try:
+            started = perf_counter()
+            cursor.execute(query)
+            if timer is not None:
+                timer.record(cursor, query, perf_counter() - started)
+            # Only print if it's a SELECT statement or potentially modifies data
+            # (heuristic: check if cursor.description is set after execute)
+            if cursor.description and export is not None:
+                path, rows = export(cursor, query)
+                print(f"\n\nEXPORTED {rows} rows to {path}: {query}")
+            elif cursor.description:
+                pretty_print_table(cursor, query)
+            else:
+                # For non-SELECT, print the query itself for context
+                print(f"\n\nEXECUTED: {query}")
+        except sqlite3.Error as e:
+            logger.error(f"Error executing query: {query}\n{e}")
+    if timer is not None:
+        timer.print_summary(script_name)
     logger.info(f"{script_name} executed successfully.")
 
 
-def create_database_and_tables():
+def create_database_and_tables(clock=None):
     """Create a SQLite database and execute SQL scripts \
         to create tables and insert data.
     This script connects to an SQLite database, reads SQL scripts from files,
@@ -74,12 +232,24 @@ def create_database_and_tables():
     - The script also fetches and displays the contents of the 'students', 'tests', \
         and 'tests_sessions' tables.
     - It prints the names of all tables in the database at the end.
+    - The test completion wait runs on `clock` (default: `CLOCK`).
     """
 
     # Connect to the SQLite database (create if it doesn't exist)
-    connection = sqlite3.connect("ems.db")
-    logger.info("Connected to the database successfully.")
+    with pool.connection() as connection:
+        logger.info("Connected to the database successfully.")
+        populate(connection, clock)
+
+
+def populate(connection: sqlite3.Connection, clock=None) -> None:
+    """Apply `schema.sql`, run `queries.sql` and list the tables.
 
+    Args:
+        connection (sqlite3.Connection): open connection
+        clock (clock.WallClock, optional): time seen by the triggers. \
+            Defaults to a new `CLOCK` clock.
+    """
+    clock = CLOCKS[CLOCK]() if clock is None else clock
     print("Hello from `ems` db!")
 
     # Create a cursor object
@@ -89,16 +259,16 @@ def create_database_and_tables():
     try:
         with open("schema.sql", "r") as sql_file:
             sql_schema_script = sql_file.read()
+        # The schema drops `events`, the month tables go with it
+        drop_partitions(connection)
         # Execute the SQL scripts for creating tables
         cursor.executescript(sql_schema_script)
         logger.info("Tables created successfully.")
     except FileNotFoundError:
         logger.error("schema.sql not found. Cannot create tables.")
-        connection.close()
         return
     except sqlite3.Error as e:
         logger.error(f"Error executing schema script: {e}")
-        connection.close()
         return
 
     print("\n\nLet's Insert Some Data replicating user flow: ...")
@@ -109,7 +279,6 @@ def create_database_and_tables():
             sql_queries_full_script = sql_file.read()
     except FileNotFoundError:
         logger.error("queries.sql not found. Cannot insert/update data.")
-        connection.close()
         return
 
     # Split the queries script
@@ -118,16 +287,21 @@ def create_database_and_tables():
     sql_queries_part2 = query_parts[1] if len(query_parts) > 1 else ""
 
     # Execute the first part of the queries script
-    execute_and_print(cursor, sql_queries_part1, "Queries Part 1 (Inserts/Selects)")
+    with using(connection, clock):
+        execute_and_print(cursor, sql_queries_part1, "Queries Part 1 (Inserts/Selects)")
 
-    sleep(TEST_COMPLETION_TIME)
     logger.info(
-        f"Sleeping for {TEST_COMPLETION_TIME} seconds to mimic test completion..."
+        f"Waiting {TEST_COMPLETION_TIME} seconds ({type(clock).__name__}) "
+        "to mimic test completion..."
     )
+    clock.sleep(TEST_COMPLETION_TIME)
 
     # Execute the second part of the queries script (if it exists)
     if sql_queries_part2:
-        execute_and_print(cursor, sql_queries_part2, "Queries Part 2 (Updates/Selects)")
+        with using(connection, clock):
+            execute_and_print(
+                cursor, sql_queries_part2, "Queries Part 2 (Updates/Selects)"
+            )
 
     logger.info("Data inserted and updated successfully.")
 
@@ -148,12 +322,26 @@ def create_database_and_tables():
     except sqlite3.Error as e:
         logger.error(f"Could not fetch table names: {e}")
 
-    # Commit the transaction (if required)
-    connection.commit()
-
-    # Close the connection
-    connection.close()
+    # The pool commits the transaction when the `with` block ends
 
 
 if __name__ == "__main__":
-    create_database_and_tables()
+    parser = argparse.ArgumentParser(description="Create and populate `ems.db`")
+    parser.add_argument(
+        "--profile",
+        choices=PROFILES,
+        default=SQLITE_PROFILE,
+        help="connection PRAGMAs (default: $SQLITE_PROFILE or `default`)",
+    )
+    parser.add_argument(
+        "--clock",
+        choices=CLOCKS,
+        default=CLOCK,
+        help="trigger clock, `wall` really waits (default: $CLOCK or `simulated`)",
+    )
+    args = parser.parse_args()
+
+    # Connections are opened on first use, so they pick up the profile
+    pool.profile = args.profile
+    create_database_and_tables(CLOCKS[args.clock]())
+    pool.close()
@@ -0,0 +1,248 @@
+"""
+Export query results to files for downstream tooling.
+
+## Key Features:
+- Sinks stream rows straight to disk, one `fetchmany` batch at a time:
+    - `csv`: a header line, then one line per row (gzip-compressed when \
+        the path ends with `.gz`).
+    - `jsonl`: one JSON object per row; dates, intervals and decimals are \
+        written as strings.
+    - `parquet`: columnar, one row group per batch, via `pyarrow` \
+        (optional, `pip install pyarrow`).
+- SQLite produces rows on demand, so only one batch is ever in memory.
+- `ResultExporter` plugs into `db.execute_and_print` and writes every \
+    result set of a script to its own numbered file.
+
+## Usage:
+```sh
+python export.py results events --format jsonl --output-dir exports
+python export.py --query "SELECT * FROM tests_history" --format parquet
+```
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import logging
+import os
+import sqlite3
+
+from stream import DEFAULT_BATCH_SIZE, iter_batches
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional, only needed for `parquet`
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "jsonl", "parquet")
+
+
+class CsvSink:
+    """CSV file, header first."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self._file = None
+        self._writer = None
+
+    def open(self, headers: list) -> None:
+        opener = gzip.open if str(self.path).endswith(".gz") else open
+        self._file = opener(self.path, "wt", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(headers)
+
+    def write(self, rows: list) -> None:
+        self._writer.writerows(rows)
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+
+
+class JsonlSink:
+    """JSON Lines file, one object per row keyed by column name."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self._file = None
+        self._headers = None
+
+    def open(self, headers: list) -> None:
+        self._file = open(self.path, "w")  # noqa: SIM115, see close()
+        self._headers = headers
+
+    def write(self, rows: list) -> None:
+        for row in rows:
+            record = dict(zip(self._headers, row))
+            self._file.write(json.dumps(record, default=str) + "\n")
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+
+
+class ParquetSink:
+    """Parquet file, one row group per batch.
+
+    Column types come from the first batch; a column that is only NULLs
+    there is written as strings.
+    """
+
+    def __init__(self, path: str):
+        if pa is None:
+            raise RuntimeError("The parquet format needs pyarrow: pip install pyarrow")
+        self.path = path
+        self.rows = 0
+        self._headers = None
+        self._schema = None
+        self._writer = None
+
+    def open(self, headers: list) -> None:
+        self._headers = headers
+
+    def _start(self, rows: list) -> None:
+        fields = []
+        for name, column in zip(self._headers, zip(*rows)):
+            kind = pa.array(column).type
+            if pa.types.is_null(kind):
+                kind = pa.string()
+            fields.append(pa.field(name, kind))
+        self._schema = pa.schema(fields)
+        self._writer = pq.ParquetWriter(self.path, self._schema)
+
+    def write(self, rows: list) -> None:
+        if not rows:
+            return
+        if self._writer is None:
+            self._start(rows)
+        arrays = []
+        for field, column in zip(self._schema, zip(*rows)):
+            if pa.types.is_string(field.type):
+                column = [None if value is None else str(value) for value in column]
+            arrays.append(pa.array(column, type=field.type))
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        if self._writer is None and self._headers is not None:
+            # Empty result: still leave a readable file with the columns
+            schema = pa.schema([(name, pa.string()) for name in self._headers])
+            self._writer = pq.ParquetWriter(self.path, schema)
+        if self._writer is not None:
+            self._writer.close()
+
+
+SINKS = {"csv": CsvSink, "jsonl": JsonlSink, "parquet": ParquetSink}
+
+
+def make_sink(path: str, fmt: str):
+    """Sink for one of `FORMATS`."""
+    if fmt not in SINKS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return SINKS[fmt](path)
+
+
+def export_cursor(cursor, sink, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Write the current result of a cursor to a sink, return the row count."""
+    sink.open([column[0] for column in cursor.description])
+    try:
+        for rows in iter_batches(cursor, batch_size):
+            sink.write(rows)
+    finally:
+        sink.close()
+    return sink.rows
+
+
+def export_query(
+    cnx: sqlite3.Connection,
+    query: str,
+    path: str,
+    fmt: str = "csv",
+    params=(),
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Export a query result to a file.
+
+    Args:
+        cnx (sqlite3.Connection): open connection
+        query (str): a single `SELECT` query
+        path (str): output file
+        fmt (str, optional): one of `FORMATS`. Defaults to "csv".
+        params (Sequence | Mapping, optional): query parameters
+        batch_size (int, optional): rows per `fetchmany`. Defaults to 500.
+
+    Returns:
+        int: number of rows written
+    """
+    sink = make_sink(path, fmt)
+    cursor = cnx.execute(query, params)
+    try:
+        return export_cursor(cursor, sink, batch_size)
+    finally:
+        cursor.close()
+
+
+class ResultExporter:
+    """Write every result set of a script to `<directory>/result-NNN.<fmt>`.
+
+    Pass it as `db.execute_and_print(..., export=ResultExporter("exports"))`.
+
+    Args:
+        directory (str): output directory, created if missing
+        fmt (str, optional): one of `FORMATS`. Defaults to "csv".
+        batch_size (int, optional): rows per `fetchmany`. Defaults to 500.
+    """
+
+    def __init__(self, directory: str, fmt: str = "csv", batch_size=DEFAULT_BATCH_SIZE):
+        if fmt not in SINKS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.files = []
+
+    def __call__(self, cursor, query: str) -> tuple:
+        """Export the current result of `cursor`, return `(path, rows)`."""
+        name = f"result-{len(self.files) + 1:03d}.{self.fmt}"
+        path = os.path.join(self.directory, name)
+        rows = export_cursor(cursor, make_sink(path, self.fmt), self.batch_size)
+        self.files.append((path, rows))
+        return path, rows
+
+
+if __name__ == "__main__":
+    from db import pool
+
+    parser = argparse.ArgumentParser(description="Export EMS tables or queries")
+    parser.add_argument("tables", nargs="*", help="tables (or views) to export")
+    parser.add_argument(
+        "--query", action="append", default=[], help="extra query to export"
+    )
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--output-dir", default="exports")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    # Log as when imported, through the handlers `db` sets up
+    logger = logging.getLogger("export")
+    os.makedirs(args.output_dir, exist_ok=True)
+    with pool.connection() as cnx:
+        jobs = [
+            (f'SELECT * FROM "{table.replace(chr(34), chr(34) * 2)}"', table)
+            for table in args.tables
+        ]
+        jobs += [(query, f"query-{i:03d}") for i, query in enumerate(args.query, 1)]
+        for query, name in jobs:
+            path = os.path.join(args.output_dir, f"{name}.{args.format}")
+            rows = export_query(cnx, query, path, args.format, (), args.batch_size)
+            logger.info("%s: %d rows -> %s", name, rows, path)
+    pool.close()
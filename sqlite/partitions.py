@@ -0,0 +1,245 @@
+"""
+Monthly partitions of `events`: rotation, retention and archival.
+
+## Key Features:
+- SQLite has no declarative partitioning: `events` keeps the current \
+    month, `ensure_partitions` moves the rows of every closed month to its \
+    own `events_YYYYMM` table (created on first use, with a `CHECK` on its \
+    range and its own indexes).
+- The `events_all` view (see `schema.sql`) is regenerated with one \
+    `UNION ALL` branch per month table, each with its range: SQLite pushes \
+    a time range down into every branch, so a query on \
+    `test_sessions_suspicious_behaviour_search` only searches the months \
+    of that range, the others cost one empty index probe.
+- `archive_partitions` writes every month older than the retention to \
+    `<directory>/events_YYYYMM.csv.gz` (`export.export_query`), then drops \
+    its table.
+- `maintain` runs both; schedule it (e.g. a daily cron job).
+
+## Notes:
+- The month tables live in the main database file: a view of the main \
+    schema can't read attached databases, and triggers and foreign keys \
+    can't cross them either. Month tables don't enforce the foreign key \
+    to `proctoring_sessions`, their rows were checked when inserted.
+- "Now" is the `ems_now` view, so months follow the trigger clock (see \
+    `clock.py`).
+- Nothing is committed, the caller owns the transaction. An archive file \
+    is complete before its table is dropped: if the transaction fails, the \
+    table stays and the next run writes the same file again.
+
+## Usage:
+```sh
+python partitions.py --retention-months 12 --archive-dir archive
+python partitions.py --list
+```
+"""
+
+import argparse
+import logging
+import os
+import re
+import sqlite3
+from datetime import date
+
+from export import export_query
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_MONTHS = 12
+DEFAULT_ARCHIVE_DIR = "archive"
+
+PARTITION = re.compile(r"^events_(\d{4})(\d{2})$")
+COLUMNS = '"id", "proctoring_session_id", "type", "timestamp", "description"'
+
+LIST_PARTITIONS = (
+    'SELECT "name" FROM "sqlite_master" WHERE "type" = \'table\' '
+    "AND \"name\" GLOB 'events_[0-9][0-9][0-9][0-9][0-9][0-9]'"
+)
+
+# Months of the rows of `events` before the current one
+CLOSED_MONTHS = (
+    'SELECT DISTINCT strftime(\'%Y%m\', "timestamp") FROM "events" '
+    'WHERE "timestamp" < ? ORDER BY 1'
+)
+
+MONTH_TABLE = """
+CREATE TABLE IF NOT EXISTS "{name}" (
+    "id" INTEGER,
+    "proctoring_session_id" INTEGER,
+    "type" TEXT NOT NULL,
+    "timestamp" NUMERIC NOT NULL CHECK (
+        "timestamp" >= '{since}' AND "timestamp" < '{until}'
+    ),
+    "description" TEXT,
+    PRIMARY KEY ("id")
+)
+"""
+
+
+def add_months(day: date, months: int) -> date:
+    """First day of the month `months` after (or before) the month of `day`."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _now(cnx: sqlite3.Connection) -> date:
+    (now,) = cnx.execute('SELECT "now" FROM "ems_now"').fetchone()
+    return date.fromisoformat(now[:10])
+
+
+def _branch(name: str, since: date) -> str:
+    until = add_months(since, 1)
+    # Unary `+`: the range covers the whole table, it must not pass for a
+    # selective `timestamp` index search (a query's own range still is one)
+    return (
+        f'SELECT {COLUMNS} FROM "{name}" '
+        f"WHERE +\"timestamp\" >= '{since}' AND +\"timestamp\" < '{until}'"
+    )
+
+
+def partitions(cnx: sqlite3.Connection) -> list:
+    """`(name, first day of its month)` of the month tables, oldest first."""
+    found = []
+    for (name,) in cnx.execute(LIST_PARTITIONS):
+        if match := PARTITION.match(name):
+            found.append((name, date(int(match[1]), int(match[2]), 1)))
+    return sorted(found, key=lambda partition: partition[1])
+
+
+def rebuild_view(cnx: sqlite3.Connection) -> None:
+    """Regenerate `events_all` over `events` and every month table."""
+    branches = [f'SELECT {COLUMNS} FROM "events"']
+    branches += [_branch(name, since) for name, since in partitions(cnx)]
+    cnx.execute('DROP VIEW IF EXISTS "events_all"')
+    cnx.execute(f'CREATE VIEW "events_all" AS {" UNION ALL ".join(branches)}')
+
+
+def _create(cnx: sqlite3.Connection, name: str, since: date) -> None:
+    until = add_months(since, 1)
+    cnx.execute(MONTH_TABLE.format(name=name, since=since, until=until))
+    cnx.execute(
+        f'CREATE INDEX IF NOT EXISTS "idx_{name}_suspicious" ON "{name}" '
+        '("proctoring_session_id", "type", "timestamp", "description") '
+        "WHERE \"type\" = 'suspicious-behavior'"
+    )
+    cnx.execute(
+        f'CREATE INDEX IF NOT EXISTS "idx_{name}_timestamp" ON "{name}" ("timestamp")'
+    )
+
+
+def ensure_partitions(cnx: sqlite3.Connection) -> list:
+    """Move the rows of the closed months out of `events`.
+
+    Args:
+        cnx (sqlite3.Connection): open connection
+
+    Returns:
+        list: names of the created month tables
+    """
+    current = add_months(_now(cnx), 0)
+    existing = {name for name, _ in partitions(cnx)}
+    created = []
+    moved = 0
+    for (month,) in cnx.execute(CLOSED_MONTHS, (f"{current}",)).fetchall():
+        name = f"events_{month}"
+        since = date(int(month[:4]), int(month[4:]), 1)
+        if name not in existing:
+            _create(cnx, name, since)
+            created.append(name)
+        where = '"timestamp" >= ? AND "timestamp" < ?'
+        bounds = (f"{since}", f"{add_months(since, 1)}")
+        cnx.execute(
+            f'INSERT INTO "{name}" ({COLUMNS}) '
+            f'SELECT {COLUMNS} FROM "events" WHERE {where}',
+            bounds,
+        )
+        moved += cnx.execute(f'DELETE FROM "events" WHERE {where}', bounds).rowcount
+    if created:
+        rebuild_view(cnx)
+        logger.info("Created events partitions: %s", ", ".join(created))
+    if moved:
+        logger.info("Moved %d events of closed months", moved)
+    return created
+
+
+def archive_partitions(
+    cnx: sqlite3.Connection,
+    keep_months: int = DEFAULT_RETENTION_MONTHS,
+    directory: str = DEFAULT_ARCHIVE_DIR,
+) -> list:
+    """Archive and drop the month tables older than the retention.
+
+    The current month and the `keep_months` before it are kept.
+
+    Args:
+        cnx (sqlite3.Connection): open connection
+        keep_months (int, optional): months kept before the current one. \
+            Defaults to 12.
+        directory (str, optional): archive directory, created if missing. \
+            Defaults to "archive".
+
+    Returns:
+        list: `(name, path, rows)` of the archived month tables
+    """
+    cutoff = add_months(_now(cnx), -keep_months)
+    archived = []
+    for name, period in partitions(cnx):
+        if period >= cutoff:
+            break
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}.csv.gz")
+        rows = export_query(cnx, f'SELECT * FROM "{name}" ORDER BY "id"', path)
+        cnx.execute(f'DROP TABLE "{name}"')
+        logger.info("Archived %s: %d rows -> %s", name, rows, path)
+        archived.append((name, path, rows))
+    if archived:
+        rebuild_view(cnx)
+    return archived
+
+
+def drop_partitions(cnx: sqlite3.Connection) -> None:
+    """Drop every month table, e.g. before reloading the schema."""
+    names = [name for name, _ in partitions(cnx)]
+    for name in names:
+        cnx.execute(f'DROP TABLE "{name}"')
+    if names:
+        rebuild_view(cnx)
+
+
+def maintain(
+    cnx: sqlite3.Connection,
+    keep_months: int = DEFAULT_RETENTION_MONTHS,
+    directory: str = DEFAULT_ARCHIVE_DIR,
+) -> dict:
+    """Move the closed months out of `events`, then archive the expired ones.
+
+    Returns:
+        dict: `created` table names, `archived` `(name, path, rows)`
+    """
+    return {
+        "created": ensure_partitions(cnx),
+        "archived": archive_partitions(cnx, keep_months, directory),
+    }
+
+
+if __name__ == "__main__":
+    from tabulate import tabulate as tb
+
+    from db import EVENTS_ARCHIVE_DIR, EVENTS_RETENTION_MONTHS, pool
+
+    parser = argparse.ArgumentParser(description="Maintain the events partitions")
+    parser.add_argument("--retention-months", type=int, default=EVENTS_RETENTION_MONTHS)
+    parser.add_argument("--archive-dir", default=EVENTS_ARCHIVE_DIR)
+    parser.add_argument("--list", action="store_true", help="only list the partitions")
+    args = parser.parse_args()
+
+    with pool.connection() as cnx:
+        if not args.list:
+            maintain(cnx, args.retention_months, args.archive_dir)
+        listed = [(name, f"{period:%Y-%m}") for name, period in partitions(cnx)]
+        rows = []
+        for name, month in [*listed, ("events", "")]:
+            count = cnx.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]
+            rows.append((name, month, count))
+        print(tb(rows, ["partition", "month", "rows"], tablefmt="grid"))
+    pool.close()
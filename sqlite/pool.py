@@ -0,0 +1,272 @@
+"""
+Thread-local connection set for the SQLite database.
+
+## Key Features:
+- Every thread gets its own `sqlite3` connection (SQLite connections are \
+    cheap but must not be used by two threads at once), reused across calls.
+- At most `max_size` threads hold a connection at the same time; others \
+    wait up to `timeout` seconds.
+- Connections are health-checked (`SELECT 1`) before being handed out and \
+    replaced when broken.
+- Connections idle for more than `max_idle` seconds are closed (down to \
+    `min_size`), e.g. those left behind by finished worker threads.
+- Acquire-latency metrics (count, p50/p95/max) next to the pool counters.
+- `connection()` context manager: commits on success, rolls back on error.
+
+## Notes:
+- Connections are opened with `check_same_thread=False` only so that idle \
+    ones can be closed from another thread; a connection is still used by \
+    its owning thread only.
+- Every `:memory:` connection is a separate database, use a file path.
+- `cached_statements` sizes each connection's compiled statement cache \
+    (see `queries.py`).
+- `profile` picks the PRAGMAs applied to new connections (see `pragmas.py`).
+- `read_only` opens the connections with `mode=ro`: with WAL they read \
+    next to a writer without blocking it (see `access.py`).
+"""
+
+import logging
+import sqlite3
+import threading
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from time import monotonic, perf_counter
+from typing import Self
+
+from pragmas import DEFAULT_PROFILE, apply_profile, close_connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_SIZE = 1
+DEFAULT_MAX_SIZE = 4
+DEFAULT_MAX_IDLE = 300.0  # seconds
+DEFAULT_TIMEOUT = 30.0  # seconds
+DEFAULT_CACHED_STATEMENTS = 128  # `sqlite3.connect` default
+
+
+class AcquireLatency:
+    """Rolling window of the time spent waiting for a connection."""
+
+    def __init__(self, window: int = 1024):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.max = max(self.max, seconds)
+
+    def summary(self) -> dict:
+        """Latency figures in milliseconds (percentiles over the window)."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {"acquire_count": 0}
+        return {
+            "acquire_count": self.count,
+            "acquire_p50_ms": samples[len(samples) // 2] * 1000,
+            "acquire_p95_ms": samples[int(len(samples) * 0.95)] * 1000,
+            "acquire_max_ms": self.max * 1000,
+        }
+
+
+class _Slot:
+    """A thread's connection and its bookkeeping."""
+
+    def __init__(self, cnx: sqlite3.Connection):
+        self.cnx = cnx
+        self.depth = 0  # nested `connection()` blocks in the owning thread
+        self.last_used = monotonic()
+
+
+class Pool:
+    """SQLite connections, one per thread, with acquire-latency metrics.
+
+    Args:
+        database (str): database file
+        min_size (int, optional): idle connections never closed. Defaults to 1.
+        max_size (int, optional): threads holding a connection at once. \
+            Defaults to 4.
+        max_idle (float, optional): seconds before an idle connection is closed.
+        timeout (float, optional): seconds to wait for a free slot.
+        check (bool, optional): health-check connections on checkout.
+        cached_statements (int, optional): compiled statements kept per \
+            connection. Defaults to 128.
+        profile (str, optional): one of `pragmas.PROFILES`. Defaults to "default".
+        read_only (bool, optional): open read-only connections. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        database: str,
+        min_size: int = DEFAULT_MIN_SIZE,
+        max_size: int = DEFAULT_MAX_SIZE,
+        max_idle: float = DEFAULT_MAX_IDLE,
+        timeout: float = DEFAULT_TIMEOUT,
+        check: bool = True,
+        cached_statements: int = DEFAULT_CACHED_STATEMENTS,
+        profile: str = DEFAULT_PROFILE,
+        read_only: bool = False,
+    ):
+        self.database = database
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.check = check
+        self.cached_statements = cached_statements
+        self.profile = profile
+        self.read_only = read_only
+        self.latency = AcquireLatency()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = {}  # thread ident -> _Slot
+        self._counters = {"connections_num": 0, "connections_lost": 0}
+
+    def _connect(self) -> _Slot:
+        database = self.database
+        if self.read_only:
+            database = f"{Path(database).resolve().as_uri()}?mode=ro"
+        cnx = sqlite3.connect(
+            database,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            uri=self.read_only,
+        )
+        apply_profile(cnx, self.profile)
+        with self._lock:
+            self._counters["connections_num"] += 1
+        return _Slot(cnx)
+
+    def _healthy(self, slot: _Slot) -> bool:
+        try:
+            slot.cnx.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error as err:
+            logger.info("Dropping broken connection: %s", err)
+            with self._lock:
+                self._counters["connections_lost"] += 1
+            return False
+
+    def _reap(self) -> None:
+        """Close connections idle for longer than `max_idle`."""
+        now = monotonic()
+        with self._lock:
+            idle = sorted(
+                (slot.last_used, ident)
+                for ident, slot in self._connections.items()
+                if slot.depth == 0
+            )
+            expired = [
+                ident
+                for last_used, ident in idle[: len(self._connections) - self.min_size]
+                if now - last_used > self.max_idle
+            ]
+            slots = [self._connections.pop(ident) for ident in expired]
+        for slot in slots:
+            close_connection(slot.cnx, self.profile)
+        if slots:
+            logger.info(
+                "Closed %d connection(s) idle for over %ss", len(slots), self.max_idle
+            )
+
+    def _claim_local_slot(self) -> _Slot:
+        """This thread's slot, marked busy so that `_reap` leaves it alone."""
+        ident = threading.get_ident()
+        slot = getattr(self._local, "slot", None)
+        with self._lock:
+            # The slot may have been reaped while this thread was idle
+            if slot is not None and self._connections.get(ident) is not slot:
+                slot = None
+            if slot is not None:
+                slot.depth += 1
+        if slot is not None and self.check and not self._healthy(slot):
+            with self._lock:
+                self._connections.pop(ident, None)
+            close_connection(slot.cnx, self.profile)
+            slot = None
+        if slot is None:
+            slot = self._connect()
+            slot.depth += 1
+            self._local.slot = slot
+            with self._lock:
+                # Left behind by a finished thread whose ident got reused
+                stale = self._connections.get(ident)
+                self._connections[ident] = slot
+            if stale is not None:
+                close_connection(stale.cnx, self.profile)
+        return slot
+
+    @contextmanager
+    def connection(self, timeout: float | None = None):
+        """Borrow this thread's connection for the duration of a `with` block.
+
+        Args:
+            timeout (float, optional): seconds to wait for a free slot
+
+        Yields:
+            sqlite3.Connection: the calling thread's connection
+        """
+        slot = getattr(self._local, "slot", None)
+        if slot is not None and slot.depth > 0:
+            # Nested block: same connection, the outer block owns the transaction
+            slot.depth += 1
+            try:
+                yield slot.cnx
+            finally:
+                slot.depth -= 1
+            return
+
+        started = perf_counter()
+        timeout = self.timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"Couldn't get a connection after {timeout:.2f} sec")
+        try:
+            self._reap()
+            slot = self._claim_local_slot()
+            self.latency.record(perf_counter() - started)
+            try:
+                yield slot.cnx
+                slot.cnx.commit()
+            except BaseException:
+                slot.cnx.rollback()
+                raise
+            finally:
+                slot.depth -= 1
+                slot.last_used = monotonic()
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict:
+        """Pool counters (`psycopg_pool` names) plus acquire latency."""
+        with self._lock:
+            sizes = {
+                "pool_min": self.min_size,
+                "pool_max": self.max_size,
+                "pool_size": len(self._connections),
+                "pool_available": sum(
+                    slot.depth == 0 for slot in self._connections.values()
+                ),
+            }
+            counters = dict(self._counters)
+        return {**counters, **sizes, **self.latency.summary()}
+
+    def close(self) -> None:
+        """Close every connection (the pool can still be used afterwards)."""
+        with self._lock:
+            slots = list(self._connections.values())
+            self._connections.clear()
+        for slot in slots:
+            close_connection(slot.cnx, self.profile)
+        logger.info("Connection pool closed: %s", self.stats())
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
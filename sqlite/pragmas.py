@@ -0,0 +1,76 @@
+"""
+Connection profiles: the PRAGMAs applied to every new SQLite connection.
+
+## Key Features:
+- `default`: SQLite's own settings (rollback journal, `synchronous=FULL`, \
+    no mmap, ~2 MB page cache, foreign keys not enforced).
+- `performance`: for exam centres with concurrent readers:
+    - `journal_mode=WAL`: readers never block the writer and vice versa.
+    - `synchronous=NORMAL`: no fsync per commit in WAL mode (a power loss \
+        may lose the last commits, never corrupts the database).
+    - `mmap_size` (256 MiB), `cache_size` (64 MiB) and `temp_store=MEMORY`: \
+        fewer `read()` system calls and no temporary files for sorts.
+    - `busy_timeout` (5 s): writers wait for each other instead of failing \
+        with "database is locked".
+    - `foreign_keys=ON`: the `REFERENCES` clauses of `schema.sql` are enforced.
+    - `PRAGMA optimize` when a connection is closed, so the planner \
+        statistics follow the data.
+- Selected with `SQLITE_PROFILE` (or `--profile`) in `db.py` and `bench.py`.
+
+## Notes:
+- WAL is a property of the database file: it stays on after the \
+    connection closes, and a `default` connection to the same file uses it too.
+- `:memory:` databases can't use WAL, `journal_mode` stays `memory`.
+"""
+
+import sqlite3
+
+DEFAULT_PROFILE = "default"
+
+PROFILES = {
+    DEFAULT_PROFILE: {},
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,  # negative: KiB instead of pages
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,  # ms
+        "foreign_keys": "ON",
+    },
+}
+
+# Profiles that refresh the planner statistics when a connection closes
+OPTIMIZE_ON_CLOSE = ("performance",)
+
+
+def apply_profile(cnx: sqlite3.Connection, profile: str = DEFAULT_PROFILE) -> dict:
+    """Apply a profile's PRAGMAs to a connection.
+
+    Args:
+        cnx (sqlite3.Connection): freshly opened connection (no open transaction)
+        profile (str, optional): one of `PROFILES`. Defaults to "default".
+
+    Raises:
+        ValueError: unknown profile
+
+    Returns:
+        dict: the value SQLite reports for every PRAGMA after setting it
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown SQLite profile: {profile}")
+    effective = {}
+    for pragma, value in PROFILES[profile].items():
+        cnx.execute(f"PRAGMA {pragma} = {value}").fetchall()
+        (effective[pragma],) = cnx.execute(f"PRAGMA {pragma}").fetchone()
+    return effective
+
+
+def close_connection(cnx: sqlite3.Connection, profile: str = DEFAULT_PROFILE) -> None:
+    """Close a connection, running `PRAGMA optimize` first if the profile asks."""
+    if profile in OPTIMIZE_ON_CLOSE:
+        try:
+            cnx.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            pass  # a broken connection is closed anyway
+    cnx.close()
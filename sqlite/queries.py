@@ -0,0 +1,120 @@
+"""
+Parameterized hot lookups over SQLite's prepared statement cache.
+
+## Key Features:
+- `LOOKUPS`: the lookups the application runs over and over (history by \
+    email, options by title or correctness, suspicious behaviour by status), \
+    written with bound parameters instead of literal values.
+- `CACHED_LOOKUPS`: the catalog lookups, whose rows only change with the \
+    tables listed, served from the result cache by `db.lookup` (see \
+    `resultcache.py`).
+- `sqlite3` keeps an LRU of compiled statements per connection, keyed by \
+    the SQL text and sized by `connect(cached_statements=...)`: a bound \
+    query is compiled once, a query with inlined values once per value.
+- `StatementCache` runs queries on a connection and mirrors that LRU to \
+    count hits, misses and evictions (`stats()`), which `sqlite3` does not \
+    expose.
+- `cache_for(cnx)` returns the cache of the calling thread's connection \
+    (see `pool.py`).
+
+## Notes:
+- `maxsize` must match the `cached_statements` the connection was opened \
+    with (`Pool(..., cached_statements=...)`) for the counters to be exact.
+
+## Usage:
+```py
+with pool.connection() as cnx:
+    rows = cache_for(cnx).lookup("tests_history_by_email", {"email": email})
+```
+"""
+
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from resultcache import CATALOG_TABLES
+
+# `sqlite3.connect` default
+DEFAULT_CACHE_SIZE = 128
+
+LOOKUPS = {
+    "tests_history_by_email": (
+        'SELECT * FROM "tests_history" WHERE "student_id" = ('
+        'SELECT "id" FROM "students" WHERE "email" = :email)'
+    ),
+    "test_questions_option_search_by_title": (
+        'SELECT * FROM "test_questions_option_search" WHERE "title" = :title'
+    ),
+    "test_questions_option_search_by_is_correct": (
+        'SELECT * FROM "test_questions_option_search" WHERE "is_correct" = :is_correct'
+    ),
+    "test_sessions_suspicious_behaviour_search_by_status": (
+        'SELECT * FROM "test_sessions_suspicious_behaviour_search" '
+        'WHERE "test_session_status" = :status'
+    ),
+}
+
+CACHED_LOOKUPS = {
+    "test_questions_option_search_by_title": CATALOG_TABLES,
+    "test_questions_option_search_by_is_correct": CATALOG_TABLES,
+}
+
+
+class StatementCache:
+    """Statements run on one connection, counted like its statement cache.
+
+    Args:
+        cnx (sqlite3.Connection): connection the statements run on
+        maxsize (int, optional): the connection's `cached_statements`. \
+            Defaults to 128.
+    """
+
+    def __init__(self, cnx: sqlite3.Connection, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.cnx = cnx
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._queries = OrderedDict()
+
+    def execute(self, query: str, params=()) -> sqlite3.Cursor:
+        """Run a query with bound parameters, return its cursor."""
+        if query in self._queries:
+            self.hits += 1
+            self._queries.move_to_end(query)
+        else:
+            self.misses += 1
+            self._queries[query] = None
+            if len(self._queries) > self.maxsize:
+                self._queries.popitem(last=False)
+                self.evictions += 1
+        return self.cnx.execute(query, params)
+
+    def fetchall(self, query: str, params=()) -> list:
+        return self.execute(query, params).fetchall()
+
+    def lookup(self, name: str, params: dict) -> list:
+        """Rows of one of the `LOOKUPS`."""
+        return self.fetchall(LOOKUPS[name], params)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._queries),
+            "maxsize": self.maxsize,
+        }
+
+
+# `sqlite3.Connection` can't be weakly referenced; the pool gives every
+# thread its own connection, so the cache lives next to it
+_local = threading.local()
+
+
+def cache_for(cnx: sqlite3.Connection, maxsize: int = DEFAULT_CACHE_SIZE):
+    """The `StatementCache` of this thread's connection, created on first use."""
+    cache = getattr(_local, "cache", None)
+    if cache is None or cache.cnx is not cnx:
+        cache = _local.cache = StatementCache(cnx, maxsize)
+    return cache
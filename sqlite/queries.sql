@@ -1,7 +1,11 @@
 -- Part 1 Initial Insertion
 -- INSERT/DELETE data from tables(reset-tables)
+DELETE FROM tests_history_summary;
+
 DELETE FROM reports;
 
+DELETE FROM tests_sessions_scores;
+
 DELETE FROM results;
 
 DELETE FROM events;
@@ -186,3 +190,9 @@ WHERE is_correct = 1;
 SELECT *
 FROM test_sessions_suspicious_behaviour_search
 WHERE test_session_status = 'ended';
+
+-- Running score of a test session (live dashboards)
+-- EXPLAIN QUERY PLAN
+SELECT *
+FROM tests_sessions_live_scores
+WHERE test_session_id = 1;
@@ -2,6 +2,9 @@
 DROP VIEW IF EXISTS "tests_history";
 DROP VIEW IF EXISTS "test_questions_option_search";
 DROP VIEW IF EXISTS "test_sessions_suspicious_behaviour_search";
+DROP VIEW IF EXISTS "events_all";
+DROP VIEW IF EXISTS "tests_sessions_live_scores";
+DROP VIEW IF EXISTS "ems_now";
 
 -- Drop indexes
 DROP INDEX IF EXISTS "idx_tests_sessions";
@@ -12,11 +15,18 @@ DROP INDEX IF EXISTS "idx_questions_options";
 DROP INDEX IF EXISTS "idx_questions_options_is_correct";
 DROP INDEX IF EXISTS "idx_tests";
 DROP INDEX IF EXISTS "idx_questions";
-DROP INDEX IF EXISTS "idx_events";
+DROP INDEX IF EXISTS "idx_events_suspicious";
+DROP INDEX IF EXISTS "idx_events_timestamp";
+DROP INDEX IF EXISTS "idx_proctoring_sessions";
+DROP INDEX IF EXISTS "idx_proctoring_sessions_proctor_id";
+DROP INDEX IF EXISTS "idx_results";
+DROP INDEX IF EXISTS "idx_tests_history_summary";
 
 
 -- Drop tables
+DROP TABLE IF EXISTS "tests_history_summary";
 DROP TABLE IF EXISTS "reports";
+DROP TABLE IF EXISTS "tests_sessions_scores";
 DROP TABLE IF EXISTS "results";
 DROP TABLE IF EXISTS "events";
 DROP TABLE IF EXISTS "proctoring_sessions";
@@ -26,9 +36,32 @@ DROP TABLE IF EXISTS "questions_options";
 DROP TABLE IF EXISTS "questions";
 DROP TABLE IF EXISTS "tests";
 DROP TABLE IF EXISTS "students";
+DROP TABLE IF EXISTS "clock";
+DROP TABLE IF EXISTS "bulk_scoring";
 
 -- CREATE TABLES
 
+-- Simulated time for the triggers (see `clock.py`): empty means the wall
+-- clock. SQLite has no session variables: the row is written and deleted
+-- inside the writer's transaction, so other connections don't see it
+CREATE TABLE "clock" (
+    "id" INTEGER CHECK ("id" = 1),
+    "now" NUMERIC NOT NULL,
+    PRIMARY KEY ("id")
+);
+
+-- Answers scored by the application (see `scoring.py`): while it holds its
+-- row, `set_score_of_result` leaves inserted results alone. The row only
+-- lives inside the writer's transaction, no other connection sees it
+CREATE TABLE "bulk_scoring" (
+    "id" INTEGER CHECK ("id" = 1),
+    PRIMARY KEY ("id")
+);
+
+-- The triggers' "now": the simulated time if set, else local time
+CREATE VIEW "ems_now" AS
+SELECT COALESCE((SELECT "now" FROM "clock"), DATETIME('now', 'localtime')) AS "now";
+
 -- Represents students taking the test
 CREATE TABLE "students" (
     "id" INTEGER,
@@ -82,7 +115,7 @@ CREATE TABLE "tests_sessions" (
     "id" INTEGER,
     "test_id" INTEGER,
     "student_id" INTEGER,
-    "start" NUMERIC NOT NULL DEFAULT (DATETIME('now', 'localtime')),
+    "start" NUMERIC, -- trigger added when left out: the clock's "now"
     "end" NUMERIC, -- trigger added.
     "duration_taken" NUMERIC, -- trigger added
     "status" TEXT NOT NULL DEFAULT 'in-progress' CHECK (
@@ -123,6 +156,8 @@ CREATE TABLE "proctoring_sessions" (
 
 -- Represents events occurring during proctoring sessions
 -- trigger added for some new auto updates and entries
+-- holds the current month: closed months move to `events_YYYYMM` tables
+-- (see `partitions.py`), ids are never reused across them
 CREATE TABLE "events" (
     "id" INTEGER,
     "proctoring_session_id" INTEGER,
@@ -136,7 +171,7 @@ CREATE TABLE "events" (
     ),
     "timestamp" NUMERIC NOT NULL DEFAULT (DATETIME('now', 'localtime')),
     "description" TEXT DEFAULT 'OK',
-    PRIMARY KEY ("id"),
+    PRIMARY KEY ("id" AUTOINCREMENT),
     FOREIGN KEY ("proctoring_session_id") REFERENCES "proctoring_sessions" (
         "id"
     )
@@ -171,14 +206,59 @@ CREATE TABLE "reports" (
 );
 
 
+-- Represents the materialized `tests_history` view
+-- trigger added: one row per report, kept with the report
+CREATE TABLE "tests_history_summary" (
+    "report_id" INTEGER,
+    "student_id" INTEGER,
+    "test_id" INTEGER,
+    "test_title" TEXT,
+    "total_score" INTEGER,
+    "scored" INTEGER,
+    "overall_feedback" TEXT,
+    "duration_taken" NUMERIC,
+    PRIMARY KEY ("report_id"),
+    FOREIGN KEY ("report_id") REFERENCES "reports" ("id")
+);
+
+
+-- Represents the running score of test sessions
+-- trigger added: one row per session, updated on every answer
+CREATE TABLE "tests_sessions_scores" (
+    "test_session_id" INTEGER,
+    "answered" INTEGER NOT NULL DEFAULT 0,
+    "correct" INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY ("test_session_id"),
+    FOREIGN KEY ("test_session_id") REFERENCES "tests_sessions" ("id")
+);
+
+
+-- Change counters of the test catalog tables, bumped by triggers and read by
+-- the result caches (see `resultcache.py`); kept across schema reloads
+CREATE TABLE IF NOT EXISTS "ems_table_versions" (
+    "table_name" TEXT,
+    "version" INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY ("table_name")
+);
+
+INSERT OR IGNORE INTO "ems_table_versions" ("table_name")
+VALUES ('tests'), ('questions'), ('questions_options');
+
+
 -- CREATE TRIGGERS: to UPDATE and INSERT values
 
 -- Create a trigger to set the end time based on the tests duration
+-- A start left out (NULL) is set first, from the clock (see `ems_now`)
 CREATE TRIGGER "set_end_for_test_session" AFTER INSERT ON "tests_sessions"
 BEGIN
 UPDATE "tests_sessions"
 SET
-    "end" = DATETIME(new.start, '+' || (
+    "start" = (SELECT "now" FROM "ems_now")
+WHERE "id" = new.id AND new.start IS NULL;
+
+UPDATE "tests_sessions"
+SET
+    "end" = DATETIME("start", '+' || (
             SELECT TIME(duration)
             FROM "tests" AS t
             WHERE t."id" = new."test_id"
@@ -192,14 +272,26 @@ END;
 -- We add some events(student logs) as proctor obeserve in session)
 CREATE TRIGGER "add_events_starts" AFTER INSERT ON "proctoring_sessions"
 BEGIN
-INSERT INTO "events" ("proctoring_session_id", "type")
-VALUES (new.id, 'started-test');
+INSERT INTO "events" ("proctoring_session_id", "type", "timestamp")
+VALUES (new.id, 'started-test', (SELECT "now" FROM "ems_now"));
 END;
 
 
 -- Create a trigger to set score for answer of questions
+-- The answer is counted with its inserted score first: the UPDATE that
+-- scores it then corrects the count through "update_score_of_result"
 CREATE TRIGGER "set_score_of_result" AFTER INSERT ON "results"
+WHEN NOT EXISTS (SELECT 1 FROM "bulk_scoring")
 BEGIN
+-- count the answer in the running score of its session
+INSERT INTO "tests_sessions_scores" ("test_session_id", "answered", "correct")
+SELECT new.test_session_id, 1, new.score
+WHERE new.test_session_id IS NOT NULL
+ON CONFLICT ("test_session_id") DO UPDATE
+SET
+    "answered" = "answered" + 1,
+    "correct" = "correct" + excluded."correct";
+
 UPDATE "results"
 SET
     "score"
@@ -221,9 +313,51 @@ WHERE "id" = new.id;
 END;
 
 
+-- Create triggers to keep the running scores with corrected and deleted answers
+CREATE TRIGGER "update_score_of_result" AFTER UPDATE OF "score" ON "results"
+WHEN old.test_session_id IS new.test_session_id AND old.score IS NOT new.score
+BEGIN
+UPDATE "tests_sessions_scores"
+SET "correct" = "correct" + new.score - old.score
+WHERE "test_session_id" = new.test_session_id;
+END;
+
+CREATE TRIGGER "move_score_of_result" AFTER UPDATE OF "test_session_id" ON "results"
+WHEN old.test_session_id IS NOT new.test_session_id
+BEGIN
+-- take the old answer out of the running score of its session
+UPDATE "tests_sessions_scores"
+SET
+    "answered" = "answered" - 1,
+    "correct" = "correct" - old.score
+WHERE "test_session_id" = old.test_session_id;
+
+-- count the moved one in
+INSERT INTO "tests_sessions_scores" ("test_session_id", "answered", "correct")
+SELECT new.test_session_id, 1, new.score
+WHERE new.test_session_id IS NOT NULL
+ON CONFLICT ("test_session_id") DO UPDATE
+SET
+    "answered" = "answered" + 1,
+    "correct" = "correct" + excluded."correct";
+END;
+
+CREATE TRIGGER "delete_score_of_result" AFTER DELETE ON "results"
+BEGIN
+UPDATE "tests_sessions_scores"
+SET
+    "answered" = "answered" - 1,
+    "correct" = "correct" - old.score
+WHERE "test_session_id" = old.test_session_id;
+END;
+
+
 -- create a trigger to update tests sessions, events,
--- proctoring session and reports on tests session status update
-CREATE TRIGGER "update_status_end_final_score_all" AFTER UPDATE
+-- proctoring session and reports on tests session status update.
+-- Only status changes fire it: SQLite cannot assign `new` columns, so the
+-- trigger sets "duration_taken" with a second UPDATE, which must not
+-- re-run it
+CREATE TRIGGER "update_status_end_final_score_all" AFTER UPDATE OF "status"
 ON "tests_sessions"
 WHEN new.status IN ('ended', 'completed')
 AND old.status NOT IN ('ended', 'completed')
@@ -233,63 +367,234 @@ UPDATE "tests_sessions"
 SET
     "duration_taken"
     = CASE
-        WHEN STRFTIME('%s', 'now', 'localtime') < STRFTIME('%s', new.start) THEN '00:00:00' -- Or handle error/impossibility
-        ELSE STRFTIME('%H:%M:%S', DATETIME(STRFTIME('%s', 'now', 'localtime') - STRFTIME('%s', new.start), 'unixepoch'))
+        WHEN STRFTIME('%s', (SELECT "now" FROM "ems_now")) < STRFTIME('%s', new.start) THEN '00:00:00' -- Or handle error/impossibility
+        ELSE STRFTIME('%H:%M:%S', DATETIME(STRFTIME('%s', (SELECT "now" FROM "ems_now")) - STRFTIME('%s', new.start), 'unixepoch'))
     END
 WHERE "id" = new.id;
 
 -- Add event for test session
-INSERT INTO "events" ("proctoring_session_id", "type")
+INSERT INTO "events" ("proctoring_session_id", "type", "timestamp")
 VALUES
 (
     new.id,
     CASE
         WHEN new.status = 'ended' THEN 'ended-test'
         ELSE 'completed-test'
-    END
+    END,
+    (SELECT "now" FROM "ems_now")
 );
 
 -- Update end time and status for proctoring session
 UPDATE "proctoring_sessions"
-SET "end" = (DATETIME('now', 'localtime')), "status" = 'completed'
+SET "end" = (SELECT "now" FROM "ems_now"), "status" = 'completed'
 WHERE "id" = new.id;
 
---  add reports for test session
+--  add reports for test session from its running score (no results scan)
 INSERT INTO "reports" (
     "test_session_id", "total_score", "final_score", "overall_feedback"
 )
-VALUES (
+SELECT
     new.id,
-    (
-        SELECT COUNT(*) FROM "results"
-        WHERE "results"."test_session_id" = new.id
-    ),
-    (
-        SELECT SUM("results"."score") FROM "results"
-        WHERE "results"."test_session_id" = new.id
-    ),
-    (
-        SELECT MAX("results"."feedback") FROM "results"
-        WHERE "results"."test_session_id" = new.id
-    )
+    COALESCE(s."answered", 0),
+    s."correct",
+    CASE
+        WHEN s."correct" < s."answered" THEN 'need-improvement'
+        WHEN s."answered" > 0 THEN 'great'
+    END
+FROM (SELECT new.id AS "id") AS ts
+LEFT JOIN "tests_sessions_scores" AS s ON ts."id" = s."test_session_id";
+
+-- add the report to the materialized tests history
+INSERT INTO "tests_history_summary" (
+    "report_id",
+    "student_id",
+    "test_id",
+    "test_title",
+    "total_score",
+    "scored",
+    "overall_feedback",
+    "duration_taken"
+)
+SELECT
+    r."id",
+    ts."student_id",
+    ts."test_id",
+    t."title",
+    r."total_score",
+    r."final_score",
+    r."overall_feedback",
+    ts."duration_taken"
+FROM "reports" AS r
+INNER JOIN "tests_sessions" AS ts ON r."test_session_id" = ts."id"
+INNER JOIN "tests" AS t ON ts."test_id" = t."id"
+WHERE r."test_session_id" = new."id"
+-- earlier reports of the session are kept by "update_tests_history_session"
+ON CONFLICT ("report_id") DO NOTHING;
+END;
+
+
+-- Create a trigger to keep test titles of the materialized tests history
+CREATE TRIGGER "update_tests_history_title" AFTER UPDATE OF "title" ON "tests"
+BEGIN
+UPDATE "tests_history_summary"
+SET "test_title" = new.title
+WHERE "test_id" = new.id;
+END;
+
+-- Create triggers to keep the materialized tests history with changed and
+-- deleted sessions, reports and tests (foreign keys are not enforced by
+-- default, so deletes can leave no row behind)
+CREATE TRIGGER "update_tests_history_session"
+AFTER UPDATE OF "student_id", "test_id", "duration_taken" ON "tests_sessions"
+WHEN old.student_id IS NOT new.student_id
+OR old.test_id IS NOT new.test_id
+OR old.duration_taken IS NOT new.duration_taken
+BEGIN
+DELETE FROM "tests_history_summary"
+WHERE "report_id" IN (
+    SELECT "id" FROM "reports" WHERE "test_session_id" = new.id
 );
+
+INSERT INTO "tests_history_summary" (
+    "report_id",
+    "student_id",
+    "test_id",
+    "test_title",
+    "total_score",
+    "scored",
+    "overall_feedback",
+    "duration_taken"
+)
+SELECT
+    r."id",
+    new.student_id,
+    new.test_id,
+    t."title",
+    r."total_score",
+    r."final_score",
+    r."overall_feedback",
+    new.duration_taken
+FROM "reports" AS r
+INNER JOIN "tests" AS t ON t."id" = new.test_id
+WHERE r."test_session_id" = new.id;
+END;
+
+CREATE TRIGGER "delete_tests_history_session" AFTER DELETE ON "tests_sessions"
+BEGIN
+DELETE FROM "tests_history_summary"
+WHERE "report_id" IN (
+    SELECT "id" FROM "reports" WHERE "test_session_id" = old.id
+);
+END;
+
+CREATE TRIGGER "update_tests_history_report" AFTER UPDATE ON "reports"
+BEGIN
+DELETE FROM "tests_history_summary" WHERE "report_id" = old.id;
+
+INSERT INTO "tests_history_summary" (
+    "report_id",
+    "student_id",
+    "test_id",
+    "test_title",
+    "total_score",
+    "scored",
+    "overall_feedback",
+    "duration_taken"
+)
+SELECT
+    new.id,
+    ts."student_id",
+    ts."test_id",
+    t."title",
+    new.total_score,
+    new.final_score,
+    new.overall_feedback,
+    ts."duration_taken"
+FROM "tests_sessions" AS ts
+INNER JOIN "tests" AS t ON t."id" = ts."test_id"
+WHERE ts."id" = new.test_session_id;
+END;
+
+CREATE TRIGGER "delete_tests_history_report" AFTER DELETE ON "reports"
+BEGIN
+DELETE FROM "tests_history_summary" WHERE "report_id" = old.id;
+END;
+
+CREATE TRIGGER "delete_tests_history_test" AFTER DELETE ON "tests"
+BEGIN
+DELETE FROM "tests_history_summary" WHERE "test_id" = old.id;
+END;
+
+-- Create triggers to count the changes of the test catalog tables, read by
+-- the result caches (see `resultcache.py`)
+CREATE TRIGGER "tests_version_insert" AFTER INSERT ON "tests"
+BEGIN
+UPDATE "ems_table_versions" SET "version" = "version" + 1
+WHERE "table_name" = 'tests';
+END;
+
+CREATE TRIGGER "tests_version_update" AFTER UPDATE ON "tests"
+BEGIN
+UPDATE "ems_table_versions" SET "version" = "version" + 1
+WHERE "table_name" = 'tests';
+END;
+
+CREATE TRIGGER "tests_version_delete" AFTER DELETE ON "tests"
+BEGIN
+UPDATE "ems_table_versions" SET "version" = "version" + 1
+WHERE "table_name" = 'tests';
+END;
+
+CREATE TRIGGER "questions_version_insert" AFTER INSERT ON "questions"
+BEGIN
+UPDATE "ems_table_versions" SET "version" = "version" + 1
+WHERE "table_name" = 'questions';
+END;
+
+CREATE TRIGGER "questions_version_update" AFTER UPDATE ON "questions"
+BEGIN
+UPDATE "ems_table_versions" SET "version" = "version" + 1
+WHERE "table_name" = 'questions';
+END;
+
+CREATE TRIGGER "questions_version_delete" AFTER DELETE ON "questions"
+BEGIN
+UPDATE "ems_table_versions" SET "version" = "version" + 1
+WHERE "table_name" = 'questions';
+END;
+
+CREATE TRIGGER "questions_options_version_insert" AFTER INSERT ON "questions_options"
+BEGIN
+UPDATE "ems_table_versions" SET "version" = "version" + 1
+WHERE "table_name" = 'questions_options';
+END;
+
+CREATE TRIGGER "questions_options_version_update" AFTER UPDATE ON "questions_options"
+BEGIN
+UPDATE "ems_table_versions" SET "version" = "version" + 1
+WHERE "table_name" = 'questions_options';
+END;
+
+CREATE TRIGGER "questions_options_version_delete" AFTER DELETE ON "questions_options"
+BEGIN
+UPDATE "ems_table_versions" SET "version" = "version" + 1
+WHERE "table_name" = 'questions_options';
 END;
 
 
 -- CREATE VIEWS: to simplify quering
 
 -- VIEW all students test performance history in test they took
+-- (reads the trigger-maintained "tests_history_summary", no joins)
 CREATE VIEW "tests_history" AS
 SELECT
-    ts."student_id",
-    t."title" AS "test_title",
-    r."total_score",
-    r."final_score" AS "scored",
-    r."overall_feedback",
-    ts."duration_taken"
-FROM "reports" AS r
-INNER JOIN "tests_sessions" AS ts ON r."test_session_id" = ts."id"
-INNER JOIN "tests" AS t ON ts."test_id" = t."id";
+    "student_id",
+    "test_title",
+    "total_score",
+    "scored",
+    "overall_feedback",
+    "duration_taken"
+FROM "tests_history_summary";
 
 
 -- VIEW all tests and their questions as well as options
@@ -309,6 +614,18 @@ FROM "tests" AS t
 INNER JOIN "questions" AS q ON t."id" = q."test_id"
 INNER JOIN "questions_options" AS qo ON q."id" = qo."question_id";
 
+-- VIEW events of every month, regenerated by `partitions.py` with one
+-- `UNION ALL` branch per `events_YYYYMM` table; the range of each branch
+-- lets a time range skip the other months with one index probe
+CREATE VIEW "events_all" AS
+SELECT
+    "id",
+    "proctoring_session_id",
+    "type",
+    "timestamp",
+    "description"
+FROM "events";
+
 -- VIEW tests session of suspicious behaviour
 CREATE VIEW "test_sessions_suspicious_behaviour_search" AS
 SELECT
@@ -323,9 +640,20 @@ SELECT
     e."description"
 FROM "tests_sessions" AS ts
 INNER JOIN "proctoring_sessions" AS ps ON ts."id" = ps."test_session_id"
-INNER JOIN "events" AS e ON ps."id" = e."proctoring_session_id"
+INNER JOIN "events_all" AS e ON ps."id" = e."proctoring_session_id"
 WHERE e."type" = 'suspicious-behavior';
 
+-- VIEW running score of test sessions, one primary key probe per session
+CREATE VIEW "tests_sessions_live_scores" AS
+SELECT
+    ts."id" AS "test_session_id",
+    ts."student_id",
+    ts."status" AS "test_session_status",
+    COALESCE(s."answered", 0) AS "answered",
+    COALESCE(s."correct", 0) AS "correct"
+FROM "tests_sessions" AS ts
+LEFT JOIN "tests_sessions_scores" AS s ON ts."id" = s."test_session_id";
+
 
 -- CREATE INDEXES: to speed common searches
 CREATE INDEX "idx_tests_sessions" ON "tests_sessions" (
@@ -343,4 +671,30 @@ CREATE INDEX "idx_questions_options_is_correct" ON "questions_options" (
 WHERE "is_correct" = 1;
 CREATE INDEX "idx_tests" ON "tests" ("title");
 CREATE INDEX "idx_questions" ON "questions" ("test_id", "id");
-CREATE INDEX "idx_events" ON "events" ("type");
+
+-- Trigger and view access paths: `results` is aggregated per test session,
+-- `proctoring_sessions` is joined per test session and the suspicious
+-- behaviour view joins `events` per proctoring session
+CREATE INDEX "idx_results" ON "results" (
+    "test_session_id", "score", "feedback"
+);
+CREATE INDEX "idx_proctoring_sessions" ON "proctoring_sessions" (
+    "test_session_id", "status"
+);
+
+-- The proctor alert screen: sessions of a proctor, then their suspicious
+-- events only (a few percent of `events`), read from the index alone
+CREATE INDEX "idx_proctoring_sessions_proctor_id" ON "proctoring_sessions" (
+    "proctor_id"
+);
+CREATE INDEX "idx_events_suspicious" ON "events" (
+    "proctoring_session_id", "type", "timestamp", "description"
+)
+WHERE "type" = 'suspicious-behavior';
+CREATE INDEX "idx_events_timestamp" ON "events" ("timestamp");
+CREATE INDEX "idx_tests_history_summary" ON "tests_history_summary" (
+    "student_id"
+);
+
+-- The tables were recreated: every cached result is stale
+UPDATE "ems_table_versions" SET "version" = "version" + 1;
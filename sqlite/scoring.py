@@ -0,0 +1,128 @@
+"""
+Bulk answer scoring against an answer key, without the per-row trigger.
+
+## Key Features:
+- `answer_key(*papers)`: for every question of the tests, whether each of \
+    its options is correct, from their papers (see `catalog.py`).
+- `score_answers(key, answers)`: `(test_session_id, question_id, answer, \
+    score, feedback)` rows, scored like `set_score_of_result` does, in memory.
+- `session_totals(scored)`: answers and correct answers per session, one \
+    `tests_sessions_scores` upsert per session instead of one per answer.
+- `write_scored(cnx, key, answers)` inserts the scored rows with the trigger \
+    switched off (a row in `bulk_scoring`, see `schema.sql`), then adds the \
+    totals: the trigger's `questions_options` lookups and its `UPDATE` of \
+    every inserted row are gone.
+
+## Notes:
+- Only an option of the answered question is accepted (`ValueError`), the \
+    trigger would score an option of another question by its own correctness.
+- The `bulk_scoring` row is inserted and deleted inside a savepoint, so \
+    other connections never see it and a failure leaves nothing behind.
+- Nothing is committed, the caller owns the transaction.
+
+## Usage:
+```py
+key = answer_key(load_paper(cnx, test_id))
+write_scored(cnx, key, [(session_id, question_id, option_id), ...])
+cnx.commit()
+```
+"""
+
+import sqlite3
+
+# `set_score_of_result`: 0 is "need-improvement", anything else "great"
+FEEDBACK = {0: "need-improvement", 1: "great"}
+
+SAVEPOINT = "ems_scoring"
+BULK_SCORING = 'INSERT INTO "bulk_scoring" ("id") VALUES (1)'
+TRIGGER_SCORING = 'DELETE FROM "bulk_scoring"'
+
+SCORED_RESULT_INSERT = (
+    'INSERT INTO "results" '
+    '("test_session_id", "question_id", "answer", "score", "feedback") '
+    "VALUES (?, ?, ?, ?, ?)"
+)
+SESSION_SCORES_UPSERT = (
+    'INSERT INTO "tests_sessions_scores" ("test_session_id", "answered", "correct") '
+    'VALUES (?, ?, ?) ON CONFLICT ("test_session_id") DO UPDATE SET '
+    '"answered" = "answered" + excluded."answered", '
+    '"correct" = "correct" + excluded."correct"'
+)
+
+
+def answer_key(*papers) -> dict:
+    """`{question_id: {option_id: is_correct}}` of the questions of `papers`."""
+    return {
+        question.id: {option.id: option.is_correct for option in question.options}
+        for paper in papers
+        for question in paper.questions
+    }
+
+
+def score_answers(key: dict, answers) -> list:
+    """Score answers `(test_session_id, question_id, answer)`.
+
+    Args:
+        key (dict): `answer_key` of the answered tests
+        answers (Iterable[Sequence]): one answer per row
+
+    Raises:
+        ValueError: an answer is not an option of its question
+
+    Returns:
+        list: `(test_session_id, question_id, answer, score, feedback)` rows
+    """
+    scored = []
+    for test_session_id, question_id, answer in answers:
+        try:
+            score = key[question_id][answer]
+        except KeyError:
+            raise ValueError(
+                f"answer {answer} is not an option of question {question_id}"
+            ) from None
+        scored.append((test_session_id, question_id, answer, score, FEEDBACK[score]))
+    return scored
+
+
+def session_totals(scored: list) -> list:
+    """`(test_session_id, answered, correct)` of the sessions of scored rows."""
+    totals = {}
+    for test_session_id, _, _, score, _ in scored:
+        # Like the trigger, answers without a session count nowhere
+        if test_session_id is not None:
+            answered, correct = totals.get(test_session_id, (0, 0))
+            totals[test_session_id] = (answered + 1, correct + score)
+    return [(session, *counts) for session, counts in totals.items()]
+
+
+def write_scored(cnx: sqlite3.Connection, key: dict, answers) -> int:
+    """Score answers in memory and insert them, bypassing the scoring trigger.
+
+    Args:
+        cnx (sqlite3.Connection): open connection
+        key (dict): `answer_key` of the answered tests
+        answers (Iterable[Sequence]): `(test_session_id, question_id, answer)`
+
+    Raises:
+        ValueError: an answer is not an option of its question (nothing \
+            is written)
+
+    Returns:
+        int: number of answers written
+    """
+    scored = score_answers(key, answers)
+    if not cnx.in_transaction:
+        # Releasing an outermost savepoint would commit
+        cnx.execute("BEGIN")
+    cnx.execute(f"SAVEPOINT {SAVEPOINT}")
+    try:
+        cnx.execute(BULK_SCORING)
+        rows = cnx.executemany(SCORED_RESULT_INSERT, scored).rowcount
+        cnx.executemany(SESSION_SCORES_UPSERT, session_totals(scored))
+        cnx.execute(TRIGGER_SCORING)
+    except sqlite3.Error:
+        cnx.execute(f"ROLLBACK TO {SAVEPOINT}")
+        cnx.execute(f"RELEASE {SAVEPOINT}")
+        raise
+    cnx.execute(f"RELEASE {SAVEPOINT}")
+    return rows
@@ -0,0 +1,398 @@
+"""
+Synthetic EMS workload generator and bulk loader for SQLite.
+
+## Key Features:
+- Generates students, tests, questions, questions_options, tests_sessions, \
+    proctors, proctoring_sessions, results and suspicious-behaviour events \
+    for any volume, deterministically from a seed.
+- Distributions are configurable (see `DEFAULT_SCALE`): questions per test, \
+    options per question, sessions per student, test popularity (Zipf), \
+    answer accuracy, session status mix and suspicious-event rate.
+- Rows are produced lazily per table, only a few compact arrays are kept \
+    in memory, so millions of rows load in constant memory.
+- Loads with `executemany` inside one transaction, with \
+    `PRAGMA synchronous = OFF` for the duration of the load.
+- Triggers stay enabled: `end`, `score`/`feedback` and the `started-test` \
+    events are filled in by the schema, and finished sessions are closed \
+    with one set-based `UPDATE`, so `reports` and the final events come \
+    from the same code path as in production.
+- The events of the closed months are then moved to their monthly tables \
+    (see `partitions.py`).
+
+## Usage:
+```sh
+python seed.py --scale 100 --seed 42 [--database ems.db]
+```
+"""
+
+import argparse
+import logging
+import math
+import random
+import sqlite3
+from array import array
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+from time import perf_counter
+
+from partitions import drop_partitions, ensure_partitions
+
+logger = logging.getLogger(__name__)
+
+# Volumes for `scale=1`, multiplied by the scale factor
+DEFAULT_SCALE = {
+    "students": 1000,
+    "tests": 20,
+    "proctors": 20,
+    "questions_per_test": (5, 20),  # uniform range, inclusive
+    "options_per_question": (2, 4),  # one of them is correct
+    "sessions_per_student": 3.0,  # mean (Poisson)
+    "test_popularity": 1.1,  # Zipf exponent, 0 for uniform
+    "answered_ratio": 0.9,  # share of a test's questions answered
+    "correct_ratio": 0.6,  # chance that an answer is correct
+    "status_weights": {"in-progress": 0.1, "ended": 0.2, "completed": 0.7},
+    "suspicious_ratio": 0.05,  # suspicious events per proctoring session
+    "days": 90,  # sessions start within the last `days` days
+}
+
+COLUMNS = {
+    "students": ("id", "first_name", "last_name", "password", "email"),
+    "tests": ("id", "title", "description", "duration", "instructions", "course"),
+    "questions": ("id", "test_id", "question", "type", "topic", "duration"),
+    "questions_options": ("id", "question_id", "option", "is_correct"),
+    "tests_sessions": ("id", "test_id", "student_id", "start"),
+    "proctors": ("id", "first_name", "last_name", "password", "email"),
+    "proctoring_sessions": ("id", "proctor_id", "test_session_id", "start"),
+    "results": ("test_session_id", "question_id", "answer"),
+    "events": ("proctoring_session_id", "type", "timestamp", "description"),
+}
+
+# Load order (foreign keys first)
+TABLES = tuple(COLUMNS)
+
+# Filled by the schema triggers, never loaded directly
+DERIVED_TABLES = ("tests_history_summary", "reports", "tests_sessions_scores")
+
+BATCH_SIZE = 5000  # rows per executemany call
+
+FIRST_NAMES = ("John", "Jane", "Alex", "Maria", "Wei", "Aisha", "Ivan", "Sara")
+LAST_NAMES = ("Doe", "Smith", "Khan", "Garcia", "Chen", "Okafor", "Novak", "Rossi")
+COURSES = ("sql", "python", "math", "physics", "history", "random")
+TOPICS = ("dtype", "joins", "indexes", "triggers", "views", "transactions")
+SUSPICIOUS = (
+    "not present in front of screen",
+    "multiple faces detected",
+    "switched browser tab",
+    "voice detected",
+)
+STATUSES = ("in-progress", "ended", "completed")
+TEST_DURATION = "00:30"
+QUESTION_DURATION = "00:03"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"  # as written by DATETIME()
+
+
+class Workload:
+    """Deterministic synthetic dataset for the EMS schema.
+
+    Args:
+        scale (float, optional): multiplies students and proctors. Defaults to 1.
+        seed (int, optional): random seed. Defaults to 0.
+        **overrides: replace any `DEFAULT_SCALE` entry
+    """
+
+    def __init__(self, scale: float = 1, seed: int = 0, **overrides):
+        self.config = {**DEFAULT_SCALE, **overrides}
+        self.seed = seed
+        self.students_count = max(1, round(self.config["students"] * scale))
+        self.proctors_count = max(1, round(self.config["proctors"] * scale))
+        self.tests_count = self.config["tests"]
+        self.now = datetime.now().replace(microsecond=0)
+        self._plan()
+
+    def _rng(self, table: str) -> random.Random:
+        # One independent stream per table, so tables can be generated alone
+        return random.Random(f"{self.seed}:{table}")
+
+    def _plan(self) -> None:
+        """Draw the shape of the dataset (sizes and foreign keys)."""
+        rng = self._rng("plan")
+        low, high = self.config["questions_per_test"]
+        self.questions_per_test = [
+            rng.randint(low, high) for _ in range(self.tests_count)
+        ]
+        self.first_question = [0, *accumulate(self.questions_per_test)]
+
+        low, high = self.config["options_per_question"]
+        questions = self.first_question[-1]
+        self.options_per_question = array(
+            "B", (rng.randint(low, high) for _ in range(questions))
+        )
+        self.first_option = array("l", [0])
+        for count in self.options_per_question:
+            self.first_option.append(self.first_option[-1] + count)
+        self.correct_option = array(
+            "B", (rng.randrange(count) for count in self.options_per_question)
+        )
+
+        # Popular tests are taken far more often than the rest
+        exponent = self.config["test_popularity"]
+        popularity = [1 / (rank + 1) ** exponent for rank in range(self.tests_count)]
+        mean = self.config["sessions_per_student"]
+        statuses = list(self.config["status_weights"])
+        weights = list(self.config["status_weights"].values())
+        self.session_student = array("l")
+        self.session_test = array("l")
+        self.session_status = array("B")
+        for student in range(self.students_count):
+            for _ in range(_poisson(rng, mean)):
+                self.session_student.append(student + 1)
+                self.session_test.append(
+                    rng.choices(range(self.tests_count), popularity)[0]
+                )
+                status = rng.choices(statuses, weights)[0]
+                self.session_status.append(STATUSES.index(status))
+
+    @property
+    def sessions_count(self) -> int:
+        return len(self.session_test)
+
+    def students(self):
+        rng = self._rng("students")
+        for i in range(1, self.students_count + 1):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            yield (i, first, f"{last}{i}", f"pass{i}", f"student{i}@example.com")
+
+    def tests(self):
+        for i in range(1, self.tests_count + 1):
+            yield (
+                i,
+                f"test-{i}",
+                f"synthetic test {i}",
+                TEST_DURATION,
+                "choose correct option for questions",
+                COURSES[i % len(COURSES)],
+            )
+
+    def questions(self):
+        for test in range(self.tests_count):
+            first = self.first_question[test]
+            for i in range(first + 1, first + self.questions_per_test[test] + 1):
+                kind = "true/false" if i % 3 == 0 else "multiple-choice"
+                yield (
+                    i,
+                    test + 1,
+                    f"question {i}?",
+                    kind,
+                    TOPICS[i % len(TOPICS)],
+                    QUESTION_DURATION,
+                )
+
+    def questions_options(self):
+        for question, count in enumerate(self.options_per_question):
+            first = self.first_option[question]
+            correct = self.correct_option[question]
+            for n in range(count):
+                yield (
+                    first + n + 1,
+                    question + 1,
+                    f"option {n + 1}",
+                    int(n == correct),
+                )
+
+    def _session_start(self, rng: random.Random) -> datetime:
+        return self.now - timedelta(seconds=rng.randrange(self.config["days"] * 86400))
+
+    def tests_sessions(self):
+        rng = self._rng("tests_sessions")
+        for i in range(self.sessions_count):
+            yield (
+                i + 1,
+                self.session_test[i] + 1,
+                self.session_student[i],
+                self._session_start(rng).strftime(TIMESTAMP_FORMAT),
+            )
+
+    def proctors(self):
+        rng = self._rng("proctors")
+        for i in range(1, self.proctors_count + 1):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            yield (i, first, f"{last}{i}", f"pass{i}", f"proctor{i}@example.com")
+
+    def proctoring_sessions(self):
+        # One proctoring session per test session, starting at the same time
+        rng = self._rng("proctoring_sessions")
+        starts = self.tests_sessions()
+        for i in range(self.sessions_count):
+            start = next(starts)[3]
+            yield (i + 1, rng.randint(1, self.proctors_count), i + 1, start)
+
+    def results(self):
+        rng = self._rng("results")
+        answered = self.config["answered_ratio"]
+        correct_ratio = self.config["correct_ratio"]
+        for i in range(self.sessions_count):
+            test = self.session_test[i]
+            first = self.first_question[test]
+            for question in range(first, first + self.questions_per_test[test]):
+                if rng.random() >= answered:
+                    continue
+                count = self.options_per_question[question]
+                correct = self.correct_option[question]
+                if rng.random() < correct_ratio or count == 1:
+                    option = correct
+                else:
+                    option = (correct + rng.randrange(1, count)) % count
+                yield (i + 1, question + 1, self.first_option[question] + option + 1)
+
+    def events(self):
+        """Suspicious-behaviour events (the others come from triggers)."""
+        rng = self._rng("events")
+        ratio = self.config["suspicious_ratio"]
+        starts = self.tests_sessions()
+        for i in range(self.sessions_count):
+            start = datetime.strptime(next(starts)[3], TIMESTAMP_FORMAT)
+            # Poisson number of events, most sessions have none
+            for _ in range(_poisson(rng, ratio)):
+                yield (
+                    i + 1,
+                    "suspicious-behavior",
+                    (start + timedelta(seconds=rng.randrange(30 * 60))).strftime(
+                        TIMESTAMP_FORMAT
+                    ),
+                    rng.choice(SUSPICIOUS),
+                )
+
+    def background_events(self, count: int):
+        """`count` routine events over the sessions and days (benchmark volume)."""
+        rng = self._rng("background_events")
+        for _ in range(count):
+            yield (
+                rng.randrange(self.sessions_count) + 1,
+                "started-test",
+                self._session_start(rng),
+                "OK",
+            )
+
+    def finished_sessions(self):
+        """`(id, status)` of sessions that get ended or completed."""
+        for i, status in enumerate(self.session_status):
+            if STATUSES[status] != "in-progress":
+                yield (i + 1, STATUSES[status])
+
+    def rows(self, table: str):
+        return getattr(self, table)()
+
+
+def _poisson(rng: random.Random, mean: float) -> int:
+    """Knuth's Poisson sampler (fine for the small means used here)."""
+    limit, count, product = math.exp(-mean), 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+
+def reset_tables(cursor: sqlite3.Cursor) -> None:
+    """Empty every EMS table and reset the autoincrement counters."""
+    drop_partitions(cursor.connection)
+    for table in (*DERIVED_TABLES, *reversed(TABLES)):
+        cursor.execute(f'DELETE FROM "{table}"')
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_sequence'"
+    )
+    if cursor.fetchone():
+        cursor.execute('DELETE FROM "sqlite_sequence"')
+
+
+def insert_rows(
+    cursor: sqlite3.Cursor, table: str, columns: tuple, rows, batch_size: int
+) -> int:
+    """Insert rows with `executemany` in batches, return the row count."""
+    names = ", ".join(f'"{column}"' for column in columns)
+    marks = ", ".join(["?"] * len(columns))
+    statement = f'INSERT INTO "{table}" ({names}) VALUES ({marks})'
+    count = 0
+    while batch := list(islice(rows, batch_size)):
+        cursor.executemany(statement, batch)
+        count += len(batch)
+    return count
+
+
+def load(
+    cnx: sqlite3.Connection,
+    workload: Workload,
+    reset: bool = True,
+    batch_size: int = BATCH_SIZE,
+) -> dict:
+    """Load a workload in one transaction.
+
+    Args:
+        cnx (sqlite3.Connection): open connection
+        workload (Workload): dataset to load
+        reset (bool, optional): empty the tables first. Defaults to True.
+        batch_size (int, optional): rows per `executemany` call.
+
+    Returns:
+        dict: `{table: (rows, seconds)}`, `finish` for the status update
+    """
+    stats = {}
+    cursor = cnx.cursor()
+    (synchronous,) = cursor.execute("PRAGMA synchronous").fetchone()
+    # Durability is pointless for a load that is redone from scratch on failure
+    cursor.execute("PRAGMA synchronous = OFF")
+    try:
+        cnx.commit()
+        cursor.execute("BEGIN")
+        if reset:
+            reset_tables(cursor)
+        for table in TABLES:
+            started = perf_counter()
+            count = insert_rows(
+                cursor, table, COLUMNS[table], workload.rows(table), batch_size
+            )
+            stats[table] = (count, perf_counter() - started)
+            logger.info("%-20s %10d rows in %8.2f s", table, *stats[table])
+
+        # Close sessions the way the application does, fires the triggers
+        started = perf_counter()
+        cursor.execute(
+            'CREATE TEMP TABLE "finished" ("id" INTEGER PRIMARY KEY, "status" TEXT)'
+        )
+        count = insert_rows(
+            cursor,
+            "finished",
+            ("id", "status"),
+            workload.finished_sessions(),
+            batch_size,
+        )
+        cursor.execute(
+            'UPDATE "tests_sessions" SET "status" = "F"."status" '
+            'FROM "finished" AS "F" WHERE "tests_sessions"."id" = "F"."id"'
+        )
+        cursor.execute('DROP TABLE "finished"')
+        stats["finish"] = (count, perf_counter() - started)
+        logger.info("%-20s %10d rows in %8.2f s", "finish", *stats["finish"])
+        # Events of the closed months go to their monthly table
+        ensure_partitions(cnx)
+        cnx.commit()
+    except BaseException:
+        cnx.rollback()
+        raise
+    finally:
+        cursor.execute(f"PRAGMA synchronous = {synchronous}")
+        cursor.close()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load a synthetic EMS workload")
+    parser.add_argument("--scale", type=float, default=1, help="volume multiplier")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--database", default="ems.db", help="SQLite database file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    workload = Workload(args.scale, args.seed)
+    connection = sqlite3.connect(args.database)
+    load(connection, workload)
+    connection.close()
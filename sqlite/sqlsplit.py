@@ -0,0 +1,84 @@
+"""
+Streaming SQL statement splitter for SQLite scripts.
+
+## Key Features:
+- Uses SQLite's own tokenizer (`sqlite3.complete_statement`) to decide where \
+    a statement ends, so `;` inside strings, quoted identifiers, comments \
+    and `CREATE TRIGGER ... BEGIN ... END;` bodies never splits a statement.
+- Consumes input line by line and yields statements lazily, so large dump \
+    files are processed in constant memory.
+- Comment-only chunks (e.g. trailing notes after the last `;`) are skipped.
+
+## Usage:
+```py
+for statement in read_statements("schema.sql"):
+    cursor.execute(statement)
+```
+"""
+
+import sqlite3
+from collections.abc import Iterable, Iterator
+
+
+def _has_code(text: str) -> bool:
+    """Check whether text holds more than whitespace and leading comments."""
+    pos = 0
+    while True:
+        while pos < len(text) and text[pos].isspace():
+            pos += 1
+        if text.startswith("--", pos):
+            newline = text.find("\n", pos)
+            if newline == -1:
+                return False
+            pos = newline + 1
+        elif text.startswith("/*", pos):
+            close = text.find("*/", pos + 2)
+            if close == -1:
+                return False
+            pos = close + 2
+        else:
+            return pos < len(text)
+
+
+def iter_statements(lines: Iterable[str]) -> Iterator[str]:
+    """Yield statements (without the terminating `;`) from lines of SQL.
+
+    Args:
+        lines (Iterable[str]): SQL text, e.g. an open file; line endings kept
+
+    Yields:
+        str: one stripped statement at a time
+    """
+    buffer = ""
+    for line in lines:
+        # Semicolons seen earlier could not end a statement, test only new ones
+        semicolon = line.find(";")
+        if semicolon == -1:
+            buffer += line
+            continue
+        semicolon += len(buffer)
+        buffer += line
+
+        start = 0
+        while semicolon != -1:
+            candidate = buffer[start : semicolon + 1]
+            if sqlite3.complete_statement(candidate):
+                if _has_code(candidate[:-1]):
+                    yield candidate[:-1].strip()
+                start = semicolon + 1
+            semicolon = buffer.find(";", semicolon + 1)
+        buffer = buffer[start:]
+
+    if _has_code(buffer):
+        yield buffer.strip()
+
+
+def split_statements(sql_script: str) -> list[str]:
+    """Split a script string into statements."""
+    return list(iter_statements(sql_script.splitlines(keepends=True)))
+
+
+def read_statements(path: str, encoding: str = "utf-8") -> Iterator[str]:
+    """Lazily yield statements from a SQL file."""
+    with open(path, "r", encoding=encoding) as sql_file:
+        yield from iter_statements(sql_file)
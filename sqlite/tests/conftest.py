@@ -0,0 +1,35 @@
+import sqlite3
+
+import pytest
+
+from seed import Workload, load
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Path of the test's own database file."""
+    return tmp_path / "ems.db"
+
+
+@pytest.fixture
+def workload(request, database):
+    """The schema loaded with a synthetic workload into `database`.
+
+    The seed is 1, or the value of an indirect parametrization:
+    `@pytest.mark.parametrize("workload", [7], indirect=True)`.
+    """
+    workload = Workload(scale=0.05, seed=getattr(request, "param", 1))
+    connection = sqlite3.connect(database)
+    with open("schema.sql", "r") as sql_file:
+        connection.executescript(sql_file.read())
+    load(connection, workload)
+    connection.close()
+    return workload
+
+
+@pytest.fixture
+def connection(database, workload):
+    """A connection to the loaded workload."""
+    connection = sqlite3.connect(database)
+    yield connection
+    connection.close()
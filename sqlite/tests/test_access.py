@@ -0,0 +1,104 @@
+import sqlite3
+from time import perf_counter
+
+import pytest
+
+from access import AccessLayer
+
+INSERT = 'INSERT INTO "answers" ("session", "answer") VALUES (?, ?)'
+COUNT = 'SELECT COUNT(*) FROM "answers"'
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = str(tmp_path / "ems.db")
+    connection = sqlite3.connect(database)
+    connection.execute(
+        'CREATE TABLE "answers" ("session" INTEGER, '
+        '"answer" INTEGER NOT NULL CHECK ("answer" > 0))'
+    )
+    connection.close()
+    return database
+
+
+@pytest.fixture
+def ems(database):
+    ems = AccessLayer(database, readers=2)
+    yield ems
+    ems.close()
+
+
+def test_writes_are_visible_to_readers(ems):
+    assert ems.write(INSERT, [(1, 1), (1, 2), (2, 3)]) == 3
+
+    assert ems.read(COUNT) == [(3,)]
+    rows = ems.read('SELECT "answer" FROM "answers" WHERE "session" = ?', (2,))
+    assert rows == [(3,)]
+    stats = ems.stats()
+    assert stats["writer"]["rows"] == 3
+    assert stats["writer"]["commits"] == 1
+
+
+def test_database_is_switched_to_wal(ems, database):
+    connection = sqlite3.connect(database)
+
+    assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    connection.close()
+
+
+def test_readers_are_read_only(ems):
+    with pytest.raises(sqlite3.OperationalError, match="readonly"):
+        ems.read(INSERT, (1, 1))
+
+
+def test_failing_batch_is_rolled_back_alone(ems):
+    good = ems.submit(INSERT, [(1, 1)])
+    bad = ems.submit(INSERT, [(2, 2), (2, 0)])  # second row breaks the CHECK
+    also_good = ems.submit(INSERT, [(3, 3)])
+
+    assert good.result() == 1
+    assert also_good.result() == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        bad.result()
+    assert ems.read('SELECT "session" FROM "answers" ORDER BY 1') == [(1,), (3,)]
+    assert ems.stats()["writer"]["failed"] == 1
+
+
+def test_queued_batches_are_group_committed(ems, database):
+    # Hold the write lock so that the batches pile up in the queue
+    blocker = sqlite3.connect(database, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    futures = [ems.submit(INSERT, [(session, 1)]) for session in range(10)]
+    blocker.execute("COMMIT")
+    blocker.close()
+
+    assert sum(future.result() for future in futures) == 10
+    stats = ems.stats()["writer"]
+    assert stats["batches"] == 10
+    assert stats["commits"] < 10
+    assert stats["batches_per_commit"] > 1
+
+
+def test_readers_do_not_wait_for_the_writer(ems, database):
+    ems.write(INSERT, [(1, 1)])
+    writer = sqlite3.connect(database, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    writer.execute(INSERT, (2, 2))
+
+    started = perf_counter()
+    assert ems.read(COUNT) == [(1,)]  # last committed snapshot
+    assert perf_counter() - started < 1  # well under `busy_timeout`
+    writer.execute("COMMIT")
+    writer.close()
+    assert ems.read(COUNT) == [(2,)]
+
+
+def test_close_commits_queued_batches(database):
+    ems = AccessLayer(database)
+    futures = [ems.submit(INSERT, [(session, 1)]) for session in range(5)]
+    ems.close()
+
+    assert all(future.done() for future in futures)
+    connection = sqlite3.connect(database)
+    assert connection.execute(COUNT).fetchone() == (5,)
+    connection.close()
@@ -0,0 +1,76 @@
+import json
+
+from bench import QUERIES, percentile, run
+
+
+def test_percentile_nearest_rank():
+    samples = list(range(1, 101))
+
+    assert percentile(samples, 0.50) == 50
+    assert percentile(samples, 0.99) == 99
+    assert percentile([7], 0.95) == 7
+
+
+def test_run_reports_every_query(tmp_path):
+    report = run(str(tmp_path / "bench.db"), scales=(0.02,), repeat=3)
+
+    (scale,) = report["runs"]
+    assert set(scale["queries"]) == set(QUERIES)
+    for stats in scale["queries"].values():
+        assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
+        assert stats["plan"]
+    assert scale["queries"]["tests_history_by_email"]["rows"] > 0
+    assert 0 < scale["catalog"]["paper_bytes"] < scale["catalog"]["view_bytes"]
+    assert scale["scoring"]["scored_rows_per_s"] > 0
+    json.dumps(report)
+
+
+def test_run_compares_profiles(tmp_path):
+    report = run(
+        str(tmp_path / "bench.db"),
+        scales=(0.02,),
+        repeat=2,
+        profiles=("default", "performance"),
+    )
+
+    assert [scale["profile"] for scale in report["runs"]] == [
+        "default",
+        "performance",
+    ]
+    default, performance = report["runs"]
+    assert default["rows"] == performance["rows"]
+
+
+def test_run_measures_concurrent_reads_and_writes(tmp_path):
+    report = run(
+        str(tmp_path / "bench.db"),
+        scales=(0.02,),
+        repeat=1,
+        profiles=("performance",),
+        concurrency_seconds=0.2,
+        writers=2,
+        readers=2,
+    )
+
+    concurrency = report["runs"][0]["concurrency"]
+    for mode in ("single_connection", "writer_thread"):
+        assert concurrency[mode]["write_rows_per_s"] > 0
+        assert concurrency[mode]["reads_per_s"] > 0
+        assert concurrency[mode]["read_p50_ms"] <= concurrency[mode]["read_p99_ms"]
+    assert concurrency["writer_thread"]["batches_per_commit"] >= 1
+    json.dumps(report)
+
+
+def test_events_are_padded_to_the_requested_volume(tmp_path):
+    report = run(
+        str(tmp_path / "bench.db"),
+        scales=(0.02,),
+        repeat=1,
+        concurrency_seconds=0,
+        events=20000,
+    )
+
+    (scale,) = report["runs"]
+    assert scale["events"] == 20000
+    plan = scale["queries"]["proctor_alerts"]["plan"]
+    assert any("_suspicious" in detail for detail in plan)
@@ -0,0 +1,101 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from clock import SimulatedClock, WallClock, using
+
+START = datetime(2025, 1, 6, 9, 0, 0)
+
+
+with open("queries.sql", "r") as sql_file:
+    Q1, Q2 = sql_file.read().split("$$$testbreak", maxsplit=1)
+
+
+@pytest.fixture
+def connection():
+    connection = sqlite3.connect(":memory:")
+    with open("schema.sql", "r") as sql_file:
+        connection.executescript(sql_file.read())
+    yield connection
+    connection.close()
+
+
+def test_simulated_clock_drives_the_triggers(connection):
+    clock = SimulatedClock(START)
+    with using(connection, clock):
+        connection.executescript(Q1)
+    clock.sleep(90 * 60)
+    with using(connection, clock):
+        connection.executescript(Q2)
+
+    sessions = connection.execute(
+        'SELECT "start", "end", "duration_taken" FROM "tests_sessions" ORDER BY "id"'
+    ).fetchall()
+    assert sessions[0] == ("2025-01-06 09:00:00", "2025-01-06 09:30:00", "01:30:00")
+    assert sessions[1][2] == "01:30:00"
+    proctoring_end = connection.execute(
+        'SELECT "end" FROM "proctoring_sessions" WHERE "id" = 1'
+    ).fetchone()
+    assert proctoring_end == ("2025-01-06 10:30:00",)
+    assert connection.execute('SELECT "timestamp" FROM "events"').fetchall()
+
+
+def test_clock_is_reset_after_the_block(connection):
+    with using(connection, SimulatedClock(START)):
+        assert connection.execute('SELECT "now" FROM "ems_now"').fetchone() == (
+            "2025-01-06 09:00:00",
+        )
+
+    assert connection.execute('SELECT COUNT(*) FROM "clock"').fetchone() == (0,)
+    (now,) = connection.execute('SELECT "now" FROM "ems_now"').fetchone()
+    assert abs((datetime.fromisoformat(now) - datetime.now()).total_seconds()) < 5
+
+
+def test_wall_clock_keeps_explicit_starts(connection):
+    connection.executescript(Q1)
+    with using(connection, WallClock()):
+        connection.execute(
+            'INSERT INTO "tests_sessions" ("test_id", "student_id", "start") '
+            "VALUES (1, 1, '2024-05-01 08:00:00')"
+        )
+
+    row = connection.execute(
+        'SELECT "start", "end" FROM "tests_sessions" ORDER BY "id" DESC LIMIT 1'
+    ).fetchone()
+    assert row == ("2024-05-01 08:00:00", "2024-05-01 08:30:00")
+
+
+def test_clock_is_only_seen_by_the_writer(tmp_path):
+    writer = sqlite3.connect(tmp_path / "clock.db")
+    with open("schema.sql", "r") as sql_file:
+        writer.executescript(sql_file.read())
+    reader = sqlite3.connect(tmp_path / "clock.db")
+
+    with using(writer, SimulatedClock(START)):
+        writer.execute('INSERT INTO "tests_sessions" ("test_id") VALUES (NULL)')
+        assert reader.execute('SELECT COUNT(*) FROM "clock"').fetchone() == (0,)
+    writer.commit()
+
+    assert reader.execute('SELECT COUNT(*) FROM "clock"').fetchone() == (0,)
+    assert reader.execute('SELECT "start" FROM "tests_sessions"').fetchall() == [
+        ("2025-01-06 09:00:00",)
+    ]
+    writer.close()
+    reader.close()
+
+
+def test_only_left_out_starts_follow_the_clock(connection):
+    connection.executescript(Q1)
+    explicit = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with using(connection, SimulatedClock(START)):
+        connection.execute(
+            'INSERT INTO "tests_sessions" ("test_id", "student_id", "start") '
+            "VALUES (1, 1, ?), (1, 1, NULL)",
+            (explicit,),
+        )
+
+    rows = connection.execute(
+        'SELECT "start" FROM "tests_sessions" ORDER BY "id" DESC LIMIT 2'
+    ).fetchall()
+    assert rows == [("2025-01-06 09:00:00",), (explicit,)]
@@ -1,11 +1,19 @@
 import sqlite3
-from time import sleep
 
-from psql.db import TEST_COMPLETION_TIME
 import pytest
 
+from clock import SimulatedClock, using
+
 TEST_COMPLETION_TIME = 3
 
+# What `tests_history` read before it was materialized
+HISTORY_JOIN = (
+    'SELECT ts."student_id", t."title", r."total_score", r."final_score", '
+    'r."overall_feedback", ts."duration_taken" FROM "reports" AS r '
+    'INNER JOIN "tests_sessions" AS ts ON r."test_session_id" = ts."id" '
+    'INNER JOIN "tests" AS t ON ts."test_id" = t."id"'
+)
+
 
 # Use an in-memory database for testing to avoid file conflicts
 # and ensure a clean state for each test run.
@@ -23,9 +31,12 @@ def db_connection():
 
     cursor = connection.cursor()
     cursor.executescript(sql_schema_script)
-    cursor.executescript(q1)
-    sleep(TEST_COMPLETION_TIME)
-    cursor.executescript(q2)
+    clock = SimulatedClock()
+    with using(connection, clock):
+        cursor.executescript(q1)
+    clock.sleep(TEST_COMPLETION_TIME)  # instant
+    with using(connection, clock):
+        cursor.executescript(q2)
     connection.commit()
 
     yield connection
@@ -124,6 +135,14 @@ def test_final_reports_state(db_connection):
     assert reports == expected_reports
 
 
+def test_view_tests_sessions_live_scores(db_connection):
+    cursor = db_connection.cursor()
+    cursor.execute(
+        "SELECT test_session_id, answered, correct FROM tests_sessions_live_scores ORDER BY test_session_id"
+    )
+    assert cursor.fetchall() == [(1, 2, 2), (2, 2, 1)]
+
+
 def test_view_tests_history_john_doe(db_connection):
     cursor = db_connection.cursor()
     cursor.execute("""
@@ -136,6 +155,66 @@ def test_view_tests_history_john_doe(db_connection):
     assert history == expected_history
 
 
+def test_tests_history_summary_follows_reports(connection):
+    def history():
+        return sorted(connection.execute('SELECT * FROM "tests_history"').fetchall())
+
+    # Same rows as the join the view used to run on every read
+    joined = connection.execute(HISTORY_JOIN).fetchall()
+    assert history() == sorted(joined)
+
+    connection.execute(
+        'UPDATE "tests" SET "title" = \'renamed\' WHERE "id" = ('
+        'SELECT "test_id" FROM "tests_history_summary" LIMIT 1)'
+    )
+    assert any(row[1] == "renamed" for row in history())
+
+
+def test_tests_history_summary_follows_report_and_session_changes(connection):
+    def history():
+        return sorted(connection.execute('SELECT * FROM "tests_history"').fetchall())
+
+    def joined():
+        return sorted(connection.execute(HISTORY_JOIN).fetchall())
+
+    def summary():
+        return {
+            report_id: rest
+            for report_id, *rest in connection.execute(
+                'SELECT "report_id", "student_id", "test_id", "total_score", '
+                '"scored", "duration_taken" FROM "tests_history_summary"'
+            )
+        }
+
+    first, second, third, fourth = connection.execute(
+        'SELECT "id", "test_session_id" FROM "reports" ORDER BY "id" LIMIT 4'
+    ).fetchall()
+    connection.execute(
+        'UPDATE "reports" SET "total_score" = 99, "final_score" = 98 WHERE "id" = ?',
+        (first[0],),
+    )
+    connection.execute('DELETE FROM "reports" WHERE "id" = ?', (second[0],))
+    connection.execute(
+        'UPDATE "tests_sessions" SET "student_id" = 1, "test_id" = 1, '
+        '"duration_taken" = \'00:42:00\' WHERE "id" = ?',
+        (third[1],),
+    )
+    # Foreign keys are off: the report stays, its session is gone
+    connection.execute('DELETE FROM "tests_sessions" WHERE "id" = ?', (fourth[1],))
+
+    assert history() == joined()
+    rows = summary()
+    assert rows[first[0]][2:4] == [99, 98]
+    assert second[0] not in rows
+    assert rows[third[0]][:2] == [1, 1]
+    assert rows[third[0]][4] == "00:42:00"
+    assert fourth[0] not in rows
+
+    connection.execute('DELETE FROM "tests" WHERE "id" = 1')
+    assert history() == joined()
+    assert all(test_id != 1 for _, test_id, *_ in summary().values())
+
+
 def test_view_test_questions_option_search_demo(db_connection):
     cursor = db_connection.cursor()
     cursor.execute("""
@@ -162,3 +241,31 @@ def test_view_suspicious_behaviour_search_ended(db_connection):
     suspicious = cursor.fetchall()
     expected_suspicious = [(2, 2, "not present in front of screen")]
     assert suspicious == expected_suspicious
+
+
+def test_corrected_and_deleted_answers_update_the_counters(db_connection):
+    cursor = db_connection.cursor()
+    cursor.execute('UPDATE "results" SET "score" = 0 WHERE "id" = 1')
+    cursor.execute('UPDATE "results" SET "test_session_id" = 1 WHERE "id" = 3')
+    cursor.execute('DELETE FROM "results" WHERE "id" = 4')
+    cursor.execute(
+        'SELECT "test_session_id", "answered", "correct" '
+        'FROM "tests_sessions_scores" ORDER BY "test_session_id"'
+    )
+    counters = cursor.fetchall()
+    # Closing the session again reports from the corrected counters
+    cursor.execute(
+        'UPDATE "tests_sessions" SET "status" = \'in-progress\' WHERE "id" = 1'
+    )
+    cursor.execute(
+        'UPDATE "tests_sessions" SET "status" = \'completed\' WHERE "id" = 1'
+    )
+    cursor.execute(
+        'SELECT "total_score", "final_score", "overall_feedback" FROM "reports" '
+        'WHERE "test_session_id" = 1 ORDER BY "id" DESC LIMIT 1'
+    )
+    report = cursor.fetchone()
+    db_connection.rollback()
+
+    assert counters == [(1, 3, 1), (2, 0, 0)]
+    assert report == (3, 1, "need-improvement")
@@ -0,0 +1,85 @@
+import re
+import sqlite3
+
+import pytest
+
+from bench import QUERIES, pad_events, plan_shape
+from seed import Workload, load
+
+
+@pytest.fixture(scope="module")
+def connection(tmp_path_factory):
+    connection = sqlite3.connect(tmp_path_factory.mktemp("indexes") / "ems.db")
+    with open("schema.sql", "r") as sql_file:
+        connection.executescript(sql_file.read())
+    load(connection, Workload(scale=0.5, seed=1))
+    connection.execute("ANALYZE")
+    yield connection
+    connection.close()
+
+
+def uses_index(connection, query, index):
+    shape = plan_shape(connection, query, {"id": 1})
+    return any(f" INDEX {index} " in f"{detail} " for detail in shape)
+
+
+def test_report_aggregates_use_results_index(connection):
+    # `update_status_end_final_score_all` aggregates results per session
+    for aggregate in ("COUNT(*)", 'SUM("score")', 'MAX("feedback")'):
+        query = (
+            f'SELECT {aggregate} FROM "results" WHERE "results"."test_session_id" = :id'
+        )
+        shape = plan_shape(connection, query, {"id": 1})
+        assert any("COVERING INDEX idx_results " in detail for detail in shape)
+
+
+def test_proctoring_session_lookups_use_index(connection):
+    assert uses_index(
+        connection,
+        'SELECT "id" FROM "proctoring_sessions" WHERE "test_session_id" = :id',
+        "idx_proctoring_sessions",
+    )
+
+
+def test_suspicious_behaviour_view_uses_event_index(connection):
+    assert uses_index(
+        connection,
+        'SELECT * FROM "test_sessions_suspicious_behaviour_search" '
+        'WHERE "test_session_id" = :id',
+        "idx_events_suspicious",
+    )
+
+
+def test_proctor_alerts_only_read_suspicious_events():
+    # Routine events outnumber the suspicious ones, as in production
+    connection = sqlite3.connect(":memory:")
+    with open("schema.sql", "r") as sql_file:
+        connection.executescript(sql_file.read())
+    workload = Workload(scale=0.2, seed=1)
+    load(connection, workload)
+    pad_events(connection, workload, 20000)
+    connection.execute("ANALYZE")
+
+    shape = plan_shape(connection, QUERIES["proctor_alerts"], {"proctor_id": 1})
+    connection.close()
+
+    # `events` and every month table are read from their partial index
+    reads = [detail for detail in shape if detail.split()[1].startswith("events")]
+    assert len(reads) > 1
+    for detail in reads:
+        assert re.search(r"COVERING INDEX idx_events(_\d{6})?_suspicious", detail)
+
+
+def test_live_scores_view_is_a_key_lookup(connection):
+    query = 'SELECT * FROM "tests_sessions_live_scores" WHERE "test_session_id" = :id'
+    shape = plan_shape(connection, query, {"id": 1})
+    # "test_session_id" is the rowid of tests_sessions_scores
+    assert "SEARCH s USING INTEGER PRIMARY KEY (rowid=?) LEFT-JOIN" in shape
+
+
+def test_tests_history_is_an_index_probe(connection):
+    assert uses_index(
+        connection,
+        'SELECT * FROM "tests_history" WHERE "student_id" = :id',
+        "idx_tests_history_summary",
+    )
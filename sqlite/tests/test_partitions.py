@@ -0,0 +1,137 @@
+import csv
+import gzip
+import sqlite3
+from datetime import date, datetime
+
+import pytest
+
+from bench import plan_shape
+from clock import SimulatedClock, using
+from partitions import (
+    add_months,
+    drop_partitions,
+    ensure_partitions,
+    maintain,
+    partitions,
+)
+
+START = datetime(2025, 1, 6, 9, 0, 0)
+
+SEARCH = (
+    'SELECT * FROM "test_sessions_suspicious_behaviour_search" '
+    'WHERE "timestamp" >= :since AND "timestamp" < :until'
+)
+
+with open("queries.sql", "r") as sql_file:
+    Q1, Q2 = sql_file.read().split("$$$testbreak", maxsplit=1)
+
+
+@pytest.fixture
+def connection():
+    connection = sqlite3.connect(":memory:")
+    with open("schema.sql", "r") as sql_file:
+        connection.executescript(sql_file.read())
+    yield connection
+    connection.close()
+
+
+def count(connection, table):
+    return connection.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+
+def months(connection):
+    return [f"{period:%Y%m}" for _, period in partitions(connection)]
+
+
+def old_event(connection, timestamp, description="old"):
+    connection.execute(
+        'INSERT INTO "events" ("proctoring_session_id", "type", "timestamp", '
+        "\"description\") VALUES (2, 'suspicious-behavior', ?, ?)",
+        (timestamp, description),
+    )
+
+
+def test_add_months():
+    assert add_months(date(2025, 11, 20), 3) == date(2026, 2, 1)
+    assert add_months(date(2025, 1, 31), -1) == date(2024, 12, 1)
+
+
+def test_closed_months_move_to_their_table(connection):
+    with using(connection, SimulatedClock(START)):
+        connection.executescript(Q1)
+        old_event(connection, "2024-12-31 23:00:00")
+        # January is the current month, only December is closed
+        assert ensure_partitions(connection) == ["events_202412"]
+    events = count(connection, "events")
+    suspicious = count(connection, "test_sessions_suspicious_behaviour_search")
+
+    with using(connection, SimulatedClock(datetime(2025, 2, 3))):
+        created = ensure_partitions(connection)
+
+    assert created == ["events_202501"]
+    assert months(connection) == ["202412", "202501"]
+    assert count(connection, "events") == 0
+    assert count(connection, "events_202501") == events
+    assert count(connection, "test_sessions_suspicious_behaviour_search") == suspicious
+    assert ensure_partitions(connection) == []
+
+
+def test_ids_are_not_reused_after_a_move(connection):
+    old_event(connection, "2024-12-31 23:00:00")
+    ensure_partitions(connection)
+
+    connection.execute('INSERT INTO "events" ("type") VALUES (\'started-test\')')
+
+    ids = connection.execute('SELECT "id" FROM "events_all" ORDER BY "id"').fetchall()
+    assert ids == [(1,), (2,)]
+
+
+def test_time_range_queries_only_search_their_months(connection):
+    with using(connection, SimulatedClock(START)):
+        connection.executescript(Q1)
+        old_event(connection, "2024-12-31 23:00:00")
+    ensure_partitions(connection)
+    params = {"since": "2024-12-01", "until": "2025-01-01"}
+
+    shape = plan_shape(connection, SEARCH, params)
+
+    # Every month table is a range search on its timestamp index, no scan
+    assert not [detail for detail in shape if detail.startswith("SCAN")]
+    for name, _ in partitions(connection):
+        assert f"SEARCH {name} USING INDEX idx_{name}_timestamp" in " ".join(shape)
+    rows = connection.execute(SEARCH, params).fetchall()
+    assert [row[-1] for row in rows] == ["old"]
+
+
+def test_expired_months_are_archived_and_dropped(connection, tmp_path):
+    with using(connection, SimulatedClock(START)):
+        connection.executescript(Q1)
+    old_event(connection, "2024-11-30 23:00:00", "older")
+    old_event(connection, "2024-12-31 23:00:00")
+
+    # One year and a bit later, only the current month and the last 12 stay
+    with using(connection, SimulatedClock(datetime(2026, 1, 15))):
+        result = maintain(connection, keep_months=12, directory=tmp_path)
+
+    assert result["created"] == ["events_202411", "events_202412", "events_202501"]
+    assert [name for name, _, _ in result["archived"]] == [
+        "events_202411",
+        "events_202412",
+    ]
+    _, path, rows = result["archived"][-1]
+    assert rows == 1
+    with gzip.open(path, "rt", newline="") as archive:
+        archived = list(csv.DictReader(archive))
+    assert [row["description"] for row in archived] == ["old"]
+    assert months(connection) == ["202501"]
+    assert count(connection, "events_all") == count(connection, "events_202501")
+
+
+def test_drop_partitions_keeps_the_view_usable(connection):
+    old_event(connection, "2024-12-31 23:00:00")
+    ensure_partitions(connection)
+
+    drop_partitions(connection)
+
+    assert months(connection) == []
+    assert count(connection, "test_sessions_suspicious_behaviour_search") == 0
@@ -0,0 +1,68 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pool import Pool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = Pool(str(tmp_path / "pool.db"), min_size=0, max_size=2)
+    yield pool
+    pool.close()
+
+
+def test_pool_reuses_thread_connection(pool):
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    with pool.connection() as outer, pool.connection() as inner:
+        assert inner is outer
+    assert pool.stats()["acquire_count"] == 3
+
+
+def test_pool_gives_each_thread_its_own_connection(pool):
+    def borrow(_):
+        with pool.connection() as cnx:
+            return id(cnx), threading.get_ident()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        borrowed = set(executor.map(borrow, range(20)))
+
+    connections = {cnx for cnx, _ in borrowed}
+    threads = {ident for _, ident in borrowed}
+    assert len(connections) == len(threads)
+    assert pool.stats()["pool_size"] == len(threads)
+
+
+def test_pool_commits_and_rolls_back(pool):
+    with pool.connection() as cnx:
+        cnx.execute("CREATE TABLE probe (id INTEGER)")
+        cnx.execute("INSERT INTO probe VALUES (1)")
+    with pytest.raises(RuntimeError), pool.connection() as cnx:
+        cnx.execute("INSERT INTO probe VALUES (2)")
+        raise RuntimeError("abort")
+
+    with pool.connection() as cnx:
+        assert cnx.execute("SELECT id FROM probe").fetchall() == [(1,)]
+
+
+def test_pool_closes_idle_connections(tmp_path):
+    pool = Pool(str(tmp_path / "pool.db"), min_size=0, max_idle=0)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is not first
+    assert pool.stats()["connections_num"] == 2
+    pool.close()
+
+
+def test_pool_replaces_broken_connection(pool):
+    with pool.connection() as first:
+        pass
+    first.close()
+    with pool.connection() as second:
+        assert second.execute("SELECT 1").fetchone() == (1,)
+    assert pool.stats()["connections_lost"] == 1
@@ -0,0 +1,63 @@
+import sqlite3
+
+import pytest
+
+from pool import Pool
+from pragmas import PROFILES, apply_profile, close_connection
+
+
+def pragma(connection, name):
+    return connection.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def test_performance_profile_settings(tmp_path):
+    connection = sqlite3.connect(tmp_path / "ems.db")
+
+    effective = apply_profile(connection, "performance")
+
+    assert effective["journal_mode"] == "wal"
+    assert effective["synchronous"] == 1  # NORMAL
+    assert effective["foreign_keys"] == 1
+    assert effective["temp_store"] == 2  # MEMORY
+    assert effective["cache_size"] == PROFILES["performance"]["cache_size"]
+    assert effective["busy_timeout"] == 5000
+    close_connection(connection, "performance")
+
+
+def test_default_profile_keeps_sqlite_defaults(tmp_path):
+    connection = sqlite3.connect(tmp_path / "ems.db")
+
+    assert apply_profile(connection) == {}
+    assert pragma(connection, "journal_mode") == "delete"
+    assert pragma(connection, "foreign_keys") == 0
+    connection.close()
+
+
+def test_unknown_profile_is_rejected(tmp_path):
+    connection = sqlite3.connect(tmp_path / "ems.db")
+
+    with pytest.raises(ValueError):
+        apply_profile(connection, "turbo")
+    connection.close()
+
+
+def test_performance_profile_loads_the_schema(tmp_path):
+    # Foreign keys are enforced, `queries.sql` must still go through
+    connection = sqlite3.connect(tmp_path / "ems.db")
+    apply_profile(connection, "performance")
+    with open("schema.sql", "r") as sql_file:
+        connection.executescript(sql_file.read())
+    with open("queries.sql", "r") as sql_file:
+        connection.executescript(sql_file.read().replace("$$$testbreak", ""))
+
+    assert connection.execute("PRAGMA foreign_key_check").fetchall() == []
+    close_connection(connection, "performance")
+
+
+def test_pool_applies_the_profile(tmp_path):
+    pool = Pool(str(tmp_path / "pool.db"), profile="performance")
+
+    with pool.connection() as cnx:
+        assert pragma(cnx, "journal_mode") == "wal"
+        assert pragma(cnx, "mmap_size") == PROFILES["performance"]["mmap_size"]
+    pool.close()
@@ -0,0 +1,68 @@
+import sqlite3
+import threading
+
+from pool import Pool
+from queries import LOOKUPS, StatementCache, cache_for
+
+
+def test_lookups_match_literal_queries(workload, connection):
+    cache = StatementCache(connection)
+    email = next(workload.students())[4]
+
+    rows = cache.lookup("tests_history_by_email", {"email": email})
+
+    literal = connection.execute(
+        'SELECT * FROM "tests_history" WHERE "student_id" = ('
+        'SELECT "id" FROM "students" WHERE "email" = ?)',
+        (email,),
+    ).fetchall()
+    assert rows and rows == literal
+
+
+def test_counters_follow_the_connection_lru(database, workload):
+    connection = sqlite3.connect(database, cached_statements=2)
+    cache = StatementCache(connection, maxsize=2)
+    title = next(workload.tests())[1]
+
+    for _ in range(3):
+        cache.lookup("test_questions_option_search_by_title", {"title": title})
+    cache.lookup(
+        "test_sessions_suspicious_behaviour_search_by_status", {"status": "ended"}
+    )
+    # Evicts the title lookup, the least recently used
+    cache.fetchall("SELECT 1")
+    cache.lookup("test_questions_option_search_by_title", {"title": title})
+
+    assert cache.stats() == {
+        "hits": 2,
+        "misses": 4,
+        "evictions": 2,
+        "size": 2,
+        "maxsize": 2,
+    }
+    connection.close()
+
+
+def test_cache_for_follows_the_thread_connection(tmp_path):
+    pool = Pool(str(tmp_path / "pool.db"), cached_statements=16)
+    with pool.connection() as cnx:
+        cache = cache_for(cnx, 16)
+        assert cache_for(cnx, 16) is cache
+        assert cache.fetchall("SELECT 1") == [(1,)]
+
+    def other_thread():
+        with pool.connection() as cnx:
+            return cache_for(cnx, 16)
+
+    thread_caches = []
+    thread = threading.Thread(target=lambda: thread_caches.append(other_thread()))
+    thread.start()
+    thread.join()
+    assert thread_caches[0] is not cache
+    assert set(LOOKUPS) == {
+        "tests_history_by_email",
+        "test_questions_option_search_by_title",
+        "test_questions_option_search_by_is_correct",
+        "test_sessions_suspicious_behaviour_search_by_status",
+    }
+    pool.close()
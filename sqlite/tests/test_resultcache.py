@@ -0,0 +1,170 @@
+import sqlite3
+
+import pytest
+
+from queries import CACHED_LOOKUPS, LOOKUPS
+from resultcache import CATALOG_TABLES, ResultCache, VersionWatcher, cache_key
+from seed import reset_tables
+
+BY_TITLE = LOOKUPS["test_questions_option_search_by_title"]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hits_misses_and_normalized_keys():
+    cache = ResultCache()
+    loads = []
+
+    def load():
+        loads.append(1)
+        return [(1, "a")]
+
+    cache.fetch("SELECT  *\n FROM t WHERE x = %(x)s", {"x": 1}, ("t",), load)
+    rows = cache.fetch("SELECT * FROM t WHERE x = %(x)s", {"x": 1}, ("t",), load)
+    cache.fetch("SELECT * FROM t WHERE x = %(x)s", {"x": 2}, ("t",), load)
+
+    assert rows == [(1, "a")]
+    assert len(loads) == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["hit_rate"] == pytest.approx(1 / 3)
+
+
+def test_entries_expire_after_the_ttl():
+    clock = FakeClock()
+    cache = ResultCache(ttl=10, clock=clock)
+    key = cache_key("SELECT 1")
+    cache.put(key, [(1,)], ("t",))
+
+    clock.now = 9.9
+    assert cache.get(key) == [(1,)]
+    clock.now = 10
+    assert cache.get(key) is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["bytes"] == 0
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    rows = [(n, "x" * 100) for n in range(10)]
+    probe = ResultCache()
+    probe.put(cache_key("SELECT 0"), rows, ("t",))
+    cache = ResultCache(max_bytes=probe.bytes * 2)
+
+    for n in range(3):
+        cache.put(cache_key(f"SELECT {n}"), rows, ("t",))
+        # "SELECT 0" stays the most recently used
+        cache.get(cache_key("SELECT 0"))
+
+    assert cache.get(cache_key("SELECT 1")) is None
+    assert cache.get(cache_key("SELECT 0")) == rows
+    assert cache.stats()["evictions"] == 1
+    assert cache.bytes <= cache.max_bytes
+    # Larger than the whole cache: not cached at all
+    assert not cache.put(cache_key("SELECT big"), rows * 3, ("t",))
+
+
+def test_invalidation_drops_the_entries_of_a_table():
+    cache = ResultCache()
+    cache.put(cache_key("SELECT 1"), [(1,)], ("tests", "questions"))
+    cache.put(cache_key("SELECT 2"), [(2,)], ("students",))
+
+    assert cache.invalidate(["questions"]) == 1
+    assert cache.get(cache_key("SELECT 1")) is None
+    assert cache.get(cache_key("SELECT 2")) == [(2,)]
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
+
+
+def test_a_load_overlapping_an_invalidation_is_not_cached():
+    cache = ResultCache()
+
+    def load():
+        # The table changes while its rows are being read
+        cache.invalidate(["tests"])
+        return [(1,)]
+
+    assert cache.fetch("SELECT 1", None, ("tests",), load) == [(1,)]
+    assert cache.stats()["entries"] == 0
+
+
+def test_catalog_changes_invalidate_cached_lookups(database, workload, connection):
+    cache = ResultCache()
+    watcher = VersionWatcher(cache)
+    title = next(workload.tests())[1]
+    params = {"title": title}
+    tables = CACHED_LOOKUPS["test_questions_option_search_by_title"]
+    assert tables == CATALOG_TABLES
+
+    def read():
+        watcher.check(connection)
+        return cache.fetch(
+            BY_TITLE,
+            params,
+            tables,
+            lambda: connection.execute(BY_TITLE, params).fetchall(),
+        )
+
+    before = read()
+    assert read() is before
+
+    # Another connection (or process) changes the options of the test
+    with sqlite3.connect(database) as writer:
+        writer.execute(
+            'UPDATE "questions_options" SET "option" = "option" || \'!\' '
+            'WHERE "question_id" IN (SELECT "id" FROM "questions" '
+            'WHERE "test_id" = (SELECT "id" FROM "tests" WHERE "title" = ?))',
+            (title,),
+        )
+    writer.close()
+
+    after = read()
+    assert len(after) == len(before) > 0
+    assert not any(option.endswith("!") for *_, option, _ in before)
+    assert all(option.endswith("!") for *_, option, _ in after)
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_unchanged_counters_keep_the_cache(connection):
+    cache = ResultCache()
+    watcher = VersionWatcher(cache)
+    watcher.check(connection)
+    cache.put(cache_key(BY_TITLE, {"title": "x"}), [], CATALOG_TABLES)
+
+    # Changes to other tables, and rolled back ones, are not counted
+    connection.execute('UPDATE "students" SET "email" = "email"')
+    connection.commit()
+    connection.execute('UPDATE "tests" SET "course" = "course"')
+    connection.rollback()
+
+    assert watcher.check(connection) == []
+    assert cache.stats()["entries"] == 1
+
+
+def test_emptied_tables_and_reloaded_schema_invalidate(workload, connection):
+    watcher = VersionWatcher(ResultCache())
+    watcher.check(connection)
+
+    reset_tables(connection.cursor())
+    connection.commit()
+    assert sorted(watcher.check(connection)) == sorted(CATALOG_TABLES)
+
+    with open("schema.sql", "r") as sql_file:
+        connection.executescript(sql_file.read())
+    assert sorted(watcher.check(connection)) == sorted(CATALOG_TABLES)
+
+
+def test_checks_wait_for_the_interval(connection):
+    clock = FakeClock()
+    watcher = VersionWatcher(ResultCache(), interval=5, clock=clock)
+
+    assert watcher.due()
+    watcher.check(connection)
+    assert not watcher.due()
+    clock.now = 5
+    assert watcher.due()
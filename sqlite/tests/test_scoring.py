@@ -0,0 +1,109 @@
+import sqlite3
+from itertools import islice
+
+import pytest
+
+from access import RESULT_INSERT
+from catalog import Option, Paper, Question, load_paper
+from scoring import answer_key, score_answers, session_totals, write_scored
+
+NEW_RESULTS = (
+    'SELECT "test_session_id", "question_id", "answer", "score", "feedback" '
+    'FROM "results" WHERE "id" > ? ORDER BY "id"'
+)
+SCORES = 'SELECT * FROM "tests_sessions_scores" ORDER BY "test_session_id"'
+ANSWERED = 'SELECT "answered" FROM "tests_sessions_scores" WHERE "test_session_id" = ?'
+
+
+def paper(*questions):
+    return Paper(1, "t", "d", None, "i", "c", questions)
+
+
+def question(id, *options):
+    return Question(id, "q", "multiple-choice", "x", None, options)
+
+
+KEY = answer_key(
+    paper(
+        question(1, Option(1, "a", 0), Option(2, "b", 1)),
+        question(2, Option(3, "c", 1)),
+    )
+)
+
+
+def test_answers_are_scored_against_the_key():
+    scored = score_answers(KEY, [(7, 1, 1), (7, 1, 2), (8, 2, 3), (None, 2, 3)])
+
+    assert scored == [
+        (7, 1, 1, 0, "need-improvement"),
+        (7, 1, 2, 1, "great"),
+        (8, 2, 3, 1, "great"),
+        (None, 2, 3, 1, "great"),
+    ]
+    assert session_totals(scored) == [(7, 2, 1), (8, 1, 1)]
+
+
+def test_an_option_of_another_question_is_rejected():
+    with pytest.raises(ValueError, match="answer 3 is not an option of question 1"):
+        score_answers(KEY, [(7, 1, 3)])
+
+
+@pytest.fixture
+def key(workload, connection):
+    tests = [test_id for test_id, *_ in workload.tests()]
+    return answer_key(*(load_paper(connection, test_id) for test_id in tests))
+
+
+def submitted(connection, write) -> tuple:
+    """Rows and running scores written by `write()`, then rolled back."""
+    (last,) = connection.execute('SELECT MAX("id") FROM "results"').fetchone()
+    write()
+    rows = connection.execute(NEW_RESULTS, (last,)).fetchall()
+    scores = connection.execute(SCORES).fetchall()
+    connection.rollback()
+    return rows, scores
+
+
+def test_bulk_scoring_matches_the_trigger(workload, connection, key):
+    answers = list(islice(workload.results(), 400))
+    answers.append((None, *answers[0][1:]))
+
+    def insert():
+        connection.executemany(RESULT_INSERT, answers)
+
+    by_trigger = submitted(connection, insert)
+    in_bulk = submitted(connection, lambda: write_scored(connection, key, answers))
+
+    assert in_bulk == by_trigger
+    rows, _ = in_bulk
+    assert {score for *_, score, _ in rows} == {0, 1}
+
+
+def test_the_trigger_scores_again_after_a_bulk_write(workload, connection, key):
+    session, question, answer = next(workload.results())
+    (last,) = connection.execute('SELECT MAX("id") FROM "results"').fetchone()
+    (answered,) = connection.execute(ANSWERED, (session,)).fetchone()
+
+    write_scored(connection, key, [(session, question, answer)])
+    connection.execute(RESULT_INSERT, (session, question, answer))
+
+    first, second = connection.execute(NEW_RESULTS, (last,)).fetchall()
+    assert second == first
+    assert connection.execute(ANSWERED, (session,)).fetchone() == (answered + 2,)
+    assert connection.execute('SELECT * FROM "bulk_scoring"').fetchall() == []
+
+
+def test_a_failed_bulk_write_leaves_nothing_behind(workload, connection, key):
+    session, question, answer = next(workload.results())
+    (last,) = connection.execute('SELECT MAX("id") FROM "results"').fetchone()
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.execute(RESULT_INSERT, (session, question, answer))
+    # The last one has no such session
+    answers = [(session, question, answer)] * 2 + [(0, question, answer)]
+
+    with pytest.raises(sqlite3.IntegrityError):
+        write_scored(connection, key, answers)
+    connection.commit()
+
+    assert len(connection.execute(NEW_RESULTS, (last,)).fetchall()) == 1
+    assert connection.execute('SELECT * FROM "bulk_scoring"').fetchall() == []
@@ -0,0 +1,63 @@
+import re
+import sqlite3
+
+from sqlsplit import read_statements, split_statements
+
+
+def test_split_ignores_semicolons_in_strings_and_identifiers():
+    statements = split_statements(
+        """
+        SELECT 'a;b', 'it''s;' FROM "odd;name"; SELECT [x;y], `z;`;
+        SELECT 1
+        """
+    )
+
+    assert statements == [
+        """SELECT 'a;b', 'it''s;' FROM "odd;name\"""",
+        "SELECT [x;y], `z;`",
+        "SELECT 1",
+    ]
+
+
+def test_split_ignores_semicolons_in_comments():
+    statements = split_statements(
+        """
+        -- leading; comment
+        SELECT 1 /* block; */;
+        -- trailing comment only;
+        """
+    )
+
+    assert statements == ["-- leading; comment\n        SELECT 1 /* block; */"]
+
+
+def test_split_keeps_trigger_bodies():
+    statements = split_statements(
+        """
+        CREATE TRIGGER t AFTER INSERT ON x
+        BEGIN
+            UPDATE x SET a = 1;
+            UPDATE x SET b = ';';
+        END;
+        SELECT 2;
+        """
+    )
+
+    assert len(statements) == 2
+    assert statements[0].endswith("END")
+    assert statements[1] == "SELECT 2"
+
+
+def test_read_statements_schema_executes_statement_by_statement():
+    connection = sqlite3.connect(":memory:")
+    statements = list(read_statements("schema.sql"))
+    for statement in statements:
+        connection.execute(statement)
+
+    triggers = connection.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger'"
+    ).fetchone()[0]
+    with open("schema.sql", "r") as sql_file:
+        expected = re.findall(r"^CREATE TRIGGER", sql_file.read(), re.MULTILINE)
+    assert triggers == sum("CREATE TRIGGER" in s for s in statements) == len(expected)
+    connection.close()
@@ -0,0 +1,74 @@
+import io
+import sqlite3
+
+from tabulate import tabulate
+
+from stream import GridWriter, print_stream, stream_query
+
+SEQUENCE = (
+    "WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq "
+    "WHERE n < 2000) SELECT n FROM seq"
+)
+
+
+def test_grid_writer_matches_tabulate():
+    rows = [("john", 12, None), ("jane", 7, "great")]
+    out = io.StringIO()
+
+    writer = GridWriter(["name", "score", "feedback"], out)
+    writer.write(rows[:1])
+    writer.write(rows[1:])
+
+    expected = tabulate(rows, ["name", "score", "feedback"], tablefmt="grid")
+    assert out.getvalue() == expected + "\n"
+    assert writer.rows == 2
+
+
+def test_grid_writer_keeps_widths_across_batches():
+    out = io.StringIO()
+
+    writer = GridWriter(["id"], out)
+    writer.write([(1,), (22,)])
+    writer.write([(3,)])
+
+    lines = out.getvalue().splitlines()
+    assert len({len(line) for line in lines}) == 1
+    assert lines[-2] == "|    3 |"
+
+
+def test_print_stream_skips_empty_results():
+    connection = sqlite3.connect(":memory:")
+    out = io.StringIO()
+    cursor = connection.execute("SELECT 1 WHERE 0")
+
+    assert print_stream(cursor, "empty", out=out) == 0
+    assert out.getvalue() == ""
+    connection.close()
+
+
+def test_stream_query_prints_before_the_result_is_complete():
+    connection = sqlite3.connect(":memory:")
+    produced = []
+    seen = []
+    out = io.StringIO()
+
+    def produce(n):
+        produced.append(n)
+        return n
+
+    class Recorder(io.StringIO):
+        def write(self, text):
+            # How many rows SQLite had produced when printing started
+            if not seen:
+                seen.append(len(produced))
+            return out.write(text)
+
+    connection.create_function("produce", 1, produce)
+    query = SEQUENCE.replace("SELECT n FROM seq", "SELECT produce(n) AS n FROM seq")
+    rows = stream_query(connection, query, batch_size=100, out=Recorder())
+
+    assert rows == 2000
+    # One batch (the sqlite3 module steps one row ahead), not the whole result
+    assert 100 <= seen[0] <= 101
+    assert "| 2000 |" in out.getvalue()
+    connection.close()
@@ -0,0 +1,88 @@
+import logging
+import sqlite3
+
+import pytest
+
+from db import execute_and_print
+from timing import StatementTimer, explain_query, format_plan, shorten
+
+SCRIPT = """
+CREATE TABLE "timing_probe" ("id" INTEGER PRIMARY KEY, "name" TEXT);
+-- Two rows
+INSERT INTO "timing_probe" ("id", "name") VALUES (1, 'a'), (2, 'b');
+INSERT INTO "timing_probe" ("id", "name") VALUES (1, 'c');
+SELECT * FROM "timing_probe" WHERE "name" = 'a';
+SELECT * FROM "timing_probe" WHERE "name" = 'a';
+"""
+
+
+@pytest.fixture
+def connection():
+    connection = sqlite3.connect(":memory:")
+    yield connection
+    connection.close()
+
+
+def test_explain_query_skips_comments_and_ddl():
+    plan = explain_query("-- comment\nSELECT 1")
+    assert plan == "EXPLAIN QUERY PLAN SELECT 1"
+    assert explain_query("CREATE TABLE t (id INT)") is None
+    assert shorten("-- Add\nINSERT INTO t\nVALUES (1)") == "INSERT INTO t VALUES (1)"
+
+
+def test_format_plan_indents_children():
+    rows = [(2, 0, 0, "COMPOUND QUERY"), (3, 2, 0, "LEFT"), (7, 3, 0, "SCAN t")]
+
+    assert format_plan(rows) == "COMPOUND QUERY\n  LEFT\n    SCAN t"
+
+
+def test_execute_and_print_times_every_successful_statement(connection, capsys):
+    execute_and_print(connection.cursor(), SCRIPT, "probe", timing=False)
+    assert "TIMING" not in capsys.readouterr().out
+
+    connection.execute('DROP TABLE "timing_probe"')
+    execute_and_print(connection.cursor(), SCRIPT, "probe", timing=True)
+    out = capsys.readouterr().out
+    assert "TIMING: probe" in out
+    # The failing insert isn't timed, the two selects are one statement
+    (total,) = [line for line in out.splitlines() if "TOTAL" in line]
+    cells = [cell.strip() for cell in total.split("|")]
+    assert cells[1:3] == ["TOTAL (3 statements)", "4"]
+
+
+def test_rows_are_known_for_writes(connection):
+    connection.execute('CREATE TABLE "timing_probe" ("name" TEXT)')
+    timer = StatementTimer(connection, slow_ms=float("inf"))
+    cursor = connection.cursor()
+    cursor.execute("INSERT INTO \"timing_probe\" (\"name\") VALUES ('c'), ('d')")
+    timer.record(cursor, "INSERT", 0.001)
+    cursor.execute('SELECT * FROM "timing_probe"')
+    timer.record(cursor, "SELECT", 0.001)
+    assert [record["rows"] for record in timer.records] == [2, None]
+    # A read isn't counted as 0 rows
+    assert {entry["query"]: entry["rows"] for entry in timer.summary()} == {
+        "INSERT": 2,
+        "SELECT": None,
+    }
+
+
+def test_slow_statements_are_logged_with_their_plan(connection, caplog):
+    connection.execute('CREATE TABLE "timing_probe" ("id" INTEGER, "name" TEXT)')
+    timer = StatementTimer(connection, slow_ms=0)
+    cursor = connection.cursor()
+
+    with caplog.at_level(logging.DEBUG, logger="timing"):
+        query = 'SELECT * FROM "timing_probe" WHERE "name" = \'a\''
+        cursor.execute(query)
+        read = timer.record(cursor, query, 0.001)
+        query = 'DELETE FROM "timing_probe"'
+        cursor.execute(query)
+        write = timer.record(cursor, query, 0.001)
+
+    assert read["plan"].startswith("SCAN")  # "SCAN TABLE" before 3.36
+    assert write["plan"] is not None
+    slow = [record for record in caplog.records if hasattr(record, "timing")]
+    assert [record.levelno for record in slow] == [logging.WARNING] * 2
+    assert slow[0].timing["slow"] is True
+    summary = timer.summary()
+    assert [entry["calls"] for entry in summary] == [1, 1]
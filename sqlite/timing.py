@@ -0,0 +1,192 @@
+"""
+Per-statement timing and slow-query log for script execution.
+
+## Key Features:
+- `StatementTimer.record` is called by `db.execute_and_print` after every \
+    successful statement with its wall time:
+    - One structured log record per statement (`DEBUG`, `extra={"timing": \
+        {...}}` with `query`, `wall_ms`, `rows`, `slow`), so a handler or \
+        formatter can ship the fields as they are.
+    - Statements slower than `slow_ms` are logged as `WARNING` with their \
+        `EXPLAIN QUERY PLAN` tree.
+- `summary()` aggregates the records per statement (calls, total/max time, \
+    rows, slow calls), `print_summary()` prints the slowest as a table.
+
+## Notes:
+- SQLite runs in-process: the wall time is the engine's time, there is no \
+    separate server time.
+- Rows are produced lazily, so a read's time covers its first row (all of \
+    the work when it sorts or aggregates); `rows` is only known for writes, \
+    a read leaves it empty in the summary.
+- `EXPLAIN QUERY PLAN` doesn't execute the statement, writes are safe to \
+    explain.
+"""
+
+import logging
+import re
+import sqlite3
+
+from tabulate import tabulate as tb
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_MS = 100.0
+DEFAULT_SUMMARY_LIMIT = 10
+
+EXPLAINABLE = re.compile(
+    r"^(SELECT|WITH|VALUES|INSERT|REPLACE|UPDATE|DELETE)\b", re.IGNORECASE
+)
+LEADING_COMMENTS = re.compile(r"^(\s*(--[^\n]*(\n|$)|/\*.*?\*/))*\s*", re.DOTALL)
+
+
+def strip_comments(query: str) -> str:
+    """The statement without the comments in front of it."""
+    return LEADING_COMMENTS.sub("", query, count=1)
+
+
+def shorten(query: str, width: int = 60) -> str:
+    """One-line prefix of a statement (comments skipped), for logs and tables."""
+    query = " ".join(strip_comments(query).split())
+    return query if len(query) <= width else f"{query[: width - 3]}..."
+
+
+def explain_query(query: str) -> str:
+    """The `EXPLAIN QUERY PLAN` for a statement, `None` if it can't be explained."""
+    query = strip_comments(query)
+    if not EXPLAINABLE.match(query):
+        return None
+    return f"EXPLAIN QUERY PLAN {query}"
+
+
+def format_plan(rows: list) -> str:
+    """Indented tree of `EXPLAIN QUERY PLAN` rows (`id`, `parent`, _, `detail`)."""
+    depths = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depths[node] = depths.get(parent, -1) + 1
+        lines.append(f"{'  ' * depths[node]}{detail}")
+    return "\n".join(lines)
+
+
+class StatementTimer:
+    """Timing records of the statements of one connection.
+
+    Args:
+        connection (sqlite3.Connection): connection the statements run on
+        slow_ms (float, optional): threshold of the slow-query log. \
+            Defaults to 100.
+        explain (bool, optional): capture the plan of slow statements. \
+            Defaults to True.
+    """
+
+    def __init__(
+        self,
+        connection: sqlite3.Connection,
+        slow_ms: float = DEFAULT_SLOW_MS,
+        explain: bool = True,
+    ):
+        self.connection = connection
+        self.slow_ms = slow_ms
+        self.explain = explain
+        self.records = []
+
+    def _plan(self, query: str) -> str:
+        explain = explain_query(query)
+        if explain is None:
+            return None
+        try:
+            return format_plan(self.connection.execute(explain).fetchall())
+        except sqlite3.Error as err:
+            logger.info("Couldn't explain %s: %s", shorten(query), err)
+            return None
+
+    def record(self, cursor: sqlite3.Cursor, query: str, seconds: float) -> dict:
+        """Record (and log) one executed statement, explain it if slow.
+
+        Args:
+            cursor (sqlite3.Cursor): cursor of the statement
+            query (str): the statement
+            seconds (float): wall time of its execution
+
+        Returns:
+            dict: the timing record
+        """
+        wall_ms = seconds * 1000
+        record = {
+            "query": query,
+            "wall_ms": wall_ms,
+            "rows": cursor.rowcount if cursor.rowcount >= 0 else None,
+            "slow": wall_ms >= self.slow_ms,
+            "plan": None,
+        }
+        if record["slow"] and self.explain:
+            record["plan"] = self._plan(query)
+
+        self.records.append(record)
+        timing = {key: value for key, value in record.items() if key != "plan"}
+        logger.log(
+            logging.WARNING if record["slow"] else logging.DEBUG,
+            "%s statement (%.3f ms, %s rows): %s",
+            "Slow" if record["slow"] else "Timed",
+            wall_ms,
+            "?" if record["rows"] is None else record["rows"],
+            shorten(query),
+            extra={"timing": timing},
+        )
+        if record["plan"]:
+            logger.warning("Plan of %s\n%s", shorten(query), record["plan"])
+        return record
+
+    def summary(self) -> list:
+        """Records aggregated per statement, slowest (total time) first."""
+        statements = {}
+        for record in self.records:
+            entry = statements.setdefault(
+                record["query"],
+                {
+                    "query": record["query"],
+                    "calls": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "rows": None,
+                    "slow": 0,
+                },
+            )
+            entry["calls"] += 1
+            entry["total_ms"] += record["wall_ms"]
+            entry["max_ms"] = max(entry["max_ms"], record["wall_ms"])
+            if record["rows"] is not None:
+                # Unknown (reads) stays empty rather than counting as 0
+                entry["rows"] = (entry["rows"] or 0) + record["rows"]
+            entry["slow"] += record["slow"]
+        return sorted(statements.values(), key=lambda entry: -entry["total_ms"])
+
+    def print_summary(self, title: str = "", limit: int = DEFAULT_SUMMARY_LIMIT):
+        """Print the `limit` slowest statements and the script totals."""
+        summary = self.summary()
+        if not summary:
+            return
+        rows = [
+            (
+                shorten(entry["query"]),
+                entry["calls"],
+                f"{entry['total_ms']:.3f}",
+                f"{entry['max_ms']:.3f}",
+                entry["rows"],
+                entry["slow"],
+            )
+            for entry in summary[:limit]
+        ]
+        rows.append(
+            (
+                f"TOTAL ({len(summary)} statements)",
+                sum(entry["calls"] for entry in summary),
+                f"{sum(entry['total_ms'] for entry in summary):.3f}",
+                "",
+                sum(entry["rows"] or 0 for entry in summary),
+                sum(entry["slow"] for entry in summary),
+            )
+        )
+        headers = ["statement", "calls", "total ms", "max ms", "rows"]
+        print(f"\n\nTIMING: {title}")
+        print(tb(rows, headers + [f">= {self.slow_ms:g} ms"], tablefmt="grid"))